@@ -0,0 +1,151 @@
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from greento.network.prepared import prepared_network
+from greento.utils.geo import geo
+
+
+class green_candidates:
+    """
+    The green points of a raster snapped to a traffic network, prepared once for many queries.
+
+    Every green point stands for the node it is snapped to, plus its snapping
+    distance. All the preparation is array-native: one batched query of the network
+    snap index for the nodes and their snapping distances.
+
+    Attributes
+    ----------
+    network : prepared_network
+        The prepared traffic network.
+    lats : numpy.ndarray
+        The latitude of every green point.
+    lons : numpy.ndarray
+        The longitude of every green point.
+    nodes : numpy.ndarray
+        The int32 index of the node every green point is snapped to.
+    offsets : numpy.ndarray
+        The distance in meters from every green point to its node.
+
+    Methods
+    -------
+    bounds(node: int) -> numpy.ndarray
+        Returns a lower bound of the network distance from a node to every green point.
+    nearest(node: int or numpy.ndarray, limit: float, offsets: numpy.ndarray) -> tuple[int, float]
+        Finds the green point with the shortest network distance from a node.
+    """
+
+    PRESELECTED = 2048
+
+    def __init__(
+        self, network: prepared_network, lats: np.ndarray, lons: np.ndarray
+    ) -> None:
+        """
+        Snaps the green points to the traffic network.
+
+        Parameters
+        ----------
+        network : prepared_network
+            The prepared traffic network.
+        lats : numpy.ndarray
+            The latitude of every green point.
+        lons : numpy.ndarray
+            The longitude of every green point.
+
+        Returns
+        -------
+        None
+        """
+        graph = network.graph
+        self.network = network
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.nodes, self.offsets = graph.snap(self.lats, self.lons)
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def bounds(self, node: int) -> np.ndarray:
+        """
+        Returns a lower bound of the network distance from a node to every green point.
+
+        The bound is the straight-line distance between the node and the node of the
+        green point, plus the snapping distance: it never exceeds the network distance
+        as long as edges are at least as long as the straight line between their ends.
+
+        Parameters
+        ----------
+        node : int
+            The index of the node.
+
+        Returns
+        -------
+        numpy.ndarray
+            The lower bound in meters for every green point.
+        """
+        graph = self.network.graph
+        straight = geo().haversine_distances(
+            graph.y[node], graph.x[node], graph.y[self.nodes], graph.x[self.nodes]
+        )
+        return straight * 1000 + self.offsets
+
+    def nearest(
+        self,
+        node: Union[int, np.ndarray],
+        limit: float = 100000,
+        offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[int, float]:
+        """
+        Finds the green point with the shortest network distance from a node.
+
+        Only the green points with the lowest bounds are searched first, selected
+        with a partial sort. The result is accepted when no other green point can
+        beat it, otherwise the search is repeated over all of them.
+
+        Parameters
+        ----------
+        node : int or numpy.ndarray
+            The index of the starting node, or the indices of several starting nodes
+            (e.g. both ends of the edge a point is snapped to).
+        limit : float, optional
+            The maximum network distance in meters. Defaults to 100000.
+        offsets : numpy.ndarray, optional
+            The distance in meters from the starting point to every starting node. Defaults to zero.
+
+        Returns
+        -------
+        tuple
+            The index of the nearest green point and its distance in meters,
+            or (-1, inf) if no green point is reachable.
+        """
+        if len(self) == 0:
+            return -1, float("inf")
+        search = self.network.search("length")
+        nodes = np.atleast_1d(node)
+        if offsets is None:
+            offsets = np.zeros(len(nodes))
+        # the cheapest bound through any of the starting nodes
+        bounds = np.min(
+            [offset + self.bounds(int(start)) for start, offset in zip(nodes, offsets)],
+            axis=0,
+        )
+
+        if len(bounds) > self.PRESELECTED:
+            selected = np.argpartition(bounds, self.PRESELECTED - 1)[
+                : self.PRESELECTED
+            ]
+            position, cost = search.nearest_target(
+                nodes,
+                self.nodes[selected],
+                self.offsets[selected],
+                bounds[selected],
+                limit,
+                offsets,
+            )
+            # every green point left out has a bound at least as high as the selected ones
+            if cost <= bounds[selected].max():
+                return int(selected[position]), cost
+
+        return search.nearest_target(
+            nodes, self.nodes, self.offsets, bounds, limit, offsets
+        )
@@ -1,14 +1,23 @@
 import json
 import logging
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple, Union
 
 import geopandas as gpd
 import networkx as nx
 import numpy as np
 import osmnx as ox
-from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
 from tqdm import tqdm
 
+from greento.distance.candidates import green_candidates
+from greento.distance.field import green_field
+from greento.green.patches import green_patch_index
+from greento.network.landmarks import landmarks
+from greento.network.prepared import prepared_network
+from greento.network.speeds import speed_profiles
+from greento.network.trees import path_tree_cache
+from greento.transit.gtfs import gtfs_feed
+from greento.transit.router import transit_router
 from greento.utils.geo import geo
 
 from .interface import interface
@@ -24,17 +33,41 @@ class copernicus(interface):
     ----------
     copernicus_green : dict
         A dictionary containing the raster data and its transform.
-    vector_traffic_area : tuple
-        A tuple containing GeoDataFrames for nodes and edges of the traffic network.
+    vector_traffic_area : tuple or prepared_network
+        A tuple containing GeoDataFrames for nodes and edges of the traffic network, prepared on first use.
     preprocessed_graph : networkx.Graph or None
-        A preprocessed traffic network graph for routing.
+        A preprocessed traffic network graph for routing, built once from the prepared network.
+    green_field : green_field or None
+        The precomputed nearest green field answering the nearest green queries, if any.
+    patch_index : green_patch_index or None
+        The patch index of the green raster, built on first use.
+    min_area_sqm : float
+        The minimum area in square meters of the green areas considered.
+    landmark_weight : str or None
+        The edge weight of the landmark tables used to route directions, if any.
+    path_tree_weight : str or None
+        The edge weight of the cached shortest path trees answering the queries, if enabled.
+    transit : gtfs_feed, transit_router or None
+        The public transit timetable timing the 'all_public' directions, routed on the network on first use.
     _green_positions_cache : dict
         A cache for storing green positions.
+    _length_field : green_field or None
+        The nearest green field by length of the batch queries, when the precomputed field has another weight.
 
     Methods
     -------
+    build_green_field(weight: str, limit: float) -> green_field
+        Precomputes the nearest green point of every network node.
+    build_landmarks(weight: str, count: int) -> landmarks
+        Precomputes the landmark distance tables used to route directions.
+    cache_path_trees(weight: str, max_bytes: int) -> path_tree_cache
+        Answers the queries from repeated origins with cached shortest path trees.
     get_nearest_green_position(lat: float, lon: float) -> tuple[float, float]
         Finds the nearest green position from a given starting point.
+    get_nearest_green_positions(lats: numpy.ndarray, lons: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Finds the nearest green position and its network distance from many starting points.
+    od_matrix(origins: numpy.ndarray, destinations: numpy.ndarray, transport_mode: str, weight: str) -> tuple[numpy.ndarray, numpy.ndarray]
+        Calculates the network distance and estimated travel time between every origin and destination.
     directions(lat1: float, lon1: float, lat2: float, lon2: float, transport_mode: str) -> str
         Calculates the shortest path and estimated travel time between two points.
     """
@@ -42,7 +75,13 @@ class copernicus(interface):
     def __init__(
         self,
         raster_data: Dict[str, Any],
-        vector_traffic_area: Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame],
+        vector_traffic_area: Union[
+            Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame], prepared_network
+        ],
+        green_field: Optional[green_field] = None,
+        patch_index: Optional[green_patch_index] = None,
+        min_area_sqm: float = 0.0,
+        transit: Optional[Union[gtfs_feed, transit_router]] = None,
     ) -> None:
         """
         Initializes the DistanceCopernicus class with raster data and a traffic network graph.
@@ -55,8 +94,19 @@ class copernicus(interface):
                 - 'transform': The affine transform of the raster.
                 - 'crs': The coordinate reference system of the raster.
                 - 'shape': The shape of the raster.
-        vector_traffic_area : tuple
-            A tuple containing GeoDataFrames for nodes and edges of the traffic network.
+        vector_traffic_area : tuple or prepared_network
+            A tuple containing GeoDataFrames for nodes and edges of the traffic network,
+            or a prepared network reused across all queries.
+        green_field : green_field, optional
+            A precomputed nearest green field, e.g. loaded with `green_field.load`.
+        patch_index : green_patch_index, optional
+            The patch index of the green raster, built on first use if missing.
+        min_area_sqm : float, optional
+            The minimum area in square meters of the green areas considered
+            (e.g. 5000 for parks of at least 0.5 ha). Defaults to 0.
+        transit : gtfs_feed or transit_router, optional
+            The public transit timetable, e.g. loaded with `gtfs_feed.from_zip`.
+            When given, the 'all_public' directions follow its timetables.
 
         Returns
         -------
@@ -65,14 +115,238 @@ class copernicus(interface):
         self.copernicus_green = raster_data
         self.vector_traffic_area = vector_traffic_area
         self.preprocessed_graph: Optional[nx.Graph] = None
+        self.green_field = green_field
+        self.patch_index = patch_index
+        self.min_area_sqm = min_area_sqm
+        self.landmark_weight: Optional[str] = None
+        self.path_tree_weight: Optional[str] = None
+        self.transit = transit
+        self._green_candidates: Optional[green_candidates] = None
+        self._length_field: Optional[green_field] = None
         self._green_positions_cache: Dict[Tuple[float, float], Tuple[float, float]] = {}
 
+    def _network(self) -> prepared_network:
+        """
+        Returns the prepared traffic network, preparing the GeoDataFrames on first use.
+
+        Returns
+        -------
+        prepared_network
+            The traffic network shared by all the queries of this instance.
+        """
+        if not isinstance(self.vector_traffic_area, prepared_network):
+            self.vector_traffic_area = prepared_network.from_traffic_area(
+                self.vector_traffic_area
+            )
+        return self.vector_traffic_area
+
+    def _transit(self) -> Optional[transit_router]:
+        """
+        Returns the public transit router, built on the traffic network on first use.
+
+        Returns
+        -------
+        transit_router or None
+            The router shared by all the queries of this instance, None without a timetable.
+        """
+        if isinstance(self.transit, gtfs_feed):
+            self.transit = transit_router(self.transit, self._network())
+        return self.transit
+
+    def _green_points(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the latitude and longitude of the entry pixels of every green area large enough.
+
+        Only the pixels on the boundary of a green area are kept: a path coming
+        from outside reaches one of them first.
+
+        Returns
+        -------
+        tuple
+            The latitudes and longitudes of the green points.
+        """
+        patches = self._patches()
+        lats, lons, _ = patches.entry_points(patches.select(self.min_area_sqm))
+        return lats, lons
+
+    def _patches(self) -> green_patch_index:
+        """
+        Returns the patch index of the green raster, built on first use.
+
+        Returns
+        -------
+        green_patch_index
+            The green patches shared by all the queries of this instance.
+        """
+        if self.patch_index is None:
+            self.patch_index = green_patch_index(self.copernicus_green)
+        return self.patch_index
+
+    def _candidates(self) -> green_candidates:
+        """
+        Returns the green pixels snapped to the traffic network, prepared on first use.
+
+        Returns
+        -------
+        green_candidates
+            The green points shared by all the nearest green queries of this instance.
+        """
+        if self._green_candidates is None:
+            self._green_candidates = green_candidates(
+                self._network(), *self._green_points()
+            )
+        return self._green_candidates
+
+    def build_green_field(
+        self, weight: str = "length", limit: float = 100000
+    ) -> green_field:
+        """
+        Precomputes the nearest green point of every network node.
+
+        The field answers all the following nearest green queries of this instance,
+        and can be saved to be reused across runs.
+
+        Parameters
+        ----------
+        weight : str, optional
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+            Defaults to 'length'.
+        limit : float, optional
+            The maximum cost from a node to a green point. Defaults to 100000.
+
+        Returns
+        -------
+        green_field
+            The field of the nearest green points.
+        """
+        self.green_field = green_field.from_candidates(
+            self._candidates(), weight=weight, limit=limit
+        )
+        return self.green_field
+
+    def build_landmarks(self, weight: str = "length", count: int = 16) -> landmarks:
+        """
+        Precomputes the landmark distance tables used to route directions.
+
+        Once built for a transport mode, `directions` in that mode finds its routes
+        with A* over the CSR network, bounded by the landmarks, instead of Dijkstra.
+        Tables by 'length' are never used to route directions, which follow the travel
+        times. The tables are kept on the prepared network and written with it by `network_store`.
+
+        Parameters
+        ----------
+        weight : str, optional
+            'length' for the shortest routes, or a transport mode for the fastest ones.
+            Defaults to 'length'.
+        count : int, optional
+            The number of landmarks. Defaults to 16.
+
+        Returns
+        -------
+        landmarks
+            The landmark distance tables.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        tables = self._network().landmarks(weight, count)
+        self.landmark_weight = weight
+        return tables
+
+    def cache_path_trees(
+        self, weight: str = "length", max_bytes: Optional[int] = None
+    ) -> path_tree_cache:
+        """
+        Answers the queries from repeated origins with cached shortest path trees.
+
+        Once enabled, `directions` in the transport mode of the trees and
+        `get_nearest_green_position` build the whole shortest path tree of their
+        origin node and keep it in the LRU cache of the prepared network, so any
+        later query from the same node is answered without a new search. The cache is shared by every instance using the same network.
+
+        Parameters
+        ----------
+        weight : str, optional
+            'length' for the shortest routes, or a transport mode for the fastest ones.
+            Nearest green queries always use 'length' trees. Defaults to 'length'.
+        max_bytes : int, optional
+            The memory budget of the cache in bytes. Defaults to the current budget.
+
+        Returns
+        -------
+        path_tree_cache
+            The cache of the shortest path trees.
+        """
+        network = self._network()
+        network.search(weight)
+        if max_bytes is not None:
+            network.path_trees.max_bytes = max_bytes
+        self.path_tree_weight = weight
+        return network.path_trees
+
+    def get_nearest_green_positions(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the nearest green position and its network distance from many starting points.
+
+        The green points are extracted from the raster once and all the network
+        distances to them come from a single multi-source search, shared with the
+        nearest green field of this instance. All origins are then snapped with one
+        KD-tree query.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            Latitudes of the starting points.
+        lons : numpy.ndarray
+            Longitudes of the starting points.
+
+        Returns
+        -------
+        tuple
+            Three arrays with one entry per starting point, NaN where no green area is reachable:
+            - green_lats (numpy.ndarray): The latitude of the nearest green position.
+            - green_lons (numpy.ndarray): The longitude of the nearest green position.
+            - distances (numpy.ndarray): The network distance in meters to the nearest green position.
+
+        Raises
+        ------
+        ValueError
+            If the coordinates are not valid.
+        """
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lons = np.asarray(lons, dtype=np.float64).ravel()
+        if len(lats) != len(lons) or not (
+            np.isfinite(lats).all() and np.isfinite(lons).all()
+        ):
+            logger = logging.getLogger(__name__)
+            logger.error("Coordinates not valid")
+            raise ValueError("Coordinates not valid")
+
+        field = self.green_field
+        if field is None or field.weight != "length":
+            # built once, whatever the weight of the precomputed field
+            if self._length_field is None:
+                self._length_field = green_field.from_candidates(self._candidates())
+            field = self._length_field
+            if self.green_field is None:
+                self.green_field = field
+        return field.query(lats, lons)
+
     def get_nearest_green_position(
         self, lat: float, lon: float
     ) -> Optional[Tuple[float, float]]:
         """
         Finds the nearest green position from a given starting point using a raster dataset and a traffic network graph.
 
+        Every green pixel is a candidate. The starting point is snapped onto its
+        nearest edge and searched from both ends, as in `get_nearest_green_positions`.
+        The network search stops as soon as no candidate left can be closer than the
+        best one found, candidates being ruled out by their straight-line distance.
+
         Parameters
         ----------
         lat : float
@@ -85,99 +359,158 @@ class copernicus(interface):
         tuple
             A tuple containing the latitude and longitude of the nearest green position,
             or None if no green areas are found.
-
-        Raises
-        ------
-        NetworkXError
-            If there is an error calculating the nearest green point.
         """
+        if self.green_field is not None:
+            return self.green_field.nearest_green(lat, lon)
 
         with tqdm(
             total=100, desc="Processing nearest green position", leave=False
         ) as pbar:
-            nodes, edges = self.vector_traffic_area
-            raster_data = self.copernicus_green["data"]
-            transform = self.copernicus_green["transform"]
-
-            G = ox.graph_from_gdfs(nodes, edges)
-
-            nearest_node = ox.distance.nearest_nodes(G, X=lon, Y=lat)
-
+            network = self._network()
+            # the point starts from both ends of its nearest edge, partway along it
+            seed_nodes, seed_offsets = network.point_seeds(lat, lon, "length")
             pbar.update(10)
-            green_rows, green_cols = np.where(raster_data == 1)
 
-            logger = logging.getLogger(__name__)
-            if len(green_rows) == 0:
+            candidates = self._candidates()
+            if len(candidates) == 0:
+                logger = logging.getLogger(__name__)
                 logger.warning("No green areas found in the raster")
                 return None
-
-            if len(green_rows) < 2000:
-                max_green_points = len(green_rows)
-            elif len(green_rows) < 10000:
-                max_green_points = len(green_rows) // 5
+            pbar.update(40)
+
+            if self.path_tree_weight is not None:
+                totals = np.full(len(candidates), np.inf)
+                for node, offset in zip(seed_nodes.tolist(), seed_offsets.tolist()):
+                    tree = network.path_tree(node, "length", limit=100000)
+                    totals = np.minimum(totals, offset + tree.cost(candidates.nodes))
+                totals += candidates.offsets
+                position = int(totals.argmin())
+                if not np.isfinite(totals[position]):
+                    position = -1
             else:
-                max_green_points = 5000
+                position, _ = candidates.nearest(
+                    seed_nodes, limit=100000, offsets=seed_offsets
+                )
+            pbar.update(50)
+            pbar.set_description("Nearest green position found")
+            pbar.close()
+            if position < 0:
+                return None
+            return (float(candidates.lats[position]), float(candidates.lons[position]))
 
-            green_coords = []
-            for row, col in zip(green_rows, green_cols):
-                lon_pixel, lat_pixel = transform * (col + 0.5, row + 0.5)
-                green_coords.append((lat_pixel, lon_pixel))
+    def od_matrix(
+        self,
+        origins: np.ndarray,
+        destinations: np.ndarray,
+        transport_mode: str = "walk",
+        weight: str = "length",
+        limit: float = np.inf,
+        chunk_size: int = 256,
+        sparse: bool = False,
+    ) -> Tuple[Union[np.ndarray, csr_matrix], Union[np.ndarray, csr_matrix]]:
+        """
+        Calculates the network distance and estimated travel time between every origin and destination.
 
-            pbar.update(10)
-            distances_euclidian = [
-                geo().haversine_distance(lat, lon, gp_lat, gp_lon)
-                for gp_lat, gp_lon in green_coords
-            ]
-            pbar.update(10)
+        The origins are snapped onto their nearest edges and the destinations to their
+        nearest nodes, then both ends of the edge of every origin are searched in chunks
+        of `chunk_size` origins with SciPy's Dijkstra over the CSR network, which
+        bounds the memory used whatever the number of origins. The travel times are
+        estimated from the distances as in `directions`.
 
-            indices_sorted = np.argsort(distances_euclidian)[:max_green_points]
-            green_coords_filtered = [green_coords[i] for i in indices_sorted]
-            pbar.update(10)
-            node_points = np.array(
-                [(data["y"], data["x"]) for _, data in G.nodes(data=True)]
-            )
-            node_ids = list(G.nodes())
-            tree = cKDTree(node_points)
-            pbar.update(10)
+        Parameters
+        ----------
+        origins : numpy.ndarray
+            The (N, 2) latitude and longitude of the origins.
+        destinations : numpy.ndarray
+            The (M, 2) latitude and longitude of the destinations.
+        transport_mode : str, optional
+            Mode of transport (e.g., "walk", "bike", "drive"). Defaults to "walk".
+        weight : str, optional
+            'length' for the shortest paths, 'travel_time' for the fastest ones with the
+            edge travel times of the transport mode. Defaults to 'length'.
+        limit : float, optional
+            The maximum cost searched from every origin, in meters or seconds depending
+            on the weight. Defaults to no limit.
+        chunk_size : int, optional
+            The number of origins searched at a time. Defaults to 256.
+        sparse : bool, optional
+            Whether to return sparse matrices holding only the reachable pairs. Defaults to False.
 
-            green_nodes = []
-            batch_size = 100
-
-            for i in range(0, len(green_coords_filtered), batch_size):
-                batch = green_coords_filtered[i : i + batch_size]
-                batch_points = np.array(batch)
-                distances_batch, indices_batch = tree.query(batch_points, k=1)
-                for j, (dist, idx) in enumerate(zip(distances_batch, indices_batch)):
-                    green_lat, green_lon = batch[j]
-                    closest_node = node_ids[idx]
-                    green_nodes.append((green_lat, green_lon, closest_node, dist))
-            pbar.update(20)
-
-            try:
-                distances = nx.single_source_dijkstra_path_length(
-                    G, nearest_node, weight="length", cutoff=100000
-                )
-            except nx.NetworkXError as e:
-                logger.error(f"Error calculating nearest green point: {e}")
-            pbar.update(20)
-            min_distance = float("inf")
-            closest_green_point = None
-            for green_lat, green_lon, node, node_dist in green_nodes:
-                if node in distances:
-                    total_distance = distances[node] + node_dist
-                    if total_distance < min_distance:
-                        min_distance = total_distance
-                        closest_green_point = (green_lat, green_lon)
-            pbar.set_description("Nearest green position found")
-            pbar.update(10)
-            pbar.close()
-            return closest_green_point
+        Returns
+        -------
+        tuple
+            Two (N, M) matrices, inf (or missing if sparse) where the destination is not reachable:
+            - distances (numpy.ndarray or scipy.sparse.csr_matrix): The network distance in meters.
+            - times (numpy.ndarray or scipy.sparse.csr_matrix): The estimated travel time in minutes.
+
+        Raises
+        ------
+        ValueError
+            If the coordinates, the transport mode or the weight are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        if not (np.isfinite(origins).all() and np.isfinite(destinations).all()):
+            logger.error("Coordinates not valid")
+            raise ValueError("Coordinates not valid")
+        network = self._network()
+        if transport_mode not in network.travel_times:
+            logger.error(f"Transport mode not valid: {transport_mode}")
+            raise ValueError("Transport mode not valid")
+        if weight not in ("length", "travel_time"):
+            logger.error(f"Weight not valid: {weight}")
+            raise ValueError("Weight not valid")
+
+        # the origins start from both ends of their nearest edge, partway along it
+        seed_nodes, seed_lengths = network.edge_seeds(
+            origins[:, 0], origins[:, 1], "length"
+        )
+        targets = network.graph.nearest_nodes(destinations[:, 0], destinations[:, 1])
+        shape = (len(origins), 2, len(targets))
+
+        if weight == "length":
+            costs, _ = network.shortest_paths("length").costs(
+                seed_nodes.ravel(), targets, limit=limit, chunk_size=2 * chunk_size
+            )
+            distances = (costs.reshape(shape) + seed_lengths[:, :, None]).min(axis=1)
+            distances[distances > limit] = np.inf
+        else:
+            _, seed_costs = network.edge_seeds(
+                origins[:, 0], origins[:, 1], transport_mode
+            )
+            costs, lengths = network.shortest_paths(transport_mode).costs(
+                seed_nodes.ravel(),
+                targets,
+                limit=limit,
+                chunk_size=2 * chunk_size,
+                lengths=True,
+            )
+            costs = costs.reshape(shape) + seed_costs[:, :, None]
+            best = costs.argmin(axis=1)[:, None]
+            lengths = lengths.reshape(shape) + seed_lengths[:, :, None]
+            distances = np.take_along_axis(lengths, best, axis=1)[:, 0]
+            distances[np.take_along_axis(costs, best, axis=1)[:, 0] > limit] = np.inf
+        times = geo()._calculate_travel_time(distances, transport_mode)
+
+        if sparse:
+            rows, cols = np.nonzero(np.isfinite(distances))
+            shape = distances.shape
+            return (
+                csr_matrix((distances[rows, cols], (rows, cols)), shape=shape),
+                csr_matrix((times[rows, cols], (rows, cols)), shape=shape),
+            )
+        return distances, times
 
     def directions(
         self, lat1: float, lon1: float, lat2: float, lon2: float, transport_mode: str
     ) -> Optional[str]:
         """
-        Calculates the shortest path and estimated travel time between two points using a traffic network graph.
+        Calculates the fastest path and estimated travel time between two points using a traffic network graph.
+
+        The route minimizes the edge travel times of the transport mode, with the
+        cached path trees or the landmark tables only when they were built for it.
+        It starts partway along the edge nearest to the origin.
 
         Parameters
         ----------
@@ -199,53 +532,63 @@ class copernicus(interface):
 
         Raises
         ------
-        RuntimeError
-            If there is an error creating the graph or if the graph has no nodes.
+        ValueError
+            If the transport mode is not valid.
         """
+        logger = logging.getLogger(__name__)
         with tqdm(total=100, desc="Calculating the direction", leave=False) as pbar:
-            if self.preprocessed_graph is None:
-                if (
-                    isinstance(self.vector_traffic_area, tuple)
-                    and len(self.vector_traffic_area) == 2
-                ):
-                    gdf_nodes, gdf_edges = self.vector_traffic_area
-                    G = ox.graph_from_gdfs(gdf_nodes, gdf_edges)
-                    if G is None or len(G.nodes()) == 0:
-                        logger = logging.getLogger(__name__)
-                        logger.error("Failed to create graph or graph has no nodes")
-                        return None
-                    G = ox.routing.add_edge_speeds(G)
-                    G = ox.routing.add_edge_travel_times(G)
-                    self.preprocessed_graph = G
-                    pbar.update(40)
-                else:
-                    logger = logging.getLogger(__name__)
-                    logger.error("Invalid vector_traffic_area type")
-                    return None
-
-            G = self.preprocessed_graph
+            network = self._network()
+            # every branch routes by the travel time of the requested mode
+            weight = speed_profiles.transport_mode(transport_mode)
+            # the origin starts from both ends of its nearest edge, partway along it
+            seed_nodes, seed_offsets = network.point_seeds(lat1, lon1, weight)
+            _, seed_lengths = network.point_seeds(lat1, lon1, "length")
+            dest_index = int(network.graph.nearest_node(lat2, lon2))
             pbar.update(30)
-            logger = logging.getLogger(__name__)
-            for node_id, data in G.nodes(data=True):
-                if "x" not in data or "y" not in data:
-                    logger.error(
-                        f"Node {node_id} does not have 'x' and 'y' coordinates"
-                    )
-                    return None
-
-            orig_node = ox.distance.nearest_nodes(G, X=lon1, Y=lat1)
-            dest_node = ox.distance.nearest_nodes(G, X=lon2, Y=lat2)
-            pbar.update(20)
-
-            route = ox.shortest_path(G, orig_node, dest_node, weight="travel_time")
+            if self.path_tree_weight == weight:
+                trees = [
+                    network.path_tree(node, weight) for node in seed_nodes.tolist()
+                ]
+                totals = seed_offsets + [
+                    tree.cost(np.array([dest_index]))[0] for tree in trees
+                ]
+                start = int(totals.argmin())
+                edges = trees[start].path(dest_index, network.graph)
+            else:
+                potential = None
+                if weight == self.landmark_weight or weight in network.landmark_tables:
+                    potential = network.landmarks(weight).potential(dest_index)
+                edges, cost, _ = network.search(weight).path(
+                    seed_nodes, dest_index, potential, offsets=seed_offsets
+                )
+                if not np.isfinite(cost):
+                    edges = None
+                else:
+                    first = dest_index
+                    if len(edges):
+                        # the source node of the first edge of the path
+                        first = (
+                            int(np.searchsorted(network.graph.indptr, edges[0], "right"))
+                            - 1
+                        )
+                    start = int(np.flatnonzero(seed_nodes == first)[0])
+            if edges is None:
+                logger.error("No route found between the two points")
+                return None
             total_distance = (
-                sum(G[u][v][0].get("length", 0) for u, v in zip(route[:-1], route[1:]))
-                / 1000
+                float(seed_lengths[start] + network.graph.length[edges].sum()) / 1000
             )
+            pbar.update(60)
             total_distance_meters = total_distance * 1000
             total_time_minutes = geo()._calculate_travel_time(
                 total_distance_meters, transport_mode
             )
+            transit = self._transit() if transport_mode == "all_public" else None
+            if transit is not None:
+                # the fastest of walking and riding the scheduled trips
+                seconds = transit.travel_time(lat1, lon1, lat2, lon2)
+                if np.isfinite(seconds):
+                    total_time_minutes = round(seconds / 60, 1)
             pbar.update(10)
             pbar.set_description("Direction calculated")
             pbar.close()
@@ -0,0 +1,295 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from greento.distance.candidates import green_candidates
+from greento.network.prepared import prepared_network
+from greento.network.search import reachability
+
+
+class green_field:
+    """
+    The network distance from every node of a traffic network to its nearest green point.
+
+    The field is built once with a single multi-source search over the reversed
+    network, seeded from every green point at the distance to the node it is
+    snapped to. A nearest-green query is then a snap onto the nearest edge and an
+    array lookup at both of its ends.
+
+    Attributes
+    ----------
+    network : prepared_network
+        The prepared traffic network the field was built on.
+    distances : numpy.ndarray
+        The float64 cost from every node to its nearest green point, inf if none is reachable.
+    nearest : numpy.ndarray
+        The int32 index of the nearest green point of every node, -1 if none is reachable.
+    green_lats : numpy.ndarray
+        The latitude of every green point.
+    green_lons : numpy.ndarray
+        The longitude of every green point.
+    weight : str
+        The edge weight of the costs: 'length' for meters, or a transport mode for seconds.
+
+    Methods
+    -------
+    build(network, green_lats, green_lons, weight, limit) -> green_field
+        Builds the field from a set of green points.
+    from_candidates(candidates, weight, limit) -> green_field
+        Builds the field from green points already snapped to the network.
+    nearest_green(lat: float, lon: float) -> tuple[float, float]
+        Finds the nearest green point from a given starting point.
+    query(lats: numpy.ndarray, lons: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Finds the nearest green point and its distance for many starting points.
+    save(path: str) -> None
+        Writes the field to a `.npz` file.
+    load(path: str, network: prepared_network) -> green_field
+        Reads a field written by `save` for the given network.
+    """
+
+    def __init__(
+        self,
+        network: prepared_network,
+        distances: np.ndarray,
+        nearest: np.ndarray,
+        green_lats: np.ndarray,
+        green_lons: np.ndarray,
+        weight: str = "length",
+    ) -> None:
+        """
+        Initializes the field from its arrays.
+
+        Parameters
+        ----------
+        network : prepared_network
+            The prepared traffic network the field was built on.
+        distances : numpy.ndarray
+            The cost from every node to its nearest green point.
+        nearest : numpy.ndarray
+            The index of the nearest green point of every node.
+        green_lats : numpy.ndarray
+            The latitude of every green point.
+        green_lons : numpy.ndarray
+            The longitude of every green point.
+        weight : str, optional
+            The edge weight of the costs. Defaults to 'length'.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the arrays do not match the nodes of the network.
+        """
+        if len(distances) != network.graph.num_nodes or len(nearest) != len(
+            distances
+        ):
+            logger = logging.getLogger(__name__)
+            logger.error("Green field does not match the traffic network nodes")
+            raise ValueError("Green field does not match the traffic network")
+
+        self.network = network
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.nearest = np.asarray(nearest, dtype=np.int32)
+        self.green_lats = np.asarray(green_lats, dtype=np.float64)
+        self.green_lons = np.asarray(green_lons, dtype=np.float64)
+        self.weight = weight
+
+    @classmethod
+    def build(
+        cls,
+        network: prepared_network,
+        green_lats: np.ndarray,
+        green_lons: np.ndarray,
+        weight: str = "length",
+        limit: float = 100000,
+    ) -> "green_field":
+        """
+        Builds the field from a set of green points.
+
+        Parameters
+        ----------
+        network : prepared_network
+            The prepared traffic network.
+        green_lats : numpy.ndarray
+            The latitude of every green point.
+        green_lons : numpy.ndarray
+            The longitude of every green point.
+        weight : str, optional
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+            Defaults to 'length'.
+        limit : float, optional
+            The maximum cost from a node to a green point. Defaults to 100000.
+
+        Returns
+        -------
+        green_field
+            The field of the nearest green points.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        return cls.from_candidates(
+            green_candidates(network, green_lats, green_lons), weight, limit
+        )
+
+    @classmethod
+    def from_candidates(
+        cls, candidates: green_candidates, weight: str = "length", limit: float = 100000
+    ) -> "green_field":
+        """
+        Builds the field from green points already snapped to the network.
+
+        Parameters
+        ----------
+        candidates : green_candidates
+            The green points snapped to the traffic network.
+        weight : str, optional
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+            Defaults to 'length'.
+        limit : float, optional
+            The maximum cost from a node to a green point. Defaults to 100000.
+
+        Returns
+        -------
+        green_field
+            The field of the nearest green points.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        network = candidates.network
+        weights = network.search(weight).weights
+        offsets = candidates.offsets
+        if weight != "length":
+            # the snapping offset is travelled at the speed of the mode
+            offsets = offsets / (network.SPEEDS_KMH[weight] * 1000 / 3600)
+
+        # Costs towards the greens are costs from the greens on the reversed network
+        reversed_graph, order = network.graph.reversed()
+        distances, nearest = reachability(
+            reversed_graph, weights[order]
+        ).nearest_sources(candidates.nodes, offsets, limit)
+        return cls(
+            network, distances, nearest, candidates.lats, candidates.lons, weight
+        )
+
+    def nearest_green(self, lat: float, lon: float) -> Optional[Tuple[float, float]]:
+        """
+        Finds the nearest green point from a given starting point.
+
+        Parameters
+        ----------
+        lat : float
+            Latitude of the starting point.
+        lon : float
+            Longitude of the starting point.
+
+        Returns
+        -------
+        tuple
+            A tuple containing the latitude and longitude of the nearest green point,
+            or None if no green point is reachable.
+        """
+        green_lats, green_lons, _ = self.query(np.array([lat]), np.array([lon]))
+        if np.isnan(green_lats[0]):
+            return None
+        return (float(green_lats[0]), float(green_lons[0]))
+
+    def query(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the nearest green point and its distance for many starting points.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the starting points.
+        lons : numpy.ndarray
+            The longitudes of the starting points.
+
+        Returns
+        -------
+        tuple
+            Three arrays with one entry per starting point, NaN where no green point is reachable:
+            - green_lats (numpy.ndarray): The latitude of the nearest green point.
+            - green_lons (numpy.ndarray): The longitude of the nearest green point.
+            - distances (numpy.ndarray): The cost to the nearest green point.
+        """
+        # the cost through each end of the nearest edge, the cheaper one wins
+        seed_nodes, seed_offsets = self.network.edge_seeds(lats, lons, self.weight)
+        if len(self.green_lats) == 0:
+            missing = np.full(len(seed_nodes), np.nan)
+            return missing, missing.copy(), missing.copy()
+        costs = seed_offsets + self.distances[seed_nodes]
+        best = np.argmin(costs, axis=1)
+        nodes = seed_nodes[np.arange(len(seed_nodes)), best]
+        total = costs[np.arange(len(seed_nodes)), best]
+        green = self.nearest[nodes]
+        found = (green >= 0) & np.isfinite(total)
+        result_lats = np.where(found, self.green_lats[np.maximum(green, 0)], np.nan)
+        result_lons = np.where(found, self.green_lons[np.maximum(green, 0)], np.nan)
+        distances = np.where(found, total, np.nan)
+        return result_lats, result_lons, distances
+
+    def save(self, path: str) -> None:
+        """
+        Writes the field to a `.npz` file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+
+        Returns
+        -------
+        None
+        """
+        np.savez(
+            path,
+            distances=self.distances,
+            nearest=self.nearest,
+            green_lats=self.green_lats,
+            green_lons=self.green_lons,
+            weight=np.array(self.weight),
+        )
+
+    @classmethod
+    def load(cls, path: str, network: prepared_network) -> "green_field":
+        """
+        Reads a field written by `save` for the given network.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        network : prepared_network
+            The prepared traffic network the field was built on.
+
+        Returns
+        -------
+        green_field
+            The field of the nearest green points.
+
+        Raises
+        ------
+        ValueError
+            If the field does not match the nodes of the network.
+        """
+        with np.load(path) as data:
+            return cls(
+                network,
+                data["distances"],
+                data["nearest"],
+                data["green_lats"],
+                data["green_lons"],
+                str(data["weight"]),
+            )
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Tuple
+
+import numpy as np
 
 
 class interface(ABC):
@@ -12,6 +14,10 @@ class interface(ABC):
         Calculates the shortest path and estimated travel time between two points.
     get_nearest_green_position(lat, lon)
         Finds the nearest green area from a given starting point.
+    get_nearest_green_positions(lats, lons)
+        Finds the nearest green area and its network distance from many starting points.
+    od_matrix(origins, destinations, transport_mode, weight)
+        Calculates the network distance and estimated travel time between every origin and destination.
     """
 
     @abstractmethod
@@ -64,3 +70,53 @@ class interface(ABC):
             The nearest green position.
         """
         pass
+
+    @abstractmethod
+    def get_nearest_green_positions(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the nearest green area and its network distance from many starting points.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            Latitudes of the starting points.
+        lons : numpy.ndarray
+            Longitudes of the starting points.
+
+        Returns
+        -------
+        tuple
+            The latitudes, longitudes and network distances of the nearest green positions.
+        """
+        pass
+
+    @abstractmethod
+    def od_matrix(
+        self,
+        origins: np.ndarray,
+        destinations: np.ndarray,
+        transport_mode: str = "walk",
+        weight: str = "length",
+    ) -> Tuple[Any, Any]:
+        """
+        Calculates the network distance and estimated travel time between every origin and destination.
+
+        Parameters
+        ----------
+        origins : numpy.ndarray
+            The (N, 2) latitude and longitude of the origins.
+        destinations : numpy.ndarray
+            The (M, 2) latitude and longitude of the destinations.
+        transport_mode : str, optional
+            Mode of transport (e.g., "walk", "bike", "drive"). Defaults to "walk".
+        weight : str, optional
+            'length' for the shortest paths, 'travel_time' for the fastest ones. Defaults to 'length'.
+
+        Returns
+        -------
+        tuple
+            The (N, M) distances in meters and travel times in minutes.
+        """
+        pass
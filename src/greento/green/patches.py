@@ -0,0 +1,264 @@
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from pyproj import CRS
+from scipy.ndimage import binary_erosion, center_of_mass, find_objects, label
+
+from greento.network.prepared import prepared_network
+from greento.utils.geo import geo
+
+
+class green_patch_index:
+    """
+    An index of the connected green patches of a green raster, built once and shared by queries.
+
+    Patches are the 8-connected components of the green pixels. Their entry
+    pixels are the green pixels on the patch boundary, the only ones a path
+    coming from outside the patch can reach first.
+
+    Attributes
+    ----------
+    green : dict
+        The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+    labels : numpy.ndarray
+        The label image: 0 outside the patches, the patch id + 1 inside.
+    num_patches : int
+        The number of patches.
+    area_sqm : numpy.ndarray
+        The area in square meters of every patch.
+    centroid_lats : numpy.ndarray
+        The latitude of the centroid of every patch.
+    centroid_lons : numpy.ndarray
+        The longitude of the centroid of every patch.
+    bbox : numpy.ndarray
+        The (num_patches, 4) pixel bounding box of every patch: row start, row stop, col start, col stop.
+    entry_ptr : numpy.ndarray
+        The offsets of the entry pixels of every patch, those of patch i being entry_*[entry_ptr[i]:entry_ptr[i + 1]].
+    entry_rows : numpy.ndarray
+        The row of every entry pixel, grouped by patch.
+    entry_cols : numpy.ndarray
+        The column of every entry pixel, grouped by patch.
+    network : prepared_network or None
+        The traffic network the patches were last snapped to.
+    nodes : numpy.ndarray or None
+        The node index every patch is snapped to, through its entry pixel closest to the network.
+    offsets : numpy.ndarray or None
+        The distance in meters from the snapping entry pixel of every patch to its node.
+
+    Methods
+    -------
+    select(min_area_sqm: float) -> numpy.ndarray
+        Returns the ids of the patches at least as large as the given area.
+    centroids(patches: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]
+        Returns the latitude and longitude of the centroid of the given patches.
+    entry_points(patches: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Returns the coordinates of the entry pixels of the given patches.
+    snap(network: prepared_network) -> tuple[numpy.ndarray, numpy.ndarray]
+        Snaps every patch to the traffic network through its entry pixels.
+    """
+
+    def __init__(self, green: Dict[str, Any]) -> None:
+        """
+        Labels the green raster and measures its patches.
+
+        Parameters
+        ----------
+        green : dict
+            The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+
+        Returns
+        -------
+        None
+        """
+        self.green = green
+        data = green["data"]
+        if data.ndim == 3:
+            data = data[0]
+        mask = data == 1
+        structure = np.ones((3, 3), dtype=int)
+        labels, num_patches = label(mask, structure=structure)
+        self.labels = labels
+        self.num_patches = int(num_patches)
+
+        transform = green["transform"]
+        patch_ids = np.arange(1, num_patches + 1)
+        rows, cols = np.nonzero(mask)
+        patch_of = labels[rows, cols] - 1
+
+        pixel_area = self._pixel_area(transform, green.get("crs"), rows)
+        self.area_sqm = np.bincount(patch_of, weights=pixel_area, minlength=num_patches)
+
+        if num_patches > 0:
+            centers = np.asarray(center_of_mass(mask, labels, index=patch_ids))
+        else:
+            centers = np.zeros((0, 2))
+        self.centroid_lats, self.centroid_lons = geo().pixel_centers(
+            transform, centers[:, 0], centers[:, 1]
+        )
+
+        self.bbox = np.array(
+            [
+                (rs.start, rs.stop, cs.start, cs.stop)
+                for rs, cs in find_objects(labels, max_label=num_patches)
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+
+        boundary = mask & ~binary_erosion(mask, structure=structure, border_value=0)
+        entry_rows, entry_cols = np.nonzero(boundary)
+        entry_patch = labels[entry_rows, entry_cols] - 1
+        order = np.argsort(entry_patch, kind="stable")
+        self.entry_rows = entry_rows[order]
+        self.entry_cols = entry_cols[order]
+        self.entry_ptr = np.zeros(num_patches + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(entry_patch, minlength=num_patches), out=self.entry_ptr[1:]
+        )
+
+        self.network: Optional[prepared_network] = None
+        self.nodes: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _pixel_area(transform: Any, crs: Any, rows: np.ndarray) -> np.ndarray:
+        """
+        Calculates the area in square meters of the pixels of the given rows.
+
+        Parameters
+        ----------
+        transform : affine.Affine
+            The affine transform of the raster.
+        crs : Any
+            The coordinate reference system of the raster, geographic if missing.
+        rows : numpy.ndarray
+            The row of every pixel.
+
+        Returns
+        -------
+        numpy.ndarray
+            The area of every pixel.
+        """
+        cell = abs(transform.a * transform.e - transform.b * transform.d)
+        is_geographic = True
+        if crs is not None:
+            try:
+                is_geographic = CRS.from_user_input(crs).is_geographic
+            except Exception as e:
+                logger = logging.getLogger(__name__)
+                logger.warning(f"Raster CRS not recognized, assuming degrees: {e}")
+        if not is_geographic:
+            return np.full(len(rows), cell)
+        # one degree of latitude is ~110.6 km, one of longitude shrinks with the latitude
+        lats = transform.e * (rows + 0.5) + transform.f
+        return cell * 110574.0 * 111320.0 * np.cos(np.radians(lats))
+
+    def select(self, min_area_sqm: float = 0.0) -> np.ndarray:
+        """
+        Returns the ids of the patches at least as large as the given area.
+
+        Parameters
+        ----------
+        min_area_sqm : float, optional
+            The minimum patch area in square meters (e.g. 5000 for parks of at least 0.5 ha).
+            Defaults to 0.
+
+        Returns
+        -------
+        numpy.ndarray
+            The ids of the selected patches.
+        """
+        return np.flatnonzero(self.area_sqm >= min_area_sqm)
+
+    def centroids(
+        self, patches: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the latitude and longitude of the centroid of the given patches.
+
+        Parameters
+        ----------
+        patches : numpy.ndarray, optional
+            The ids of the patches. Defaults to all patches.
+
+        Returns
+        -------
+        tuple
+            The latitudes and longitudes of the centroids.
+        """
+        if patches is None:
+            return self.centroid_lats, self.centroid_lons
+        return self.centroid_lats[patches], self.centroid_lons[patches]
+
+    def entry_points(
+        self, patches: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the coordinates of the entry pixels of the given patches.
+
+        Parameters
+        ----------
+        patches : numpy.ndarray, optional
+            The ids of the patches. Defaults to all patches.
+
+        Returns
+        -------
+        tuple
+            Three arrays with one entry per entry pixel:
+            - lats (numpy.ndarray): The latitude of the pixel center.
+            - lons (numpy.ndarray): The longitude of the pixel center.
+            - patches (numpy.ndarray): The id of the patch of the pixel.
+        """
+        counts = np.diff(self.entry_ptr)
+        if patches is None:
+            positions = np.arange(self.entry_ptr[-1])
+            patch_of = np.repeat(np.arange(self.num_patches), counts)
+        else:
+            patches = np.asarray(patches, dtype=np.int64)
+            patch_of = np.repeat(patches, counts[patches])
+            starts = np.repeat(self.entry_ptr[patches], counts[patches])
+            ranks = np.arange(len(patch_of)) - np.repeat(
+                np.cumsum(counts[patches]) - counts[patches], counts[patches]
+            )
+            positions = starts + ranks
+        lats, lons = geo().pixel_centers(
+            self.green["transform"],
+            self.entry_rows[positions],
+            self.entry_cols[positions],
+        )
+        return lats, lons, patch_of
+
+    def snap(self, network: prepared_network) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Snaps every patch to the traffic network through its entry pixels.
+
+        Every patch is snapped to the node closest to any of its entry pixels.
+        The result is kept until the patches are snapped to another network.
+
+        Parameters
+        ----------
+        network : prepared_network
+            The prepared traffic network.
+
+        Returns
+        -------
+        tuple
+            The node index of every patch and the distance in meters from its
+            snapping entry pixel to the node.
+        """
+        if self.network is network and self.nodes is not None:
+            return self.nodes, self.offsets
+
+        graph = network.graph
+        lats, lons, patch_of = self.entry_points()
+        entry_nodes, entry_offsets = graph.snap(lats, lons)
+        # the closest entry pixel of every patch comes first
+        order = np.lexsort((entry_offsets, patch_of))
+        first = self.entry_ptr[:-1][np.diff(self.entry_ptr) > 0]
+        nodes = np.full(self.num_patches, -1, dtype=np.int32)
+        offsets = np.full(self.num_patches, np.inf)
+        nodes[patch_of[order][first]] = entry_nodes[order][first]
+        offsets[patch_of[order][first]] = entry_offsets[order][first]
+
+        self.network, self.nodes, self.offsets = network, nodes, offsets
+        return nodes, offsets
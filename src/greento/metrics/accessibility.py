@@ -0,0 +1,259 @@
+import logging
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from pyproj import CRS, Transformer
+
+from greento.distance.candidates import green_candidates
+from greento.distance.field import green_field
+from greento.green.patches import green_patch_index
+from greento.metrics.isochrone import isochrone
+from greento.network.prepared import prepared_network
+from greento.utils.geo import geo
+
+
+class green_accessibility:
+    """
+    The network distance and travel time to the nearest green area from every populated pixel.
+
+    The green entry pixels are snapped to the network and a single multi-source
+    search over the reversed network gives every node its distance to the
+    nearest green, once in meters and once in travel time. Every populated pixel
+    is then snapped to a node in one batched query and reads its values from the
+    node arrays, so the cost grows with the network, not with the number of
+    populated pixels.
+
+    Attributes
+    ----------
+    green : dict
+        The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+    network : prepared_network
+        The prepared traffic network.
+    ghs_pop : dict
+        The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+    patches : green_patch_index or None
+        The patch index of the green raster, built on first use if missing.
+
+    Methods
+    -------
+    populated_pixels() -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Returns the position, coordinates and population of every populated pixel.
+    compute(transport_mode: str, max_times: list, percentiles: list, min_area_sqm: float) -> dict
+        Calculates the accessibility rasters and their population-weighted summary.
+    weighted_percentiles(values: numpy.ndarray, weights: numpy.ndarray, percentiles: list) -> numpy.ndarray
+        Calculates weighted percentiles of the values.
+    """
+
+    def __init__(
+        self,
+        green: Dict[str, Any],
+        network: prepared_network,
+        ghs_pop: Dict[str, Any],
+        patches: Optional[green_patch_index] = None,
+    ) -> None:
+        """
+        Initializes the accessibility computations with the green, network and population data.
+
+        Parameters
+        ----------
+        green : dict
+            The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+        network : prepared_network
+            The prepared traffic network.
+        ghs_pop : dict
+            The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+        patches : green_patch_index, optional
+            The patch index of the green raster, built on first use if missing.
+
+        Returns
+        -------
+        None
+        """
+        self.green = green
+        self.network = network
+        self.ghs_pop = ghs_pop
+        self.patches = patches
+
+    def populated_pixels(
+        self,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the position, coordinates and population of every populated pixel.
+
+        Pixel centers in a projected CRS are transformed to latitude and longitude.
+
+        Returns
+        -------
+        tuple
+            Five arrays with one entry per populated pixel: the rows, the columns,
+            the latitudes, the longitudes and the population.
+        """
+        data = self.ghs_pop["data"]
+        if data.ndim == 3:
+            data = data[0]
+        population = np.nan_to_num(np.asarray(data, dtype=np.float64))
+        rows, cols = np.nonzero(population > 0)
+        ys, xs = geo().pixel_centers(self.ghs_pop["transform"], rows, cols)
+
+        crs = self.ghs_pop.get("crs")
+        if crs is not None:
+            try:
+                source = CRS.from_user_input(crs)
+            except Exception as e:
+                logger = logging.getLogger(__name__)
+                logger.warning(f"Population CRS not recognized, assuming degrees: {e}")
+                source = None
+            if source is not None and not source.is_geographic:
+                transformer = Transformer.from_crs(source, "EPSG:4326", always_xy=True)
+                xs, ys = transformer.transform(xs, ys)
+        return rows, cols, np.asarray(ys), np.asarray(xs), population[rows, cols]
+
+    @staticmethod
+    def weighted_percentiles(
+        values: np.ndarray, weights: np.ndarray, percentiles: Sequence[float]
+    ) -> np.ndarray:
+        """
+        Calculates weighted percentiles of the values.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            The values, inf where not reachable.
+        weights : numpy.ndarray
+            The weight of every value (e.g. its population).
+        percentiles : list of float
+            The percentiles, between 0 and 100.
+
+        Returns
+        -------
+        numpy.ndarray
+            The smallest value reached by every percentile of the total weight, NaN without weights.
+        """
+        percentiles = np.asarray(percentiles, dtype=np.float64)
+        if len(values) == 0 or weights.sum() <= 0:
+            return np.full(len(percentiles), np.nan)
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(
+            cumulative, percentiles / 100 * cumulative[-1], side="left"
+        )
+        return values[order][np.minimum(positions, len(values) - 1)]
+
+    def compute(
+        self,
+        transport_mode: str = "walk",
+        max_times: Sequence[float] = (5, 10, 15),
+        percentiles: Sequence[float] = (25, 50, 75, 90),
+        min_area_sqm: float = 0.0,
+    ) -> Dict[str, Any]:
+        """
+        Calculates the accessibility rasters and their population-weighted summary.
+
+        The travel time of a pixel includes its walk to the network and the fixed
+        delays of the transport mode, as the isochrones do.
+
+        Parameters
+        ----------
+        transport_mode : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive'). Defaults to 'walk'.
+        max_times : list of float, optional
+            The travel times in minutes of the shares of the population reported. Defaults to 5, 10 and 15.
+        percentiles : list of float, optional
+            The population percentiles of distance and time reported. Defaults to 25, 50, 75 and 90.
+        min_area_sqm : float, optional
+            The minimum area in square meters of the green patches considered. Defaults to 0.
+
+        Returns
+        -------
+        dict
+            - 'distance': A raster dict like `ghs_pop` with the float32 network distance in meters
+              from every populated pixel to the nearest green, NaN elsewhere and inf if none is reachable.
+            - 'time': The same raster with the travel time in minutes.
+            - 'summary': A JSON-serializable dict with the total population, the population
+              percentiles of distance and time, and the share of the population within every max time.
+
+        Raises
+        ------
+        ValueError
+            If the transport mode or the max times are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        network = self.network
+        if transport_mode not in network.travel_times:
+            logger.error(
+                f"Transport mode not valid. Choose from: {', '.join(network.travel_times)}"
+            )
+            raise ValueError("Transport mode not valid")
+        if not all(
+            isinstance(t, (int, float, np.number)) and t > 0 for t in max_times
+        ):
+            logger.error("Max time not valid")
+            raise ValueError("Max time not valid")
+
+        if self.patches is None:
+            self.patches = green_patch_index(self.green)
+        green_lats, green_lons, _ = self.patches.entry_points(
+            self.patches.select(min_area_sqm)
+        )
+        candidates = green_candidates(network, green_lats, green_lons)
+        if len(candidates):
+            distances = green_field.from_candidates(candidates, "length").distances
+            times = green_field.from_candidates(candidates, transport_mode).distances
+        else:
+            distances = times = np.full(network.graph.num_nodes, np.inf)
+
+        rows, cols, lats, lons, population = self.populated_pixels()
+        pixel_distances = np.full(len(rows), np.inf)
+        pixel_times = np.full(len(rows), np.inf)
+        if len(rows):
+            nodes, snapped = network.graph.snap(lats, lons)
+            walk_speed = network.SPEEDS_KMH["walk"] * 1000 / 3600
+            pixel_distances = distances[nodes] + snapped
+            pixel_times = (
+                times[nodes]
+                + snapped / walk_speed
+                + isochrone.FIXED_DELAYS.get(transport_mode, 0)
+            ) / 60
+
+        shape = np.shape(self.ghs_pop["data"])[-2:]
+        rasters = {}
+        for name, values in (("distance", pixel_distances), ("time", pixel_times)):
+            data = np.full(shape, np.nan, dtype=np.float32)
+            data[rows, cols] = values
+            rasters[name] = {
+                "data": data,
+                "transform": self.ghs_pop["transform"],
+                "crs": self.ghs_pop.get("crs"),
+                "shape": shape,
+            }
+
+        def finite(values: np.ndarray) -> list:
+            return [
+                round(float(value), 2) if np.isfinite(value) else None
+                for value in values
+            ]
+
+        total = float(population.sum())
+        within = [
+            round(float(population[pixel_times <= t].sum()) / total, 4) if total else 0.0
+            for t in max_times
+        ]
+        rasters["summary"] = {
+            "transport_mode": transport_mode,
+            "total_population": round(total, 2),
+            "percentiles": [float(p) for p in percentiles],
+            "distance_meters": finite(
+                self.weighted_percentiles(pixel_distances, population, percentiles)
+            ),
+            "time_minutes": finite(
+                self.weighted_percentiles(pixel_times, population, percentiles)
+            ),
+            "max_times": [float(t) for t in max_times],
+            "population_share_within": within,
+            "population_share_unreachable": (
+                round(float(population[~np.isfinite(pixel_times)].sum()) / total, 4)
+                if total
+                else 0.0
+            ),
+        }
+        return rasters
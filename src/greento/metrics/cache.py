@@ -0,0 +1,320 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+class isochrone_cache:
+    """
+    A least-recently-used cache of isochrone results, bounded by the number of entries.
+
+    Results are keyed by the snapped origin (the seed nodes and their offsets,
+    rounded to `OFFSET_RESOLUTION` seconds), the max times, the transport mode,
+    the coverage options and a fingerprint of the green raster and the network,
+    so clicks snapping to the same place share one result. Origins whose offsets
+    round to the same values share it too: a nearby click on the same edge gets
+    the distances and times computed from the first origin cached, which may
+    differ from its own by up to `OFFSET_RESOLUTION` at every seed. The snapped
+    origins of the most recent coordinates are kept too, so a repeated click
+    skips the snapping as well. The results can be written to a JSON file and
+    are read back from it when the cache is created.
+
+    Attributes
+    ----------
+    max_entries : int
+        The maximum number of cached results.
+    path : str or None
+        The JSON file the cache is persisted to, if any.
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups not found in the cache.
+    evictions : int
+        The number of results evicted to stay within the size.
+
+    Methods
+    -------
+    get(key) -> str
+        Returns the cached result of the key, marking it as recently used.
+    put(key, result: str) -> None
+        Caches a result, evicting the least recently used ones over the size.
+    clear() -> None
+        Removes every result from the cache.
+    snapped(point) -> tuple
+        Returns the snapped origin of a point already looked up, None otherwise.
+    remember(point, origin: tuple) -> None
+        Keeps the snapped origin of a point, evicting the least recently used points over the size.
+    stats() -> dict
+        Returns the size and the hit and miss counts of the cache.
+    save(path: str) -> None
+        Writes the cached results to a JSON file.
+    origin(nodes: numpy.ndarray, offsets: numpy.ndarray) -> tuple
+        Returns the cache key part of a snapped origin.
+    fingerprint(*parts) -> str
+        Returns a digest of arrays and values, identifying the data a result depends on.
+    """
+
+    OFFSET_RESOLUTION = 1.0  # seconds
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None) -> None:
+        """
+        Initializes the cache, reading the results persisted at the path if any.
+
+        Parameters
+        ----------
+        max_entries : int, optional
+            The maximum number of cached results. Defaults to 1024.
+        path : str, optional
+            The JSON file the cache is persisted to. Defaults to no persistence.
+
+        Returns
+        -------
+        None
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._origins: "OrderedDict[Hashable, Tuple[Any, ...]]" = OrderedDict()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                for key, result in entries:
+                    self.put(self._tuple(key), result)
+            except (OSError, ValueError, TypeError) as e:
+                logger = logging.getLogger(__name__)
+                logger.warning(f"Isochrone cache could not be read: {e}")
+                self._results.clear()
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._results
+
+    @classmethod
+    def _tuple(cls, value: Any) -> Any:
+        """
+        Turns the nested lists of a key read from JSON back into tuples.
+
+        Parameters
+        ----------
+        value : Any
+            The key or one of its parts.
+
+        Returns
+        -------
+        Any
+            The value with every list turned into a tuple.
+        """
+        if isinstance(value, list):
+            return tuple(cls._tuple(item) for item in value)
+        return value
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """
+        Returns the cached result of the key, marking it as recently used.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the result.
+
+        Returns
+        -------
+        str or None
+            The cached result, or None if it is not cached.
+        """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(key)
+        return result
+
+    def put(self, key: Hashable, result: str) -> None:
+        """
+        Caches a result, evicting the least recently used ones over the size.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the result.
+        result : str
+            The JSON string of the result.
+
+        Returns
+        -------
+        None
+        """
+        if self.max_entries <= 0:
+            return
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes every result from the cache.
+
+        Returns
+        -------
+        None
+        """
+        self._results.clear()
+        self._origins.clear()
+
+    def snapped(self, point: Hashable) -> Optional[Tuple[Any, ...]]:
+        """
+        Returns the snapped origin of a point already looked up, None otherwise.
+
+        Parameters
+        ----------
+        point : Hashable
+            The data fingerprint, coordinates and mode of the point.
+
+        Returns
+        -------
+        tuple or None
+            The origin key part given to `remember`.
+        """
+        origin = self._origins.get(point)
+        if origin is not None:
+            self._origins.move_to_end(point)
+        return origin
+
+    def remember(self, point: Hashable, origin: Tuple[Any, ...]) -> None:
+        """
+        Keeps the snapped origin of a point, evicting the least recently used points over the size.
+
+        Parameters
+        ----------
+        point : Hashable
+            The data fingerprint, coordinates and mode of the point.
+        origin : tuple
+            The origin key part of the point, as given by `origin`.
+
+        Returns
+        -------
+        None
+        """
+        if self.max_entries <= 0:
+            return
+        self._origins[point] = origin
+        self._origins.move_to_end(point)
+        while len(self._origins) > self.max_entries:
+            self._origins.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the size and the hit and miss counts of the cache.
+
+        Returns
+        -------
+        dict
+            The 'entries', 'max_entries', 'hits', 'misses', 'evictions' and 'hit_rate' of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._results),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Writes the cached results to a JSON file, from the least to the most recently used.
+
+        The file is written next to the target and then moved over it, so a
+        reader never sees a partial cache.
+
+        Parameters
+        ----------
+        path : str, optional
+            The JSON file. Defaults to the path of the cache.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If no path is given and the cache has none.
+        """
+        path = path or self.path
+        if path is None:
+            logger = logging.getLogger(__name__)
+            logger.error("Cache path not valid")
+            raise ValueError("Cache path not valid")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump([[key, result] for key, result in self._results.items()], f)
+        os.replace(temporary, path)
+
+    @classmethod
+    def origin(cls, nodes: np.ndarray, offsets: np.ndarray) -> Tuple[Any, ...]:
+        """
+        Returns the cache key part of a snapped origin.
+
+        Parameters
+        ----------
+        nodes : numpy.ndarray
+            The seed nodes of the origin.
+        offsets : numpy.ndarray
+            The initial cost in seconds of every seed node.
+
+        Returns
+        -------
+        tuple
+            The seed nodes and their offsets rounded to `OFFSET_RESOLUTION`, inf for unused seeds.
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        rounded = np.where(
+            np.isfinite(offsets),
+            np.round(offsets / cls.OFFSET_RESOLUTION) * cls.OFFSET_RESOLUTION,
+            -1.0,
+        )
+        return (
+            tuple(np.asarray(nodes, dtype=np.int64).tolist()),
+            tuple(rounded.tolist()),
+        )
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """
+        Returns a digest of arrays and values, identifying the data a result depends on.
+
+        Parameters
+        ----------
+        *parts : Any
+            NumPy arrays, hashed with their shape and type, or values hashed by their representation.
+
+        Returns
+        -------
+        str
+            The hexadecimal BLAKE2b digest of the parts.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                array = np.ascontiguousarray(part)
+                digest.update(f"{array.dtype.str}{array.shape}".encode())
+                digest.update(array.view(np.uint8).ravel())
+            else:
+                digest.update(repr(part).encode())
+        return digest.hexdigest()
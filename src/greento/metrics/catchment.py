@@ -0,0 +1,351 @@
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from tqdm import tqdm
+
+from greento.green.patches import green_patch_index
+from greento.metrics.accessibility import green_accessibility
+from greento.metrics.isochrone import isochrone
+from greento.network.prepared import prepared_network
+from greento.network.search import reachability
+
+
+class green_catchment:
+    """
+    Catchment-based accessibility of the green patches for the population cells.
+
+    A sparse cell x patch travel time matrix is built from one bounded search per
+    patch over the reversed network, in chunks of patches, so only the pairs
+    within the catchment are ever stored. The distance decay is applied to the
+    stored values only, and the scores are sparse matrix-vector products:
+
+    - two-step floating catchment (2SFCA): every patch gets a supply-to-demand ratio,
+      its area over the decay-weighted population of its catchment, and every cell
+      sums the decay-weighted ratios of the patches it reaches;
+    - gravity: every cell sums the decay-weighted areas of the patches it reaches.
+
+    Attributes
+    ----------
+    green : dict
+        The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+    network : prepared_network
+        The prepared traffic network.
+    ghs_pop : dict
+        The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+    patches : green_patch_index or None
+        The patch index of the green raster, built on first use if missing.
+
+    Methods
+    -------
+    travel_times(transport_mode: str, max_time: float, min_area_sqm: float, chunk_size: int) -> tuple
+        Builds the sparse travel time matrix between the populated cells and the green patches.
+    decay(minutes: numpy.ndarray, function: str, max_time: float, beta: float) -> numpy.ndarray
+        Calculates the distance decay weights of travel times.
+    compute(transport_mode: str, max_time: float, method: str, decay: str, beta: float, min_area_sqm: float, chunk_size: int) -> dict
+        Calculates the accessibility score of every populated cell.
+    """
+
+    METHODS = ("2sfca", "gravity")
+    DECAYS = ("binary", "gaussian", "exponential", "power")
+
+    def __init__(
+        self,
+        green: Dict[str, Any],
+        network: prepared_network,
+        ghs_pop: Dict[str, Any],
+        patches: Optional[green_patch_index] = None,
+    ) -> None:
+        """
+        Initializes the catchment computations with the green, network and population data.
+
+        Parameters
+        ----------
+        green : dict
+            The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+        network : prepared_network
+            The prepared traffic network.
+        ghs_pop : dict
+            The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+        patches : green_patch_index, optional
+            The patch index of the green raster, built on first use if missing.
+
+        Returns
+        -------
+        None
+        """
+        self.green = green
+        self.network = network
+        self.ghs_pop = ghs_pop
+        self.patches = patches
+
+    def travel_times(
+        self,
+        transport_mode: str = "walk",
+        max_time: float = 15,
+        min_area_sqm: float = 0.0,
+        chunk_size: int = 256,
+    ) -> Tuple[csr_matrix, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Builds the sparse travel time matrix between the populated cells and the green patches.
+
+        Every populated cell is snapped to its nearest node and reads the costs of
+        the searches reaching that node. The walk between a cell or a patch and
+        its node, and the fixed delays of the transport mode, are included.
+
+        Parameters
+        ----------
+        transport_mode : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive'). Defaults to 'walk'.
+        max_time : float, optional
+            The catchment size in minutes. Defaults to 15.
+        min_area_sqm : float, optional
+            The minimum area in square meters of the green patches considered. Defaults to 0.
+        chunk_size : int, optional
+            The number of patches searched before their entries are packed. Defaults to 256.
+
+        Returns
+        -------
+        tuple
+            - times (scipy.sparse.csr_matrix): The (cells, patches) travel times in minutes,
+              stored only within the catchment, zeros included.
+            - rows (numpy.ndarray): The raster row of every cell.
+            - cols (numpy.ndarray): The raster column of every cell.
+            - population (numpy.ndarray): The population of every cell.
+            - patches (numpy.ndarray): The id of every patch column.
+
+        Raises
+        ------
+        ValueError
+            If the transport mode or the max time are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        network = self.network
+        if transport_mode not in network.travel_times:
+            logger.error(
+                f"Transport mode not valid. Choose from: {', '.join(network.travel_times)}"
+            )
+            raise ValueError("Transport mode not valid")
+        if not (isinstance(max_time, (int, float, np.number)) and max_time > 0):
+            logger.error("Max time not valid")
+            raise ValueError("Max time not valid")
+
+        if self.patches is None:
+            self.patches = green_patch_index(self.green)
+        selected = self.patches.select(min_area_sqm)
+        patch_nodes, patch_offsets = self.patches.snap(network)
+        rows, cols, lats, lons, population = green_accessibility(
+            self.green, network, self.ghs_pop
+        ).populated_pixels()
+
+        walk_speed = network.SPEEDS_KMH["walk"] * 1000 / 3600
+        budget = max_time * 60 - isochrone.FIXED_DELAYS.get(transport_mode, 0)
+        if len(rows) == 0 or len(selected) == 0 or budget < 0:
+            empty = csr_matrix((len(rows), len(selected)))
+            return empty, rows, cols, population, selected
+
+        # cells grouped by node, to expand every reached node into its cells
+        cell_nodes, snapped = network.graph.snap(lats, lons)
+        cell_offsets = snapped / walk_speed
+        cells_by_node = np.argsort(cell_nodes, kind="stable")
+        node_ptr = np.zeros(network.graph.num_nodes + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(cell_nodes, minlength=network.graph.num_nodes),
+            out=node_ptr[1:],
+        )
+
+        # costs towards the patches are costs from the patches on the reversed network
+        reversed_graph, order = network.graph.reversed()
+        search = reachability(reversed_graph, network.search(transport_mode).weights[order])
+
+        row_parts, col_parts, time_parts = [], [], []
+        for start in tqdm(
+            range(0, len(selected), chunk_size),
+            desc="Building the catchment matrix",
+            leave=False,
+        ):
+            chunk_rows, chunk_cols, chunk_times = [], [], []
+            for column in range(start, min(start + chunk_size, len(selected))):
+                patch = selected[column]
+                offset = patch_offsets[patch] / walk_speed
+                if patch_nodes[patch] < 0 or offset > budget:
+                    continue
+                nodes, costs = search.search(int(patch_nodes[patch]), budget - offset)
+                counts = node_ptr[nodes + 1] - node_ptr[nodes]
+                if not counts.any():
+                    continue
+                starts = np.repeat(node_ptr[nodes], counts)
+                ranks = np.arange(counts.sum()) - np.repeat(
+                    np.cumsum(counts) - counts, counts
+                )
+                cells = cells_by_node[starts + ranks]
+                times = np.repeat(costs, counts) + offset + cell_offsets[cells]
+                kept = times <= budget
+                chunk_rows.append(cells[kept])
+                chunk_cols.append(np.full(int(kept.sum()), column, dtype=np.int64))
+                chunk_times.append(times[kept])
+            if chunk_rows:
+                row_parts.append(np.concatenate(chunk_rows))
+                col_parts.append(np.concatenate(chunk_cols))
+                time_parts.append(np.concatenate(chunk_times))
+
+        if row_parts:
+            entries = (
+                np.concatenate(row_parts),
+                np.concatenate(col_parts),
+                np.concatenate(time_parts),
+            )
+        else:
+            entries = (np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0))
+        minutes = (entries[2] + isochrone.FIXED_DELAYS.get(transport_mode, 0)) / 60
+        times = csr_matrix(
+            (minutes, (entries[0], entries[1])), shape=(len(rows), len(selected))
+        )
+        return times, rows, cols, population, selected
+
+    @classmethod
+    def decay(
+        cls,
+        minutes: np.ndarray,
+        function: str = "binary",
+        max_time: float = 15,
+        beta: float = 1.0,
+    ) -> np.ndarray:
+        """
+        Calculates the distance decay weights of travel times.
+
+        Parameters
+        ----------
+        minutes : numpy.ndarray
+            The travel times in minutes, within the catchment.
+        function : str, optional
+            'binary' (1 within the catchment), 'gaussian' (1 at the start, 0 at the
+            catchment edge), 'exponential' (exp(-beta * t)) or 'power'
+            (t ** -beta, from one minute). Defaults to 'binary'.
+        max_time : float, optional
+            The catchment size in minutes. Defaults to 15.
+        beta : float, optional
+            The decay rate of the exponential and power functions. Defaults to 1.
+
+        Returns
+        -------
+        numpy.ndarray
+            The weight of every travel time.
+
+        Raises
+        ------
+        ValueError
+            If the decay function is not valid.
+        """
+        minutes = np.asarray(minutes, dtype=np.float64)
+        if function == "binary":
+            return np.ones_like(minutes)
+        if function == "gaussian":
+            edge = np.exp(-0.5)
+            return (np.exp(-0.5 * (minutes / max_time) ** 2) - edge) / (1 - edge)
+        if function == "exponential":
+            return np.exp(-beta * minutes)
+        if function == "power":
+            return np.maximum(minutes, 1.0) ** -beta
+        logger = logging.getLogger(__name__)
+        logger.error(f"Decay function not valid. Choose from: {', '.join(cls.DECAYS)}")
+        raise ValueError("Decay function not valid")
+
+    def compute(
+        self,
+        transport_mode: str = "walk",
+        max_time: float = 15,
+        method: str = "2sfca",
+        decay: Optional[str] = None,
+        beta: float = 1.0,
+        min_area_sqm: float = 0.0,
+        chunk_size: int = 256,
+    ) -> Dict[str, Any]:
+        """
+        Calculates the accessibility score of every populated cell.
+
+        Parameters
+        ----------
+        transport_mode : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive'). Defaults to 'walk'.
+        max_time : float, optional
+            The catchment size in minutes. Defaults to 15.
+        method : str, optional
+            '2sfca' for the reachable green area per person, or 'gravity' for the
+            decay-weighted reachable green area. Defaults to '2sfca'.
+        decay : str, optional
+            The distance decay function, see `decay`. Defaults to 'binary' for
+            '2sfca' and 'power' for 'gravity'.
+        beta : float, optional
+            The decay rate of the exponential and power functions. Defaults to 1.
+        min_area_sqm : float, optional
+            The minimum area in square meters of the green patches considered. Defaults to 0.
+        chunk_size : int, optional
+            The number of patches searched before their entries are packed. Defaults to 256.
+
+        Returns
+        -------
+        dict
+            - 'score': A raster dict like `ghs_pop` with the float32 score of every
+              populated cell, NaN elsewhere.
+            - 'summary': A JSON-serializable dict with the method, the population-weighted
+              mean score and the share of the population reaching no patch.
+
+        Raises
+        ------
+        ValueError
+            If the method, the decay function, the transport mode or the max time are not valid.
+        """
+        if method not in self.METHODS:
+            logger = logging.getLogger(__name__)
+            logger.error(f"Method not valid. Choose from: {', '.join(self.METHODS)}")
+            raise ValueError("Method not valid")
+        if decay is None:
+            decay = "binary" if method == "2sfca" else "power"
+        self.decay(np.zeros(0), decay, max_time, beta)
+
+        times, rows, cols, population, selected = self.travel_times(
+            transport_mode, max_time, min_area_sqm, chunk_size
+        )
+        weights = times.copy()
+        weights.data = self.decay(times.data, decay, max_time, beta)
+        supply = self.patches.area_sqm[selected] if len(selected) else np.zeros(0)
+
+        if method == "2sfca":
+            demand = weights.T @ population
+            ratios = np.divide(
+                supply, demand, out=np.zeros(len(supply)), where=demand > 0
+            )
+            scores = weights @ ratios
+        else:
+            scores = weights @ supply
+
+        shape = np.shape(self.ghs_pop["data"])[-2:]
+        data = np.full(shape, np.nan, dtype=np.float32)
+        data[rows, cols] = scores
+        total = float(population.sum())
+        reached = np.diff(times.indptr) > 0
+        return {
+            "score": {
+                "data": data,
+                "transform": self.ghs_pop["transform"],
+                "crs": self.ghs_pop.get("crs"),
+                "shape": shape,
+            },
+            "summary": {
+                "method": method,
+                "decay": decay,
+                "transport_mode": transport_mode,
+                "max_time": max_time,
+                "total_population": round(total, 2),
+                "mean_score": (
+                    round(float(population @ scores) / total, 4) if total else 0.0
+                ),
+                "population_share_unreachable": (
+                    round(float(population[~reached].sum()) / total, 4)
+                    if total
+                    else 0.0
+                ),
+            },
+        }
@@ -1,18 +1,121 @@
+import json
+import logging
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from greento.green.patches import green_patch_index
+from greento.metrics.accessibility import green_accessibility
+from greento.metrics.cache import isochrone_cache
+from greento.metrics.catchment import green_catchment
+from greento.metrics.isochrone import isochrone
+from greento.network.prepared import prepared_network
+from greento.network.speeds import speed_profiles
+from greento.transit.gtfs import gtfs_feed
+from greento.transit.router import transit_router
+from greento.utils.geo import geo
 
 
 class interface(ABC):
     """
     An abstract base class for calculating metrics using geographical data.
 
+    The network metrics are shared by every green data source: a backend only
+    provides its green raster and the green area per person.
+
+    Attributes
+    ----------
+    SOURCE : str
+        The name of the green data source shown in the progress bars.
+    vector_traffic_area : tuple or prepared_network
+        A tuple containing two GeoDataFrames: nodes and edges for traffic area, prepared on first use.
+    ghs_pop_data : dict
+        The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+    patch_index : green_patch_index or None
+        The patch index of the green raster, built on first use.
+    transit : gtfs_feed, transit_router or None
+        The public transit timetable routing the 'all_public' mode, routed on the network on first use.
+    isochrone_cache : isochrone_cache
+        The cache of the isochrone results, keyed by snapped origin, max times, mode and data fingerprint.
+
     Methods
     -------
-    green_area_per_person()
+    green_area_per_person() -> str
         Abstract method to calculate the green area per person.
-    get_isochrone_green(lat, lon, max_time, transport_mode)
-        Abstract method to calculate the reachable green areas within a given time from a starting point.
+    get_isochrone_green(lat: float, lon: float, max_time: float | list, network_type: str, coverage: str, access_distance: float) -> str
+        Calculates the reachable green areas within a given time from a starting point.
+    get_isochrone_green_batch(origins: Any, max_time: float, network_type: str) -> pandas.DataFrame
+        Calculates the reachable green areas within a given time from many starting points.
+    get_isochrone_green_sweep(max_time: float, network_type: str, n_jobs: int, chunk_size: int) -> pandas.DataFrame
+        Calculates the reachable green areas within a given time from every node of the traffic network.
+    get_green_accessibility(transport_mode: str, max_times: list, percentiles: list, min_patch_area_sqm: float) -> dict
+        Calculates the distance and travel time to the nearest green area from every populated pixel.
+    get_green_catchment(transport_mode: str, max_time: float, method: str, decay: str, beta: float, min_patch_area_sqm: float) -> dict
+        Calculates the catchment-based green accessibility score of every populated pixel.
+    invalidate() -> None
+        Marks the green raster as edited in place.
+    _green_raster() -> dict
+        Abstract method returning the green raster of the data source.
+    _network() -> prepared_network
+        Returns the prepared traffic network, preparing the GeoDataFrames on first use.
+    _patches() -> green_patch_index
+        Returns the patch index of the green raster, built on first use.
+    _transit() -> transit_router or None
+        Returns the public transit router, built on the traffic network on first use.
+    _isochrone_key(lat: float, lon: float, max_time: float | list, network_type: str, coverage: str, access_distance: float, min_patch_area_sqm: float) -> tuple
+        Returns the cache key of an isochrone query, None if it is not cached.
+    _estimate_distance_from_time(time_seconds: float, transport_mode: str) -> float
+        Estimates the distance that can be traveled in a given time for a specific transport mode.
     """
 
+    SOURCE = "green"
+
+    def __init__(
+        self,
+        vector_traffic_area: Union[
+            Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame], prepared_network
+        ],
+        ghs_pop_data: Dict[str, Any],
+        patch_index: Optional[green_patch_index] = None,
+        transit: Optional[Union[gtfs_feed, transit_router]] = None,
+        cache: Optional[isochrone_cache] = None,
+    ) -> None:
+        """
+        Initializes the traffic area, the population data and the shared caches.
+
+        Parameters
+        ----------
+        vector_traffic_area : tuple or prepared_network
+            A tuple containing two GeoDataFrames: nodes and edges for traffic area,
+            or a prepared network reused across all queries.
+        ghs_pop_data : dict
+            The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+        patch_index : green_patch_index, optional
+            The patch index of the green raster, built on first use if missing.
+        transit : gtfs_feed or transit_router, optional
+            The public transit timetable, e.g. loaded with `gtfs_feed.from_zip`. When given,
+            the 'all_public' isochrones follow its timetables instead of a fixed road speed.
+        cache : isochrone_cache, optional
+            The cache of the isochrone results, e.g. shared or persisted. Defaults to a new in-memory cache.
+
+        Returns
+        -------
+        None
+        """
+        self.vector_traffic_area = vector_traffic_area
+        self.ghs_pop_data = ghs_pop_data
+        self.patch_index = patch_index
+        self.transit = transit
+        self.isochrone_cache = cache if cache is not None else isochrone_cache()
+        self._fingerprint: Optional[Tuple[Any, str]] = None
+        self._green_fingerprint: Optional[Tuple[Any, Tuple[Any, ...], str, str]] = (
+            None
+        )
+
     @abstractmethod
     def green_area_per_person(self) -> str:
         """
@@ -25,27 +128,701 @@ class interface(ABC):
         """
         pass
 
+    def invalidate(self) -> None:
+        """
+        Marks the green raster as edited in place.
+
+        The green raster is fingerprinted once per array, so after changing its
+        pixels in place the cached isochrone results would still be returned. The
+        next query fingerprints it again, and the patch index is rebuilt on next use.
+
+        Returns
+        -------
+        None
+        """
+        self._green_fingerprint = None
+        self.patch_index = None
+
     @abstractmethod
+    def _green_raster(self) -> Dict[str, Any]:
+        """
+        Returns the green raster of the data source.
+
+        Returns
+        -------
+        dict
+            The green area data containing 'data', 'transform', 'crs', and 'shape'.
+        """
+        pass
+
     def get_isochrone_green(
-        self, lat: float, lon: float, max_time: float, transport_mode: str
+        self,
+        lat: float,
+        lon: float,
+        max_time: Union[float, Sequence[float]],
+        network_type: str,
+        coverage: str = "nodes",
+        access_distance: float = 50.0,
+        min_patch_area_sqm: float = 0.0,
     ) -> str:
         """
         Calculates the reachable green areas within a given time from a starting point.
 
+        When several time budgets are given, a single search is run at the largest
+        one and every reached node is bucketed by arrival time, so all the nested
+        isochrones cost about as much as the largest alone.
+
+        With the 'nodes' coverage the green share is sampled at the reached
+        intersections. With the 'area' coverage it is measured over every pixel
+        within the access distance of a reachable street, which also counts the
+        parks lying between streets.
+
+        With a public transit timetable, the 'all_public' isochrones walk to the
+        stops, ride the scheduled trips and walk again from the stops reached.
+
+        On the core of a network, the search runs over the contracted chains and
+        the chains reached are then expanded back to the nodes of the full network,
+        so the isochrones still end partway along a chain and its interior nodes
+        are sampled: the core changes the speed, not the result.
+
         Parameters
         ----------
         lat : float
             The latitude of the starting point.
         lon : float
             The longitude of the starting point.
+        max_time : float or list of float
+            The maximum travel time in minutes, or an ascending list of them.
+        network_type : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+        coverage : str, optional
+            How the green share is measured, 'nodes' or 'area'. Defaults to 'nodes'.
+        access_distance : float, optional
+            The distance in meters from a reachable street still considered
+            accessible with the 'area' coverage. Defaults to 50.
+        min_patch_area_sqm : float, optional
+            The minimum area in square meters of the green patches counted as
+            reachable (e.g. 5000 for parks of at least 0.5 ha). Defaults to 0.
+
+        Returns
+        -------
+        str
+            A JSON string containing the reachable green areas in the selected max time with the selected transport mode.
+            If a list of max times is given, a JSON list with one such result per max time.
+
+        Raises
+        ------
+        ValueError
+            If the input parameters are invalid or the traffic area is not reachable.
+        """
+        key = self._isochrone_key(
+            lat,
+            lon,
+            max_time,
+            network_type,
+            coverage,
+            access_distance,
+            min_patch_area_sqm,
+        )
+        if key is not None:
+            cached = self.isochrone_cache.get(key)
+            if cached is not None:
+                return cached
+
+        with tqdm(
+            total=100,
+            desc=f"Calculating {self.SOURCE} isochrone green area",
+            unit="%",
+            leave=False,
+        ) as pbar:
+            logger = logging.getLogger(__name__)
+            if not (isinstance(lat, (int, float)) and isinstance(lon, (int, float))):
+                logger.error("Coordinates not valid")
+                raise ValueError("Coordinates not valid")
+            pbar.update(5)
+
+            nested = isinstance(max_time, (list, tuple, np.ndarray))
+            max_times = list(max_time) if nested else [max_time]
+            if (
+                not max_times
+                or not all(
+                    isinstance(t, (int, float, np.number)) and t > 0 for t in max_times
+                )
+                or max_times != sorted(max_times)
+            ):
+                logger.error("Max time not valid")
+                raise ValueError("Max time not valid")
+
+            valid_transport_modes = [
+                "walk",
+                "bike",
+                "drive",
+                "all_public",
+                "drive_public",
+            ]
+            if network_type not in valid_transport_modes:
+                logger.error(
+                    f"Transport mode not valid. Choose from: {', '.join(valid_transport_modes)}"
+                )
+                raise ValueError("Transport mode not valid")
+
+            if coverage not in ("nodes", "area") or not (
+                isinstance(access_distance, (int, float)) and access_distance >= 0
+            ):
+                logger.error("Coverage not valid. Choose from: nodes, area")
+                raise ValueError("Coverage not valid")
+
+            pbar.update(5)
+            if (
+                not hasattr(self, "vector_traffic_area")
+                or self.vector_traffic_area is None
+            ):
+                logger.error("Traffic area not reachable")
+                return json.dumps({"error": "Traffic area not reachable"})
+
+            network = self._network()
+            graph = network.graph
+            transit = self._transit() if network_type == "all_public" else None
+            # with a timetable the stops are reached and left on foot
+            access_mode = transit.WALK_MODE if transit is not None else network_type
+            # start from both ends of the nearest edge, with the partial travel times
+            seed_nodes, seed_offsets = network.edge_seeds(
+                np.array([lat]), np.array([lon]), access_mode
+            )
+            pbar.update(10)
+            # the timetable already accounts for the walk to the stop and the wait
+            fixed_delay = (
+                0
+                if transit is not None
+                else speed_profiles.FIXED_DELAYS.get(network_type, 0)
+            )
+
+            budgets_seconds = np.array(max_times, dtype=np.float64) * 60 - fixed_delay
+            travel_time_seconds = float(budgets_seconds[-1])
+
+            if travel_time_seconds <= 0:
+                logger = logging.getLogger(__name__)
+                logger.warning(
+                    f"Time after delays ({fixed_delay / 60} min) is not enough to travel."
+                )
+                return json.dumps({"error": "Insufficient travel time after delays"})
+
+            weights = network.travel_times[access_mode]
+            pbar.update(10)
+            if transit is not None:
+                reached, arrival = transit.search(
+                    seed_nodes[0], seed_offsets[0], travel_time_seconds
+                )
+            else:
+                reached, arrival = network.search(network_type).search(
+                    seed_nodes[0], travel_time_seconds, seed_offsets[0]
+                )
+            pbar.update(50)
+            if len(reached) == 0:
+                logger = logging.getLogger(__name__)
+                logger.warning("No reachable nodes within the time limit.")
+                return json.dumps({"error": "No reachable nodes within the time limit"})
+
+            if network.contraction is not None and network.parent is not None:
+                # sample the chains reached on the core at their own nodes, as on the full network
+                seed_edges, seed_costs = None, None
+                if seed_nodes[0, 0] != seed_nodes[0, 1]:
+                    index = network.edge_snap_index
+                    edge, _, _ = index.snap(np.array([lat]), np.array([lon]))
+                    seed_edges = np.concatenate((edge, index.reverse[edge]))
+                    seed_costs = seed_offsets[0, ::-1]
+                    seed_edges, seed_costs = (
+                        seed_edges[seed_edges >= 0],
+                        seed_costs[seed_edges >= 0],
+                    )
+                contraction, network = network.contraction, network.parent
+                graph = network.graph
+                weights = network.travel_times[access_mode]
+                reached, arrival = contraction.expand_reached(
+                    reached, arrival, weights, travel_time_seconds, seed_edges, seed_costs
+                )
+
+            # Nodes come out of the search in arrival order, so the nodes within
+            # every budget are a prefix of the reached ones
+            iso = isochrone(self._green_raster(), network, self._patches())
+            flags = iso.green_flags(reached)
+            inside = flags[:, 0].astype(bool)
+            green = flags[:, 1].astype(bool)
+
+            green_nodes = reached[green]
+            distances_meters = self._estimate_distance_from_time(
+                arrival[green], network_type
+            )
+            travel_times = geo()._calculate_travel_time(distances_meters, network_type)
+            green_records = [
+                {
+                    "time_minutes": node_time,
+                    "distance_meters": node_distance,
+                    "lat": node_lat,
+                    "lon": node_lon,
+                }
+                for node_time, node_distance, node_lat, node_lon in zip(
+                    travel_times.tolist(),
+                    np.round(distances_meters, 2).tolist(),
+                    graph.y[green_nodes].tolist(),
+                    graph.x[green_nodes].tolist(),
+                )
+            ]
+            pbar.update(10)
+
+            within = np.searchsorted(arrival, budgets_seconds, side="right")
+            green_within = np.concatenate(([0], np.cumsum(green)))[within]
+            if coverage == "area":
+                total_pixels, green_area_pixels = iso.area_coverage(
+                    network.edges,
+                    reached,
+                    arrival,
+                    weights,
+                    budgets_seconds,
+                    access_distance,
+                )
+            else:
+                total_pixels = np.concatenate(([0], np.cumsum(inside)))[within]
+                green_area_pixels = green_within
+            pixel_area_sqm = 100  # 10m x 10m
+
+            patches_within, patches_area = iso.reachable_patches(
+                reached, arrival, access_mode, budgets_seconds, min_patch_area_sqm
+            )
+
+            results = []
+            for (
+                budget_time,
+                budget_total,
+                budget_green,
+                budget_records,
+                budget_patches,
+                budget_patches_area,
+            ) in zip(
+                max_times,
+                total_pixels.tolist(),
+                green_area_pixels.tolist(),
+                green_within.tolist(),
+                patches_within.tolist(),
+                patches_area.tolist(),
+            ):
+                green_percentage = (
+                    (budget_green / max(1, budget_total)) * 100
+                    if budget_total > 0
+                    else 0
+                )
+                green_area_sqm = budget_green * pixel_area_sqm
+                results.append(
+                    {
+                        "max_time": budget_time,
+                        "transport_mode": network_type,
+                        "green_area_percentage": round(green_percentage, 2),
+                        "green_area_sqm": round(green_area_sqm, 2),
+                        "green_accessibility": green_records[:budget_records],
+                        "green_patches": budget_patches,
+                        "green_patches_area_sqm": round(budget_patches_area, 2),
+                    }
+                )
+            pbar.update(5)
+            if pbar.n > 100:
+                pbar.n = 100
+                pbar.last_print_n = 100
+            pbar.set_description(f"Finished calculating {self.SOURCE} isochrone green area")
+            pbar.close()
+            result = json.dumps(results if nested else results[0])
+            if key is not None:
+                self.isochrone_cache.put(key, result)
+            return result
+
+    def get_isochrone_green_batch(
+        self,
+        origins: Any,
+        max_time: float,
+        network_type: str,
+        n_jobs: Optional[int] = None,
+        chunk_size: int = 256,
+    ) -> pd.DataFrame:
+        """
+        Calculates the reachable green areas within a given time from many starting points.
+
+        The traffic network is built and every origin snapped only once, then the
+        bounded searches are spread over a process pool sharing the graph arrays.
+
+        Unlike `get_isochrone_green`, the chains of the core of a network are not
+        expanded: the isochrones end at the core nodes, and only those are sampled
+        and counted in 'reachable_nodes'.
+
+        Parameters
+        ----------
+        origins : pandas.DataFrame, geopandas.GeoDataFrame or array-like
+            A GeoDataFrame of points, a DataFrame with 'lat' and 'lon' columns, or a
+            sequence of (lat, lon) pairs. The frame index, or the position in the
+            sequence, is used as origin id.
+        max_time : float
+            The maximum travel time in minutes.
+        network_type : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+        n_jobs : int, optional
+            The number of worker processes. Defaults to the number of CPUs.
+        chunk_size : int, optional
+            The number of origins handed to a worker at a time. Defaults to 256.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per origin with the columns 'origin_id', 'green_area_percentage',
+            'green_area_sqm' and 'reachable_nodes'.
+
+        Raises
+        ------
+        ValueError
+            If the input parameters are invalid or the traffic area is not reachable.
+        """
+        if self.vector_traffic_area is None:
+            logger = logging.getLogger(__name__)
+            logger.error("Traffic area not reachable")
+            raise ValueError("Traffic area not reachable")
+
+        return isochrone(self._green_raster(), self._network()).green_batch(
+            origins, max_time, network_type, n_jobs, chunk_size
+        )
+
+    def get_isochrone_green_sweep(
+        self,
+        max_time: float,
+        network_type: str = "walk",
+        n_jobs: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Calculates the reachable green areas within a given time from every node of the traffic network.
+
+        The graph and the per-node green flags are published once in shared memory,
+        and the workers write the results of their node ranges into a shared output array.
+
+        On the core of a network, only the core nodes are origins, and the isochrones
+        end at the core nodes, which alone are sampled and counted in 'reachable_nodes'.
+
+        Parameters
+        ----------
         max_time : float
             The maximum travel time in minutes.
+        network_type : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+            Defaults to 'walk'.
+        n_jobs : int, optional
+            The number of worker processes. Defaults to the number of CPUs.
+        chunk_size : int, optional
+            The number of nodes handed to a worker at a time. Defaults to a
+            sixteenth of the share of every worker.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per node with the columns 'node_id', 'lat', 'lon', 'green_area_percentage',
+            'green_area_sqm' and 'reachable_nodes'.
+
+        Raises
+        ------
+        ValueError
+            If the input parameters are invalid or the traffic area is not reachable.
+        """
+        if self.vector_traffic_area is None:
+            logger = logging.getLogger(__name__)
+            logger.error("Traffic area not reachable")
+            raise ValueError("Traffic area not reachable")
+
+        return isochrone(self._green_raster(), self._network()).green_sweep(
+            max_time, network_type, n_jobs, chunk_size
+        )
+
+    def get_green_accessibility(
+        self,
+        transport_mode: str = "walk",
+        max_times: Sequence[float] = (5, 10, 15),
+        percentiles: Sequence[float] = (25, 50, 75, 90),
+        min_patch_area_sqm: float = 0.0,
+    ) -> Dict[str, Any]:
+        """
+        Calculates the distance and travel time to the nearest green area from every populated pixel.
+
+        A single multi-source search from all the green entry nodes covers the
+        whole network, and every populated GHS-POP pixel is snapped to it at once.
+
+        Parameters
+        ----------
+        transport_mode : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive'). Defaults to 'walk'.
+        max_times : list of float, optional
+            The travel times in minutes of the shares of the population reported. Defaults to 5, 10 and 15.
+        percentiles : list of float, optional
+            The population percentiles of distance and time reported. Defaults to 25, 50, 75 and 90.
+        min_patch_area_sqm : float, optional
+            The minimum area in square meters of the green patches considered. Defaults to 0.
+
+        Returns
+        -------
+        dict
+            The 'distance' raster in meters and 'time' raster in minutes, aligned with the
+            GHS-POP data, and the population-weighted 'summary'.
+
+        Raises
+        ------
+        ValueError
+            If the input parameters are invalid or the traffic area is not reachable.
+        """
+        with tqdm(
+            total=100, desc=f"Calculating {self.SOURCE} green accessibility", leave=False
+        ) as pbar:
+            if self.vector_traffic_area is None:
+                logger = logging.getLogger(__name__)
+                logger.error("Traffic area not reachable")
+                raise ValueError("Traffic area not reachable")
+            network = self._network()
+            pbar.update(20)
+            result = green_accessibility(
+                self._green_raster(), network, self.ghs_pop_data, self._patches()
+            ).compute(transport_mode, max_times, percentiles, min_patch_area_sqm)
+            pbar.update(80)
+            pbar.set_description(f"Finished calculating {self.SOURCE} green accessibility")
+            pbar.close()
+            return result
+
+    def get_green_catchment(
+        self,
+        transport_mode: str = "walk",
+        max_time: float = 15,
+        method: str = "2sfca",
+        decay: Optional[str] = None,
+        beta: float = 1.0,
+        min_patch_area_sqm: float = 0.0,
+    ) -> Dict[str, Any]:
+        """
+        Calculates the catchment-based green accessibility score of every populated pixel.
+
+        Unlike `green_area_per_person`, the green supply (patch area) is matched to
+        the demand (GHS-POP) within a travel time catchment, through a sparse
+        pixel x patch travel time matrix.
+
+        Parameters
+        ----------
+        transport_mode : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive'). Defaults to 'walk'.
+        max_time : float, optional
+            The catchment size in minutes. Defaults to 15.
+        method : str, optional
+            '2sfca' for the reachable green area per person, or 'gravity' for the
+            decay-weighted reachable green area. Defaults to '2sfca'.
+        decay : str, optional
+            'binary', 'gaussian', 'exponential' or 'power'. Defaults to 'binary' for
+            '2sfca' and 'power' for 'gravity'.
+        beta : float, optional
+            The decay rate of the exponential and power functions. Defaults to 1.
+        min_patch_area_sqm : float, optional
+            The minimum area in square meters of the green patches considered. Defaults to 0.
+
+        Returns
+        -------
+        dict
+            The 'score' raster aligned with the GHS-POP data and its population-weighted 'summary'.
+
+        Raises
+        ------
+        ValueError
+            If the input parameters are invalid or the traffic area is not reachable.
+        """
+        with tqdm(
+            total=100, desc=f"Calculating {self.SOURCE} green catchment", leave=False
+        ) as pbar:
+            if self.vector_traffic_area is None:
+                logger = logging.getLogger(__name__)
+                logger.error("Traffic area not reachable")
+                raise ValueError("Traffic area not reachable")
+            network = self._network()
+            pbar.update(20)
+            result = green_catchment(
+                self._green_raster(), network, self.ghs_pop_data, self._patches()
+            ).compute(
+                transport_mode, max_time, method, decay, beta, min_patch_area_sqm
+            )
+            pbar.update(80)
+            pbar.set_description(f"Finished calculating {self.SOURCE} green catchment")
+            pbar.close()
+            return result
+
+    def _patches(self) -> green_patch_index:
+        """
+        Returns the patch index of the green raster, built on first use.
+
+        Returns
+        -------
+        green_patch_index
+            The green patches shared by all the queries of this instance.
+        """
+        if self.patch_index is None:
+            self.patch_index = green_patch_index(self._green_raster())
+        return self.patch_index
+
+    def _transit(self) -> Optional[transit_router]:
+        """
+        Returns the public transit router, built on the traffic network on first use.
+
+        Returns
+        -------
+        transit_router or None
+            The router shared by all the queries of this instance, None without a timetable.
+        """
+        if isinstance(self.transit, gtfs_feed):
+            self.transit = transit_router(self.transit, self._network())
+        return self.transit
+
+    def _isochrone_key(
+        self,
+        lat: float,
+        lon: float,
+        max_time: Union[float, Sequence[float]],
+        network_type: str,
+        coverage: str,
+        access_distance: float,
+        min_patch_area_sqm: float,
+    ) -> Optional[Tuple[Any, ...]]:
+        """
+        Returns the cache key of an isochrone query, None if it is not cached.
+
+        Invalid queries are not cached, so they fail as usual, and neither are the
+        timetable-routed 'all_public' ones. The fingerprints of the green raster and
+        of the network are computed again only when they are replaced, so a repeated
+        click hashes nothing; a raster edited in place must be marked with `invalidate`.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude of the starting point.
+        lon : float
+            The longitude of the starting point.
+        max_time : float or list of float
+            The maximum travel time in minutes, or an ascending list of them.
+        network_type : str
+            The type of transport network.
+        coverage : str
+            How the green share is measured, 'nodes' or 'area'.
+        access_distance : float
+            The access distance in meters of the 'area' coverage.
+        min_patch_area_sqm : float
+            The minimum area in square meters of the green patches counted as reachable.
+
+        Returns
+        -------
+        tuple or None
+            The key of the query.
+        """
+        if (
+            not (isinstance(lat, (int, float)) and isinstance(lon, (int, float)))
+            or not (np.isfinite(lat) and np.isfinite(lon))
+            or network_type not in speed_profiles.SPEEDS_KMH
+            or (network_type == "all_public" and self.transit is not None)
+            or getattr(self, "vector_traffic_area", None) is None
+        ):
+            return None
+        nested = isinstance(max_time, (list, tuple, np.ndarray))
+        try:
+            max_times = tuple(float(t) for t in (max_time if nested else [max_time]))
+            options = (coverage, float(access_distance), float(min_patch_area_sqm))
+        except (TypeError, ValueError):
+            return None
+        if (
+            not max_times
+            or min(max_times) <= 0
+            or list(max_times) != sorted(max_times)
+            or coverage not in ("nodes", "area")
+            or options[1] < 0
+        ):
+            return None
+
+        network = self._network()
+        green = self._green_raster()
+        if self._fingerprint is None or self._fingerprint[0] is not network:
+            graph = network.graph
+            self._fingerprint = (
+                network,
+                isochrone_cache.fingerprint(
+                    graph.indptr,
+                    graph.indices,
+                    *(network.travel_times[mode] for mode in sorted(network.travel_times)),
+                ),
+            )
+        data, transform = green["data"], tuple(green["transform"])
+        memo = self._green_fingerprint
+        if (
+            memo is None
+            or memo[0] is not data
+            or memo[1] != transform
+            or memo[2] != self._fingerprint[1]
+        ):
+            memo = (
+                data,
+                transform,
+                self._fingerprint[1],
+                isochrone_cache.fingerprint(
+                    np.asarray(data), transform, self._fingerprint[1]
+                ),
+            )
+            self._green_fingerprint = memo
+        fingerprint = memo[3]
+        point = (self._fingerprint[1], float(lat), float(lon), network_type)
+        origin = self.isochrone_cache.snapped(point)
+        if origin is None:
+            nodes, offsets = network.edge_seeds(
+                np.array([lat], dtype=np.float64),
+                np.array([lon], dtype=np.float64),
+                network_type,
+            )
+            origin = isochrone_cache.origin(nodes[0], offsets[0])
+            self.isochrone_cache.remember(point, origin)
+        return (
+            fingerprint,
+            origin,
+            max_times,
+            nested,
+            network_type,
+        ) + options
+
+    def _network(self) -> prepared_network:
+        """
+        Returns the prepared traffic network, preparing the GeoDataFrames on first use.
+
+        Returns
+        -------
+        prepared_network
+            The traffic network shared by all the queries of this instance.
+        """
+        if not isinstance(self.vector_traffic_area, prepared_network):
+            self.vector_traffic_area = prepared_network.from_traffic_area(
+                self.vector_traffic_area
+            )
+        return self.vector_traffic_area
+
+    def _estimate_distance_from_time(
+        self, time_seconds: float, transport_mode: str
+    ) -> float:
+        """
+        Estimates the distance that can be traveled in a given time for a specific transport mode.
+
+        Parameters
+        ----------
+        time_seconds : float
+            The time available for travel in seconds.
         transport_mode : str
             The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
 
         Returns
         -------
-        str
-            A JSON string containing the reachable green areas in the selected max time with the selected transport mode.
+        float
+            The estimated distance that can be traveled in meters.
+
+        Raises
+        ------
+        ValueError
+            If the transport mode is not valid.
         """
-        pass
+        return speed_profiles.estimated_distance(time_seconds, transport_mode)
@@ -0,0 +1,450 @@
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from rasterio.features import rasterize
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
+
+from greento.green.patches import green_patch_index
+from greento.network.parallel import reachability_pool
+from greento.network.prepared import prepared_network
+from greento.network.speeds import speed_profiles
+
+
+class isochrone:
+    """
+    A class with the network-side computations shared by the isochrone metrics of every green source.
+
+    Attributes
+    ----------
+    green : dict
+        The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+    network : prepared_network
+        The prepared traffic network.
+    graph : csr_graph
+        The CSR graph of the traffic network.
+    patches : green_patch_index or None
+        The patch index of the green raster, if any.
+
+    Methods
+    -------
+    travel_budget(max_time: float, network_type: str) -> float
+        Validates the isochrone parameters and returns the travel time budget.
+    parse_origins(origins: Any) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Splits a collection of origins into ids, latitudes and longitudes.
+    green_flags(nodes: numpy.ndarray) -> numpy.ndarray
+        Flags the nodes falling inside the raster and on a green pixel.
+    green_batch(origins: Any, max_time: float, network_type: str) -> pandas.DataFrame
+        Calculates the isochrone green metrics of many origins at once.
+    green_sweep(max_time: float, network_type: str, n_jobs: int, chunk_size: int) -> pandas.DataFrame
+        Calculates the isochrone green metrics of every node of the network as an origin.
+    area_coverage(edges, reached, arrival, weights, budgets_seconds, access_distance) -> tuple[numpy.ndarray, numpy.ndarray]
+        Counts the raster and green pixels covered by the buffered reachable edges of every budget.
+    reachable_patches(reached, arrival, network_type, budgets_seconds, min_area_sqm) -> tuple[numpy.ndarray, numpy.ndarray]
+        Counts the green patches reachable within every budget and their total area.
+    """
+
+    FIXED_DELAYS = speed_profiles.FIXED_DELAYS
+
+    PIXEL_AREA_SQM = 100  # 10m x 10m
+
+    def __init__(
+        self,
+        green: Dict[str, Any],
+        network: prepared_network,
+        patches: Optional[green_patch_index] = None,
+    ) -> None:
+        """
+        Initializes the isochrone computations with a green raster and a traffic network.
+
+        Parameters
+        ----------
+        green : dict
+            The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+        network : prepared_network
+            The prepared traffic network.
+        patches : green_patch_index, optional
+            The patch index of the green raster, built on first use if missing.
+
+        Returns
+        -------
+        None
+        """
+        self.green = green
+        self.network = network
+        self.graph = network.graph
+        self.patches = patches
+
+    def travel_budget(self, max_time: float, network_type: str) -> float:
+        """
+        Validates the isochrone parameters and returns the travel time budget.
+
+        Parameters
+        ----------
+        max_time : float
+            The maximum travel time in minutes.
+        network_type : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+
+        Returns
+        -------
+        float
+            The travel time in seconds left after the fixed delays.
+
+        Raises
+        ------
+        ValueError
+            If the max time or the transport mode are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        if not isinstance(max_time, (int, float)) or max_time <= 0:
+            logger.error("Max time not valid")
+            raise ValueError("Max time not valid")
+        if network_type not in self.network.travel_times:
+            logger.error(
+                f"Transport mode not valid. Choose from: {', '.join(self.network.travel_times)}"
+            )
+            raise ValueError("Transport mode not valid")
+
+        return max_time * 60 - self.FIXED_DELAYS[network_type]
+
+    def parse_origins(self, origins: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Splits a collection of origins into ids, latitudes and longitudes.
+
+        Parameters
+        ----------
+        origins : pandas.DataFrame, geopandas.GeoDataFrame or array-like
+            A GeoDataFrame of points, a DataFrame with 'lat' and 'lon' columns,
+            or a sequence of (lat, lon) pairs. The frame index, or the position
+            in the sequence, is used as origin id.
+
+        Returns
+        -------
+        tuple
+            The origin ids, latitudes and longitudes as arrays.
+
+        Raises
+        ------
+        ValueError
+            If the origins are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        if isinstance(origins, pd.DataFrame):
+            if "geometry" in origins.columns:
+                lats = origins.geometry.y.to_numpy(dtype=np.float64)
+                lons = origins.geometry.x.to_numpy(dtype=np.float64)
+            elif "lat" in origins.columns and "lon" in origins.columns:
+                lats = origins["lat"].to_numpy(dtype=np.float64)
+                lons = origins["lon"].to_numpy(dtype=np.float64)
+            else:
+                logger.error("Origins must have a geometry or 'lat' and 'lon' columns")
+                raise ValueError("Origins not valid")
+            ids = origins.index.to_numpy()
+        else:
+            points = np.asarray(origins, dtype=np.float64)
+            if points.ndim != 2 or points.shape[1] != 2:
+                logger.error("Origins must be a sequence of (lat, lon) pairs")
+                raise ValueError("Origins not valid")
+            lats, lons = points[:, 0], points[:, 1]
+            ids = np.arange(len(points))
+
+        if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+            logger.error("Coordinates not valid")
+            raise ValueError("Coordinates not valid")
+        return ids, lats, lons
+
+    def green_flags(self, nodes: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Flags the nodes falling inside the raster and on a green pixel.
+
+        Parameters
+        ----------
+        nodes : numpy.ndarray, optional
+            The indices of the nodes to flag. Defaults to all nodes.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (len(nodes), 2) uint8 array: inside the raster, on a green pixel.
+        """
+        data = self.green["data"]
+        rows, cols, inside = self.graph.raster_cells(
+            self.green["transform"], data.shape, nodes
+        )
+        green = inside & (data[rows, cols] == 1)
+        return np.column_stack((inside, green)).astype(np.uint8)
+
+    def green_batch(
+        self,
+        origins: Any,
+        max_time: float,
+        network_type: str,
+        n_jobs: Optional[int] = None,
+        chunk_size: int = 256,
+    ) -> pd.DataFrame:
+        """
+        Calculates the isochrone green metrics of many origins at once.
+
+        All origins are snapped onto their nearest edges in one query, and searched
+        from both ends of the edge with the partial travel times. The per-node green
+        flags are sampled once, and the bounded searches are spread over a process pool sharing the
+        graph arrays.
+
+        Parameters
+        ----------
+        origins : pandas.DataFrame, geopandas.GeoDataFrame or array-like
+            The starting points, as accepted by `parse_origins`.
+        max_time : float
+            The maximum travel time in minutes.
+        network_type : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+        n_jobs : int, optional
+            The number of worker processes. Defaults to the number of CPUs.
+        chunk_size : int, optional
+            The number of origins handed to a worker at a time. Defaults to 256.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per origin with the columns 'origin_id', 'green_area_percentage',
+            'green_area_sqm' and 'reachable_nodes'.
+
+        Raises
+        ------
+        ValueError
+            If the parameters are not valid or the travel time is not enough after the fixed delays.
+        """
+        travel_time_seconds = self.travel_budget(max_time, network_type)
+        if travel_time_seconds <= 0:
+            logger = logging.getLogger(__name__)
+            logger.error("Insufficient travel time after delays")
+            raise ValueError("Insufficient travel time after delays")
+
+        ids, lats, lons = self.parse_origins(origins)
+        sources, offsets = self.network.edge_seeds(lats, lons, network_type)
+        weights = self.network.travel_times[network_type]
+        pool = reachability_pool(self.graph, weights, self.green_flags(), n_jobs)
+        counts = pool.count_reachable(
+            sources, travel_time_seconds, chunk_size, offsets=offsets
+        )
+
+        reachable, inside, green = counts[:, 0], counts[:, 1], counts[:, 2]
+        percentage = np.where(inside > 0, green / np.maximum(inside, 1) * 100, 0.0)
+        return pd.DataFrame(
+            {
+                "origin_id": ids,
+                "green_area_percentage": np.round(percentage, 2),
+                "green_area_sqm": green * self.PIXEL_AREA_SQM,
+                "reachable_nodes": reachable,
+            }
+        )
+
+    def green_sweep(
+        self,
+        max_time: float,
+        network_type: str = "walk",
+        n_jobs: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Calculates the isochrone green metrics of every node of the network as an origin.
+
+        Every node is searched from directly, without snapping. The graph and the
+        per-node green flags are published once in shared memory, and the workers
+        write the counts of their node ranges into a shared output array.
+
+        Parameters
+        ----------
+        max_time : float
+            The maximum travel time in minutes.
+        network_type : str, optional
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+            Defaults to 'walk'.
+        n_jobs : int, optional
+            The number of worker processes. Defaults to the number of CPUs.
+        chunk_size : int, optional
+            The number of nodes handed to a worker at a time. Defaults to a
+            sixteenth of the share of every worker.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per node with the columns 'node_id', 'lat', 'lon',
+            'green_area_percentage', 'green_area_sqm' and 'reachable_nodes'.
+
+        Raises
+        ------
+        ValueError
+            If the parameters are not valid or the travel time is not enough after the fixed delays.
+        """
+        travel_time_seconds = self.travel_budget(max_time, network_type)
+        if travel_time_seconds <= 0:
+            logger = logging.getLogger(__name__)
+            logger.error("Insufficient travel time after delays")
+            raise ValueError("Insufficient travel time after delays")
+
+        weights = self.network.travel_times[network_type]
+        pool = reachability_pool(self.graph, weights, self.green_flags(), n_jobs)
+        counts = pool.sweep(travel_time_seconds, chunk_size)
+
+        reachable, inside, green = counts[:, 0], counts[:, 1], counts[:, 2]
+        percentage = np.where(inside > 0, green / np.maximum(inside, 1) * 100, 0.0)
+        return pd.DataFrame(
+            {
+                "node_id": self.graph.node_ids,
+                "lat": self.graph.y,
+                "lon": self.graph.x,
+                "green_area_percentage": np.round(percentage, 2),
+                "green_area_sqm": green * self.PIXEL_AREA_SQM,
+                "reachable_nodes": reachable,
+            }
+        )
+
+    def area_coverage(
+        self,
+        edges: gpd.GeoDataFrame,
+        reached: np.ndarray,
+        arrival: np.ndarray,
+        weights: np.ndarray,
+        budgets_seconds: np.ndarray,
+        access_distance: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Counts the raster and green pixels covered by the buffered reachable edges of every budget.
+
+        An edge is reachable within a budget when it can be walked end to end within
+        it. The reachable edges are buffered by the access distance in a local metric
+        projection and burned, with the index of the first budget reaching them, into
+        a mask cropped to the window around their bounding box. The counts of every
+        budget are then masked reductions of that single rasterization.
+
+        Parameters
+        ----------
+        edges : geopandas.GeoDataFrame
+            The edges of the traffic network the graph was built from.
+        reached : numpy.ndarray
+            The indices of the reached nodes.
+        arrival : numpy.ndarray
+            The arrival time in seconds at every reached node.
+        weights : numpy.ndarray
+            The travel time in seconds of every edge, in CSR order.
+        budgets_seconds : numpy.ndarray
+            The ascending travel time budgets in seconds.
+        access_distance : float
+            The distance in meters from a reachable edge still considered accessible.
+
+        Returns
+        -------
+        tuple
+            The number of pixels and of green pixels covered within every budget.
+        """
+        num_budgets = len(budgets_seconds)
+        empty = np.zeros(num_budgets, dtype=np.int64)
+
+        node_arrival = np.full(self.graph.num_nodes, np.inf)
+        node_arrival[reached] = arrival
+        sources, targets = self.graph.edge_endpoints()
+        edge_arrival = node_arrival[sources] + weights
+        reachable = np.isfinite(node_arrival[targets]) & (
+            edge_arrival <= budgets_seconds[-1]
+        )
+        if not reachable.any():
+            return empty, empty
+        buckets = np.searchsorted(budgets_seconds, edge_arrival[reachable], side="left")
+
+        raster_crs = self.green.get("crs") or "EPSG:4326"
+        geometries = gpd.GeoSeries(
+            edges.geometry.to_numpy()[self.graph.edge_rows[reachable]],
+            crs=edges.crs or raster_crs,
+        )
+        valid = geometries.notna().to_numpy()
+        geometries, buckets = geometries[valid], buckets[valid]
+        if len(geometries) == 0:
+            return empty, empty
+        metric_crs = geometries.estimate_utm_crs()
+        buffered = (
+            geometries.to_crs(metric_crs).buffer(access_distance).to_crs(raster_crs)
+        )
+
+        data = self.green["data"]
+        transform = self.green["transform"]
+        height, width = data.shape[-2], data.shape[-1]
+        bounds = from_bounds(*buffered.total_bounds, transform=transform)
+        col_start = max(0, int(np.floor(bounds.col_off)))
+        row_start = max(0, int(np.floor(bounds.row_off)))
+        col_stop = min(width, int(np.ceil(bounds.col_off + bounds.width)))
+        row_stop = min(height, int(np.ceil(bounds.row_off + bounds.height)))
+        if col_stop <= col_start or row_stop <= row_start:
+            return empty, empty
+        window = Window(
+            col_start, row_start, col_stop - col_start, row_stop - row_start
+        )
+
+        # Burn the largest budgets first so every pixel keeps the first budget reaching it
+        order = np.argsort(-buckets, kind="stable")
+        burned = rasterize(
+            shapes=zip(buffered.to_numpy()[order], buckets[order].tolist()),
+            out_shape=(int(window.height), int(window.width)),
+            transform=window_transform(window, transform),
+            fill=num_budgets,
+            dtype=np.int32,
+        )
+        rows, cols = window.toslices()
+        green = data[rows, cols] == 1
+
+        covered = np.bincount(burned.ravel(), minlength=num_budgets + 1)[:num_budgets]
+        covered_green = np.bincount(burned[green], minlength=num_budgets + 1)[
+            :num_budgets
+        ]
+        return np.cumsum(covered), np.cumsum(covered_green)
+
+    def reachable_patches(
+        self,
+        reached: np.ndarray,
+        arrival: np.ndarray,
+        network_type: str,
+        budgets_seconds: np.ndarray,
+        min_area_sqm: float = 0.0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Counts the green patches reachable within every budget and their total area.
+
+        A patch is reachable when its snapping node is reached and the distance
+        from the node to the patch can be covered within the budget.
+
+        Parameters
+        ----------
+        reached : numpy.ndarray
+            The indices of the reached nodes.
+        arrival : numpy.ndarray
+            The arrival time in seconds at every reached node.
+        network_type : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+        budgets_seconds : numpy.ndarray
+            The ascending travel time budgets in seconds.
+        min_area_sqm : float, optional
+            The minimum area in square meters of the patches counted. Defaults to 0.
+
+        Returns
+        -------
+        tuple
+            The number of reachable patches and their area in square meters within every budget.
+        """
+        if self.patches is None:
+            self.patches = green_patch_index(self.green)
+        nodes, offsets = self.patches.snap(self.network)
+        selected = self.patches.select(min_area_sqm)
+
+        node_arrival = np.full(self.graph.num_nodes, np.inf)
+        node_arrival[reached] = arrival
+        speed = self.network.SPEEDS_KMH[network_type] * 1000 / 3600
+        patch_arrival = node_arrival[nodes[selected]] + offsets[selected] / speed
+        order = np.argsort(patch_arrival, kind="stable")
+
+        within = np.searchsorted(patch_arrival[order], budgets_seconds, side="right")
+        areas = np.concatenate(([0.0], np.cumsum(self.patches.area_sqm[selected][order])))
+        return within.astype(np.int64), areas[within]
@@ -1,13 +1,15 @@
 import json
-import logging
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple, Union
 
 import geopandas as gpd
 import numpy as np
-import osmnx as ox
 from tqdm import tqdm
 
-from greento.utils.geo import geo
+from greento.green.patches import green_patch_index
+from greento.metrics.cache import isochrone_cache
+from greento.network.prepared import prepared_network
+from greento.transit.gtfs import gtfs_feed
+from greento.transit.router import transit_router
 
 from .interface import interface
 
@@ -16,30 +18,44 @@ class osm(interface):
     """
     A class to calculate metrics using OpenStreetMap (OSM) data.
 
+    The network metrics, their cache and the public transit routing are shared
+    with the other data sources through `interface`.
+
     Attributes
     ----------
     osm_file : dict
         The OSM green area data containing 'data', 'transform', 'crs', and 'shape'.
-    vector_traffic_area : tuple
-        A tuple containing two GeoDataFrames: nodes and edges for traffic area.
+    vector_traffic_area : tuple or prepared_network
+        A tuple containing two GeoDataFrames: nodes and edges for traffic area, prepared on first use.
     ghs_pop_data : dict
         The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+    patch_index : green_patch_index or None
+        The patch index of the green raster, built on first use.
+    transit : gtfs_feed, transit_router or None
+        The public transit timetable routing the 'all_public' mode, routed on the network on first use.
+    isochrone_cache : isochrone_cache
+        The cache of the isochrone results, keyed by snapped origin, max times, mode and data fingerprint.
 
     Methods
     -------
     green_area_per_person() -> str
         Calculates the green area per person in the given raster and population data.
-    get_isochrone_green(lat: float, lon: float, max_time: float, network_type: str) -> str
-        Calculates the reachable green areas within a given time from a starting point.
-    _estimate_distance_from_time(time_seconds: float, transport_mode: str) -> float
-        Estimates the distance that can be traveled in a given time for a specific transport mode.
+    _green_raster() -> dict
+        Returns the OSM green raster.
     """
 
+    SOURCE = "OSM"
+
     def __init__(
         self,
         osm: Dict[str, Any],
-        vector_traffic_area: Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame],
+        vector_traffic_area: Union[
+            Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame], prepared_network
+        ],
         ghs_pop_data: Dict[str, Any],
+        patch_index: Optional[green_patch_index] = None,
+        transit: Optional[Union[gtfs_feed, transit_router]] = None,
+        cache: Optional[isochrone_cache] = None,
     ) -> None:
         """
         Initializes the MetricsOSM class with OSM green area data, traffic area, and population data.
@@ -48,18 +64,27 @@ class osm(interface):
         ----------
         osm : dict
             The OSM green area data containing 'data', 'transform', 'crs', and 'shape'.
-        vector_traffic_area : tuple
-            A tuple containing two GeoDataFrames: nodes and edges for traffic area.
+        vector_traffic_area : tuple or prepared_network
+            A tuple containing two GeoDataFrames: nodes and edges for traffic area,
+            or a prepared network reused across all queries.
         ghs_pop_data : dict
             The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+        patch_index : green_patch_index, optional
+            The patch index of the green raster, built on first use if missing.
+        transit : gtfs_feed or transit_router, optional
+            The public transit timetable, e.g. loaded with `gtfs_feed.from_zip`. When given,
+            the 'all_public' isochrones follow its timetables instead of a fixed road speed.
+        cache : isochrone_cache, optional
+            The cache of the isochrone results, e.g. shared or persisted. Defaults to a new in-memory cache.
 
         Returns
         -------
         None
         """
         self.osm_file = osm
-        self.vector_traffic_area = vector_traffic_area
-        self.ghs_pop_data = ghs_pop_data
+        super().__init__(
+            vector_traffic_area, ghs_pop_data, patch_index, transit, cache
+        )
 
     def green_area_per_person(self) -> str:
         """
@@ -95,255 +120,13 @@ class osm(interface):
                 pbar.close()
                 return json.dumps({"green_area_per_person": green_area_per_person})
 
-    def get_isochrone_green(
-        self, lat: float, lon: float, max_time: float, network_type: str
-    ) -> str:
+    def _green_raster(self) -> Dict[str, Any]:
         """
-        Calculates the reachable green areas within a given time from a starting point.
-
-        Parameters
-        ----------
-        lat : float
-            The latitude of the starting point.
-        lon : float
-            The longitude of the starting point.
-        max_time : float
-            The maximum travel time in minutes.
-        network_type : str
-            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+        Returns the OSM green raster.
 
         Returns
         -------
-        str
-            A JSON string containing the reachable green areas in the selected max time with the selected transport mode.
-
-        Raises
-        ------
-        ValueError
-            If the input parameters are invalid or the traffic area is not reachable.
-        """
-        with tqdm(
-            total=100,
-            desc="Calculating OSM isochrone green area",
-            unit="%",
-            leave=False,
-        ) as pbar:
-            logger = logging.getLogger(__name__)
-            if not (isinstance(lat, (int, float)) and isinstance(lon, (int, float))):
-                logger.error("Coordinates not valid")
-                raise ValueError("Coordinates not valid")
-            pbar.update(5)
-
-            if not isinstance(max_time, (int, float)) or max_time <= 0:
-                logger.error("Max time not valid")
-                raise ValueError("Max time not valid")
-
-            valid_transport_modes = [
-                "walk",
-                "bike",
-                "drive",
-                "all_public",
-                "drive_public",
-            ]
-            if network_type not in valid_transport_modes:
-                logger.error(
-                    f"Transport mode not valid. Choose from: {', '.join(valid_transport_modes)}"
-                )
-                raise ValueError("Transport mode not valid")
-
-            pbar.update(5)
-            if (
-                not hasattr(self, "vector_traffic_area")
-                or self.vector_traffic_area is None
-            ):
-                logger.error("Traffic area not reachable")
-                return json.dumps({"error": "Traffic area not reachable"})
-
-            speed_kmh = {
-                "walk": 5,
-                "bike": 15,
-                "drive": 30,
-                "all_public": 30,
-                "drive_public": 30,
-            }.get(network_type, 5)
-
-            nodes, edges = self.vector_traffic_area
-            G = ox.graph_from_gdfs(nodes, edges)
-            start_node, _ = ox.distance.nearest_nodes(G, X=lon, Y=lat, return_dist=True)
-            pbar.update(10)
-            FIXED_DELAYS = {
-                "walk": 0,
-                "bike": 30,  # take/return bike
-                "drive": 180,  # parking + take the car
-                "all_public": 420,  # walk to the stop (3 min) + estimated wait (4 min)
-                "drive_public": 180,  # wait + call
-            }
-
-            fixed_delay = FIXED_DELAYS.get(network_type, 0)
-
-            travel_time_seconds = (max_time * 60) - fixed_delay
-
-            if travel_time_seconds <= 0:
-                logger = logging.getLogger(__name__)
-                logger.warning(
-                    f"Time after delays ({fixed_delay / 60} min) is not enough to travel."
-                )
-                return json.dumps({"error": "Insufficient travel time after delays"})
-
-            for u, v, data in G.edges(data=True):
-                if "travel_time" not in data and "length" in data:
-                    length_m = data["length"]
-                    data["travel_time"] = length_m / (speed_kmh * 1000 / 3600)
-            pbar.update(10)
-            reachable_nodes = {}
-            visited = set()
-            queue = [(start_node, 0)]
-
-            while queue:
-                current_node, current_time = queue.pop(0)
-
-                if current_node in visited:
-                    continue
-
-                visited.add(current_node)
-                pbar.update(5)
-                if pbar.n > 75:
-                    pbar.n = 75
-                if current_node in G.nodes:
-                    node_data = G.nodes[current_node]
-                    reachable_nodes[current_node] = {
-                        "y": node_data.get("y"),
-                        "x": node_data.get("x"),
-                        "time": current_time,
-                    }
-
-                for neighbor in G.neighbors(current_node):
-                    if neighbor not in visited:
-                        edges = G.get_edge_data(current_node, neighbor).values()
-                        edge_time = min(
-                            edge.get("travel_time", float("inf")) for edge in edges
-                        )
-
-                        new_time = current_time + edge_time
-
-                        if new_time <= travel_time_seconds:
-                            queue.append((neighbor, new_time))
-            pbar.update(10)
-            if not reachable_nodes:
-                logger = logging.getLogger(__name__)
-                logger.warning("No reachable nodes within the time limit.")
-                return json.dumps({"error": "No reachable nodes within the time limit"})
-
-            reachable_coords = [
-                (data["y"], data["x"]) for node_id, data in reachable_nodes.items()
-            ]
-
-            data = self.osm_file["data"]
-            transform = self.osm_file["transform"]
-
-            total_pixels = 0
-            green_area_pixels = 0
-            green_accessibility = {}
-
-            for lat_point, lon_point in reachable_coords:
-                try:
-                    row, col = [int(i) for i in ~transform * (lon_point, lat_point)]
-
-                    if 0 <= row < data.shape[0] and 0 <= col < data.shape[1]:
-                        total_pixels += 1
-                        pixel_value = data[row, col]
-
-                        if pixel_value == 1:
-                            green_area_pixels += 1
-
-                            node_data = next(
-                                (
-                                    d
-                                    for n, d in reachable_nodes.items()
-                                    if d["y"] == lat_point and d["x"] == lon_point
-                                ),
-                                None,
-                            )
-                            if node_data:
-                                time_to_node = node_data["time"]
-                                distance_meters = self._estimate_distance_from_time(
-                                    time_to_node, network_type
-                                )
-                                travel_time = geo()._calculate_travel_time(
-                                    distance_meters, network_type
-                                )
-                                green_accessibility[node_data["x"]] = {
-                                    "time_minutes": travel_time,
-                                    "distance_meters": round(distance_meters, 2),
-                                    "lat": lat_point,
-                                    "lon": lon_point,
-                                }
-                except Exception:
-                    continue
-            pbar.update(10)
-            green_percentage = (
-                (green_area_pixels / max(1, total_pixels)) * 100
-                if total_pixels > 0
-                else 0
-            )
-
-            pixel_area_sqm = 100  # 10m x 10m
-            green_area_sqm = green_area_pixels * pixel_area_sqm
-
-            result = {
-                "max_time": max_time,
-                "transport_mode": network_type,
-                "green_area_percentage": round(green_percentage, 2),
-                "green_area_sqm": round(green_area_sqm, 2),
-                "green_accessibility": list(green_accessibility.values()),
-            }
-            pbar.update(5)
-            if pbar.n > 100:
-                pbar.n = 100
-                pbar.last_print_n = 100
-            pbar.set_description("Finished calculating OSM isochrone green area")
-            pbar.close()
-            return json.dumps(result)
-
-    def _estimate_distance_from_time(
-        self, time_seconds: float, transport_mode: str
-    ) -> float:
-        """
-        Estimates the distance that can be traveled in a given time for a specific transport mode.
-
-        Parameters
-        ----------
-        time_seconds : float
-            The time available for travel in seconds.
-        transport_mode : str
-            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
-
-        Returns
-        -------
-        float
-            The estimated distance that can be traveled in meters.
+        dict
+            The OSM green area data containing 'data', 'transform', 'crs', and 'shape'.
         """
-        # Speed constants in m/s
-        SPEEDS = {
-            "walk": 5 / 3.6,
-            "bike": 15 / 3.6,
-            "drive": 30 / 3.6,
-            "all_public": 30 / 3.6,
-            "drive_public": 30 / 3.6,
-        }
-
-        DELAY_FACTORS = {
-            "walk": 1.15,
-            "bike": 1.2,
-            "drive": 1.25,
-            "all_public": 1.10,
-            "drive_public": 1.25,
-        }
-
-        # Get values for the transport mode
-        speed = SPEEDS.get(transport_mode, SPEEDS["walk"])
-        delay_factor = DELAY_FACTORS.get(transport_mode, 1.0)
-
-        distance = time_seconds * speed / delay_factor
-
-        return distance
+        return self.osm_file
@@ -0,0 +1,707 @@
+import logging
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from rasterio.features import rasterize
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
+from scipy.ndimage import binary_erosion, label
+
+from greento.distance.candidates import green_candidates
+from greento.distance.field import green_field
+from greento.green.patches import green_patch_index
+from greento.metrics.accessibility import green_accessibility
+from greento.network.search import reachability
+from greento.utils.geo import geo
+
+
+class green_scenario:
+    """
+    The outcome of one what-if scenario on the green areas.
+
+    Only the part of the nearest-green field changed by the scenario is stored,
+    the rest is shared with the base field.
+
+    Attributes
+    ----------
+    action : str
+        The change applied, 'add' or 'remove'.
+    base : green_field
+        The field before the change.
+    window : rasterio.windows.Window
+        The part of the green raster touched by the change.
+    data : numpy.ndarray
+        The green mask of the window after the change.
+    nodes : numpy.ndarray
+        The index of every node whose nearest green changed.
+    distances : numpy.ndarray
+        The new cost from every changed node to its nearest green point.
+    nearest : numpy.ndarray
+        The new nearest green point of every changed node, indexing the base
+        green points followed by the added ones.
+    green_lats : numpy.ndarray
+        The latitude of every added green point.
+    green_lons : numpy.ndarray
+        The longitude of every added green point.
+    summary : dict
+        The change of the population-weighted accessibility.
+
+    Methods
+    -------
+    field() -> green_field
+        Builds the full nearest-green field after the change.
+    raster(green: dict) -> dict
+        Returns a copy of the green raster with the change applied.
+    """
+
+    def __init__(
+        self,
+        action: str,
+        base: green_field,
+        window: Window,
+        data: np.ndarray,
+        nodes: np.ndarray,
+        distances: np.ndarray,
+        nearest: np.ndarray,
+        green_lats: np.ndarray,
+        green_lons: np.ndarray,
+        summary: Dict[str, Any],
+    ) -> None:
+        """
+        Initializes the scenario from its changes.
+
+        Parameters
+        ----------
+        action : str
+            The change applied, 'add' or 'remove'.
+        base : green_field
+            The field before the change.
+        window : rasterio.windows.Window
+            The part of the green raster touched by the change.
+        data : numpy.ndarray
+            The green mask of the window after the change.
+        nodes : numpy.ndarray
+            The index of every node whose nearest green changed.
+        distances : numpy.ndarray
+            The new cost of every changed node.
+        nearest : numpy.ndarray
+            The new nearest green point of every changed node.
+        green_lats : numpy.ndarray
+            The latitude of every added green point.
+        green_lons : numpy.ndarray
+            The longitude of every added green point.
+        summary : dict
+            The change of the population-weighted accessibility.
+
+        Returns
+        -------
+        None
+        """
+        self.action = action
+        self.base = base
+        self.window = window
+        self.data = data
+        self.nodes = nodes
+        self.distances = distances
+        self.nearest = nearest
+        self.green_lats = green_lats
+        self.green_lons = green_lons
+        self.summary = summary
+
+    def field(self) -> green_field:
+        """
+        Builds the full nearest-green field after the change.
+
+        Returns
+        -------
+        green_field
+            A new field, the base field is left untouched.
+        """
+        distances = self.base.distances.copy()
+        nearest = self.base.nearest.copy()
+        distances[self.nodes] = self.distances
+        nearest[self.nodes] = self.nearest
+        return green_field(
+            self.base.network,
+            distances,
+            nearest,
+            np.concatenate([self.base.green_lats, self.green_lats]),
+            np.concatenate([self.base.green_lons, self.green_lons]),
+            self.base.weight,
+        )
+
+    def raster(self, green: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns a copy of the green raster with the change applied.
+
+        Parameters
+        ----------
+        green : dict
+            The green area raster the scenario was applied to.
+
+        Returns
+        -------
+        dict
+            A raster dict like `green`, with the added pixels set to 1 and the removed ones to 0.
+        """
+        data = green["data"].copy()
+        band = data[0] if data.ndim == 3 else data
+        rows, cols = self.window.toslices()
+        before = band[rows, cols] == 1
+        band[rows, cols][self.data & ~before] = 1
+        band[rows, cols][before & ~self.data] = 0
+        return {**green, "data": data}
+
+
+class green_scenarios:
+    """
+    What-if scenarios of added or removed green areas, each repaired incrementally.
+
+    The reversed search, the green points grouped by pixel and by node, the nodes
+    grouped by nearest green point and the populated cells grouped by node are
+    prepared once. A scenario then only rasterizes its geometry in its own
+    window, invalidates the nodes whose nearest green point was removed, and
+    repairs the field from the changed entry pixels and the edge of the
+    invalidated region, so its cost grows with the affected area, not the city.
+
+    Added green is entered through its boundary pixels, and removed green
+    exposes the boundary pixels of what remains. Scenarios are independent:
+    each one is applied to the base field.
+
+    Attributes
+    ----------
+    green : dict
+        The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+    patches : green_patch_index
+        The patch index of the green raster.
+    field : green_field
+        The nearest-green field of the green raster.
+    ghs_pop : dict
+        The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+    min_area_sqm : float
+        The minimum area in square meters of a green patch entered through its new boundary.
+    thresholds : tuple of float
+        The costs, in the units of the field, of the population shares reported.
+    limit : float
+        The maximum cost from a node to a green point.
+
+    Methods
+    -------
+    apply(geometry: Any, action: str) -> green_scenario
+        Applies an added or removed green geometry and repairs the field.
+    """
+
+    ACTIONS = ("add", "remove")
+
+    def __init__(
+        self,
+        green: Dict[str, Any],
+        patches: green_patch_index,
+        field: green_field,
+        ghs_pop: Dict[str, Any],
+        min_area_sqm: float = 0.0,
+        thresholds: Sequence[float] = (300, 600, 900),
+        limit: float = 100000,
+    ) -> None:
+        """
+        Prepares the indices shared by all the scenarios.
+
+        Parameters
+        ----------
+        green : dict
+            The green area raster containing 'data', 'transform', 'crs', and 'shape'.
+        patches : green_patch_index
+            The patch index of the green raster.
+        field : green_field
+            The nearest-green field of the green raster.
+        ghs_pop : dict
+            The GHS-POP data containing 'data', 'transform', 'crs', and 'shape'.
+        min_area_sqm : float, optional
+            The minimum area in square meters of a green patch entered through its new boundary. Defaults to 0.
+        thresholds : list of float, optional
+            The costs, in the units of the field, of the population shares reported.
+            Defaults to 300, 600 and 900.
+        limit : float, optional
+            The maximum cost from a node to a green point, as used to build the field. Defaults to 100000.
+
+        Returns
+        -------
+        None
+        """
+        self.green = green
+        self.patches = patches
+        self.field = field
+        self.ghs_pop = ghs_pop
+        self.min_area_sqm = min_area_sqm
+        self.thresholds = tuple(float(t) for t in thresholds)
+        self.limit = limit
+
+        network = field.network
+        graph = network.graph
+        self._speed = (
+            1.0
+            if field.weight == "length"
+            else network.SPEEDS_KMH[field.weight] * 1000 / 3600
+        )
+        self._weights = network.search(field.weight).weights
+        reversed_graph, order = graph.reversed()
+        self._search = reachability(reversed_graph, self._weights[order])
+
+        # The green points by pixel, to find the ones a removal covers
+        candidates = green_candidates(network, field.green_lats, field.green_lons)
+        self._green_nodes = candidates.nodes.astype(np.int64)
+        self._green_offsets = candidates.offsets / self._speed
+        keys = self._keys(*self._pixels(field.green_lats, field.green_lons))
+        self._key_order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._key_order]
+
+        # The nodes by nearest green point and the green points by node
+        self._nodes_ptr, self._nodes_of = self._group(
+            field.nearest, len(field.green_lats)
+        )
+        self._green_ptr, self._green_of = self._group(
+            self._green_nodes, graph.num_nodes
+        )
+
+        # The populated cells by node, with their walk to the node
+        _, _, lats, lons, population = green_accessibility(
+            green, network, ghs_pop, patches
+        ).populated_pixels()
+        self._population = population
+        if len(population):
+            cell_nodes, snapped = graph.snap(lats, lons)
+        else:
+            cell_nodes, snapped = np.zeros(0, dtype=np.int64), np.zeros(0)
+        walk_speed = (
+            1.0
+            if field.weight == "length"
+            else network.SPEEDS_KMH["walk"] * 1000 / 3600
+        )
+        self._cell_offsets = snapped / walk_speed
+        self._cell_ptr, self._cells_of = self._group(cell_nodes, graph.num_nodes)
+        self._baseline = self._totals(
+            field.distances[cell_nodes] + self._cell_offsets, population
+        )
+
+    @staticmethod
+    def _group(keys: np.ndarray, num_keys: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Groups the positions of an array by their non-negative value.
+
+        Parameters
+        ----------
+        keys : numpy.ndarray
+            The value of every position, negative to leave it out.
+        num_keys : int
+            The number of distinct values.
+
+        Returns
+        -------
+        tuple
+            The CSR pointers of every value and the positions grouped by value.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        positions = np.nonzero(keys >= 0)[0]
+        positions = positions[np.argsort(keys[positions], kind="stable")]
+        ptr = np.zeros(num_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys[positions], minlength=num_keys), out=ptr[1:])
+        return ptr, positions
+
+    @classmethod
+    def _gather(
+        cls, ptr: np.ndarray, positions: Optional[np.ndarray], keys: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the grouped positions of the given values.
+
+        Parameters
+        ----------
+        ptr : numpy.ndarray
+            The CSR pointers of every value.
+        positions : numpy.ndarray or None
+            The positions grouped by value, None for the pointer ranges themselves.
+        keys : numpy.ndarray
+            The values to gather.
+
+        Returns
+        -------
+        numpy.ndarray
+            The positions of all the given values.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        ranges = cls._ranges(ptr[keys], ptr[keys + 1] - ptr[keys])
+        return ranges if positions is None else positions[ranges]
+
+    @staticmethod
+    def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """
+        Concatenates many ranges of consecutive integers.
+
+        Parameters
+        ----------
+        starts : numpy.ndarray
+            The first integer of every range.
+        counts : numpy.ndarray
+            The length of every range.
+
+        Returns
+        -------
+        numpy.ndarray
+            The int64 integers of all the ranges, in order.
+        """
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return (np.repeat(starts, counts) + offsets).astype(np.int64)
+
+    def _pixels(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the raster row and column of the given points.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitude of every point.
+        lons : numpy.ndarray
+            The longitude of every point.
+
+        Returns
+        -------
+        tuple
+            The row and the column of every point.
+        """
+        inverse = ~self.green["transform"]
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        cols = np.floor(inverse.a * lons + inverse.b * lats + inverse.c)
+        rows = np.floor(inverse.d * lons + inverse.e * lats + inverse.f)
+        return rows.astype(np.int64), cols.astype(np.int64)
+
+    def _keys(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """
+        Returns a unique key of every pixel.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            The row of every pixel.
+        cols : numpy.ndarray
+            The column of every pixel.
+
+        Returns
+        -------
+        numpy.ndarray
+            The int64 key of every pixel.
+        """
+        return rows * self.green["data"].shape[-1] + cols
+
+    def _totals(self, costs: np.ndarray, population: np.ndarray) -> np.ndarray:
+        """
+        Sums the population by accessibility class.
+
+        Parameters
+        ----------
+        costs : numpy.ndarray
+            The cost of every cell to its nearest green.
+        population : numpy.ndarray
+            The population of every cell.
+
+        Returns
+        -------
+        numpy.ndarray
+            The reachable population, its cost-weighted sum, and the population within every threshold.
+        """
+        reachable = np.isfinite(costs)
+        return np.array(
+            [
+                population[reachable].sum(),
+                (population[reachable] * costs[reachable]).sum(),
+            ]
+            + [population[costs <= t].sum() for t in self.thresholds]
+        )
+
+    def _summary(
+        self, totals: np.ndarray, total_population: float
+    ) -> Tuple[Any, list, float]:
+        """
+        Turns the population sums into the mean cost and the population shares.
+
+        Parameters
+        ----------
+        totals : numpy.ndarray
+            The population sums given by `_totals`.
+        total_population : float
+            The total population.
+
+        Returns
+        -------
+        tuple
+            The mean cost of the reachable population, the share within every threshold
+            and the unreachable share.
+        """
+        if total_population <= 0:
+            return None, [0.0] * len(self.thresholds), 0.0
+        mean = round(float(totals[1] / totals[0]), 2) if totals[0] > 0 else None
+        within = [round(float(t / total_population), 4) for t in totals[2:]]
+        unreachable = round(float(1 - totals[0] / total_population), 4)
+        return mean, within, unreachable
+
+    def _window(self, geometry: Any) -> Window:
+        """
+        Returns the pixels of the green raster around a geometry.
+
+        The window has a margin of two pixels, so the boundary of the changed
+        pixels is known.
+
+        Parameters
+        ----------
+        geometry : shapely.geometry.base.BaseGeometry
+            The geometry, in the CRS of the green raster.
+
+        Returns
+        -------
+        rasterio.windows.Window
+            The window, empty if the geometry misses the raster.
+        """
+        data = self.green["data"]
+        height, width = data.shape[-2], data.shape[-1]
+        bounds = from_bounds(*geometry.bounds, transform=self.green["transform"])
+        col_start = max(0, int(np.floor(bounds.col_off)) - 2)
+        row_start = max(0, int(np.floor(bounds.row_off)) - 2)
+        col_stop = min(width, int(np.ceil(bounds.col_off + bounds.width)) + 2)
+        row_stop = min(height, int(np.ceil(bounds.row_off + bounds.height)) + 2)
+        return Window(
+            col_start,
+            row_start,
+            max(0, col_stop - col_start),
+            max(0, row_stop - row_start),
+        )
+
+    def apply(self, geometry: Any, action: str = "add") -> green_scenario:
+        """
+        Applies an added or removed green geometry and repairs the field.
+
+        Parameters
+        ----------
+        geometry : shapely.geometry.base.BaseGeometry
+            The green area added or removed, in the CRS of the green raster.
+        action : str, optional
+            'add' to turn the geometry into green, 'remove' to turn it into non-green. Defaults to 'add'.
+
+        Returns
+        -------
+        green_scenario
+            The changed part of the field and the change of the population-weighted
+            accessibility: the mean cost of the reachable population, the share of the
+            population within every threshold and the unreachable share, before and after.
+
+        Raises
+        ------
+        ValueError
+            If the action or the geometry are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        if action not in self.ACTIONS:
+            logger.error(f"Action not valid. Choose from: {', '.join(self.ACTIONS)}")
+            raise ValueError("Action not valid")
+        if geometry is None or geometry.is_empty:
+            logger.error("Geometry not valid")
+            raise ValueError("Geometry not valid")
+
+        field = self.field
+        graph = field.network.graph
+        data = self.green["data"]
+        if data.ndim == 3:
+            data = data[0]
+        height, width = data.shape
+        window = self._window(geometry)
+        rows, cols = window.toslices()
+        before = data[rows, cols] == 1
+        if before.size:
+            inside = rasterize(
+                shapes=[(geometry, 1)],
+                out_shape=before.shape,
+                transform=window_transform(window, self.green["transform"]),
+                fill=0,
+                dtype=np.uint8,
+            ).astype(bool)
+        else:
+            inside = np.zeros(before.shape, dtype=bool)
+        after = before | inside if action == "add" else before & ~inside
+        changed = before != after
+
+        # The pixels on the window edge are only known to be boundary on the raster edge
+        structure = np.ones((3, 3), dtype=int)
+        known = np.zeros(before.shape, dtype=bool)
+        known[1:-1, 1:-1] = True
+        known[0, :] |= rows.start == 0
+        known[-1, :] |= rows.stop == height
+        known[:, 0] |= cols.start == 0
+        known[:, -1] |= cols.stop == width
+        boundary_before = before & ~binary_erosion(
+            before, structure=structure, border_value=0
+        )
+        boundary_after = after & ~binary_erosion(
+            after, structure=structure, border_value=0
+        )
+        entries = boundary_after & ~boundary_before & known
+
+        if self.min_area_sqm > 0 and entries.any():
+            # A component is as large as its pixels in the window plus the rest of the patches it touches
+            components, num_components = label(after, structure=structure)
+            pixel_rows = np.arange(rows.start, rows.stop)
+            areas = np.broadcast_to(
+                green_patch_index._pixel_area(
+                    self.green["transform"], self.green.get("crs"), pixel_rows
+                )[:, None],
+                before.shape,
+            )
+            patch_ids = self.patches.labels[rows, cols]
+            outside = self.patches.area_sqm - np.bincount(
+                np.maximum(patch_ids[before] - 1, 0),
+                weights=areas[before],
+                minlength=self.patches.num_patches,
+            )
+            size = np.bincount(
+                components[after], weights=areas[after], minlength=num_components + 1
+            )
+            touching = after & before & (patch_ids > 0)
+            pairs = np.unique(
+                np.stack([components[touching], patch_ids[touching] - 1]), axis=1
+            )
+            np.add.at(size, pairs[0], outside[pairs[1]])
+            entries &= size[components] >= self.min_area_sqm
+
+        # Removed green points and the nodes that were closest to them
+        num_green = len(field.green_lats)
+        removed = np.zeros(0, dtype=np.int64)
+        if action == "remove":
+            changed_rows, changed_cols = np.nonzero(changed)
+            changed_keys = self._keys(
+                changed_rows + rows.start, changed_cols + cols.start
+            )
+            starts = np.searchsorted(self._sorted_keys, changed_keys, side="left")
+            counts = (
+                np.searchsorted(self._sorted_keys, changed_keys, side="right") - starts
+            )
+            removed = self._key_order[self._ranges(starts, counts)]
+        invalid = self._gather(self._nodes_ptr, self._nodes_of, removed)
+
+        seed_nodes = []
+        seed_offsets = []
+        seed_labels = []
+        if len(invalid):
+            # The valid neighbours of the invalid region keep their cost
+            edges = self._gather(graph.indptr, None, invalid)
+            tails = np.repeat(invalid, graph.indptr[invalid + 1] - graph.indptr[invalid])
+            heads = graph.indices[edges]
+            valid = ~np.isin(heads, invalid)
+            seed_nodes.append(tails[valid])
+            seed_offsets.append(self._weights[edges][valid] + field.distances[heads][valid])
+            seed_labels.append(field.nearest[heads][valid])
+
+            # The remaining green points on the invalid nodes
+            points = self._gather(self._green_ptr, self._green_of, invalid)
+            points = points[~np.isin(points, removed)]
+            seed_nodes.append(self._green_nodes[points])
+            seed_offsets.append(self._green_offsets[points])
+            seed_labels.append(points)
+
+        entry_rows, entry_cols = np.nonzero(entries)
+        added_lats, added_lons = self._centers(
+            entry_rows + rows.start, entry_cols + cols.start
+        )
+        if len(added_lats):
+            added_nodes, added_offsets = graph.snap(added_lats, added_lons)
+            seed_nodes.append(added_nodes)
+            seed_offsets.append(added_offsets / self._speed)
+            seed_labels.append(num_green + np.arange(len(added_lats)))
+
+        if seed_nodes or len(invalid):
+            nodes, distances, nearest = self._search.repair(
+                field.distances,
+                field.nearest,
+                np.concatenate(seed_nodes) if seed_nodes else np.zeros(0, dtype=np.int64),
+                np.concatenate(seed_offsets) if seed_offsets else np.zeros(0),
+                np.concatenate(seed_labels) if seed_labels else np.zeros(0, dtype=np.int64),
+                invalid,
+                self.limit,
+            )
+        else:
+            nodes = np.zeros(0, dtype=np.int64)
+            distances = np.zeros(0)
+            nearest = np.zeros(0, dtype=np.int32)
+
+        # Only the cells on the changed nodes change their accessibility
+        cells = self._gather(self._cell_ptr, self._cells_of, nodes)
+        counts = self._cell_ptr[nodes + 1] - self._cell_ptr[nodes]
+        cell_nodes = np.repeat(nodes, counts)
+        position = np.repeat(np.arange(len(nodes)), counts)
+        population = self._population[cells]
+        before_costs = field.distances[cell_nodes] + self._cell_offsets[cells]
+        after_costs = distances[position] + self._cell_offsets[cells]
+        totals = (
+            self._baseline
+            - self._totals(before_costs, population)
+            + self._totals(after_costs, population)
+        )
+
+        total_population = float(self._population.sum())
+        mean_before, within_before, unreachable_before = self._summary(
+            self._baseline, total_population
+        )
+        mean_after, within_after, unreachable_after = self._summary(
+            totals, total_population
+        )
+        summary = {
+            "action": action,
+            "weight": field.weight,
+            "changed_pixels": int(changed.sum()),
+            "added_entries": int(len(added_lats)),
+            "removed_entries": int(len(removed)),
+            "changed_nodes": int(len(nodes)),
+            "total_population": round(total_population, 2),
+            "affected_population": round(
+                float(population[before_costs != after_costs].sum()), 2
+            ),
+            "mean_cost_before": mean_before,
+            "mean_cost_after": mean_after,
+            "thresholds": list(self.thresholds),
+            "population_share_within_before": within_before,
+            "population_share_within_after": within_after,
+            "population_share_unreachable_before": unreachable_before,
+            "population_share_unreachable_after": unreachable_after,
+        }
+        return green_scenario(
+            action,
+            field,
+            window,
+            after,
+            nodes,
+            distances,
+            nearest,
+            added_lats,
+            added_lons,
+            summary,
+        )
+
+    def _centers(
+        self, rows: np.ndarray, cols: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the latitude and longitude of the center of the given pixels.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            The row of every pixel.
+        cols : numpy.ndarray
+            The column of every pixel.
+
+        Returns
+        -------
+        tuple
+            The latitude and the longitude of every pixel center.
+        """
+        lats, lons = geo().pixel_centers(self.green["transform"], rows, cols)
+        return np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
@@ -0,0 +1,551 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from greento.network.graph import csr_graph
+
+
+class network_core:
+    """
+    The core of a traffic network, with the same shortest paths over fewer nodes and edges.
+
+    Clipping the network to the bounding box leaves dangling fragments, from
+    which a search cannot leave or which it cannot reach. Only the largest
+    strongly connected component is kept. Its chains of degree-2 nodes are then
+    contracted into single edges, weighted with the sum of the chain. The
+    original edges of every core edge are kept, so paths and geometries can be
+    expanded back to the full network on demand.
+
+    A node is inside a chain when it continues a one-way road (one edge in,
+    one edge out, from and to different nodes) or a two-way road (two edges in
+    and two out, to and from the same two other nodes).
+
+    Attributes
+    ----------
+    graph : csr_graph
+        The CSR graph of the core.
+    parent : csr_graph
+        The CSR graph of the full network.
+    nodes : numpy.ndarray
+        The int64 index in the full network of every core node.
+    node_index : numpy.ndarray
+        The int64 index in the core of every node of the full network, -1 where removed.
+    chain_ptr : numpy.ndarray
+        The int64 offsets, the original edges of core edge i being chain_edges[chain_ptr[i]:chain_ptr[i + 1]].
+    chain_edges : numpy.ndarray
+        The int64 CSR position in the full network of the original edges of every core edge, in path order.
+
+    Methods
+    -------
+    build(graph: csr_graph, weights: numpy.ndarray, contract: bool) -> network_core
+        Extracts the core of a traffic network.
+    largest_component(graph: csr_graph, weights: numpy.ndarray) -> numpy.ndarray
+        Flags the nodes of the largest strongly connected component.
+    chain_weights(weights: numpy.ndarray) -> numpy.ndarray
+        Sums the per-edge values of the full network over every core edge.
+    expand(edges: numpy.ndarray) -> numpy.ndarray
+        Returns the original edges of a sequence of core edges.
+    expand_nodes(edges: numpy.ndarray) -> numpy.ndarray
+        Returns the nodes of the full network along a path of core edges.
+    expand_reached(reached, costs, weights, limit, seed_edges, seed_offsets) -> tuple[numpy.ndarray, numpy.ndarray]
+        Returns the nodes of the full network reached by a search on the core and their costs.
+    expand_geometry(edge_coords: numpy.ndarray, edge_coord_ptr: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]
+        Joins the edge geometries of the full network into the geometries of the core edges.
+    """
+
+    def __init__(
+        self,
+        graph: csr_graph,
+        parent: csr_graph,
+        nodes: np.ndarray,
+        chain_ptr: np.ndarray,
+        chain_edges: np.ndarray,
+    ) -> None:
+        """
+        Initializes the core from its graph and its mapping to the full network.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph of the core.
+        parent : csr_graph
+            The CSR graph of the full network.
+        nodes : numpy.ndarray
+            The index in the full network of every core node.
+        chain_ptr : numpy.ndarray
+            The offsets of the original edges of every core edge in `chain_edges`.
+        chain_edges : numpy.ndarray
+            The CSR position in the full network of the original edges of every core edge.
+
+        Returns
+        -------
+        None
+        """
+        self.graph = graph
+        self.parent = parent
+        self.nodes = np.asarray(nodes, dtype=np.int64)
+        self.node_index = np.full(parent.num_nodes, -1, dtype=np.int64)
+        self.node_index[self.nodes] = np.arange(len(self.nodes))
+        self.chain_ptr = np.asarray(chain_ptr, dtype=np.int64)
+        self.chain_edges = np.asarray(chain_edges, dtype=np.int64)
+
+    @classmethod
+    def build(
+        cls,
+        graph: csr_graph,
+        weights: Optional[np.ndarray] = None,
+        contract: bool = True,
+    ) -> "network_core":
+        """
+        Extracts the core of a traffic network.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph of the full network.
+        weights : numpy.ndarray, optional
+            The cost of every edge, in CSR order. Edges with a non-finite cost are
+            not travelled by the mode and are dropped. Defaults to the edge lengths.
+        contract : bool, optional
+            Whether to contract the chains of degree-2 nodes. Defaults to True.
+
+        Returns
+        -------
+        network_core
+            The core of the network.
+        """
+        if weights is None:
+            weights = graph.length
+        usable = np.isfinite(np.asarray(weights, dtype=np.float64))
+        component = cls.largest_component(graph, weights)
+        sources, targets = graph.edge_endpoints()
+        kept_edges = np.flatnonzero(usable & component[sources] & component[targets])
+        kept_nodes = np.flatnonzero(component)
+
+        # the component as a graph of its own, its nodes and edges in the original order
+        node_index = np.full(graph.num_nodes, -1, dtype=np.int64)
+        node_index[kept_nodes] = np.arange(len(kept_nodes))
+        sub_sources = node_index[sources[kept_edges]]
+        indptr = np.zeros(len(kept_nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sub_sources, minlength=len(kept_nodes)), out=indptr[1:])
+        indices = node_index[targets[kept_edges]]
+
+        if contract:
+            interior = cls._interior(indptr, indices)
+            chain_sources, chain_targets, chain_ptr, chain_edges = cls._chains(
+                indptr, indices, interior
+            )
+        else:
+            interior = np.zeros(len(kept_nodes), dtype=bool)
+            chain_sources = sub_sources
+            chain_targets = indices
+            chain_ptr = np.arange(len(kept_edges) + 1, dtype=np.int64)
+            chain_edges = np.arange(len(kept_edges), dtype=np.int64)
+
+        core_nodes = np.flatnonzero(~interior)
+        core_index = np.full(len(kept_nodes), -1, dtype=np.int64)
+        core_index[core_nodes] = np.arange(len(core_nodes))
+        core_sources = core_index[chain_sources]
+        order = np.argsort(core_sources, kind="stable")
+        counts = np.diff(chain_ptr)[order]
+        ordered_ptr = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=ordered_ptr[1:])
+        chain_edges = chain_edges[
+            np.repeat(chain_ptr[:-1][order] - ordered_ptr[:-1], counts)
+            + np.arange(int(ordered_ptr[-1]))
+        ]
+        core_indptr = np.zeros(len(core_nodes) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(core_sources, minlength=len(core_nodes)), out=core_indptr[1:]
+        )
+
+        nodes = kept_nodes[core_nodes]
+        chain_edges = kept_edges[chain_edges]
+        core_graph = csr_graph(
+            node_ids=np.asarray(graph.node_ids)[nodes],
+            x=graph.x[nodes],
+            y=graph.y[nodes],
+            indptr=core_indptr,
+            indices=core_index[chain_targets][order],
+            length=cls._sum(graph.length, ordered_ptr, chain_edges),
+            travel_time=cls._sum(graph.travel_time, ordered_ptr, chain_edges),
+            edge_rows=np.arange(len(order), dtype=np.int64),
+        )
+        return cls(core_graph, graph, nodes, ordered_ptr, chain_edges)
+
+    @classmethod
+    def largest_component(
+        cls, graph: csr_graph, weights: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Flags the nodes of the largest strongly connected component.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph of the network.
+        weights : numpy.ndarray, optional
+            The cost of every edge, in CSR order, edges with a non-finite cost being
+            ignored. Defaults to every edge.
+
+        Returns
+        -------
+        numpy.ndarray
+            Whether every node belongs to the largest component.
+        """
+        sources, targets = graph.edge_endpoints()
+        if weights is not None:
+            usable = np.isfinite(np.asarray(weights, dtype=np.float64))
+            sources, targets = sources[usable], targets[usable]
+        adjacency = csr_matrix(
+            (np.ones(len(sources), dtype=np.int8), (sources, targets)),
+            shape=(graph.num_nodes, graph.num_nodes),
+        )
+        _, labels = connected_components(adjacency, directed=True, connection="strong")
+        return labels == np.argmax(np.bincount(labels))
+
+    @classmethod
+    def _interior(cls, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Flags the nodes continuing a one-way or a two-way road.
+
+        Parameters
+        ----------
+        indptr : numpy.ndarray
+            The CSR row pointer of the graph.
+        indices : numpy.ndarray
+            The target node of every edge, in CSR order.
+
+        Returns
+        -------
+        numpy.ndarray
+            Whether every node can be contracted into the edges around it.
+        """
+        num_nodes = len(indptr) - 1
+        sources = np.repeat(np.arange(num_nodes), np.diff(indptr))
+        out_degree = np.diff(indptr)
+        in_degree = np.bincount(indices, minlength=num_nodes)
+        loops = np.bincount(sources[sources == indices], minlength=num_nodes) > 0
+
+        # the predecessors of every node, sorted by node
+        order = np.argsort(indices, kind="stable")
+        in_ptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(in_degree, out=in_ptr[1:])
+        predecessors = sources[order]
+
+        def neighbor(ptr: np.ndarray, values: np.ndarray, k: int) -> np.ndarray:
+            # the k-th neighbor of every node, -1 where missing
+            degree = np.diff(ptr)
+            found = degree > k
+            result = np.full(num_nodes, -1, dtype=np.int64)
+            result[found] = values[ptr[:-1][found] + k]
+            return result
+
+        succ_0 = neighbor(indptr, indices, 0)
+        succ_1 = neighbor(indptr, indices, 1)
+        pred_0 = neighbor(in_ptr, predecessors, 0)
+        pred_1 = neighbor(in_ptr, predecessors, 1)
+
+        one_way = (out_degree == 1) & (in_degree == 1) & (succ_0 != pred_0)
+        two_way = (
+            (out_degree == 2)
+            & (in_degree == 2)
+            & (succ_0 != succ_1)
+            & (
+                ((pred_0 == succ_0) & (pred_1 == succ_1))
+                | ((pred_0 == succ_1) & (pred_1 == succ_0))
+            )
+        )
+        return (one_way | two_way) & ~loops
+
+    @classmethod
+    def _chains(
+        cls, indptr: np.ndarray, indices: np.ndarray, interior: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Follows every edge leaving a kept node through the chain nodes to the next kept node.
+
+        Rings made of chain nodes only keep one of their nodes, which is unflagged in place.
+
+        Parameters
+        ----------
+        indptr : numpy.ndarray
+            The CSR row pointer of the graph.
+        indices : numpy.ndarray
+            The target node of every edge, in CSR order.
+        interior : numpy.ndarray
+            Whether every node can be contracted, updated in place for the rings.
+
+        Returns
+        -------
+        tuple
+            Four arrays:
+            - sources (numpy.ndarray): The start node of every chain.
+            - targets (numpy.ndarray): The end node of every chain.
+            - ptr (numpy.ndarray): The int64 offsets of the edges of every chain.
+            - edges (numpy.ndarray): The int64 CSR positions of the edges of every chain, in path order.
+        """
+        ptr_list = indptr.tolist()
+        target_list = indices.tolist()
+        flags = interior.tolist()
+        visited = [False] * len(flags)
+        chain_sources, chain_targets, chain_ptr, chain_edges = [], [], [0], []
+
+        def follow(start: int) -> None:
+            for edge in range(ptr_list[start], ptr_list[start + 1]):
+                previous, node = start, target_list[edge]
+                chain_edges.append(edge)
+                while flags[node]:
+                    visited[node] = True
+                    edge = ptr_list[node]
+                    # a two-way chain goes on along the edge not turning back
+                    if target_list[edge] == previous and ptr_list[node + 1] - edge == 2:
+                        edge += 1
+                    previous, node = node, target_list[edge]
+                    chain_edges.append(edge)
+                chain_sources.append(start)
+                chain_targets.append(node)
+                chain_ptr.append(len(chain_edges))
+
+        for start in np.flatnonzero(~interior).tolist():
+            follow(start)
+        for start in range(len(flags)):
+            if flags[start] and not visited[start]:
+                flags[start] = False
+                interior[start] = False
+                follow(start)
+
+        return (
+            np.asarray(chain_sources, dtype=np.int64),
+            np.asarray(chain_targets, dtype=np.int64),
+            np.asarray(chain_ptr, dtype=np.int64),
+            np.asarray(chain_edges, dtype=np.int64),
+        )
+
+    def chain_weights(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Sums the per-edge values of the full network over every core edge.
+
+        Parameters
+        ----------
+        weights : numpy.ndarray
+            The value of every edge of the full network, in CSR order (e.g. travel times).
+
+        Returns
+        -------
+        numpy.ndarray
+            The summed value of every core edge, in CSR order, with the type of the weights.
+        """
+        return self._sum(weights, self.chain_ptr, self.chain_edges)
+
+    @staticmethod
+    def _sum(
+        weights: np.ndarray, chain_ptr: np.ndarray, chain_edges: np.ndarray
+    ) -> np.ndarray:
+        """
+        Sums per-edge values over chains of edges.
+
+        Parameters
+        ----------
+        weights : numpy.ndarray
+            The value of every edge, in CSR order.
+        chain_ptr : numpy.ndarray
+            The offsets of the edges of every chain in `chain_edges`.
+        chain_edges : numpy.ndarray
+            The CSR positions of the edges of every chain.
+
+        Returns
+        -------
+        numpy.ndarray
+            The summed value of every chain, with the type of the weights, NaN if any value is.
+        """
+        weights = np.asarray(weights)
+        if len(chain_edges) == 0:
+            return np.zeros(0, dtype=weights.dtype)
+        totals = np.add.reduceat(
+            weights[chain_edges].astype(np.float64), chain_ptr[:-1]
+        )
+        return totals.astype(weights.dtype)
+
+    def expand(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Returns the original edges of a sequence of core edges.
+
+        Parameters
+        ----------
+        edges : numpy.ndarray
+            The CSR positions of core edges, e.g. a path found on the core.
+
+        Returns
+        -------
+        numpy.ndarray
+            The int64 CSR positions in the full network of their original edges, in order.
+        """
+        edges = np.asarray(edges, dtype=np.int64)
+        starts = self.chain_ptr[edges]
+        counts = self.chain_ptr[edges + 1] - starts
+        offsets = np.zeros(len(edges), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        positions = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        return self.chain_edges[positions]
+
+    def expand_nodes(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Returns the nodes of the full network along a path of core edges.
+
+        Parameters
+        ----------
+        edges : numpy.ndarray
+            The CSR positions of the core edges of the path, in order.
+
+        Returns
+        -------
+        numpy.ndarray
+            The int32 index in the full network of every node of the path, empty for an empty path.
+        """
+        original = self.expand(edges)
+        if len(original) == 0:
+            return np.zeros(0, dtype=np.int32)
+        sources, targets = self.parent.edge_endpoints()
+        return np.concatenate((sources[original], targets[original[-1:]]))
+
+    def expand_reached(
+        self,
+        reached: np.ndarray,
+        costs: np.ndarray,
+        weights: np.ndarray,
+        limit: float = np.inf,
+        seed_edges: Optional[np.ndarray] = None,
+        seed_offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the nodes of the full network reached by a search on the core and their costs.
+
+        The interior nodes of a chain are reached along the core edges leaving the
+        reached core nodes, with the cost of the chain up to them, so that a search
+        on the core can end partway along a chain as on the full network. A search
+        starting partway along core edges also reaches the interior nodes between
+        its start and their end directly.
+
+        Parameters
+        ----------
+        reached : numpy.ndarray
+            The indices in the core of the reached nodes.
+        costs : numpy.ndarray
+            The cost of every reached node.
+        weights : numpy.ndarray
+            The cost of every edge of the full network, in CSR order, summing to the core weights searched.
+        limit : float, optional
+            The maximum cost of a reached node. Defaults to no limit.
+        seed_edges : numpy.ndarray, optional
+            The CSR positions of the core edges the search started partway along.
+        seed_offsets : numpy.ndarray, optional
+            The cost from the start to the end node of every seed edge.
+
+        Returns
+        -------
+        tuple
+            Two arrays sorted by cost:
+            - nodes (numpy.ndarray): The int32 indices in the full network of the reached nodes.
+            - costs (numpy.ndarray): The float64 cost of every reached node.
+        """
+        reached = np.asarray(reached, dtype=np.int64)
+        node_costs = np.full(self.parent.num_nodes, np.inf)
+        node_costs[self.nodes[reached]] = costs
+
+        # the core edges leaving the reached nodes, then the seed edges
+        starts = self.graph.indptr[reached]
+        counts = self.graph.indptr[reached + 1] - starts
+        offsets = np.zeros(len(reached), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        edges = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        origin = np.repeat(np.asarray(costs, dtype=np.float64), counts)
+        if seed_edges is not None:
+            edges = np.concatenate((edges, np.asarray(seed_edges, dtype=np.int64)))
+        num_leaving = int(counts.sum())
+
+        # the cost before and after every original edge of their chains, inf past an edge not travelled
+        starts = self.chain_ptr[edges]
+        counts = self.chain_ptr[edges + 1] - starts
+        offsets = np.zeros(len(edges), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        positions = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        original = self.chain_edges[positions]
+        values = np.asarray(weights, dtype=np.float64)[original]
+        blocked = ~np.isfinite(values)
+        running = np.cumsum(np.where(blocked, 0.0, values))
+        running_blocked = np.cumsum(blocked)
+        first = np.repeat(offsets, counts)
+        last = np.repeat(offsets + counts - 1, counts)
+        before = running[first] - np.where(blocked, 0.0, values)[first]
+        before_blocked = running_blocked[first] - blocked[first]
+        prefix = np.where(
+            running_blocked > before_blocked, np.inf, running - before
+        )
+        suffix = np.where(
+            running_blocked[last] > running_blocked,
+            np.inf,
+            running[last] - running,
+        )
+
+        # the interior node ending every original edge but the last of its chain
+        chain = np.repeat(np.arange(len(edges)), counts)
+        interior = positions < np.repeat(starts + counts - 1, counts)
+        _, targets = self.parent.edge_endpoints()
+        leaving = interior & (chain < num_leaving)
+        candidates = [(targets[original[leaving]], origin[chain[leaving]] + prefix[leaving])]
+        if seed_edges is not None:
+            seeded = interior & (chain >= num_leaving)
+            remaining = np.asarray(seed_offsets, dtype=np.float64)[
+                chain[seeded] - num_leaving
+            ]
+            ahead = np.isfinite(remaining) & (suffix[seeded] <= remaining)
+            candidates.append(
+                (
+                    targets[original[seeded]][ahead],
+                    (remaining - suffix[seeded])[ahead],
+                )
+            )
+        for nodes, node_cost in candidates:
+            np.minimum.at(node_costs, nodes, node_cost)
+
+        nodes = np.flatnonzero(node_costs <= limit)
+        order = np.argsort(node_costs[nodes], kind="stable")
+        return nodes[order].astype(np.int32), node_costs[nodes[order]]
+
+    def expand_geometry(
+        self, edge_coords: np.ndarray, edge_coord_ptr: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Joins the edge geometries of the full network into the geometries of the core edges.
+
+        The first point of every original edge after the first one of a chain is
+        the last point of the edge before it, and is not repeated.
+
+        Parameters
+        ----------
+        edge_coords : numpy.ndarray
+            The (m, 2) flattened coordinates of the edge geometries of the full network, in CSR order.
+        edge_coord_ptr : numpy.ndarray
+            The offsets of every edge geometry in `edge_coords`.
+
+        Returns
+        -------
+        tuple
+            Two arrays:
+            - coords (numpy.ndarray): The (m, 2) flattened coordinates of the core edge geometries.
+            - ptr (numpy.ndarray): The int64 offsets, the coordinates of core edge i being coords[ptr[i]:ptr[i + 1]].
+        """
+        continued = np.ones(len(self.chain_edges), dtype=np.int64)
+        continued[self.chain_ptr[:-1]] = 0
+        starts = edge_coord_ptr[self.chain_edges] + continued
+        counts = np.diff(edge_coord_ptr)[self.chain_edges] - continued
+        offsets = np.zeros(len(counts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        positions = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        ptr = np.zeros(self.graph.num_edges + 1, dtype=np.int64)
+        if len(counts):
+            np.cumsum(np.add.reduceat(counts, self.chain_ptr[:-1]), out=ptr[1:])
+        return edge_coords[positions], ptr
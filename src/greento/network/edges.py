@@ -0,0 +1,157 @@
+from typing import Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from greento.network.graph import csr_graph
+
+
+class edge_snap_index:
+    """
+    An index snapping points onto the edges of a traffic network, in meters.
+
+    The edge geometries are projected to the local metric plane of the node
+    snap index and put in a Shapely STRtree. A point is matched to its nearest
+    edge and located along it, so a search can start from both ends of the edge
+    with the partial costs of the way left to each of them, instead of from the
+    nearest node, which can be hundreds of meters away along long edges.
+
+    Attributes
+    ----------
+    graph : csr_graph
+        The CSR graph of the traffic network.
+    lines : numpy.ndarray
+        The projected LineString of every edge, in CSR order.
+    tree : shapely.STRtree
+        The spatial index of the projected edges.
+    reverse : numpy.ndarray
+        The CSR position of an edge running the other way between the same nodes, -1 if none.
+
+    Methods
+    -------
+    snap(lats: numpy.ndarray, lons: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Matches every point to its nearest edge.
+    seeds(edges: numpy.ndarray, fractions: numpy.ndarray, weights: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]
+        Returns the end nodes of the matched edges and the partial cost to each of them.
+    """
+
+    def __init__(
+        self, graph: csr_graph, edge_coords: np.ndarray, edge_coord_ptr: np.ndarray
+    ) -> None:
+        """
+        Builds the spatial index of the edges.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph of the traffic network.
+        edge_coords : numpy.ndarray
+            The (m, 2) flattened (lon, lat) coordinates of the edge geometries, in CSR order.
+        edge_coord_ptr : numpy.ndarray
+            The offsets of every edge geometry in `edge_coords`.
+
+        Returns
+        -------
+        None
+        """
+        self.graph = graph
+        index = graph.snap_index
+        points = index.project(edge_coords[:, 1], edge_coords[:, 0])
+        counts = np.diff(edge_coord_ptr)
+        self.lines = shapely.linestrings(
+            points, indices=np.repeat(np.arange(len(counts)), counts)
+        )
+        self.tree = STRtree(self.lines)
+
+        sources, targets = graph.edge_endpoints()
+        num_nodes = graph.num_nodes
+        keys = sources.astype(np.int64) * num_nodes + targets
+        order = np.argsort(keys, kind="stable")
+        reverse_keys = targets.astype(np.int64) * num_nodes + sources
+        positions = np.searchsorted(keys[order], reverse_keys)
+        positions = np.minimum(positions, max(len(keys) - 1, 0))
+        found = keys[order][positions] == reverse_keys
+        self.reverse = np.where(found, order[positions], -1).astype(np.int64)
+
+    def snap(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Matches every point to its nearest edge.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the points.
+        lons : numpy.ndarray
+            The longitudes of the points.
+
+        Returns
+        -------
+        tuple
+            Three arrays with one entry per point:
+            - edges (numpy.ndarray): The CSR position of the nearest edge.
+            - fractions (numpy.ndarray): The position of the projected point along the edge, from 0 to 1.
+            - distances (numpy.ndarray): The distance in meters from the point to the edge.
+        """
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lons = np.asarray(lons, dtype=np.float64).ravel()
+        points = shapely.points(self.graph.snap_index.project(lats, lons))
+        (inputs, matches), distances = self.tree.query_nearest(
+            points, return_distance=True
+        )
+        # keep the first match of the points equally close to several edges
+        order = np.argsort(inputs, kind="stable")
+        inputs, matches, distances = inputs[order], matches[order], distances[order]
+        first = np.ones(len(inputs), dtype=bool)
+        first[1:] = inputs[1:] != inputs[:-1]
+        edges = np.empty(len(lats), dtype=np.int64)
+        edges[inputs[first]] = matches[first]
+        snapped = np.empty(len(lats))
+        snapped[inputs[first]] = distances[first]
+        fractions = shapely.line_locate_point(self.lines[edges], points, normalized=True)
+        return edges, np.nan_to_num(fractions), snapped
+
+    def seeds(
+        self, edges: np.ndarray, fractions: np.ndarray, weights: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the end nodes of the matched edges and the partial cost to each of them.
+
+        The end node of an edge is reached with the rest of the edge cost. Its
+        start node is reached through an edge running the other way, with the
+        part of that edge cost before the point, or for free by a point lying on it.
+
+        Parameters
+        ----------
+        edges : numpy.ndarray
+            The CSR position of every matched edge.
+        fractions : numpy.ndarray
+            The position of every point along its edge, from 0 to 1.
+        weights : numpy.ndarray
+            The cost of every edge, in CSR order.
+
+        Returns
+        -------
+        tuple
+            Two (N, 2) arrays:
+            - nodes (numpy.ndarray): The int32 start and end node of every matched edge.
+            - offsets (numpy.ndarray): The cost from every point to those nodes, inf if not reachable.
+        """
+        sources, targets = self.graph.edge_endpoints()
+        weights = np.asarray(weights, dtype=np.float64)
+        reverse = self.reverse[edges]
+        nodes = np.column_stack((sources[edges], targets[edges])).astype(np.int32)
+        offsets = np.column_stack(
+            (
+                np.where(
+                    reverse >= 0,
+                    fractions * weights[np.maximum(reverse, 0)],
+                    np.where(fractions > 0, np.inf, 0.0),
+                ),
+                (1 - fractions) * weights[edges],
+            )
+        )
+        offsets[~np.isfinite(offsets)] = np.inf
+        return nodes, offsets
@@ -0,0 +1,398 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from affine import Affine
+from scipy.spatial import cKDTree
+
+from greento.network.snap import snap_index
+
+
+class csr_graph:
+    """
+    A compressed sparse row (CSR) representation of a directed traffic network.
+
+    Nodes are addressed by contiguous int32 indices, the outgoing edges of node
+    ``i`` are stored in ``indices[indptr[i]:indptr[i + 1]]``.
+
+    Attributes
+    ----------
+    node_ids : numpy.ndarray
+        The original OSM ids of the nodes, indexed by node index.
+    x : numpy.ndarray
+        The longitude of every node (float64).
+    y : numpy.ndarray
+        The latitude of every node (float64).
+    indptr : numpy.ndarray
+        The CSR row pointer, of length ``num_nodes + 1``.
+    indices : numpy.ndarray
+        The int32 target node index of every edge, in CSR order.
+    length : numpy.ndarray
+        The float32 length in meters of every edge, in CSR order.
+    travel_time : numpy.ndarray
+        The float32 travel time in seconds already stored on the edges, NaN where missing.
+    edge_rows : numpy.ndarray
+        The positional row of every CSR edge in the source edges GeoDataFrame.
+
+    Methods
+    -------
+    from_gdfs(nodes: gpd.GeoDataFrame, edges: gpd.GeoDataFrame) -> csr_graph
+        Builds the CSR graph from the nodes and edges GeoDataFrames.
+    travel_times(speed_kmh: float) -> numpy.ndarray
+        Calculates the per-edge travel time in seconds for a constant speed.
+    nearest_node(lat: float, lon: float) -> int
+        Finds the index of the node closest to the given coordinates.
+    nearest_nodes(lats: numpy.ndarray, lons: numpy.ndarray) -> numpy.ndarray
+        Finds the indices of the nodes closest to arrays of coordinates.
+    snap(lats: numpy.ndarray, lons: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]
+        Snaps arrays of coordinates to their nearest nodes, with the distances in meters.
+    raster_cells(transform: Affine, shape: tuple, nodes: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Maps nodes to the row and column of a raster grid with one inverse affine transform.
+    arrays() -> dict
+        Returns the numeric arrays of the graph, keyed by constructor argument.
+    edge_endpoints() -> tuple[numpy.ndarray, numpy.ndarray]
+        Returns the source and target node index of every edge, in CSR order.
+    reversed() -> tuple[csr_graph, numpy.ndarray]
+        Builds the graph with every edge reversed.
+    """
+
+    def __init__(
+        self,
+        node_ids: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        length: np.ndarray,
+        travel_time: np.ndarray,
+        edge_rows: np.ndarray,
+    ) -> None:
+        """
+        Initializes the CSR graph from its arrays.
+
+        Parameters
+        ----------
+        node_ids : numpy.ndarray
+            The original OSM ids of the nodes.
+        x : numpy.ndarray
+            The longitude of every node.
+        y : numpy.ndarray
+            The latitude of every node.
+        indptr : numpy.ndarray
+            The CSR row pointer.
+        indices : numpy.ndarray
+            The target node index of every edge.
+        length : numpy.ndarray
+            The length in meters of every edge.
+        travel_time : numpy.ndarray
+            The travel time in seconds of every edge, NaN where missing.
+        edge_rows : numpy.ndarray
+            The positional row of every edge in the source edges GeoDataFrame.
+
+        Returns
+        -------
+        None
+        """
+        self.node_ids = node_ids
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.int32)
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self.length = np.ascontiguousarray(length, dtype=np.float32)
+        self.travel_time = np.ascontiguousarray(travel_time, dtype=np.float32)
+        self.edge_rows = np.ascontiguousarray(edge_rows, dtype=np.int64)
+        self._snap_index: Optional[snap_index] = None
+
+    @property
+    def num_nodes(self) -> int:
+        """
+        The number of nodes in the graph.
+        """
+        return int(len(self.node_ids))
+
+    @property
+    def num_edges(self) -> int:
+        """
+        The number of directed edges in the graph.
+        """
+        return int(len(self.indices))
+
+    @property
+    def snap_index(self) -> snap_index:
+        """
+        The index snapping points to the nodes, in meters, built on first use.
+        """
+        if self._snap_index is None:
+            self._snap_index = snap_index(self.y, self.x)
+        return self._snap_index
+
+    @property
+    def tree(self) -> cKDTree:
+        """
+        The KD-tree of the node coordinates projected to meters, built on first use.
+        """
+        return self.snap_index.tree
+
+    @classmethod
+    def from_gdfs(
+        cls, nodes: gpd.GeoDataFrame, edges: gpd.GeoDataFrame
+    ) -> "csr_graph":
+        """
+        Builds the CSR graph from the nodes and edges GeoDataFrames.
+
+        Edges whose endpoints are not among the nodes (e.g. after clipping the
+        network to the bounding box) are dropped.
+
+        Parameters
+        ----------
+        nodes : geopandas.GeoDataFrame
+            The nodes of the traffic network, indexed by OSM id or with an 'osmid' column.
+        edges : geopandas.GeoDataFrame
+            The edges of the traffic network, with a (u, v, key) index or 'u' and 'v' columns.
+
+        Returns
+        -------
+        csr_graph
+            The CSR graph of the traffic network.
+
+        Raises
+        ------
+        ValueError
+            If the nodes GeoDataFrame is empty.
+        """
+        if nodes is None or len(nodes) == 0:
+            logger = logging.getLogger(__name__)
+            logger.error("Traffic network has no nodes")
+            raise ValueError("Traffic network has no nodes")
+
+        if "osmid" in nodes.columns:
+            node_ids = nodes["osmid"].to_numpy()
+        else:
+            node_ids = nodes.index.to_numpy()
+        if "x" in nodes.columns and "y" in nodes.columns:
+            x = nodes["x"].to_numpy(dtype=np.float64)
+            y = nodes["y"].to_numpy(dtype=np.float64)
+        else:
+            x = nodes.geometry.x.to_numpy(dtype=np.float64)
+            y = nodes.geometry.y.to_numpy(dtype=np.float64)
+
+        if "u" in edges.columns and "v" in edges.columns:
+            u_ids = edges["u"].to_numpy()
+            v_ids = edges["v"].to_numpy()
+        else:
+            u_ids = edges.index.get_level_values(0).to_numpy()
+            v_ids = edges.index.get_level_values(1).to_numpy()
+
+        node_index = pd.Index(node_ids)
+        u = node_index.get_indexer(u_ids)
+        v = node_index.get_indexer(v_ids)
+        valid = (u >= 0) & (v >= 0)
+        rows = np.flatnonzero(valid)
+        u = u[valid]
+        v = v[valid]
+
+        if "length" in edges.columns:
+            length = edges["length"].to_numpy(dtype=np.float64, na_value=np.inf)[rows]
+        else:
+            length = np.full(len(rows), np.inf)
+        if "travel_time" in edges.columns:
+            travel_time = edges["travel_time"].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )[rows]
+        else:
+            travel_time = np.full(len(rows), np.nan)
+
+        order = np.argsort(u, kind="stable")
+        counts = np.bincount(u, minlength=len(node_ids))
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        return cls(
+            node_ids=node_ids,
+            x=x,
+            y=y,
+            indptr=indptr,
+            indices=v[order],
+            length=length[order],
+            travel_time=travel_time[order],
+            edge_rows=rows[order],
+        )
+
+    def travel_times(self, speed_kmh: float) -> np.ndarray:
+        """
+        Calculates the per-edge travel time in seconds for a constant speed.
+
+        Travel times already stored on the edges take precedence over the
+        speed-based estimate.
+
+        Parameters
+        ----------
+        speed_kmh : float
+            The travel speed in km/h.
+
+        Returns
+        -------
+        numpy.ndarray
+            The float32 travel time in seconds of every edge, in CSR order.
+        """
+        estimated = self.length / np.float32(speed_kmh * 1000 / 3600)
+        return np.where(np.isnan(self.travel_time), estimated, self.travel_time).astype(
+            np.float32
+        )
+
+    def nearest_node(self, lat: float, lon: float) -> int:
+        """
+        Finds the index of the node closest to the given coordinates.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude of the point.
+        lon : float
+            The longitude of the point.
+
+        Returns
+        -------
+        int
+            The index of the nearest node.
+        """
+        return int(self.nearest_nodes(np.array([lat]), np.array([lon]))[0])
+
+    def nearest_nodes(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """
+        Finds the indices of the nodes closest to arrays of coordinates.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the points.
+        lons : numpy.ndarray
+            The longitudes of the points.
+
+        Returns
+        -------
+        numpy.ndarray
+            The int32 index of the nearest node for every point.
+        """
+        nodes, _ = self.snap_index.snap(lats, lons)
+        return nodes
+
+    def snap(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Snaps arrays of coordinates to their nearest nodes, with the distances in meters.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the points.
+        lons : numpy.ndarray
+            The longitudes of the points.
+
+        Returns
+        -------
+        tuple
+            The int32 index of the nearest node and the distance in meters to it, for every point.
+        """
+        return self.snap_index.snap(lats, lons)
+
+    def raster_cells(
+        self,
+        transform: Affine,
+        shape: Tuple[int, ...],
+        nodes: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Maps nodes to the row and column of a raster grid with one inverse affine transform.
+
+        Parameters
+        ----------
+        transform : affine.Affine
+            The affine transform of the raster.
+        shape : tuple
+            The shape of the raster, the last two dimensions being rows and columns.
+        nodes : numpy.ndarray, optional
+            The indices of the nodes to map. Defaults to all nodes.
+
+        Returns
+        -------
+        tuple
+            Three arrays with one entry per mapped node:
+            - rows (numpy.ndarray): The raster row, clipped to the grid.
+            - cols (numpy.ndarray): The raster column, clipped to the grid.
+            - inside (numpy.ndarray): Whether the node falls within the grid.
+        """
+        height, width = shape[-2], shape[-1]
+        x = self.x if nodes is None else self.x[nodes]
+        y = self.y if nodes is None else self.y[nodes]
+        inverse = ~transform
+        cols = np.floor(inverse.a * x + inverse.b * y + inverse.c)
+        rows = np.floor(inverse.d * x + inverse.e * y + inverse.f)
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        rows = np.clip(rows, 0, height - 1).astype(np.int64)
+        cols = np.clip(cols, 0, width - 1).astype(np.int64)
+        return rows, cols, inside
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the numeric arrays of the graph, keyed by constructor argument.
+
+        Returns
+        -------
+        dict
+            The coordinate, adjacency and edge attribute arrays of the graph.
+        """
+        return {
+            "x": self.x,
+            "y": self.y,
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "length": self.length,
+            "travel_time": self.travel_time,
+            "edge_rows": self.edge_rows,
+        }
+
+    def edge_endpoints(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the source and target node index of every edge, in CSR order.
+
+        Returns
+        -------
+        tuple
+            Two int32 arrays with the source and target node indices.
+        """
+        sources = np.repeat(
+            np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr)
+        )
+        return sources, self.indices
+
+    def reversed(self) -> Tuple["csr_graph", np.ndarray]:
+        """
+        Builds the graph with every edge reversed.
+
+        Returns
+        -------
+        tuple
+            The reversed graph, and the int64 position in this graph of every
+            reversed edge, to permute other per-edge arrays (e.g. ``weights[order]``).
+        """
+        sources, targets = self.edge_endpoints()
+        order = np.argsort(targets, kind="stable")
+        counts = np.bincount(targets, minlength=self.num_nodes)
+        indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        reversed_graph = csr_graph(
+            node_ids=self.node_ids,
+            x=self.x,
+            y=self.y,
+            indptr=indptr,
+            indices=sources[order],
+            length=self.length[order],
+            travel_time=self.travel_time[order],
+            edge_rows=self.edge_rows[order],
+        )
+        reversed_graph._snap_index = self._snap_index
+        return reversed_graph, order.astype(np.int64)
@@ -0,0 +1,183 @@
+import logging
+from typing import Callable, List, Tuple
+
+import numpy as np
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+from greento.network.matrix import shortest_paths
+
+
+class landmarks:
+    """
+    Landmark distance tables giving A* lower bounds on a CSR traffic network (ALT).
+
+    The cost from a node v to a target t is at least d(L, t) - d(L, v) and
+    d(v, L) - d(t, L) for every landmark L, by the triangle inequality. The
+    landmarks are picked far apart (farthest-point selection) in the largest
+    weakly connected component, so that the bounds are tight in every direction.
+
+    Attributes
+    ----------
+    nodes : numpy.ndarray
+        The int32 node index of every landmark.
+    from_landmarks : numpy.ndarray
+        The (num_nodes, num_landmarks) float32 cost from every landmark to every node, NaN if unreachable.
+    to_landmarks : numpy.ndarray
+        The (num_nodes, num_landmarks) float32 cost from every node to every landmark, NaN if unreachable.
+    weight : str
+        The edge weight of the costs: 'length' for meters, or a transport mode for seconds.
+
+    Methods
+    -------
+    build(paths, count, weight) -> landmarks
+        Picks the landmarks and computes their distance tables.
+    potential(target: int) -> Callable[[int], float]
+        Returns the lower bound of the cost from any node to the target.
+    """
+
+    def __init__(
+        self,
+        nodes: np.ndarray,
+        from_landmarks: np.ndarray,
+        to_landmarks: np.ndarray,
+        weight: str = "length",
+    ) -> None:
+        """
+        Initializes the landmarks from their tables.
+
+        Parameters
+        ----------
+        nodes : numpy.ndarray
+            The node index of every landmark.
+        from_landmarks : numpy.ndarray
+            The (num_nodes, num_landmarks) cost from every landmark to every node.
+        to_landmarks : numpy.ndarray
+            The (num_nodes, num_landmarks) cost from every node to every landmark.
+        weight : str, optional
+            The edge weight of the costs. Defaults to 'length'.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the tables do not match the landmarks.
+        """
+        if (
+            from_landmarks.shape != to_landmarks.shape
+            or from_landmarks.ndim != 2
+            or from_landmarks.shape[1] != len(nodes)
+        ):
+            logger = logging.getLogger(__name__)
+            logger.error("Landmark tables do not match the landmarks")
+            raise ValueError("Landmark tables not valid")
+        self.nodes = np.asarray(nodes, dtype=np.int32)
+        self.from_landmarks = from_landmarks
+        self.to_landmarks = to_landmarks
+        self.weight = weight
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @classmethod
+    def build(
+        cls, paths: shortest_paths, count: int = 16, weight: str = "length"
+    ) -> "landmarks":
+        """
+        Picks the landmarks and computes their distance tables.
+
+        Every new landmark is the node of the largest weakly connected component
+        farthest, in round-trip cost, from the landmarks already picked. Picking
+        stops early when every node of the component is a landmark or at zero cost
+        from one.
+
+        Parameters
+        ----------
+        paths : shortest_paths
+            The many-to-many search over the edge weight.
+        count : int, optional
+            The maximum number of landmarks. Defaults to 16.
+        weight : str, optional
+            The name of the edge weight of the search. Defaults to 'length'.
+
+        Returns
+        -------
+        landmarks
+            The landmarks and their distance tables.
+        """
+        matrix = paths.matrix
+        reversed_matrix = matrix.T.tocsr()
+        num_nodes = matrix.shape[0]
+
+        _, components = connected_components(matrix, directed=True, connection="weak")
+        largest = np.bincount(components).argmax() if num_nodes else 0
+        in_component = components == largest
+
+        def round_trip(node: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            forward = dijkstra(matrix, indices=node)
+            backward = dijkstra(reversed_matrix, indices=node)
+            cost = np.where(np.isfinite(forward), forward, 0.0) + np.where(
+                np.isfinite(backward), backward, 0.0
+            )
+            return forward, backward, cost
+
+        nodes, forwards, backwards = [], [], []
+        if num_nodes:
+            # the first landmark is the farthest node from an arbitrary start
+            start = int(np.flatnonzero(in_component)[0])
+            closest = np.where(in_component, round_trip(start)[2], -1.0)
+            for picked in range(max(0, count)):
+                node = int(closest.argmax())
+                if picked > 0 and closest[node] <= 0:
+                    break
+                forward, backward, cost = round_trip(node)
+                nodes.append(node)
+                forwards.append(forward)
+                backwards.append(backward)
+                if picked > 0:
+                    cost = np.minimum(closest, cost)
+                closest = np.where(in_component, cost, -1.0)
+
+        def table(rows: List[np.ndarray]) -> np.ndarray:
+            if not rows:
+                return np.zeros((num_nodes, 0), dtype=np.float32)
+            values = np.stack(rows, axis=1).astype(np.float32)
+            values[~np.isfinite(values)] = np.nan
+            return values
+
+        return cls(np.array(nodes), table(forwards), table(backwards), weight)
+
+    def potential(self, target: int) -> Callable[[int], float]:
+        """
+        Returns the lower bound of the cost from any node to the target.
+
+        The bound is 0 where no landmark reaches both the node and the target.
+
+        Parameters
+        ----------
+        target : int
+            The index of the target node.
+
+        Returns
+        -------
+        Callable
+            The function from a node index to its lower bound.
+        """
+        from_landmarks = self.from_landmarks
+        to_landmarks = self.to_landmarks
+        from_target = from_landmarks[target].astype(np.float64)
+        to_target = to_landmarks[target].astype(np.float64)
+        fmax = np.fmax
+
+        def bound(node: int) -> float:
+            # fmax skips the NaN of the landmarks not connected to the node or the target
+            return float(
+                fmax.reduce(
+                    fmax(from_target - from_landmarks[node], to_landmarks[node] - to_target),
+                    initial=0.0,
+                )
+            )
+
+        return bound
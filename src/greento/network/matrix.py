@@ -0,0 +1,185 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from tqdm import tqdm
+
+from greento.network.graph import csr_graph
+
+
+class shortest_paths:
+    """
+    Many-to-many shortest paths over a CSR traffic network, with SciPy's sparse graph routines.
+
+    Parallel edges are collapsed to the cheapest one and edges with a missing
+    cost are dropped, so the sparse matrix has exactly one entry per routable
+    node pair.
+
+    Attributes
+    ----------
+    graph : csr_graph
+        The CSR graph to search.
+    weights : numpy.ndarray
+        The cost of every edge of the graph, in CSR order.
+    matrix : scipy.sparse.csr_matrix
+        The (num_nodes, num_nodes) matrix of the cheapest edge between every pair of nodes.
+
+    Methods
+    -------
+    costs(sources, targets, limit, chunk_size, lengths) -> tuple[numpy.ndarray, numpy.ndarray]
+        Calculates the cheapest cost, and optionally the length, from every source to every target.
+    """
+
+    def __init__(self, graph: csr_graph, weights: np.ndarray) -> None:
+        """
+        Builds the sparse matrix of the cheapest edges.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph to search.
+        weights : numpy.ndarray
+            The cost of every edge, in CSR order.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the number of weights does not match the number of edges.
+        """
+        if len(weights) != graph.num_edges:
+            logger = logging.getLogger(__name__)
+            logger.error("Edge weights do not match the graph edges")
+            raise ValueError("Edge weights do not match the graph edges")
+
+        self.graph = graph
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+        sources, targets = graph.edge_endpoints()
+        usable = np.flatnonzero(np.isfinite(self.weights))
+        # the cheapest of the parallel edges comes first
+        order = usable[
+            np.lexsort(
+                (self.weights[usable], targets[usable], sources[usable])
+            )
+        ]
+        keys = sources[order].astype(np.int64) * graph.num_nodes + targets[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        self._edges = order[first]
+        self._keys = keys[first]
+
+        num_nodes = graph.num_nodes
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(sources[self._edges], minlength=num_nodes), out=indptr[1:]
+        )
+        self.matrix = csr_matrix(
+            (self.weights[self._edges], targets[self._edges], indptr),
+            shape=(num_nodes, num_nodes),
+        )
+
+    def _path_lengths(self, predecessors: np.ndarray) -> np.ndarray:
+        """
+        Sums the edge lengths along the shortest path trees given by their predecessors.
+
+        The sums are built by pointer jumping: every round adds the length up to
+        the current ancestor and doubles the distance to it, so a tree of depth d
+        takes log2(d) vectorized rounds.
+
+        Parameters
+        ----------
+        predecessors : numpy.ndarray
+            The (k, num_nodes) predecessor of every node in k shortest path trees, negative at roots.
+
+        Returns
+        -------
+        numpy.ndarray
+            The (k, num_nodes) length in meters of the path to every node, 0 at roots and unreached nodes.
+        """
+        num_nodes = self.graph.num_nodes
+        if len(self._keys) == 0:
+            return np.zeros(predecessors.shape)
+        nodes = np.broadcast_to(np.arange(num_nodes), predecessors.shape)
+        has_parent = predecessors >= 0
+        parents = np.where(has_parent, predecessors, nodes)
+
+        keys = parents.astype(np.int64) * num_nodes + nodes
+        positions = np.clip(np.searchsorted(self._keys, keys), 0, len(self._keys) - 1)
+        edge_lengths = self.graph.length[self._edges[positions]].astype(np.float64)
+        lengths = np.where(has_parent, edge_lengths, 0.0)
+
+        # roots are their own ancestors with a length of 0, so jumping past them adds nothing
+        ancestors = parents
+        next_ancestors = np.take_along_axis(ancestors, ancestors, axis=1)
+        while (next_ancestors != ancestors).any():
+            lengths = lengths + np.take_along_axis(lengths, ancestors, axis=1)
+            ancestors = next_ancestors
+            next_ancestors = np.take_along_axis(ancestors, ancestors, axis=1)
+        return lengths
+
+    def costs(
+        self,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        limit: float = np.inf,
+        chunk_size: int = 256,
+        lengths: bool = False,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Calculates the cheapest cost, and optionally the length, from every source to every target.
+
+        The sources are searched in chunks, so the memory used is bounded by
+        ``chunk_size * num_nodes`` whatever the number of sources.
+
+        Parameters
+        ----------
+        sources : numpy.ndarray
+            The source node indices.
+        targets : numpy.ndarray
+            The target node indices.
+        limit : float, optional
+            The maximum cost searched, costs above it are inf. Defaults to no limit.
+        chunk_size : int, optional
+            The number of sources searched at a time. Defaults to 256.
+        lengths : bool, optional
+            Whether to also sum the edge lengths along the cheapest paths. Defaults to False.
+
+        Returns
+        -------
+        tuple
+            The (len(sources), len(targets)) matrix of cheapest costs, inf where
+            unreachable, and the matrix of path lengths in meters (or None).
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        chunk_size = max(1, int(chunk_size))
+        costs = np.full((len(sources), len(targets)), np.inf)
+        path_lengths: Optional[np.ndarray] = (
+            np.full((len(sources), len(targets)), np.inf) if lengths else None
+        )
+
+        chunks = range(0, len(sources), chunk_size)
+        for start in tqdm(chunks, desc="Computing shortest paths", leave=False):
+            chunk = sources[start : start + chunk_size]
+            unique, inverse = np.unique(chunk, return_inverse=True)
+            if lengths:
+                dist, predecessors = dijkstra(
+                    self.matrix,
+                    indices=unique,
+                    limit=limit,
+                    return_predecessors=True,
+                )
+                chunk_lengths = self._path_lengths(predecessors)[:, targets]
+                path_lengths[start : start + len(chunk)] = np.where(
+                    np.isfinite(dist[:, targets]), chunk_lengths, np.inf
+                )[inverse]
+            else:
+                dist = dijkstra(self.matrix, indices=unique, limit=limit)
+            costs[start : start + len(chunk)] = dist[:, targets][inverse]
+        return costs, path_lengths
@@ -0,0 +1,451 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from greento.network.graph import csr_graph
+from greento.network.search import reachability
+
+# Per-process state of the pool workers, set once by the pool initializer
+_WORKER: Dict[str, Any] = {}
+
+
+class shared_arrays:
+    """
+    A set of NumPy arrays published once in shared memory for worker processes.
+
+    Attributes
+    ----------
+    spec : dict
+        A picklable description of the published arrays: name -> (block name, shape, dtype).
+
+    Methods
+    -------
+    attach(spec: dict) -> tuple[dict, list]
+        Maps the published arrays into the calling process without copying them.
+    view(name: str) -> numpy.ndarray
+        Returns the published array of the given name, as seen by the workers.
+    close() -> None
+        Releases and removes the shared memory blocks.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Copies the given arrays into new shared memory blocks.
+
+        Parameters
+        ----------
+        arrays : dict
+            The arrays to publish, keyed by name.
+
+        Returns
+        -------
+        None
+        """
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self._views: Dict[str, np.ndarray] = {}
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            view[...] = array
+            self._blocks.append(block)
+            self._views[name] = view
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    @staticmethod
+    def attach(
+        spec: Dict[str, Tuple[str, Tuple[int, ...], str]]
+    ) -> Tuple[Dict[str, np.ndarray], List[shared_memory.SharedMemory]]:
+        """
+        Maps the published arrays into the calling process without copying them.
+
+        Parameters
+        ----------
+        spec : dict
+            The description of the published arrays, as exposed by `spec`.
+
+        Returns
+        -------
+        tuple
+            The arrays keyed by name, and the shared memory handles that must be
+            kept alive as long as the arrays are used.
+        """
+        arrays = {}
+        blocks = []
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            blocks.append(block)
+        return arrays, blocks
+
+    def view(self, name: str) -> np.ndarray:
+        """
+        Returns the published array of the given name, as seen by the workers.
+
+        Parameters
+        ----------
+        name : str
+            The name of the array.
+
+        Returns
+        -------
+        numpy.ndarray
+            The array backed by the shared memory block, valid until `close`.
+        """
+        return self._views[name]
+
+    def close(self) -> None:
+        """
+        Releases and removes the shared memory blocks.
+
+        Returns
+        -------
+        None
+        """
+        self._views = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "shared_arrays":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _init_worker(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]) -> None:
+    """
+    Attaches a pool worker to the shared graph arrays and prepares its search.
+
+    The search reads the shared arrays in place, so the memory of a worker
+    does not grow with the size of the graph, besides its distance buffer.
+
+    Parameters
+    ----------
+    spec : dict
+        The description of the published arrays.
+
+    Returns
+    -------
+    None
+    """
+    arrays, blocks = shared_arrays.attach(spec)
+    weights = arrays.pop("weights")
+    flags = arrays.pop("flags", None)
+    columns = arrays.pop("columns", None)
+    output = arrays.pop("output", None)
+    graph = csr_graph(**arrays)
+    _WORKER["blocks"] = blocks
+    _WORKER["search"] = reachability(graph, weights, shared=True)
+    _WORKER["flags"] = flags
+    _WORKER["output"] = output
+    if columns is not None:
+        _WORKER["columns"] = [memoryview(column) for column in columns]
+
+
+def _count_reachable(
+    search: reachability,
+    flags: np.ndarray,
+    sources: np.ndarray,
+    limit: float,
+    offsets: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Runs one bounded search per source and sums the node flags of the reached nodes.
+
+    Parameters
+    ----------
+    search : reachability
+        The search engine over the shared graph.
+    flags : numpy.ndarray
+        A (num_nodes, k) array of per-node flags to sum.
+    sources : numpy.ndarray
+        The source node indices, or an (N, s) array of the source nodes of every search.
+    limit : float
+        The search budget.
+    offsets : numpy.ndarray, optional
+        The (N, s) initial cost of the source nodes of every search. Defaults to zero.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (len(sources), k + 1) int64 array: the reached node count followed by the flag sums.
+    """
+    counts = np.zeros((len(sources), flags.shape[1] + 1), dtype=np.int64)
+    for i, source in enumerate(sources.tolist()):
+        nodes, _ = search.search(
+            source, limit, None if offsets is None else offsets[i]
+        )
+        counts[i, 0] = len(nodes)
+        counts[i, 1:] = flags[nodes].sum(axis=0)
+    return counts
+
+
+def _count_reachable_worker(
+    sources: np.ndarray, limit: float, offsets: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Pool entry point of `_count_reachable`, using the worker's shared state.
+    """
+    return _count_reachable(
+        _WORKER["search"], _WORKER["flags"], sources, limit, offsets
+    )
+
+
+def _sweep(
+    search: reachability,
+    columns: Sequence[Sequence[int]],
+    output: np.ndarray,
+    start: int,
+    stop: int,
+    limit: float,
+) -> int:
+    """
+    Runs one bounded search from every node of a range and writes its counts in place.
+
+    Parameters
+    ----------
+    search : reachability
+        The search engine over the shared graph.
+    columns : list
+        The per-node flags, one list or memoryview of length num_nodes per flag.
+    output : numpy.ndarray
+        The (num_nodes, k + 1) output array: the reached node count followed by the flag sums.
+    start : int
+        The first source node.
+    stop : int
+        The node after the last source node.
+    limit : float
+        The search budget.
+
+    Returns
+    -------
+    int
+        The number of nodes searched from.
+    """
+    totals = [0] * len(columns)
+    for node in range(start, stop):
+        output[node, 0] = search.count(node, limit, columns, totals)
+        for j, total in enumerate(totals, start=1):
+            output[node, j] = total
+    return stop - start
+
+
+def _sweep_worker(start: int, stop: int, limit: float) -> int:
+    """
+    Pool entry point of `_sweep`, writing into the shared output array.
+    """
+    return _sweep(
+        _WORKER["search"], _WORKER["columns"], _WORKER["output"], start, stop, limit
+    )
+
+
+class reachability_pool:
+    """
+    Runs many bounded searches over one graph, spread over a process pool.
+
+    The graph arrays, the edge costs and the per-node flags are published once
+    through shared memory: workers map them and search them in place, instead
+    of receiving or making a copy.
+
+    Attributes
+    ----------
+    graph : csr_graph
+        The CSR graph to search.
+    weights : numpy.ndarray
+        The cost of every edge, in CSR order.
+    flags : numpy.ndarray
+        A (num_nodes, k) array of per-node flags summed over every reachable set.
+    n_jobs : int
+        The number of worker processes, 1 to run in the calling process.
+
+    Methods
+    -------
+    count_reachable(sources: numpy.ndarray, limit: float, chunk_size: int) -> numpy.ndarray
+        Counts the reachable nodes and flag sums of every source.
+    sweep(limit: float, chunk_size: int) -> numpy.ndarray
+        Counts the reachable nodes and flag sums of every node of the graph as a source.
+    """
+
+    def __init__(
+        self,
+        graph: csr_graph,
+        weights: np.ndarray,
+        flags: np.ndarray,
+        n_jobs: Optional[int] = None,
+    ) -> None:
+        """
+        Initializes the pool with a graph, its edge costs and the per-node flags.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph to search.
+        weights : numpy.ndarray
+            The cost of every edge, in CSR order.
+        flags : numpy.ndarray
+            A (num_nodes,) or (num_nodes, k) array of per-node flags.
+        n_jobs : int, optional
+            The number of worker processes. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        None
+        """
+        self.graph = graph
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        flags = np.asarray(flags, dtype=np.uint8)
+        self.flags = flags.reshape(len(flags), -1)
+        self.n_jobs = max(1, n_jobs if n_jobs is not None else (os.cpu_count() or 1))
+
+    def _published(self, **extra: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Returns the arrays the workers need, to publish in shared memory.
+
+        Parameters
+        ----------
+        **extra : numpy.ndarray
+            The other arrays of the task (e.g. the flags or the output).
+
+        Returns
+        -------
+        dict
+            The graph arrays, the node indices as ids and the edge costs, with the extra arrays.
+        """
+        arrays = self.graph.arrays()
+        arrays["node_ids"] = np.arange(self.graph.num_nodes)
+        arrays["weights"] = self.weights
+        arrays.update(extra)
+        return arrays
+
+    def count_reachable(
+        self,
+        sources: np.ndarray,
+        limit: float,
+        chunk_size: int = 256,
+        offsets: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Counts the reachable nodes and flag sums of every source.
+
+        Parameters
+        ----------
+        sources : numpy.ndarray
+            The source node indices, or an (N, s) array of the source nodes of every
+            search (e.g. both ends of the edge an origin is snapped to).
+        limit : float
+            The search budget.
+        chunk_size : int, optional
+            The number of sources handed to a worker at a time. Defaults to 256.
+        offsets : numpy.ndarray, optional
+            The (N, s) initial cost of the source nodes of every search. Defaults to zero.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (len(sources), k + 1) int64 array: the reached node count followed by the flag sums.
+        """
+        sources = np.asarray(sources, dtype=np.int32)
+        starts = range(0, len(sources), chunk_size)
+        chunks = [sources[i : i + chunk_size] for i in starts]
+        chunk_offsets = [
+            None if offsets is None else offsets[i : i + chunk_size] for i in starts
+        ]
+        if self.n_jobs == 1 or len(chunks) <= 1:
+            search = reachability(self.graph, self.weights)
+            results = [
+                _count_reachable(search, self.flags, chunk, limit, chunk_offset)
+                for chunk, chunk_offset in tqdm(
+                    list(zip(chunks, chunk_offsets)),
+                    desc="Running bounded searches",
+                    leave=False,
+                )
+            ]
+        else:
+            with shared_arrays(self._published(flags=self.flags)) as shared:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.n_jobs, len(chunks)),
+                    initializer=_init_worker,
+                    initargs=(shared.spec,),
+                ) as executor:
+                    futures = [
+                        executor.submit(
+                            _count_reachable_worker, chunk, limit, chunk_offset
+                        )
+                        for chunk, chunk_offset in zip(chunks, chunk_offsets)
+                    ]
+                    results = [
+                        future.result()
+                        for future in tqdm(
+                            futures, desc="Running bounded searches", leave=False
+                        )
+                    ]
+
+        if not results:
+            logger = logging.getLogger(__name__)
+            logger.warning("No sources to search from")
+            return np.zeros((0, self.flags.shape[1] + 1), dtype=np.int64)
+        return np.concatenate(results)
+
+    def sweep(self, limit: float, chunk_size: Optional[int] = None) -> np.ndarray:
+        """
+        Counts the reachable nodes and flag sums of every node of the graph as a source.
+
+        The node ranges are the only task arguments: the graph, the flags and
+        the output array are published once, and every worker writes the rows of
+        its ranges in place, so nothing proportional to the results is pickled.
+        The ranges are small enough for every worker to get many of them, which
+        balances the uneven cost of the searches.
+
+        Parameters
+        ----------
+        limit : float
+            The search budget.
+        chunk_size : int, optional
+            The number of source nodes handed to a worker at a time. Defaults to
+            a sixteenth of the share of every worker.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (num_nodes, k + 1) int64 array: the reached node count followed by the flag sums.
+        """
+        num_nodes = self.graph.num_nodes
+        if chunk_size is None:
+            chunk_size = max(1, -(-num_nodes // (self.n_jobs * 16)))
+        ranges = [
+            (start, min(start + chunk_size, num_nodes))
+            for start in range(0, num_nodes, chunk_size)
+        ]
+        output = np.zeros((num_nodes, self.flags.shape[1] + 1), dtype=np.int64)
+        if self.n_jobs == 1 or len(ranges) <= 1:
+            search = reachability(self.graph, self.weights)
+            columns = [column.tolist() for column in self.flags.T]
+            for start, stop in tqdm(ranges, desc="Sweeping all nodes", leave=False):
+                _sweep(search, columns, output, start, stop, limit)
+            return output
+
+        # one contiguous row per flag, read in place by the workers
+        arrays = self._published(columns=self.flags.T, output=output)
+        with shared_arrays(arrays) as shared:
+            with ProcessPoolExecutor(
+                max_workers=min(self.n_jobs, len(ranges)),
+                initializer=_init_worker,
+                initargs=(shared.spec,),
+            ) as executor:
+                futures = [
+                    executor.submit(_sweep_worker, start, stop, limit)
+                    for start, stop in ranges
+                ]
+                for future in tqdm(futures, desc="Sweeping all nodes", leave=False):
+                    future.result()
+            output[...] = shared.view("output")
+        return output
@@ -0,0 +1,639 @@
+import logging
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import osmnx as ox
+import pandas as pd
+from scipy.spatial import cKDTree
+from shapely.geometry import LineString
+
+from greento.network.core import network_core
+from greento.network.edges import edge_snap_index
+from greento.network.graph import csr_graph
+from greento.network.landmarks import landmarks
+from greento.network.matrix import shortest_paths
+from greento.network.search import reachability
+from greento.network.snap import snap_index
+from greento.network.speeds import speed_profiles
+from greento.network.trees import path_tree, path_tree_cache
+
+
+class prepared_network:
+    """
+    A traffic network prepared once and shared by every distance and metrics query.
+
+    It can be unpacked like the (nodes, edges) tuple it was built from.
+
+    When it is built from a CSR graph alone (e.g. loaded from a `network_store`),
+    the nodes and edges GeoDataFrames are rebuilt only on first access.
+
+    Attributes
+    ----------
+    nodes : geopandas.GeoDataFrame
+        The nodes of the traffic network.
+    edges : geopandas.GeoDataFrame
+        The edges of the traffic network.
+    graph : csr_graph
+        The CSR adjacency, with contiguous coordinate arrays.
+    snap_index : snap_index
+        The index snapping points to the nodes, in meters, built on first use.
+    tree : scipy.spatial.cKDTree
+        The KD-tree of the node coordinates projected to meters, built on first use.
+    edge_snap_index : edge_snap_index
+        The index snapping points onto the edges, built on first use.
+    travel_times : dict
+        The float32 travel time in seconds of every edge, in CSR order, keyed by transport mode.
+    speed_profiles : speed_profiles
+        The per-edge speeds of the transport modes the travel times are derived from.
+    crs : str
+        The coordinate reference system of the node coordinates.
+    landmark_tables : dict
+        The landmark distance tables built for point-to-point routing, keyed by edge weight.
+    path_trees : path_tree_cache
+        The cache of the shortest path trees of the most recently queried source nodes.
+    shared : bool
+        Whether the arrays are shared with other processes (e.g. memory-mapped), searched in place instead of copied.
+    contraction : network_core or None
+        The mapping to the full network, if this is the core of another network.
+    parent : prepared_network or None
+        The full network, if this is the core of another network.
+
+    Methods
+    -------
+    from_traffic_area(vector_traffic_area) -> prepared_network
+        Returns the given prepared network, or prepares the given (nodes, edges) tuple.
+    from_graph(graph, crs, edge_coords, edge_coord_ptr, travel_times, landmark_tables, shared) -> prepared_network
+        Wraps an existing CSR graph, deferring the GeoDataFrames to first access.
+    edge_geometry() -> tuple[numpy.ndarray, numpy.ndarray]
+        Returns the flattened coordinates of every edge geometry, in CSR order.
+    edge_seeds(lats: numpy.ndarray, lons: numpy.ndarray, weight: str) -> tuple[numpy.ndarray, numpy.ndarray]
+        Snaps points onto their nearest edges and returns the search seeds of every point.
+    point_seeds(lat: float, lon: float, weight: str) -> tuple[numpy.ndarray, numpy.ndarray]
+        Returns the search seeds of a single point: the distinct ends of its edge it can reach.
+    search(weight: str) -> reachability
+        Returns the bounded search over the given edge weight, built once per weight.
+    shortest_paths(weight: str) -> shortest_paths
+        Returns the many-to-many search over the given edge weight, built once per weight.
+    landmarks(weight: str, count: int) -> landmarks
+        Returns the landmark distance tables over the given edge weight, built once per weight.
+    path_tree(source: int, weight: str, limit: float) -> path_tree
+        Returns the shortest path tree of a source node, from the cache if it was queried recently.
+    nx_graph() -> networkx.MultiDiGraph
+        Returns the networkx graph of the network with edge speeds and travel times, built once.
+    core(weight: str, contract: bool) -> prepared_network
+        Returns the largest strongly connected component, with its degree-2 chains contracted, built once per weight.
+    """
+
+    SPEEDS_KMH = speed_profiles.SPEEDS_KMH
+
+    def __init__(self, nodes: gpd.GeoDataFrame, edges: gpd.GeoDataFrame) -> None:
+        """
+        Prepares the traffic network from its nodes and edges.
+
+        Parameters
+        ----------
+        nodes : geopandas.GeoDataFrame
+            The nodes of the traffic network.
+        edges : geopandas.GeoDataFrame
+            The edges of the traffic network.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the network has no nodes or some nodes have no coordinates.
+        """
+        graph = csr_graph.from_gdfs(nodes, edges)
+        self._setup(
+            graph,
+            nodes.crs or "EPSG:4326",
+            profiles=speed_profiles.from_edges(edges, graph.edge_rows),
+        )
+        self._nodes: Optional[gpd.GeoDataFrame] = nodes
+        self._edges: Optional[gpd.GeoDataFrame] = edges
+
+    def _setup(
+        self,
+        graph: csr_graph,
+        crs: Any,
+        travel_times: Optional[Dict[str, np.ndarray]] = None,
+        profiles: Optional[speed_profiles] = None,
+    ) -> None:
+        """
+        Validates the CSR graph and derives the per-mode travel times.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph of the traffic network.
+        crs : Any
+            The coordinate reference system of the node coordinates.
+        travel_times : dict, optional
+            Precomputed per-mode travel times, derived from the graph if missing.
+        profiles : speed_profiles, optional
+            The per-edge speeds of the transport modes. Defaults to the constant mode speeds.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If some nodes have no coordinates.
+        """
+        if not (np.isfinite(graph.x).all() and np.isfinite(graph.y).all()):
+            logger = logging.getLogger(__name__)
+            logger.error("Some nodes do not have 'x' and 'y' coordinates")
+            raise ValueError("Some nodes do not have 'x' and 'y' coordinates")
+        self.graph = graph
+        self.crs = crs
+        self.speed_profiles = profiles or speed_profiles()
+        travel_times = dict(travel_times or {})
+        if any(mode not in travel_times for mode in self.SPEEDS_KMH):
+            # the arrays live alongside the network, the edges are never written
+            derived = self.speed_profiles.travel_times(graph.length, graph.travel_time)
+            for mode in self.SPEEDS_KMH:
+                travel_times.setdefault(mode, derived[mode])
+        self.travel_times: Dict[str, np.ndarray] = {
+            mode: travel_times[mode] for mode in self.SPEEDS_KMH
+        }
+        self._edge_coords: Optional[np.ndarray] = None
+        self._edge_coord_ptr: Optional[np.ndarray] = None
+        self._searches: Dict[str, reachability] = {}
+        self._shortest_paths: Dict[str, shortest_paths] = {}
+        self.landmark_tables: Dict[str, landmarks] = {}
+        self.path_trees = path_tree_cache()
+        self._nx_graph: Optional[nx.MultiDiGraph] = None
+        self._edge_snap_index: Optional[edge_snap_index] = None
+        self._cores: Dict[Tuple[str, bool], prepared_network] = {}
+        self.shared = False
+        self.contraction: Optional[network_core] = None
+        self.parent: Optional[prepared_network] = None
+
+    @classmethod
+    def from_traffic_area(
+        cls,
+        vector_traffic_area: Union[
+            "prepared_network", Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]
+        ],
+    ) -> "prepared_network":
+        """
+        Returns the given prepared network, or prepares the given (nodes, edges) tuple.
+
+        Parameters
+        ----------
+        vector_traffic_area : prepared_network or tuple
+            A prepared network, or a tuple of nodes and edges GeoDataFrames.
+
+        Returns
+        -------
+        prepared_network
+            The prepared traffic network.
+        """
+        if isinstance(vector_traffic_area, cls):
+            return vector_traffic_area
+        nodes, edges = vector_traffic_area
+        return cls(nodes, edges)
+
+    @classmethod
+    def from_graph(
+        cls,
+        graph: csr_graph,
+        crs: Any = "EPSG:4326",
+        edge_coords: Optional[np.ndarray] = None,
+        edge_coord_ptr: Optional[np.ndarray] = None,
+        travel_times: Optional[Dict[str, np.ndarray]] = None,
+        landmark_tables: Optional[Dict[str, landmarks]] = None,
+        shared: bool = False,
+    ) -> "prepared_network":
+        """
+        Wraps an existing CSR graph, deferring the GeoDataFrames to first access.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph of the traffic network. Its edge rows must follow the CSR order.
+        crs : Any, optional
+            The coordinate reference system of the node coordinates. Defaults to 'EPSG:4326'.
+        edge_coords : numpy.ndarray, optional
+            The (m, 2) flattened coordinates of the edge geometries, in CSR order.
+        edge_coord_ptr : numpy.ndarray, optional
+            The offsets of every edge geometry in `edge_coords`. Straight segments
+            between the endpoints are used when the geometries are missing.
+        travel_times : dict, optional
+            Precomputed per-mode travel times, derived from the graph if missing.
+        landmark_tables : dict, optional
+            Precomputed landmark distance tables, keyed by edge weight.
+        shared : bool, optional
+            Whether the arrays are shared with other processes, so that the searches
+            read them in place instead of copying them. Defaults to False.
+
+        Returns
+        -------
+        prepared_network
+            The prepared traffic network.
+        """
+        network = cls.__new__(cls)
+        network._setup(graph, crs, travel_times)
+        network._nodes = None
+        network._edges = None
+        network._edge_coords = edge_coords
+        network._edge_coord_ptr = edge_coord_ptr
+        network.landmark_tables.update(landmark_tables or {})
+        network.shared = shared
+        return network
+
+    @property
+    def snap_index(self) -> snap_index:
+        """
+        The index snapping points to the nodes, in meters, built on first use.
+        """
+        return self.graph.snap_index
+
+    @property
+    def tree(self) -> cKDTree:
+        """
+        The KD-tree of the node coordinates projected to meters, built on first use.
+        """
+        return self.graph.tree
+
+    @property
+    def edge_snap_index(self) -> edge_snap_index:
+        """
+        The index snapping points onto the edges, built on first use.
+        """
+        if self._edge_snap_index is None:
+            self._edge_snap_index = edge_snap_index(self.graph, *self.edge_geometry())
+        return self._edge_snap_index
+
+    @property
+    def nodes(self) -> gpd.GeoDataFrame:
+        """
+        The nodes of the traffic network, rebuilt from the graph on first access if needed.
+        """
+        if self._nodes is None:
+            graph = self.graph
+            self._nodes = gpd.GeoDataFrame(
+                {"x": np.asarray(graph.x), "y": np.asarray(graph.y)},
+                geometry=gpd.points_from_xy(graph.x, graph.y),
+                index=pd.Index(np.asarray(graph.node_ids), name="osmid"),
+                crs=self.crs,
+            )
+        return self._nodes
+
+    @property
+    def edges(self) -> gpd.GeoDataFrame:
+        """
+        The edges of the traffic network, rebuilt from the graph on first access if needed.
+        """
+        if self._edges is None:
+            graph = self.graph
+            sources, targets = graph.edge_endpoints()
+            coords, ptr = self.edge_geometry()
+            geometry = [
+                LineString(coords[start:stop])
+                for start, stop in zip(ptr[:-1].tolist(), ptr[1:].tolist())
+            ]
+            u = np.asarray(graph.node_ids)[sources]
+            v = np.asarray(graph.node_ids)[targets]
+            key = pd.DataFrame({"u": u, "v": v}).groupby(["u", "v"]).cumcount()
+            columns = {"length": np.asarray(graph.length, dtype=np.float64)}
+            if not np.isnan(graph.travel_time).all():
+                columns["travel_time"] = np.asarray(graph.travel_time, dtype=np.float64)
+            self._edges = gpd.GeoDataFrame(
+                columns,
+                geometry=geometry,
+                index=pd.MultiIndex.from_arrays(
+                    [u, v, key.to_numpy()], names=["u", "v", "key"]
+                ),
+                crs=self.crs,
+            )
+        return self._edges
+
+    def edge_geometry(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the flattened coordinates of every edge geometry, in CSR order.
+
+        Edges without a geometry are represented by the straight segment between their endpoints.
+
+        Returns
+        -------
+        tuple
+            Two arrays:
+            - coords (numpy.ndarray): The (m, 2) float64 (x, y) coordinates of all the geometries.
+            - ptr (numpy.ndarray): The int64 offsets, the coordinates of edge i being coords[ptr[i]:ptr[i + 1]].
+        """
+        if self._edge_coords is not None and self._edge_coord_ptr is not None:
+            return self._edge_coords, self._edge_coord_ptr
+        if self.contraction is not None and self.parent is not None:
+            # the chains are joined from the full geometries only when first needed
+            self._edge_coords, self._edge_coord_ptr = self.contraction.expand_geometry(
+                *self.parent.edge_geometry()
+            )
+            return self._edge_coords, self._edge_coord_ptr
+
+        graph = self.graph
+        sources, targets = graph.edge_endpoints()
+        if self._edges is None:
+            geometries = [None] * graph.num_edges
+        else:
+            geometries = self._edges.geometry.to_numpy()[graph.edge_rows].tolist()
+        x, y = graph.x, graph.y
+        parts = []
+        for geometry, source, target in zip(
+            geometries, sources.tolist(), targets.tolist()
+        ):
+            if geometry is None or geometry.is_empty:
+                parts.append(np.array([[x[source], y[source]], [x[target], y[target]]]))
+            else:
+                parts.append(np.asarray(geometry.coords, dtype=np.float64)[:, :2])
+        ptr = np.zeros(graph.num_edges + 1, dtype=np.int64)
+        np.cumsum([len(part) for part in parts], out=ptr[1:])
+        coords = np.concatenate(parts) if parts else np.zeros((0, 2))
+        self._edge_coords, self._edge_coord_ptr = coords, ptr
+        return coords, ptr
+
+    def edge_seeds(
+        self, lats: np.ndarray, lons: np.ndarray, weight: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Snaps points onto their nearest edges and returns the search seeds of every point.
+
+        A point at least as close to a node as to any edge geometry, such as a point
+        on an intersection, starts from that node alone.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the points.
+        lons : numpy.ndarray
+            The longitudes of the points.
+        weight : str
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+
+        Returns
+        -------
+        tuple
+            The (N, 2) end nodes of the edge of every point and the partial cost to each
+            of them, inf where an end cannot be reached from the point.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        weights = self._weights(weight)
+        index = self.edge_snap_index
+        edges, fractions, edge_distances = index.snap(lats, lons)
+        nodes, offsets = index.seeds(edges, fractions, weights)
+        nearest, node_distances = self.graph.snap(lats, lons)
+        at_node = node_distances <= edge_distances
+        nodes[at_node] = nearest[at_node, None]
+        offsets[at_node] = 0.0
+        return nodes, offsets
+
+    def point_seeds(
+        self, lat: float, lon: float, weight: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the search seeds of a single point: the distinct ends of its edge it can reach.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude of the point.
+        lon : float
+            The longitude of the point.
+        weight : str
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+
+        Returns
+        -------
+        tuple
+            The indices of the one or two seed nodes and the partial cost to each of them.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        nodes, offsets = self.edge_seeds(np.array([lat]), np.array([lon]), weight)
+        nodes, offsets = nodes[0], offsets[0]
+        if nodes[0] == nodes[1]:
+            # a point starting from a node alone has it at both ends
+            nodes, offsets = nodes[:1], offsets.min(keepdims=True)
+        reachable = np.isfinite(offsets)
+        return nodes[reachable], offsets[reachable]
+
+    def _weights(self, weight: str) -> np.ndarray:
+        """
+        Returns the cost of every edge for the given weight, in CSR order.
+
+        Parameters
+        ----------
+        weight : str
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+
+        Returns
+        -------
+        numpy.ndarray
+            The edge costs.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        if weight == "length":
+            return self.graph.length
+        if weight in self.travel_times:
+            return self.travel_times[weight]
+        logger = logging.getLogger(__name__)
+        logger.error(f"Weight not valid: {weight}")
+        raise ValueError("Weight not valid")
+
+    def search(self, weight: str) -> reachability:
+        """
+        Returns the bounded search over the given edge weight, built once per weight.
+
+        Parameters
+        ----------
+        weight : str
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+
+        Returns
+        -------
+        reachability
+            The reusable search engine.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        if weight not in self._searches:
+            self._searches[weight] = reachability(
+                self.graph, self._weights(weight), shared=self.shared
+            )
+        return self._searches[weight]
+
+    def shortest_paths(self, weight: str) -> shortest_paths:
+        """
+        Returns the many-to-many search over the given edge weight, built once per weight.
+
+        Parameters
+        ----------
+        weight : str
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+
+        Returns
+        -------
+        shortest_paths
+            The reusable many-to-many search engine.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        if weight not in self._shortest_paths:
+            self._shortest_paths[weight] = shortest_paths(
+                self.graph, self._weights(weight)
+            )
+        return self._shortest_paths[weight]
+
+    def landmarks(self, weight: str = "length", count: int = 16) -> landmarks:
+        """
+        Returns the landmark distance tables over the given edge weight, built once per weight.
+
+        Parameters
+        ----------
+        weight : str, optional
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+            Defaults to 'length'.
+        count : int, optional
+            The maximum number of landmarks of new tables. Defaults to 16.
+
+        Returns
+        -------
+        landmarks
+            The landmark distance tables.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        if weight not in self.landmark_tables:
+            self.landmark_tables[weight] = landmarks.build(
+                self.shortest_paths(weight), count=count, weight=weight
+            )
+        return self.landmark_tables[weight]
+
+    def path_tree(
+        self, source: int, weight: str = "length", limit: float = float("inf")
+    ) -> path_tree:
+        """
+        Returns the shortest path tree of a source node, from the cache if it was queried recently.
+
+        Parameters
+        ----------
+        source : int
+            The index of the source node.
+        weight : str, optional
+            'length' for distances in meters, or a transport mode for travel times in seconds.
+            Defaults to 'length'.
+        limit : float, optional
+            The maximum cost of a node of the tree. Defaults to no limit.
+
+        Returns
+        -------
+        path_tree
+            The shortest path tree of the source.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        key = (int(source), weight, float(limit))
+        tree = self.path_trees.get(key)
+        if tree is None:
+            tree = self.search(weight).shortest_path_tree(int(source), limit)
+            self.path_trees.put(key, tree)
+        return tree
+
+    def nx_graph(self) -> nx.MultiDiGraph:
+        """
+        Returns the networkx graph of the network with edge speeds and travel times, built once.
+
+        Returns
+        -------
+        networkx.MultiDiGraph
+            The routable traffic network graph.
+        """
+        if self._nx_graph is None:
+            G = ox.graph_from_gdfs(self.nodes, self.edges)
+            try:
+                G = ox.routing.add_edge_speeds(G)
+                G = ox.routing.add_edge_travel_times(G)
+            except (KeyError, ValueError) as e:
+                logger = logging.getLogger(__name__)
+                logger.warning(f"Edge speeds could not be imputed: {e}")
+            self._nx_graph = G
+        return self._nx_graph
+
+    def core(self, weight: str = "length", contract: bool = True) -> "prepared_network":
+        """
+        Returns the largest strongly connected component, with its degree-2 chains contracted, built once per weight.
+
+        The core answers the same searches as the full network over fewer nodes
+        and edges. Its edges carry the summed lengths and travel times of the
+        chains they replace, and their full geometries, joined on first use.
+        Paths found on the core are expanded back with its `contraction`.
+
+        Parameters
+        ----------
+        weight : str, optional
+            'length' for every edge, or a transport mode for the edges it can travel.
+            Defaults to 'length'.
+        contract : bool, optional
+            Whether to contract the chains of degree-2 nodes. Defaults to True.
+
+        Returns
+        -------
+        prepared_network
+            The prepared core of the network.
+
+        Raises
+        ------
+        ValueError
+            If the weight is not valid.
+        """
+        key = (weight, contract)
+        if key not in self._cores:
+            contraction = network_core.build(self.graph, self._weights(weight), contract)
+            core = prepared_network.from_graph(
+                contraction.graph,
+                self.crs,
+                travel_times={
+                    mode: contraction.chain_weights(times)
+                    for mode, times in self.travel_times.items()
+                },
+            )
+            core.contraction = contraction
+            core.parent = self
+            self._cores[key] = core
+        return self._cores[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter((self.nodes, self.edges))
+
+    def __len__(self) -> int:
+        return 2
@@ -0,0 +1,704 @@
+import bisect
+import heapq
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from greento.network.graph import csr_graph
+from greento.network.trees import path_tree
+
+
+class reachability:
+    """
+    A time-bounded shortest path search over a CSR traffic network.
+
+    The search is a binary-heap Dijkstra: a node is settled, and reported as
+    reachable, only once its shortest arrival time is known. The distance
+    buffer is allocated once per instance and reset after every search, so
+    repeated searches on the same graph allocate nothing proportional to the
+    network size.
+
+    The graph arrays are copied into Python lists, which the heap loop indexes
+    fastest. A shared search instead reads the arrays in place through
+    memoryviews, slightly slower but without a private copy of the graph, for
+    arrays mapped by several processes (shared memory or a memory-mapped store).
+
+    Attributes
+    ----------
+    graph : csr_graph
+        The CSR graph to search.
+    weights : numpy.ndarray
+        The float32 cost of every edge, in CSR order.
+    shared : bool
+        Whether the graph arrays are read in place instead of copied.
+
+    Methods
+    -------
+    search(source: int, limit: float, offsets: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]
+        Finds all nodes reachable from the source within the given cost.
+    count(source: int, limit: float, columns: list, totals: list) -> int
+        Counts the nodes reachable from the source and sums their per-node values, allocating no arrays.
+    shortest_path_tree(source: int, limit: float) -> path_tree
+        Builds the shortest path tree of all nodes reachable from the source within the given cost.
+    nearest_sources(sources: numpy.ndarray, offsets: numpy.ndarray, limit: float) -> tuple[numpy.ndarray, numpy.ndarray]
+        Finds, for every node, the cheapest of many sources and its cost.
+    repair(costs: numpy.ndarray, labels: numpy.ndarray, sources: numpy.ndarray, offsets: numpy.ndarray, source_labels: numpy.ndarray, invalid: numpy.ndarray, limit: float) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Updates the result of `nearest_sources` after sources are added or removed, touching only the changed nodes.
+    nearest_target(source: int or numpy.ndarray, targets: numpy.ndarray, offsets: numpy.ndarray, bounds: numpy.ndarray, limit: float, source_offsets: numpy.ndarray) -> tuple[int, float]
+        Finds the cheapest of many targets, stopping as soon as no other target can be cheaper.
+    path(source: int or numpy.ndarray, target: int, potential: Callable[[int], float], limit: float, offsets: numpy.ndarray) -> tuple[numpy.ndarray, float, int]
+        Finds the cheapest path between two nodes, with A* when a lower bound to the target is given.
+    """
+
+    def __init__(
+        self, graph: csr_graph, weights: np.ndarray, shared: bool = False
+    ) -> None:
+        """
+        Initializes the search with a CSR graph and the per-edge costs.
+
+        Parameters
+        ----------
+        graph : csr_graph
+            The CSR graph to search.
+        weights : numpy.ndarray
+            The cost of every edge, in CSR order.
+        shared : bool, optional
+            Whether to read the graph arrays in place instead of copying them. Defaults to False.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the number of weights does not match the number of edges.
+        """
+        if len(weights) != graph.num_edges:
+            logger = logging.getLogger(__name__)
+            logger.error("Edge weights do not match the graph edges")
+            raise ValueError("Edge weights do not match the graph edges")
+
+        self.graph = graph
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.shared = shared
+        if shared:
+            # memoryviews index scalars almost as fast as lists, without copying
+            self._indptr = memoryview(graph.indptr)
+            self._indices = memoryview(graph.indices)
+            self._weights = memoryview(self.weights)
+        else:
+            # Python lists are indexed much faster than NumPy arrays in the heap loop
+            self._indptr = graph.indptr.tolist()
+            self._indices = graph.indices.tolist()
+            self._weights = self.weights.tolist()
+        self._dist = [float("inf")] * graph.num_nodes
+        self._heap: List[Tuple[float, int]] = []
+        self._touched: List[int] = []
+
+    @staticmethod
+    def _seeds(
+        source: Union[int, np.ndarray],
+        offsets: Optional[np.ndarray],
+        limit: float,
+    ) -> Dict[int, float]:
+        """
+        Returns the initial cost of every source node, the cheapest of its offsets within the limit.
+
+        Parameters
+        ----------
+        source : int or numpy.ndarray
+            The index of the source node, or the indices of several source nodes.
+        offsets : numpy.ndarray, optional
+            The initial cost of every source node, ignored for a single node. Defaults to zero.
+        limit : float
+            The maximum cost of a reached node.
+
+        Returns
+        -------
+        dict
+            The initial cost keyed by source node, without the unreachable ones.
+        """
+        if np.ndim(source) == 0:
+            return {int(source): 0.0}
+        sources = np.asarray(source, dtype=np.int64).tolist()
+        if offsets is None:
+            offsets = np.zeros(len(sources))
+        seeds: Dict[int, float] = {}
+        for node, offset in zip(
+            sources, np.asarray(offsets, dtype=np.float64).tolist()
+        ):
+            if offset <= limit and offset < seeds.get(node, float("inf")):
+                seeds[node] = offset
+        return seeds
+
+    def search(
+        self,
+        source: Union[int, np.ndarray],
+        limit: float,
+        offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds all nodes reachable from the source within the given cost.
+
+        The search can also start from several nodes at once, each at its own
+        initial cost (e.g. both ends of the edge a point is snapped to).
+
+        Parameters
+        ----------
+        source : int or numpy.ndarray
+            The index of the source node, or the indices of several source nodes.
+        limit : float
+            The maximum cost (e.g. travel time in seconds) of a reachable node.
+        offsets : numpy.ndarray, optional
+            The initial cost of every source node. Defaults to zero.
+
+        Returns
+        -------
+        tuple
+            Two arrays in settling order:
+            - nodes (numpy.ndarray): The int32 indices of the reachable nodes.
+            - costs (numpy.ndarray): The float64 shortest cost to every reachable node.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        dist = self._dist
+        inf = float("inf")
+
+        settled_nodes = []
+        settled_costs = []
+        seeds = self._seeds(source, offsets, limit)
+        heap = [(offset, node) for node, offset in seeds.items()]
+        heapq.heapify(heap)
+        touched = list(seeds)
+        try:
+            for cost, node in heap:
+                dist[node] = cost
+            while heap:
+                cost, node = heapq.heappop(heap)
+                if cost > dist[node]:
+                    continue
+                settled_nodes.append(node)
+                settled_costs.append(cost)
+                for k in range(indptr[node], indptr[node + 1]):
+                    new_cost = cost + weights[k]
+                    if new_cost > limit:
+                        continue
+                    neighbor = indices[k]
+                    if new_cost < dist[neighbor]:
+                        if dist[neighbor] == inf:
+                            touched.append(neighbor)
+                        dist[neighbor] = new_cost
+                        heapq.heappush(heap, (new_cost, neighbor))
+        finally:
+            for node in touched:
+                dist[node] = inf
+
+        return (
+            np.array(settled_nodes, dtype=np.int32),
+            np.array(settled_costs, dtype=np.float64),
+        )
+
+    def count(
+        self,
+        source: int,
+        limit: float,
+        columns: Optional[Sequence[Sequence[int]]] = None,
+        totals: Optional[List[int]] = None,
+    ) -> int:
+        """
+        Counts the nodes reachable from the source and sums their per-node values, allocating no arrays.
+
+        The settled nodes are not collected: their values are added to the totals
+        as they are settled. The heap and the list of touched nodes are scratch
+        buffers of the instance, cleared and reused by every count, so a sweep of
+        many sources allocates nothing proportional to the reached sets.
+
+        Parameters
+        ----------
+        source : int
+            The index of the source node.
+        limit : float
+            The maximum cost (e.g. travel time in seconds) of a reachable node.
+        columns : list, optional
+            The per-node values to sum, one list or memoryview of length num_nodes per column.
+        totals : list of int, optional
+            The sum of every column over the reached nodes, overwritten in place.
+
+        Returns
+        -------
+        int
+            The number of reachable nodes.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        dist = self._dist
+        inf = float("inf")
+        columns = columns or []
+        if totals is not None:
+            totals[:] = [0] * len(columns)
+
+        heap = self._heap
+        touched = self._touched
+        heap.clear()
+        touched.clear()
+        heap.append((0.0, source))
+        touched.append(source)
+        dist[source] = 0.0
+        reached = 0
+        try:
+            while heap:
+                cost, node = heapq.heappop(heap)
+                if cost > dist[node]:
+                    continue
+                reached += 1
+                if totals is not None:
+                    for j, column in enumerate(columns):
+                        totals[j] += column[node]
+                for k in range(indptr[node], indptr[node + 1]):
+                    new_cost = cost + weights[k]
+                    if new_cost > limit:
+                        continue
+                    neighbor = indices[k]
+                    if new_cost < dist[neighbor]:
+                        if dist[neighbor] == inf:
+                            touched.append(neighbor)
+                        dist[neighbor] = new_cost
+                        heapq.heappush(heap, (new_cost, neighbor))
+        finally:
+            for node in touched:
+                dist[node] = inf
+        return reached
+
+    def shortest_path_tree(
+        self, source: int, limit: float = float("inf")
+    ) -> path_tree:
+        """
+        Builds the shortest path tree of all nodes reachable from the source within the given cost.
+
+        Parameters
+        ----------
+        source : int
+            The index of the source node.
+        limit : float, optional
+            The maximum cost of a node of the tree. Defaults to no limit.
+
+        Returns
+        -------
+        path_tree
+            The tree, with the cost and the reaching edge of every node.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        dist = self._dist
+        inf = float("inf")
+
+        settled_nodes = []
+        settled_costs = []
+        settled_edges = []
+        parent_edge = {source: -1}
+        touched = [source]
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        try:
+            while heap:
+                cost, node = heapq.heappop(heap)
+                if cost > dist[node]:
+                    continue
+                settled_nodes.append(node)
+                settled_costs.append(cost)
+                settled_edges.append(parent_edge[node])
+                for k in range(indptr[node], indptr[node + 1]):
+                    new_cost = cost + weights[k]
+                    if new_cost > limit:
+                        continue
+                    neighbor = indices[k]
+                    if new_cost < dist[neighbor]:
+                        if dist[neighbor] == inf:
+                            touched.append(neighbor)
+                        dist[neighbor] = new_cost
+                        parent_edge[neighbor] = k
+                        heapq.heappush(heap, (new_cost, neighbor))
+        finally:
+            for node in touched:
+                dist[node] = inf
+
+        return path_tree(source, limit, settled_nodes, settled_costs, settled_edges)
+
+    def nearest_sources(
+        self,
+        sources: np.ndarray,
+        offsets: Optional[np.ndarray] = None,
+        limit: float = float("inf"),
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds, for every node, the cheapest of many sources and its cost.
+
+        A single Dijkstra is seeded with every source at its offset, so each node
+        is settled once with the source it is cheapest to reach from.
+
+        Parameters
+        ----------
+        sources : numpy.ndarray
+            The indices of the source nodes.
+        offsets : numpy.ndarray, optional
+            The initial cost of every source (e.g. the distance from a point to the
+            node it is snapped to). Defaults to zero.
+        limit : float, optional
+            The maximum cost of a reached node. Defaults to no limit.
+
+        Returns
+        -------
+        tuple
+            Two arrays with one entry per graph node:
+            - costs (numpy.ndarray): The float64 cost from the cheapest source, inf if unreached.
+            - labels (numpy.ndarray): The int32 position in `sources` of the cheapest source, -1 if unreached.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        num_nodes = self.graph.num_nodes
+        inf = float("inf")
+
+        sources = np.asarray(sources, dtype=np.int64)
+        if offsets is None:
+            offsets = np.zeros(len(sources))
+        dist = [inf] * num_nodes
+        label = [-1] * num_nodes
+        heap = []
+        for position, (source, offset) in enumerate(
+            zip(sources.tolist(), np.asarray(offsets, dtype=np.float64).tolist())
+        ):
+            if offset <= limit and offset < dist[source]:
+                dist[source] = offset
+                label[source] = position
+                heap.append((offset, source))
+        heapq.heapify(heap)
+
+        settled = [False] * num_nodes
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if settled[node] or cost > dist[node]:
+                continue
+            settled[node] = True
+            node_label = label[node]
+            for k in range(indptr[node], indptr[node + 1]):
+                new_cost = cost + weights[k]
+                if new_cost > limit:
+                    continue
+                neighbor = indices[k]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    label[neighbor] = node_label
+                    heapq.heappush(heap, (new_cost, neighbor))
+
+        return np.array(dist, dtype=np.float64), np.array(label, dtype=np.int32)
+
+    def repair(
+        self,
+        costs: np.ndarray,
+        labels: np.ndarray,
+        sources: np.ndarray,
+        offsets: np.ndarray,
+        source_labels: np.ndarray,
+        invalid: Optional[np.ndarray] = None,
+        limit: float = float("inf"),
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Updates the result of `nearest_sources` after sources are added or removed, touching only the changed nodes.
+
+        The invalid nodes (those whose cheapest source was removed) start unreached,
+        and the new sources, with the cheapest valid neighbours of the invalid nodes,
+        seed a Dijkstra that only follows edges improving on the current costs. The
+        given arrays are left untouched: the changes are kept in dictionaries, so the
+        work grows with the number of changed nodes, not with the network.
+
+        Parameters
+        ----------
+        costs : numpy.ndarray
+            The cost of every node from its cheapest source, as given by `nearest_sources`.
+        labels : numpy.ndarray
+            The label of the cheapest source of every node.
+        sources : numpy.ndarray
+            The indices of the seed nodes.
+        offsets : numpy.ndarray
+            The initial cost of every seed.
+        source_labels : numpy.ndarray
+            The label given to the nodes reached from every seed.
+        invalid : numpy.ndarray, optional
+            The nodes whose cost is no longer valid. Defaults to none.
+        limit : float, optional
+            The maximum cost of a reached node. Defaults to no limit.
+
+        Returns
+        -------
+        tuple
+            Three arrays with one entry per changed node:
+            - nodes (numpy.ndarray): The int64 index of the node.
+            - costs (numpy.ndarray): The float64 new cost, inf if no longer reached.
+            - labels (numpy.ndarray): The int32 new label, -1 if no longer reached.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        inf = float("inf")
+
+        dist = {}
+        label = {}
+        if invalid is not None:
+            for node in np.asarray(invalid, dtype=np.int64).tolist():
+                dist[node] = inf
+                label[node] = -1
+
+        def current(node: int) -> float:
+            value = dist.get(node)
+            return float(costs[node]) if value is None else value
+
+        heap = []
+        for source, offset, source_label in zip(
+            np.asarray(sources, dtype=np.int64).tolist(),
+            np.asarray(offsets, dtype=np.float64).tolist(),
+            np.asarray(source_labels, dtype=np.int64).tolist(),
+        ):
+            if offset <= limit and offset < current(source):
+                dist[source] = offset
+                label[source] = source_label
+                heap.append((offset, source))
+        heapq.heapify(heap)
+
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > dist[node]:
+                continue
+            node_label = label[node]
+            for k in range(indptr[node], indptr[node + 1]):
+                new_cost = cost + weights[k]
+                if new_cost > limit:
+                    continue
+                neighbor = indices[k]
+                if new_cost < current(neighbor):
+                    dist[neighbor] = new_cost
+                    label[neighbor] = node_label
+                    heapq.heappush(heap, (new_cost, neighbor))
+
+        nodes = np.fromiter(dist.keys(), dtype=np.int64, count=len(dist))
+        return (
+            nodes,
+            np.fromiter(dist.values(), dtype=np.float64, count=len(dist)),
+            np.array([label[node] for node in nodes.tolist()], dtype=np.int32),
+        )
+
+    def nearest_target(
+        self,
+        source: Union[int, np.ndarray],
+        targets: np.ndarray,
+        offsets: Optional[np.ndarray] = None,
+        bounds: Optional[np.ndarray] = None,
+        limit: float = float("inf"),
+        source_offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[int, float]:
+        """
+        Finds the cheapest of many targets, stopping as soon as no other target can be cheaper.
+
+        The cost of a target is the cost of its node plus its offset. The search
+        stops when the cheapest frontier cost reaches the best target found so
+        far, or when every target not reached yet has a lower bound at least as
+        high: the result is exact as long as the bounds never exceed the true costs.
+
+        Parameters
+        ----------
+        source : int or numpy.ndarray
+            The index of the source node, or the indices of several source nodes.
+        targets : numpy.ndarray
+            The node index of every target. Several targets may share a node.
+        offsets : numpy.ndarray, optional
+            The non-negative cost added to every target (e.g. the distance from the
+            node to the point it stands for). Defaults to zero.
+        bounds : numpy.ndarray, optional
+            A lower bound of the total cost of every target, e.g. the straight-line
+            distance from the source plus the offset. Defaults to the offsets.
+        limit : float, optional
+            The maximum cost of a reached node. Defaults to no limit.
+        source_offsets : numpy.ndarray, optional
+            The initial cost of every source node (e.g. the cost from a point to both
+            ends of the edge it is snapped to). Defaults to zero.
+
+        Returns
+        -------
+        tuple
+            The position in `targets` of the cheapest target and its cost, or
+            (-1, inf) if no target is reachable.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        dist = self._dist
+        inf = float("inf")
+
+        targets = np.asarray(targets, dtype=np.int64)
+        if offsets is None:
+            offsets = np.zeros(len(targets))
+        offsets = np.asarray(offsets, dtype=np.float64)
+        bounds = offsets if bounds is None else np.asarray(bounds, dtype=np.float64)
+        if len(targets) == 0:
+            return -1, inf
+
+        # Keep the cheapest target of every node, and the nodes by ascending bound
+        order = np.lexsort((offsets, targets))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = targets[order][1:] != targets[order][:-1]
+        best_target = order[first]
+        node_bounds = np.minimum.reduceat(bounds[order], np.flatnonzero(first))
+        target_nodes = targets[best_target]
+        by_bound = np.argsort(node_bounds, kind="stable")
+        pending_nodes = target_nodes[by_bound].tolist()
+        pending_bounds = node_bounds[by_bound].tolist()
+        target_of = dict(zip(target_nodes.tolist(), best_target.tolist()))
+        target_offset = offsets.tolist()
+
+        best_position = -1
+        best_cost = inf
+        reached = set()
+        next_pending = 0
+        seeds = self._seeds(source, source_offsets, limit)
+        heap = [(offset, node) for node, offset in seeds.items()]
+        heapq.heapify(heap)
+        touched = list(seeds)
+        try:
+            for cost, node in heap:
+                dist[node] = cost
+            while heap:
+                cost, node = heapq.heappop(heap)
+                if cost > dist[node]:
+                    continue
+                if cost >= best_cost:
+                    break
+                position = target_of.get(node)
+                if position is not None:
+                    reached.add(node)
+                    total = cost + target_offset[position]
+                    if total < best_cost:
+                        best_cost = total
+                        best_position = position
+                while (
+                    next_pending < len(pending_nodes)
+                    and pending_nodes[next_pending] in reached
+                ):
+                    next_pending += 1
+                if (
+                    next_pending == len(pending_nodes)
+                    or pending_bounds[next_pending] >= best_cost
+                ):
+                    break
+                for k in range(indptr[node], indptr[node + 1]):
+                    new_cost = cost + weights[k]
+                    if new_cost > limit:
+                        continue
+                    neighbor = indices[k]
+                    if new_cost < dist[neighbor]:
+                        if dist[neighbor] == inf:
+                            touched.append(neighbor)
+                        dist[neighbor] = new_cost
+                        heapq.heappush(heap, (new_cost, neighbor))
+        finally:
+            for node in touched:
+                dist[node] = inf
+
+        return best_position, best_cost
+
+    def path(
+        self,
+        source: Union[int, np.ndarray],
+        target: int,
+        potential: Optional[Callable[[int], float]] = None,
+        limit: float = float("inf"),
+        offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, float, int]:
+        """
+        Finds the cheapest path between two nodes, with A* when a lower bound to the target is given.
+
+        Nodes are settled by their cost plus their lower bound to the target, so a
+        tight bound (e.g. from `landmarks`) settles only the nodes close to the
+        cheapest path. The path is exact as long as the bound never exceeds the
+        true cost and is consistent along the edges, as landmark bounds are.
+
+        Parameters
+        ----------
+        source : int or numpy.ndarray
+            The index of the source node, or the indices of several source nodes.
+        target : int
+            The index of the target node.
+        potential : Callable, optional
+            The lower bound of the cost from a node to the target. Defaults to 0 (Dijkstra).
+        limit : float, optional
+            The maximum cost of a reached node. Defaults to no limit.
+        offsets : numpy.ndarray, optional
+            The initial cost of every source node, included in the cost of the path. Defaults to zero.
+
+        Returns
+        -------
+        tuple
+            - edges (numpy.ndarray): The CSR positions of the edges of the path, in order, empty if unreachable.
+              The path starts from the source node of its first edge, or from the target if empty.
+            - cost (float): The cost of the path, inf if the target is unreachable.
+            - settled (int): The number of nodes settled by the search.
+        """
+        indptr = self._indptr
+        indices = self._indices
+        weights = self._weights
+        dist = self._dist
+        inf = float("inf")
+        bounds = {}
+        seeds = self._seeds(source, offsets, limit)
+        parent_edge = dict.fromkeys(seeds, -1)
+
+        settled = 0
+        touched = list(seeds)
+        heap = []
+        for node, offset in seeds.items():
+            dist[node] = offset
+            bound = potential(node) if potential else 0.0
+            bounds[node] = bound
+            heap.append((offset + bound, offset, node))
+        heapq.heapify(heap)
+        cost = inf
+        try:
+            while heap:
+                _, node_cost, node = heapq.heappop(heap)
+                if node_cost > dist[node]:
+                    continue
+                settled += 1
+                if node == target:
+                    cost = node_cost
+                    break
+                for k in range(indptr[node], indptr[node + 1]):
+                    new_cost = node_cost + weights[k]
+                    if new_cost > limit:
+                        continue
+                    neighbor = indices[k]
+                    if new_cost < dist[neighbor]:
+                        if dist[neighbor] == inf:
+                            touched.append(neighbor)
+                        dist[neighbor] = new_cost
+                        parent_edge[neighbor] = k
+                        bound = bounds.get(neighbor)
+                        if bound is None:
+                            bound = potential(neighbor) if potential else 0.0
+                            bounds[neighbor] = bound
+                        heapq.heappush(heap, (new_cost + bound, new_cost, neighbor))
+        finally:
+            for node in touched:
+                dist[node] = inf
+
+        edges = []
+        if cost < inf:
+            node = target
+            while parent_edge[node] >= 0:
+                k = parent_edge[node]
+                edges.append(k)
+                node = bisect.bisect_right(indptr, k) - 1
+        return np.array(edges[::-1], dtype=np.int64), cost, settled
@@ -0,0 +1,164 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from greento.utils.geo import geo
+
+
+class snap_index:
+    """
+    A persistent index snapping points to the nodes of a traffic network, in meters.
+
+    The node coordinates are validated once and projected to a local
+    equirectangular plane centered on the network, so the KD-tree works in
+    meters instead of degrees: nearest nodes stay correct away from the
+    equator, where a degree of longitude is shorter than a degree of latitude.
+    The reported snapping distances are Haversine distances.
+
+    Attributes
+    ----------
+    lats : numpy.ndarray
+        The latitude of every node.
+    lons : numpy.ndarray
+        The longitude of every node.
+    origin_lat : float
+        The latitude of the center of the projection.
+    origin_lon : float
+        The longitude of the center of the projection.
+    tree : scipy.spatial.cKDTree
+        The KD-tree of the projected node coordinates.
+
+    Methods
+    -------
+    project(lats: numpy.ndarray, lons: numpy.ndarray) -> numpy.ndarray
+        Projects coordinates to the local plane, in meters.
+    snap(lats: numpy.ndarray, lons: numpy.ndarray, max_distance: float) -> tuple[numpy.ndarray, numpy.ndarray]
+        Snaps every point to its nearest node.
+    """
+
+    EARTH_RADIUS_M = 6371000.0
+    SORTED_QUERY_SIZE = 65536
+    SORT_CELL_M = 250.0
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray) -> None:
+        """
+        Validates the node coordinates and builds the KD-tree.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitude of every node.
+        lons : numpy.ndarray
+            The longitude of every node.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If there are no nodes or some coordinates are not valid.
+        """
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lons = np.ascontiguousarray(lons, dtype=np.float64)
+        if (
+            len(self.lats) == 0
+            or len(self.lats) != len(self.lons)
+            or not (np.isfinite(self.lats).all() and np.isfinite(self.lons).all())
+        ):
+            logger = logging.getLogger(__name__)
+            logger.error("Node coordinates are missing or not valid")
+            raise ValueError("Coordinates not valid")
+
+        self.origin_lat = float((self.lats.min() + self.lats.max()) / 2)
+        self.origin_lon = float((self.lons.min() + self.lons.max()) / 2)
+        self._scale_x = np.radians(1.0) * self.EARTH_RADIUS_M * np.cos(
+            np.radians(self.origin_lat)
+        )
+        self._scale_y = np.radians(1.0) * self.EARTH_RADIUS_M
+        self.tree = cKDTree(self.project(self.lats, self.lons))
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def project(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """
+        Projects coordinates to the local plane, in meters.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the points.
+        lons : numpy.ndarray
+            The longitudes of the points.
+
+        Returns
+        -------
+        numpy.ndarray
+            The (N, 2) projected x and y of every point.
+        """
+        points = np.empty((np.size(lats), 2))
+        points[:, 0] = np.ravel(lons)
+        points[:, 0] -= self.origin_lon
+        points[:, 0] *= self._scale_x
+        points[:, 1] = np.ravel(lats)
+        points[:, 1] -= self.origin_lat
+        points[:, 1] *= self._scale_y
+        return points
+
+    def snap(
+        self, lats: np.ndarray, lons: np.ndarray, max_distance: float = np.inf
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Snaps every point to its nearest node.
+
+        The points are queried all at once, over all the available cores. Large
+        batches are first ordered by grid cell, so that consecutive queries visit
+        the same branches of the KD-tree.
+
+        Parameters
+        ----------
+        lats : numpy.ndarray
+            The latitudes of the points.
+        lons : numpy.ndarray
+            The longitudes of the points.
+        max_distance : float, optional
+            The maximum snapping distance in meters, points farther from every node
+            are not snapped. Defaults to no limit.
+
+        Returns
+        -------
+        tuple
+            Two arrays with one entry per point:
+            - nodes (numpy.ndarray): The int32 index of the nearest node, -1 if not snapped.
+            - distances (numpy.ndarray): The distance in meters to the nearest node, inf if not snapped.
+        """
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lons = np.asarray(lons, dtype=np.float64).ravel()
+        points = self.project(lats, lons)
+        order = None
+        if len(points) >= self.SORTED_QUERY_SIZE:
+            cells = np.floor(points / self.SORT_CELL_M)
+            order = np.lexsort((cells[:, 0], cells[:, 1]))
+            points = points[order]
+        _, idx = self.tree.query(
+            points, k=1, distance_upper_bound=max_distance, workers=-1
+        )
+        if order is not None:
+            idx[order] = idx.copy()
+        snapped = idx < len(self)
+        nodes = np.where(snapped, idx, -1).astype(np.int32)
+        distances = np.full(len(lats), np.inf)
+        distances[snapped] = (
+            geo().haversine_distances(
+                lats[snapped],
+                lons[snapped],
+                self.lats[nodes[snapped]],
+                self.lons[nodes[snapped]],
+            )
+            * 1000
+        )
+        return nodes, distances
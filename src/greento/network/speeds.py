@@ -0,0 +1,357 @@
+import logging
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+class speed_profiles:
+    """
+    The speed of every transport mode on every edge of a traffic network.
+
+    The road speed of an edge is its posted `maxspeed` when it can be parsed,
+    otherwise the default speed of its `highway` class. Cars travel at the road
+    speed, the other modes at their own speed capped by it. Both columns are
+    parsed once with vectorized string operations, and the travel times of all
+    the modes are derived as arrays, never written back into the edges.
+
+    Attributes
+    ----------
+    road_speeds : numpy.ndarray or None
+        The road speed in km/h of every edge, in CSR order, NaN where unknown.
+
+    Methods
+    -------
+    from_edges(edges: pandas.DataFrame, rows: numpy.ndarray) -> speed_profiles
+        Reads the road speeds from the `highway` and `maxspeed` columns of the edges.
+    parse_maxspeed(values: pandas.Series) -> numpy.ndarray
+        Parses posted speed limits into km/h.
+    highway_speeds(values: pandas.Series) -> numpy.ndarray
+        Returns the default speed in km/h of highway classes.
+    speeds(transport_mode: str, num_edges: int) -> numpy.ndarray
+        Returns the speed in km/h of a transport mode on every edge.
+    travel_times(length: numpy.ndarray, travel_time: numpy.ndarray) -> dict
+        Calculates the travel time in seconds of every edge for every transport mode.
+    transport_mode(transport_mode: str) -> str
+        Validates a transport mode, resolving its former spellings.
+    estimated_time(distance_meters, transport_mode) -> float or numpy.ndarray
+        Estimates the door-to-door travel time of a network distance, with delays.
+    estimated_distance(time_seconds, transport_mode) -> float or numpy.ndarray
+        Estimates the network distance travelled in a given time, without fixed delays.
+    """
+
+    # Speed of every transport mode in km/h
+    SPEEDS_KMH = {
+        "walk": 5,
+        "bike": 15,
+        "drive": 30,
+        "all_public": 30,
+        "drive_public": 30,
+    }
+
+    # Rounded speeds in m/s of the door-to-door travel time estimates
+    ESTIMATE_SPEEDS_MS = {
+        "walk": 1.4,  # 5 km/h
+        "bike": 4.17,  # 15 km/h
+        "drive": 8.33,  # 30 km/h (urban)
+        "all_public": 8.33,  # 30 km/h
+        "drive_public": 8.33,  # as drive
+    }
+
+    # Former spellings of the transport modes
+    MODE_ALIASES = {"drive_service": "drive_public"}
+
+    # Modes travelling at the road speed, the others are only capped by it
+    ROAD_MODES = ("drive", "drive_public")
+
+    # Urban default speeds in km/h of the OSM highway classes
+    HIGHWAY_SPEEDS_KMH = {
+        "motorway": 110,
+        "trunk": 90,
+        "primary": 50,
+        "secondary": 50,
+        "tertiary": 40,
+        "unclassified": 30,
+        "residential": 30,
+        "living_street": 10,
+        "service": 20,
+        "road": 30,
+        "busway": 30,
+    }
+
+    # Implicit speed limits, as in 'IT:urban'
+    ZONE_SPEEDS_KMH = {
+        "urban": 50,
+        "rural": 90,
+        "trunk": 110,
+        "motorway": 130,
+        "living_street": 10,
+        "zone30": 30,
+    }
+
+    # Medium time of fixed delays in seconds
+    FIXED_DELAYS = {
+        "walk": 0,
+        "bike": 30,  # take/return bike
+        "drive": 180,  # parking + take the car
+        "all_public": 420,  # walk to the stop (3 min) + estimated wait (4 min)
+        "drive_public": 180,  # wait + call
+    }
+
+    # Delay factors depending on traffic and semaphores
+    DELAY_FACTORS = {
+        "walk": 1.15,  # semaphores for pedestrians
+        "bike": 1.2,  # semaphores and traffic
+        "drive": 1.25,  # traffic and semaphores
+        "all_public": 1.10,  # traffic and semaphores
+        "drive_public": 1.25,  # as drive
+    }
+
+    def __init__(self, road_speeds: Optional[np.ndarray] = None) -> None:
+        """
+        Initializes the profiles from the road speeds.
+
+        Parameters
+        ----------
+        road_speeds : numpy.ndarray, optional
+            The road speed in km/h of every edge, in CSR order. Defaults to unknown everywhere.
+
+        Returns
+        -------
+        None
+        """
+        self.road_speeds = (
+            None if road_speeds is None else np.asarray(road_speeds, dtype=np.float64)
+        )
+
+    @classmethod
+    def from_edges(
+        cls, edges: pd.DataFrame, rows: Optional[np.ndarray] = None
+    ) -> "speed_profiles":
+        """
+        Reads the road speeds from the `highway` and `maxspeed` columns of the edges.
+
+        Parameters
+        ----------
+        edges : pandas.DataFrame
+            The edges of the traffic network.
+        rows : numpy.ndarray, optional
+            The positional row of every edge of the graph, in CSR order. Defaults to all the rows.
+
+        Returns
+        -------
+        speed_profiles
+            The speed profiles of the edges.
+        """
+        if rows is None:
+            rows = np.arange(len(edges))
+        speeds = np.full(len(rows), np.nan)
+        if "maxspeed" in edges.columns:
+            speeds = cls.parse_maxspeed(edges["maxspeed"].iloc[rows])
+        if "highway" in edges.columns:
+            speeds = np.where(
+                np.isnan(speeds), cls.highway_speeds(edges["highway"].iloc[rows]), speeds
+            )
+        return cls(speeds)
+
+    @classmethod
+    def parse_maxspeed(cls, values: pd.Series) -> np.ndarray:
+        """
+        Parses posted speed limits into km/h.
+
+        Numbers in mph are converted, implicit limits like 'IT:urban' are looked
+        up, and for the lists of merged edges the first value is used.
+
+        Parameters
+        ----------
+        values : pandas.Series
+            The `maxspeed` values of the edges.
+
+        Returns
+        -------
+        numpy.ndarray
+            The float64 speed limit of every edge, NaN where it cannot be parsed.
+        """
+        text = pd.Series(values).astype(str).str.lower()
+        speeds = text.str.extract(r"(\d+(?:\.\d+)?)", expand=False).astype(float)
+        mph = text.str.contains("mph", regex=False)
+        speeds = speeds.where(~mph, speeds * 1.609344)
+        zones = text.str.extract(r"[a-z]{2}:([a-z_0-9]+)", expand=False).map(
+            cls.ZONE_SPEEDS_KMH
+        )
+        speeds = speeds.where(speeds.notna(), zones).to_numpy(dtype=np.float64)
+        speeds[speeds <= 0] = np.nan
+        return speeds
+
+    @classmethod
+    def highway_speeds(cls, values: pd.Series) -> np.ndarray:
+        """
+        Returns the default speed in km/h of highway classes.
+
+        Link roads take the speed of their class, and for the lists of merged
+        edges the first class is used.
+
+        Parameters
+        ----------
+        values : pandas.Series
+            The `highway` values of the edges.
+
+        Returns
+        -------
+        numpy.ndarray
+            The float64 default speed of every edge, NaN for unknown classes.
+        """
+        classes = (
+            pd.Series(values)
+            .astype(str)
+            .str.lower()
+            .str.extract(r"([a-z_]+)", expand=False)
+            .str.replace("_link", "", regex=False)
+        )
+        return classes.map(cls.HIGHWAY_SPEEDS_KMH).to_numpy(dtype=np.float64)
+
+    def speeds(self, transport_mode: str, num_edges: int) -> np.ndarray:
+        """
+        Returns the speed in km/h of a transport mode on every edge.
+
+        Parameters
+        ----------
+        transport_mode : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive').
+        num_edges : int
+            The number of edges of the graph.
+
+        Returns
+        -------
+        numpy.ndarray
+            The float64 speed of every edge, in CSR order.
+        """
+        speed = float(self.SPEEDS_KMH[transport_mode])
+        if self.road_speeds is None or len(self.road_speeds) != num_edges:
+            return np.full(num_edges, speed)
+        road = np.where(np.isnan(self.road_speeds), speed, self.road_speeds)
+        if transport_mode in self.ROAD_MODES:
+            return road
+        return np.minimum(road, speed)
+
+    def travel_times(
+        self, length: np.ndarray, travel_time: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculates the travel time in seconds of every edge for every transport mode.
+
+        Travel times already stored on the edges are driving times, and take
+        precedence for the road modes only.
+
+        Parameters
+        ----------
+        length : numpy.ndarray
+            The length in meters of every edge, in CSR order.
+        travel_time : numpy.ndarray, optional
+            The stored travel time in seconds of every edge, NaN where missing. Defaults to none.
+
+        Returns
+        -------
+        dict
+            The float32 travel time of every edge, in CSR order, keyed by transport mode.
+        """
+        length = np.asarray(length, dtype=np.float64)
+        if travel_time is None:
+            travel_time = np.full(len(length), np.nan)
+        stored = np.isfinite(travel_time)
+        times = {}
+        for mode in self.SPEEDS_KMH:
+            estimated = length / (self.speeds(mode, len(length)) / 3.6)
+            if mode in self.ROAD_MODES:
+                estimated = np.where(stored, travel_time, estimated)
+            times[mode] = estimated.astype(np.float32)
+        return times
+
+    @classmethod
+    def transport_mode(cls, transport_mode: str) -> str:
+        """
+        Validates a transport mode, resolving its former spellings.
+
+        Parameters
+        ----------
+        transport_mode : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+
+        Returns
+        -------
+        str
+            The transport mode, 'drive_public' for the former 'drive_service'.
+
+        Raises
+        ------
+        ValueError
+            If the transport mode is not valid.
+        """
+        transport_mode = cls.MODE_ALIASES.get(transport_mode, transport_mode)
+        if transport_mode not in cls.SPEEDS_KMH:
+            logger = logging.getLogger(__name__)
+            logger.error(
+                f"Transport mode not valid. Choose from: {', '.join(cls.SPEEDS_KMH)}"
+            )
+            raise ValueError("Transport mode not valid")
+        return transport_mode
+
+    @classmethod
+    def estimated_time(
+        cls, distance_meters: Union[float, np.ndarray], transport_mode: str
+    ) -> Union[float, np.ndarray]:
+        """
+        Estimates the door-to-door travel time of a network distance, with delays.
+
+        Parameters
+        ----------
+        distance_meters : float or numpy.ndarray
+            The distance to travel in meters, or an array of distances.
+        transport_mode : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+
+        Returns
+        -------
+        float or numpy.ndarray
+            The estimated travel time in seconds, with the shape of the distances.
+
+        Raises
+        ------
+        ValueError
+            If the transport mode is not valid.
+        """
+        transport_mode = cls.transport_mode(transport_mode)
+        return (
+            distance_meters
+            / cls.ESTIMATE_SPEEDS_MS[transport_mode]
+            * cls.DELAY_FACTORS[transport_mode]
+            + cls.FIXED_DELAYS[transport_mode]
+        )
+
+    @classmethod
+    def estimated_distance(
+        cls, time_seconds: Union[float, np.ndarray], transport_mode: str
+    ) -> Union[float, np.ndarray]:
+        """
+        Estimates the network distance travelled in a given time, without fixed delays.
+
+        Parameters
+        ----------
+        time_seconds : float or numpy.ndarray
+            The time available for travel in seconds.
+        transport_mode : str
+            The type of transport network (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
+
+        Returns
+        -------
+        float or numpy.ndarray
+            The estimated distance in meters, with the shape of the times.
+
+        Raises
+        ------
+        ValueError
+            If the transport mode is not valid.
+        """
+        transport_mode = cls.transport_mode(transport_mode)
+        speed = cls.SPEEDS_KMH[transport_mode] / 3.6
+        return time_seconds * speed / cls.DELAY_FACTORS[transport_mode]
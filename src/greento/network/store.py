@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+from greento.network.graph import csr_graph
+from greento.network.landmarks import landmarks
+from greento.network.prepared import prepared_network
+
+
+class network_store:
+    """
+    A compact on-disk store for prepared traffic networks.
+
+    Every array is written to its own `.npy` file in the store directory, so that
+    loading only maps the files: processes loading the same store share the same
+    pages. The nodes and edges GeoDataFrames are rebuilt only when accessed.
+
+    Attributes
+    ----------
+    path : str
+        The directory of the store.
+
+    Methods
+    -------
+    save(network: prepared_network) -> None
+        Writes the prepared network to the store directory.
+    load(mmap: bool) -> prepared_network
+        Reads the prepared network from the store directory.
+    """
+
+    FORMAT_VERSION = 1
+    METADATA_FILE = "network.json"
+
+    def __init__(self, path: str) -> None:
+        """
+        Initializes the store with its directory.
+
+        Parameters
+        ----------
+        path : str
+            The directory of the store.
+
+        Returns
+        -------
+        None
+        """
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        """
+        Returns the path of the `.npy` file of the given array.
+        """
+        return os.path.join(self.path, f"{name}.npy")
+
+    def save(self, network: prepared_network) -> None:
+        """
+        Writes the prepared network to the store directory.
+
+        The adjacency is stored as int32 CSR arrays, the edge lengths and travel
+        times as float32 and the node coordinates as float64, together with the
+        OSM id of every node and the flattened edge geometries. Edges are written
+        in CSR order. The landmark tables built on the network are written too.
+
+        Parameters
+        ----------
+        network : prepared_network
+            The prepared traffic network to save.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the node ids are not integers.
+        """
+        graph = network.graph
+        node_ids = np.asarray(graph.node_ids)
+        if not np.issubdtype(node_ids.dtype, np.integer):
+            try:
+                node_ids = node_ids.astype(np.int64)
+            except (TypeError, ValueError):
+                logger = logging.getLogger(__name__)
+                logger.error("Node ids must be integers to be stored")
+                raise ValueError("Node ids not valid")
+
+        edge_coords, edge_coord_ptr = network.edge_geometry()
+        arrays = {
+            "node_ids": node_ids.astype(np.int64, copy=False),
+            "x": graph.x,
+            "y": graph.y,
+            "indptr": graph.indptr,
+            "indices": graph.indices,
+            "length": graph.length,
+            "travel_time": graph.travel_time,
+            "edge_coords": edge_coords,
+            "edge_coord_ptr": edge_coord_ptr,
+        }
+        for mode, times in network.travel_times.items():
+            arrays[f"travel_time_{mode}"] = times
+        for weight, tables in network.landmark_tables.items():
+            arrays[f"landmarks_{weight}_nodes"] = tables.nodes
+            arrays[f"landmarks_{weight}_from"] = tables.from_landmarks
+            arrays[f"landmarks_{weight}_to"] = tables.to_landmarks
+
+        os.makedirs(self.path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(self._file(name), np.ascontiguousarray(array))
+
+        metadata = {
+            "version": self.FORMAT_VERSION,
+            "crs": str(network.crs),
+            "num_nodes": graph.num_nodes,
+            "num_edges": graph.num_edges,
+            "modes": list(network.travel_times),
+            "landmarks": list(network.landmark_tables),
+        }
+        with open(os.path.join(self.path, self.METADATA_FILE), "w") as file:
+            json.dump(metadata, file)
+
+    def load(self, mmap: bool = True) -> prepared_network:
+        """
+        Reads the prepared network from the store directory.
+
+        Parameters
+        ----------
+        mmap : bool, optional
+            Whether to memory-map the arrays read-only instead of reading them into memory.
+            The searches of a mapped network read the mapped pages in place, so the
+            processes loading the store share them. Defaults to True.
+
+        Returns
+        -------
+        prepared_network
+            The prepared traffic network.
+
+        Raises
+        ------
+        ValueError
+            If the directory does not contain a network store, or it was written by
+            an unsupported version.
+        """
+        logger = logging.getLogger(__name__)
+        metadata_path = os.path.join(self.path, self.METADATA_FILE)
+        if not os.path.isfile(metadata_path):
+            logger.error(f"No network store found in {self.path}")
+            raise ValueError("Network store not found")
+        with open(metadata_path) as file:
+            metadata = json.load(file)
+        if metadata.get("version") != self.FORMAT_VERSION:
+            logger.error(f"Unsupported network store version: {metadata.get('version')}")
+            raise ValueError("Network store version not supported")
+
+        mmap_mode: Optional[str] = "r" if mmap else None
+        arrays: Dict[str, np.ndarray] = {}
+        for name in (
+            "node_ids",
+            "x",
+            "y",
+            "indptr",
+            "indices",
+            "length",
+            "travel_time",
+            "edge_coords",
+            "edge_coord_ptr",
+        ):
+            arrays[name] = np.load(self._file(name), mmap_mode=mmap_mode)
+        travel_times = {
+            mode: np.load(self._file(f"travel_time_{mode}"), mmap_mode=mmap_mode)
+            for mode in metadata.get("modes", [])
+        }
+        landmark_tables = {
+            weight: landmarks(
+                np.load(self._file(f"landmarks_{weight}_nodes")),
+                np.load(self._file(f"landmarks_{weight}_from"), mmap_mode=mmap_mode),
+                np.load(self._file(f"landmarks_{weight}_to"), mmap_mode=mmap_mode),
+                weight,
+            )
+            for weight in metadata.get("landmarks", [])
+        }
+
+        graph = csr_graph(
+            node_ids=arrays["node_ids"],
+            x=arrays["x"],
+            y=arrays["y"],
+            indptr=arrays["indptr"],
+            indices=arrays["indices"],
+            length=arrays["length"],
+            travel_time=arrays["travel_time"],
+            edge_rows=np.arange(metadata["num_edges"], dtype=np.int64),
+        )
+        return prepared_network.from_graph(
+            graph,
+            crs=metadata["crs"],
+            edge_coords=arrays["edge_coords"],
+            edge_coord_ptr=arrays["edge_coord_ptr"],
+            travel_times=travel_times,
+            landmark_tables=landmark_tables,
+            shared=mmap,
+        )
@@ -0,0 +1,253 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import numpy as np
+
+from greento.network.graph import csr_graph
+
+
+class path_tree:
+    """
+    A shortest path tree from one source node, stored compactly as sorted arrays.
+
+    Only the nodes settled within the cost limit are stored, sorted by node
+    index, with their cost and the CSR position of the edge they are reached
+    through: a cost lookup is a binary search and a path is a walk up the tree.
+
+    Attributes
+    ----------
+    source : int
+        The index of the source node.
+    limit : float
+        The maximum cost of the nodes of the tree.
+    nodes : numpy.ndarray
+        The sorted int32 indices of the nodes of the tree.
+    costs : numpy.ndarray
+        The float64 cost from the source to every node of the tree.
+    parent_edges : numpy.ndarray
+        The int32 CSR position of the edge reaching every node of the tree, -1 at the source.
+
+    Methods
+    -------
+    cost(targets: numpy.ndarray) -> numpy.ndarray
+        Returns the cost from the source to every target, inf outside the tree.
+    path(target: int, graph: csr_graph) -> numpy.ndarray
+        Returns the CSR positions of the edges from the source to the target.
+    """
+
+    def __init__(
+        self,
+        source: int,
+        limit: float,
+        nodes: np.ndarray,
+        costs: np.ndarray,
+        parent_edges: np.ndarray,
+    ) -> None:
+        """
+        Initializes the tree from its settled nodes, in any order.
+
+        Parameters
+        ----------
+        source : int
+            The index of the source node.
+        limit : float
+            The maximum cost of the nodes of the tree.
+        nodes : numpy.ndarray
+            The indices of the nodes of the tree.
+        costs : numpy.ndarray
+            The cost from the source to every node.
+        parent_edges : numpy.ndarray
+            The CSR position of the edge reaching every node, -1 at the source.
+
+        Returns
+        -------
+        None
+        """
+        order = np.argsort(nodes, kind="stable")
+        self.source = int(source)
+        self.limit = float(limit)
+        self.nodes = np.asarray(nodes, dtype=np.int32)[order]
+        self.costs = np.asarray(costs, dtype=np.float64)[order]
+        self.parent_edges = np.asarray(parent_edges, dtype=np.int32)[order]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the arrays of the tree, in bytes.
+        """
+        return int(self.nodes.nbytes + self.costs.nbytes + self.parent_edges.nbytes)
+
+    def _positions(self, targets: np.ndarray) -> np.ndarray:
+        """
+        Returns the position of every target in the tree, -1 outside the tree.
+        """
+        targets = np.asarray(targets, dtype=np.int64)
+        positions = np.searchsorted(self.nodes, targets)
+        inside = positions < len(self.nodes)
+        inside[inside] = self.nodes[positions[inside]] == targets[inside]
+        return np.where(inside, positions, -1)
+
+    def cost(self, targets: np.ndarray) -> np.ndarray:
+        """
+        Returns the cost from the source to every target, inf outside the tree.
+
+        Parameters
+        ----------
+        targets : numpy.ndarray
+            The indices of the target nodes.
+
+        Returns
+        -------
+        numpy.ndarray
+            The float64 cost of every target.
+        """
+        positions = self._positions(targets)
+        return np.where(positions >= 0, self.costs[positions], np.inf)
+
+    def path(self, target: int, graph: csr_graph) -> Optional[np.ndarray]:
+        """
+        Returns the CSR positions of the edges from the source to the target.
+
+        Parameters
+        ----------
+        target : int
+            The index of the target node.
+        graph : csr_graph
+            The CSR graph the tree was built on.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The positions of the edges of the path, in order, or None if the target is outside the tree.
+        """
+        edges = []
+        position = int(self._positions(np.array([target]))[0])
+        if position < 0:
+            return None
+        while True:
+            edge = int(self.parent_edges[position])
+            if edge < 0:
+                break
+            edges.append(edge)
+            node = int(np.searchsorted(graph.indptr, edge, side="right")) - 1
+            position = int(self._positions(np.array([node]))[0])
+        return np.array(edges[::-1], dtype=np.int64)
+
+
+class path_tree_cache:
+    """
+    A least-recently-used cache of shortest path trees, bounded by memory.
+
+    Trees are keyed by (source node, edge weight, cost limit). When the total
+    size of the trees exceeds the budget, the least recently used ones are
+    evicted first.
+
+    Attributes
+    ----------
+    max_bytes : int
+        The memory budget of the cached trees, in bytes.
+    nbytes : int
+        The memory used by the cached trees, in bytes.
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups not found in the cache.
+    evictions : int
+        The number of trees evicted to stay within the budget.
+
+    Methods
+    -------
+    get(key) -> path_tree
+        Returns the cached tree of the key, marking it as recently used.
+    put(key, tree: path_tree) -> None
+        Caches a tree, evicting the least recently used ones over the budget.
+    clear() -> None
+        Removes every tree from the cache.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024) -> None:
+        """
+        Initializes an empty cache.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The memory budget of the cached trees, in bytes. Defaults to 256 MiB.
+
+        Returns
+        -------
+        None
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._trees: "OrderedDict[Hashable, path_tree]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._trees
+
+    def get(self, key: Hashable) -> Optional[path_tree]:
+        """
+        Returns the cached tree of the key, marking it as recently used.
+
+        Parameters
+        ----------
+        key : Hashable
+            The (source node, edge weight, cost limit) of the tree.
+
+        Returns
+        -------
+        path_tree or None
+            The cached tree, or None if it is not cached.
+        """
+        tree = self._trees.get(key)
+        if tree is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._trees.move_to_end(key)
+        return tree
+
+    def put(self, key: Hashable, tree: path_tree) -> None:
+        """
+        Caches a tree, evicting the least recently used ones over the budget.
+
+        Trees larger than the whole budget are not cached.
+
+        Parameters
+        ----------
+        key : Hashable
+            The (source node, edge weight, cost limit) of the tree.
+        tree : path_tree
+            The tree to cache.
+
+        Returns
+        -------
+        None
+        """
+        if key in self._trees:
+            self.nbytes -= self._trees.pop(key).nbytes
+        if tree.nbytes > self.max_bytes:
+            return
+        self._trees[key] = tree
+        self.nbytes += tree.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._trees.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes every tree from the cache.
+
+        Returns
+        -------
+        None
+        """
+        self._trees.clear()
+        self.nbytes = 0
@@ -1,11 +1,12 @@
 import logging
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 
 import geopandas as gpd
 import osmnx as ox
 from tqdm import tqdm
 
 from greento.boundingbox import boundingbox
+from greento.network.prepared import prepared_network
 
 
 class traffic:
@@ -19,7 +20,7 @@ class traffic:
 
     Methods
     -------
-    get_traffic_area(network_type: str) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]
+    get_traffic_area(network_type: str, prepared: bool, core: bool) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame] | prepared_network
         Downloads the OSM network data for a given bounding box and network type, and processes it into GeoDataFrames.
     """
 
@@ -39,8 +40,10 @@ class traffic:
         self.bounding_box = bounding_box
 
     def get_traffic_area(
-        self, network_type: str
-    ) -> Optional[Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]]:
+        self, network_type: str, prepared: bool = False, core: bool = False
+    ) -> Optional[
+        Union[Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame], prepared_network]
+    ]:
         """
         Downloads the OSM network data for a given bounding box and network type, and processes it into GeoDataFrames.
 
@@ -48,13 +51,24 @@ class traffic:
         ----------
         network_type : str
             The type of transport network (e.g., 'walk', 'bike', 'drive', 'all', 'all_private', 'all_public').
+        prepared : bool, optional
+            Whether to return a prepared network that the distance and metrics classes
+            reuse across queries, instead of the GeoDataFrames. Defaults to False.
+        core : bool, optional
+            Whether to return the prepared core of the network instead: the largest strongly
+            connected component, without the fragments left by the clipping, with its
+            degree-2 chains contracted. Defaults to False. Searches on the core end at its
+            nodes: `get_isochrone_green` expands the chains reached back to their interior
+            nodes, so its isochrones end partway along them and sample them as on the full
+            network, while the batch and sweep isochrones sample and count the core nodes only.
 
         Returns
         -------
-        tuple
+        tuple or prepared_network
             A tuple containing two GeoDataFrames:
             - nodes (geopandas.GeoDataFrame): GeoDataFrame containing the nodes of the traffic network.
             - edges (geopandas.GeoDataFrame): GeoDataFrame containing the edges of the traffic network.
+            If `prepared` is True, a prepared network wrapping them, and if `core` is True its core.
 
         Raises
         ------
@@ -99,4 +113,11 @@ class traffic:
             pbar.set_description("Finished obtaining traffic data")
             pbar.close()
 
+        if core:
+            network = prepared_network(nodes, edges)
+            # the strongly connected component of the mode, when it is one of the network
+            weight = network_type if network_type in network.travel_times else "length"
+            return network.core(weight)
+        if prepared:
+            return prepared_network(nodes, edges)
         return (nodes, edges)
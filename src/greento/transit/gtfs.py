@@ -0,0 +1,477 @@
+import io
+import logging
+import zipfile
+from datetime import date, datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+class gtfs_feed:
+    """
+    A GTFS timetable loaded into compact arrays for round-based routing.
+
+    Trips are grouped into patterns, the routes of RAPTOR: trips visiting the
+    same sequence of stops that never overtake each other. The stop times of
+    every pattern are stored trip after trip, with trips sorted by departure,
+    so that the earliest trip leaving a stop is a binary search over one
+    column of the pattern.
+
+    Attributes
+    ----------
+    stop_ids : numpy.ndarray
+        The GTFS id of every stop.
+    stop_lats : numpy.ndarray
+        The latitude of every stop.
+    stop_lons : numpy.ndarray
+        The longitude of every stop.
+    route_ptr : numpy.ndarray
+        The int64 offsets of the stops of every pattern in `route_stops`.
+    route_stops : numpy.ndarray
+        The int32 stop sequence of every pattern, flattened.
+    trip_ptr : numpy.ndarray
+        The int64 offsets of the trips of every pattern, counted over all patterns.
+    time_ptr : numpy.ndarray
+        The int64 offsets of the stop times of every pattern in `arrivals` and `departures`.
+    arrivals : numpy.ndarray
+        The int32 arrival times in seconds after midnight, trip after trip within every pattern.
+    departures : numpy.ndarray
+        The int32 departure times in seconds after midnight, laid out as `arrivals`.
+    stop_route_ptr : numpy.ndarray
+        The int64 offsets of the patterns serving every stop in `stop_routes`.
+    stop_routes : numpy.ndarray
+        The int32 patterns serving every stop, flattened.
+    stop_route_positions : numpy.ndarray
+        The int32 position of the stop along every pattern in `stop_routes`.
+    transfer_ptr : numpy.ndarray
+        The int64 offsets of the transfers leaving every stop in `transfer_stops`.
+    transfer_stops : numpy.ndarray
+        The int32 stop reached by every transfer.
+    transfer_times : numpy.ndarray
+        The float64 time in seconds of every transfer.
+
+    Methods
+    -------
+    from_zip(path: str, service_date: str | datetime.date) -> gtfs_feed
+        Loads the stops, trips and stop times of a GTFS zip file.
+    from_frames(stops: pandas.DataFrame, trips: pandas.DataFrame, stop_times: pandas.DataFrame, transfers: pandas.DataFrame) -> gtfs_feed
+        Builds the feed from the GTFS tables.
+    with_transfers(sources: numpy.ndarray, targets: numpy.ndarray, times: numpy.ndarray) -> gtfs_feed
+        Returns a copy of the feed with the given transfers added.
+    """
+
+    def __init__(
+        self,
+        stop_ids: np.ndarray,
+        stop_lats: np.ndarray,
+        stop_lons: np.ndarray,
+        route_ptr: np.ndarray,
+        route_stops: np.ndarray,
+        trip_ptr: np.ndarray,
+        arrivals: np.ndarray,
+        departures: np.ndarray,
+        transfer_sources: Optional[np.ndarray] = None,
+        transfer_targets: Optional[np.ndarray] = None,
+        transfer_times: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Initializes the feed from its pattern arrays and indexes the stops.
+
+        Parameters
+        ----------
+        stop_ids : numpy.ndarray
+            The GTFS id of every stop.
+        stop_lats : numpy.ndarray
+            The latitude of every stop.
+        stop_lons : numpy.ndarray
+            The longitude of every stop.
+        route_ptr : numpy.ndarray
+            The offsets of the stops of every pattern in `route_stops`.
+        route_stops : numpy.ndarray
+            The stop sequence of every pattern, flattened.
+        trip_ptr : numpy.ndarray
+            The offsets of the trips of every pattern.
+        arrivals : numpy.ndarray
+            The arrival times in seconds after midnight, trip after trip within every pattern.
+        departures : numpy.ndarray
+            The departure times in seconds after midnight, laid out as `arrivals`.
+        transfer_sources : numpy.ndarray, optional
+            The stop every transfer leaves from.
+        transfer_targets : numpy.ndarray, optional
+            The stop every transfer reaches.
+        transfer_times : numpy.ndarray, optional
+            The time in seconds of every transfer.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the arrays are not consistent.
+        """
+        self.stop_ids = np.asarray(stop_ids)
+        self.stop_lats = np.asarray(stop_lats, dtype=np.float64)
+        self.stop_lons = np.asarray(stop_lons, dtype=np.float64)
+        self.route_ptr = np.asarray(route_ptr, dtype=np.int64)
+        self.route_stops = np.asarray(route_stops, dtype=np.int32)
+        self.trip_ptr = np.asarray(trip_ptr, dtype=np.int64)
+        self.arrivals = np.asarray(arrivals, dtype=np.int32)
+        self.departures = np.asarray(departures, dtype=np.int32)
+
+        num_routes = len(self.route_ptr) - 1
+        route_sizes = np.diff(self.route_ptr)
+        trip_counts = np.diff(self.trip_ptr)
+        if (
+            len(self.stop_lats) != len(self.stop_ids)
+            or len(self.stop_lons) != len(self.stop_ids)
+            or len(self.trip_ptr) != num_routes + 1
+            or self.route_ptr[-1] != len(self.route_stops)
+            or len(self.arrivals) != len(self.departures)
+            or int((route_sizes * trip_counts).sum()) != len(self.arrivals)
+            or (len(self.route_stops) and self.route_stops.max() >= len(self.stop_ids))
+        ):
+            logger = logging.getLogger(__name__)
+            logger.error("The timetable arrays are not consistent")
+            raise ValueError("GTFS feed not valid")
+
+        self.time_ptr = np.zeros(num_routes + 1, dtype=np.int64)
+        np.cumsum(route_sizes * trip_counts, out=self.time_ptr[1:])
+
+        # patterns serving every stop, with the position of the stop along them
+        routes = np.repeat(np.arange(num_routes, dtype=np.int32), route_sizes)
+        positions = np.arange(len(self.route_stops)) - np.repeat(
+            self.route_ptr[:-1], route_sizes
+        )
+        order = np.argsort(self.route_stops, kind="stable")
+        self.stop_routes = routes[order]
+        self.stop_route_positions = positions[order].astype(np.int32)
+        self.stop_route_ptr = np.zeros(len(self.stop_ids) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.route_stops, minlength=len(self.stop_ids)),
+            out=self.stop_route_ptr[1:],
+        )
+
+        if transfer_sources is None:
+            transfer_sources = np.zeros(0, dtype=np.int32)
+            transfer_targets = np.zeros(0, dtype=np.int32)
+            transfer_times = np.zeros(0)
+        transfer_sources = np.asarray(transfer_sources, dtype=np.int32)
+        order = np.argsort(transfer_sources, kind="stable")
+        self._transfer_sources = transfer_sources[order]
+        self.transfer_stops = np.asarray(transfer_targets, dtype=np.int32)[order]
+        self.transfer_times = np.asarray(transfer_times, dtype=np.float64)[order]
+        self.transfer_ptr = np.zeros(len(self.stop_ids) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self._transfer_sources, minlength=len(self.stop_ids)),
+            out=self.transfer_ptr[1:],
+        )
+
+    @property
+    def num_stops(self) -> int:
+        """
+        The number of stops of the feed.
+        """
+        return len(self.stop_ids)
+
+    @property
+    def num_routes(self) -> int:
+        """
+        The number of patterns of the feed.
+        """
+        return len(self.route_ptr) - 1
+
+    @classmethod
+    def from_zip(
+        cls, path: str, service_date: Optional[Union[str, date]] = None
+    ) -> "gtfs_feed":
+        """
+        Loads the stops, trips and stop times of a GTFS zip file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the GTFS zip file.
+        service_date : str or datetime.date, optional
+            The day whose services are kept, as 'YYYYMMDD' or a date. Defaults to
+            all the trips of the feed.
+
+        Returns
+        -------
+        gtfs_feed
+            The timetable of the feed.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a GTFS zip file or misses a required table.
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            archive = zipfile.ZipFile(path)
+        except (OSError, zipfile.BadZipFile):
+            logger.error(f"Cannot open the GTFS file {path}")
+            raise ValueError("GTFS file not valid")
+
+        with archive:
+            names = {name.rsplit("/", 1)[-1]: name for name in archive.namelist()}
+
+            def read(table: str) -> Optional[pd.DataFrame]:
+                name = names.get(f"{table}.txt")
+                if name is None:
+                    return None
+                with archive.open(name) as file:
+                    return pd.read_csv(
+                        io.TextIOWrapper(file, encoding="utf-8-sig"),
+                        dtype=str,
+                        keep_default_na=False,
+                    )
+
+            tables = {
+                table: read(table)
+                for table in (
+                    "stops",
+                    "trips",
+                    "stop_times",
+                    "calendar",
+                    "calendar_dates",
+                    "transfers",
+                )
+            }
+
+        for table in ("stops", "trips", "stop_times"):
+            if tables[table] is None:
+                logger.error(f"The GTFS file has no {table}.txt")
+                raise ValueError("GTFS file not valid")
+
+        trips = tables["trips"]
+        if service_date is not None:
+            services = cls._active_services(
+                service_date, tables["calendar"], tables["calendar_dates"]
+            )
+            trips = trips[trips["service_id"].isin(services)]
+        return cls.from_frames(
+            tables["stops"], trips, tables["stop_times"], tables["transfers"]
+        )
+
+    @staticmethod
+    def _active_services(
+        service_date: Union[str, date],
+        calendar: Optional[pd.DataFrame],
+        calendar_dates: Optional[pd.DataFrame],
+    ) -> set:
+        """
+        Returns the ids of the services running on the given day.
+        """
+        if isinstance(service_date, str):
+            service_date = datetime.strptime(service_date, "%Y%m%d").date()
+        day = service_date.strftime("%Y%m%d")
+        weekday = service_date.strftime("%A").lower()
+
+        services = set()
+        if calendar is not None and len(calendar):
+            running = (
+                (calendar[weekday] == "1")
+                & (calendar["start_date"] <= day)
+                & (calendar["end_date"] >= day)
+            )
+            services.update(calendar.loc[running, "service_id"])
+        if calendar_dates is not None and len(calendar_dates):
+            today = calendar_dates[calendar_dates["date"] == day]
+            services.update(today.loc[today["exception_type"] == "1", "service_id"])
+            services.difference_update(
+                today.loc[today["exception_type"] == "2", "service_id"]
+            )
+        return services
+
+    @staticmethod
+    def _seconds(times: pd.Series) -> np.ndarray:
+        """
+        Converts GTFS 'HH:MM:SS' times, possibly past 24:00:00, to seconds after midnight.
+        """
+        if len(times) == 0:
+            return np.zeros(0, dtype=np.int64)
+        parts = times.str.strip().str.split(":", expand=True).astype(np.int64)
+        return (parts[0] * 3600 + parts[1] * 60 + parts[2]).to_numpy()
+
+    @classmethod
+    def from_frames(
+        cls,
+        stops: pd.DataFrame,
+        trips: pd.DataFrame,
+        stop_times: pd.DataFrame,
+        transfers: Optional[pd.DataFrame] = None,
+    ) -> "gtfs_feed":
+        """
+        Builds the feed from the GTFS tables.
+
+        Stop times without an arrival or a departure time are filled with the
+        other one. Trips overtaking each other along the same stops are split into
+        separate patterns.
+
+        Parameters
+        ----------
+        stops : pandas.DataFrame
+            The stops table, with 'stop_id', 'stop_lat' and 'stop_lon' columns.
+        trips : pandas.DataFrame
+            The trips table, with a 'trip_id' column.
+        stop_times : pandas.DataFrame
+            The stop times table, with 'trip_id', 'stop_id', 'stop_sequence',
+            'arrival_time' and 'departure_time' columns.
+        transfers : pandas.DataFrame, optional
+            The transfers table, with 'from_stop_id', 'to_stop_id' and 'min_transfer_time' columns.
+
+        Returns
+        -------
+        gtfs_feed
+            The timetable of the feed.
+
+        Raises
+        ------
+        ValueError
+            If a required column is missing or some times are not valid.
+        """
+        logger = logging.getLogger(__name__)
+        required = {
+            "stops": (stops, ("stop_id", "stop_lat", "stop_lon")),
+            "trips": (trips, ("trip_id",)),
+            "stop_times": (
+                stop_times,
+                ("trip_id", "stop_id", "stop_sequence", "arrival_time", "departure_time"),
+            ),
+        }
+        for table, (frame, columns) in required.items():
+            missing = [column for column in columns if column not in frame.columns]
+            if missing:
+                logger.error(f"The GTFS {table} table misses {', '.join(missing)}")
+                raise ValueError("GTFS feed not valid")
+
+        stop_ids = stops["stop_id"].astype(str).to_numpy()
+        stop_index = pd.Index(stop_ids)
+        times = stop_times[stop_times["trip_id"].isin(trips["trip_id"])].copy()
+        times["arrival_time"] = times["arrival_time"].astype(str).str.strip()
+        times["departure_time"] = times["departure_time"].astype(str).str.strip()
+        times["arrival_time"] = times["arrival_time"].where(
+            times["arrival_time"] != "", times["departure_time"]
+        )
+        times["departure_time"] = times["departure_time"].where(
+            times["departure_time"] != "", times["arrival_time"]
+        )
+        # untimed stops between timepoints are not routable
+        times = times[times["arrival_time"] != ""]
+        times["stop"] = stop_index.get_indexer(times["stop_id"].astype(str))
+        times = times[times["stop"] >= 0]
+        try:
+            times["stop_sequence"] = times["stop_sequence"].astype(np.int64)
+            times["arrival"] = cls._seconds(times["arrival_time"])
+            times["departure"] = cls._seconds(times["departure_time"])
+        except (ValueError, KeyError):
+            logger.error("The GTFS stop times are not valid")
+            raise ValueError("GTFS feed not valid")
+        times = times.sort_values(["trip_id", "stop_sequence"], kind="stable")
+
+        patterns: Dict[tuple, List[tuple]] = {}
+        for _, trip in times.groupby("trip_id", sort=False):
+            if len(trip) < 2:
+                continue
+            stops_key = tuple(trip["stop"].tolist())
+            patterns.setdefault(stops_key, []).append(
+                (trip["arrival"].to_numpy(), trip["departure"].to_numpy())
+            )
+
+        route_stops, trip_counts, arrivals, departures = [], [], [], []
+        for stops_key, pattern_trips in patterns.items():
+            pattern_trips.sort(key=lambda trip: (trip[1][0], trip[0][-1]))
+            # trips overtaking the previous ones of a group start a new group
+            groups: List[List[tuple]] = []
+            for trip in pattern_trips:
+                for group in groups:
+                    last = group[-1]
+                    if (last[0] <= trip[0]).all() and (last[1] <= trip[1]).all():
+                        group.append(trip)
+                        break
+                else:
+                    groups.append([trip])
+            for group in groups:
+                route_stops.append(np.array(stops_key, dtype=np.int32))
+                trip_counts.append(len(group))
+                arrivals.extend(trip[0] for trip in group)
+                departures.extend(trip[1] for trip in group)
+
+        route_ptr = np.zeros(len(route_stops) + 1, dtype=np.int64)
+        np.cumsum([len(stops_key) for stops_key in route_stops], out=route_ptr[1:])
+        trip_ptr = np.zeros(len(route_stops) + 1, dtype=np.int64)
+        np.cumsum(trip_counts, out=trip_ptr[1:])
+
+        transfer_sources = transfer_targets = transfer_times = None
+        if transfers is not None and len(transfers) and {
+            "from_stop_id",
+            "to_stop_id",
+        }.issubset(transfers.columns):
+            sources = stop_index.get_indexer(transfers["from_stop_id"].astype(str))
+            targets = stop_index.get_indexer(transfers["to_stop_id"].astype(str))
+            if "min_transfer_time" in transfers.columns:
+                seconds = pd.to_numeric(transfers["min_transfer_time"], errors="coerce")
+            else:
+                seconds = pd.Series(np.nan, index=transfers.index)
+            kept = (sources >= 0) & (targets >= 0) & (sources != targets)
+            # transfer_type 3 marks transfers that are not possible
+            if "transfer_type" in transfers.columns:
+                kept &= (transfers["transfer_type"].astype(str) != "3").to_numpy()
+            transfer_sources = sources[kept]
+            transfer_targets = targets[kept]
+            transfer_times = np.nan_to_num(seconds.to_numpy(dtype=np.float64)[kept])
+
+        return cls(
+            stop_ids=stop_ids,
+            stop_lats=stops["stop_lat"].astype(np.float64).to_numpy(),
+            stop_lons=stops["stop_lon"].astype(np.float64).to_numpy(),
+            route_ptr=route_ptr,
+            route_stops=(
+                np.concatenate(route_stops) if route_stops else np.zeros(0, np.int32)
+            ),
+            trip_ptr=trip_ptr,
+            arrivals=np.concatenate(arrivals) if arrivals else np.zeros(0, np.int32),
+            departures=(
+                np.concatenate(departures) if departures else np.zeros(0, np.int32)
+            ),
+            transfer_sources=transfer_sources,
+            transfer_targets=transfer_targets,
+            transfer_times=transfer_times,
+        )
+
+    def with_transfers(
+        self, sources: np.ndarray, targets: np.ndarray, times: np.ndarray
+    ) -> "gtfs_feed":
+        """
+        Returns a copy of the feed with the given transfers added.
+
+        Parameters
+        ----------
+        sources : numpy.ndarray
+            The stop every transfer leaves from.
+        targets : numpy.ndarray
+            The stop every transfer reaches.
+        times : numpy.ndarray
+            The time in seconds of every transfer.
+
+        Returns
+        -------
+        gtfs_feed
+            The feed with both its own transfers and the given ones.
+        """
+        return gtfs_feed(
+            self.stop_ids,
+            self.stop_lats,
+            self.stop_lons,
+            self.route_ptr,
+            self.route_stops,
+            self.trip_ptr,
+            self.arrivals,
+            self.departures,
+            transfer_sources=np.concatenate((self._transfer_sources, sources)),
+            transfer_targets=np.concatenate((self.transfer_stops, targets)),
+            transfer_times=np.concatenate((self.transfer_times, times)),
+        )
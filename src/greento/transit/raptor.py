@@ -0,0 +1,247 @@
+import bisect
+from typing import List, Optional
+
+import numpy as np
+
+from greento.transit.gtfs import gtfs_feed
+
+
+class raptor:
+    """
+    A round-based public transit search (RAPTOR) over a GTFS timetable.
+
+    Round k finds the earliest arrival at every stop with at most k trips: the
+    patterns serving the stops improved in the previous round are scanned once
+    each, boarding the earliest catchable trip, and the transfers leaving the
+    improved stops are relaxed. There is no priority queue, only flat arrays.
+
+    A profile over several departure times runs the latest departure first and
+    keeps the labels between runs (rRAPTOR): an earlier departure can always wait
+    for a later one, so every run only improves on the previous ones.
+
+    Attributes
+    ----------
+    feed : gtfs_feed
+        The timetable to search.
+    max_rounds : int
+        The maximum number of trips of a journey.
+
+    Methods
+    -------
+    search(stops: numpy.ndarray, offsets: numpy.ndarray, departure: float, limit: float) -> numpy.ndarray
+        Finds the earliest arrival at every stop leaving from the given stops at the given time.
+    profile(stops: numpy.ndarray, offsets: numpy.ndarray, departures: numpy.ndarray, limit: float) -> numpy.ndarray
+        Finds the travel time to every stop for every departure time.
+    """
+
+    def __init__(self, feed: gtfs_feed, max_rounds: int = 5) -> None:
+        """
+        Initializes the search with a timetable.
+
+        Parameters
+        ----------
+        feed : gtfs_feed
+            The timetable to search.
+        max_rounds : int, optional
+            The maximum number of trips of a journey. Defaults to 5.
+
+        Returns
+        -------
+        None
+        """
+        self.feed = feed
+        self.max_rounds = max_rounds
+        # Python lists are indexed much faster than NumPy arrays in the scan loops
+        self._route_ptr = feed.route_ptr.tolist()
+        self._route_stops = feed.route_stops.tolist()
+        self._trip_counts = np.diff(feed.trip_ptr).tolist()
+        self._time_ptr = feed.time_ptr.tolist()
+        self._arrivals = feed.arrivals.tolist()
+        self._stop_route_ptr = feed.stop_route_ptr.tolist()
+        self._stop_routes = feed.stop_routes.tolist()
+        self._stop_route_positions = feed.stop_route_positions.tolist()
+        self._transfer_ptr = feed.transfer_ptr.tolist()
+        self._transfer_stops = feed.transfer_stops.tolist()
+        self._transfer_times = feed.transfer_times.tolist()
+
+        # departures stored stop after stop within every pattern, so the trips
+        # leaving a stop are a contiguous sorted column
+        columns = []
+        sizes = np.diff(feed.route_ptr).tolist()
+        for route, (size, count) in enumerate(zip(sizes, self._trip_counts)):
+            start, end = self._time_ptr[route], self._time_ptr[route + 1]
+            columns.append(feed.departures[start:end].reshape(count, size).T.ravel())
+        self._departure_columns = (
+            np.concatenate(columns).tolist() if columns else []
+        )
+
+    def _labels(self) -> List[List[float]]:
+        """
+        Returns empty labels, one list per round plus the best arrival of every stop.
+        """
+        inf = float("inf")
+        num_stops = self.feed.num_stops
+        return [[inf] * num_stops for _ in range(self.max_rounds + 2)]
+
+    def _run(
+        self,
+        labels: List[List[float]],
+        stops: List[int],
+        times: List[float],
+        deadline: float,
+    ) -> None:
+        """
+        Runs the rounds from the given stops and times, improving the labels in place.
+        """
+        route_ptr = self._route_ptr
+        route_stops = self._route_stops
+        trip_counts = self._trip_counts
+        time_ptr = self._time_ptr
+        arrivals = self._arrivals
+        columns = self._departure_columns
+        stop_route_ptr = self._stop_route_ptr
+        stop_routes = self._stop_routes
+        stop_route_positions = self._stop_route_positions
+        transfer_ptr = self._transfer_ptr
+        transfer_stops = self._transfer_stops
+        transfer_times = self._transfer_times
+        inf = float("inf")
+        best = labels[-1]
+
+        marked = set()
+        first = labels[0]
+        for stop, time in zip(stops, times):
+            if time <= deadline and time < first[stop]:
+                first[stop] = time
+                if time < best[stop]:
+                    best[stop] = time
+                marked.add(stop)
+
+        for k in range(1, self.max_rounds + 1):
+            if not marked:
+                break
+            previous = labels[k - 1]
+            current = labels[k]
+            queue = {}
+            for stop in marked:
+                for j in range(stop_route_ptr[stop], stop_route_ptr[stop + 1]):
+                    route = stop_routes[j]
+                    position = stop_route_positions[j]
+                    if position < queue.get(route, inf):
+                        queue[route] = position
+            marked = set()
+
+            for route, position in queue.items():
+                offset = route_ptr[route]
+                size = route_ptr[route + 1] - offset
+                count = trip_counts[route]
+                base = time_ptr[route]
+                trip = -1
+                for i in range(position, size):
+                    stop = route_stops[offset + i]
+                    if trip >= 0:
+                        arrival = arrivals[base + trip * size + i]
+                        if arrival < best[stop] and arrival <= deadline:
+                            current[stop] = arrival
+                            best[stop] = arrival
+                            marked.add(stop)
+                    ready = previous[stop]
+                    if ready == inf:
+                        continue
+                    column = base + i * count
+                    if trip >= 0 and ready > columns[column + trip]:
+                        continue
+                    catchable = (
+                        bisect.bisect_left(columns, ready, column, column + count)
+                        - column
+                    )
+                    if catchable < count and (trip < 0 or catchable < trip):
+                        trip = catchable
+
+            for stop in list(marked):
+                time = current[stop]
+                for j in range(transfer_ptr[stop], transfer_ptr[stop + 1]):
+                    target = transfer_stops[j]
+                    arrival = time + transfer_times[j]
+                    if arrival < best[target] and arrival <= deadline:
+                        current[target] = arrival
+                        best[target] = arrival
+                        marked.add(target)
+
+    def search(
+        self,
+        stops: np.ndarray,
+        offsets: Optional[np.ndarray],
+        departure: float,
+        limit: float = np.inf,
+    ) -> np.ndarray:
+        """
+        Finds the earliest arrival at every stop leaving from the given stops at the given time.
+
+        Parameters
+        ----------
+        stops : numpy.ndarray
+            The indices of the stops the journeys start from.
+        offsets : numpy.ndarray, optional
+            The time in seconds to reach every start stop (e.g. the walk from the
+            origin). Defaults to zero.
+        departure : float
+            The departure time in seconds after midnight.
+        limit : float, optional
+            The maximum travel time in seconds. Defaults to no limit.
+
+        Returns
+        -------
+        numpy.ndarray
+            The float64 arrival time in seconds after midnight at every stop, inf if not reached.
+        """
+        return self.profile(stops, offsets, np.array([departure]), limit)[0] + departure
+
+    def profile(
+        self,
+        stops: np.ndarray,
+        offsets: Optional[np.ndarray],
+        departures: np.ndarray,
+        limit: float = np.inf,
+    ) -> np.ndarray:
+        """
+        Finds the travel time to every stop for every departure time.
+
+        Parameters
+        ----------
+        stops : numpy.ndarray
+            The indices of the stops the journeys start from.
+        offsets : numpy.ndarray, optional
+            The time in seconds to reach every start stop. Defaults to zero.
+        departures : numpy.ndarray
+            The departure times in seconds after midnight.
+        limit : float, optional
+            The maximum travel time in seconds. Defaults to no limit.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (len(departures), num_stops) float64 array of travel times in seconds,
+            inf where a stop is not reached within the limit.
+        """
+        stops = np.asarray(stops, dtype=np.int64).ravel()
+        if offsets is None:
+            offsets = np.zeros(len(stops))
+        offsets = np.asarray(offsets, dtype=np.float64).ravel()
+        departures = np.asarray(departures, dtype=np.float64).ravel()
+
+        labels = self._labels()
+        durations = np.full((len(departures), self.feed.num_stops), np.inf)
+        stop_list = stops.tolist()
+        for row in np.argsort(-departures, kind="stable").tolist():
+            departure = float(departures[row])
+            self._run(
+                labels,
+                stop_list,
+                (offsets + departure).tolist(),
+                departure + limit,
+            )
+            arrival = np.array(labels[-1]) - departure
+            arrival[arrival > limit] = np.inf
+            durations[row] = arrival
+        return durations
@@ -0,0 +1,235 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from greento.network.prepared import prepared_network
+from greento.transit.gtfs import gtfs_feed
+from greento.transit.raptor import raptor
+
+
+class transit_router:
+    """
+    Public transit journeys combining a GTFS timetable with the walk network.
+
+    Every stop is snapped to its nearest walk network node. The origin walks to
+    the stops within the time budget (access), rides with RAPTOR, and walks
+    again from every stop reached (egress), all as one multi-source search over
+    the walk network, so walking all the way stays possible. Walking transfers
+    between stops are derived once from the walk network and added to the
+    transfers of the feed.
+
+    Over a departure window, the travel time to every stop is the median over
+    departures every `step` seconds, which accounts for the wait at the first stop.
+
+    Attributes
+    ----------
+    feed : gtfs_feed
+        The timetable, with the walking transfers added.
+    network : prepared_network
+        The traffic network used to walk.
+    departure_time : float
+        The departure time in seconds after midnight.
+    window : float
+        The length in seconds of the departure window, 0 for a single departure.
+    step : float
+        The time in seconds between the departures of the window.
+    stop_nodes : numpy.ndarray
+        The int32 walk network node of every stop.
+    stop_walk_times : numpy.ndarray
+        The walk time in seconds between every stop and its node.
+    search_rounds : raptor
+        The round-based search over the timetable.
+
+    Methods
+    -------
+    search(sources: numpy.ndarray, offsets: numpy.ndarray, limit: float) -> tuple[numpy.ndarray, numpy.ndarray]
+        Finds all walk network nodes reachable from the sources within the given time.
+    travel_time(lat1: float, lon1: float, lat2: float, lon2: float, limit: float) -> float
+        Returns the travel time in seconds between two points, walking or by transit.
+    """
+
+    WALK_MODE = "walk"
+
+    def __init__(
+        self,
+        feed: gtfs_feed,
+        network: prepared_network,
+        departure_time: float = 8 * 3600,
+        window: float = 0,
+        step: float = 60,
+        max_rounds: int = 5,
+        max_transfer_time: float = 300,
+    ) -> None:
+        """
+        Snaps the stops to the walk network and derives the walking transfers.
+
+        Parameters
+        ----------
+        feed : gtfs_feed
+            The timetable.
+        network : prepared_network
+            The traffic network used to walk.
+        departure_time : float, optional
+            The departure time in seconds after midnight. Defaults to 8:00.
+        window : float, optional
+            The length in seconds of the departure window. Defaults to a single departure.
+        step : float, optional
+            The time in seconds between the departures of the window. Defaults to 60.
+        max_rounds : int, optional
+            The maximum number of trips of a journey. Defaults to 5.
+        max_transfer_time : float, optional
+            The maximum walk time in seconds of a transfer between stops. Defaults to 300.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the departure window is not valid.
+        """
+        if window < 0 or step <= 0:
+            logger = logging.getLogger(__name__)
+            logger.error("The departure window and step must be positive")
+            raise ValueError("Departure window not valid")
+
+        self.network = network
+        self.departure_time = departure_time
+        self.window = window
+        self.step = step
+        walk_speed = network.SPEEDS_KMH[self.WALK_MODE] * 1000 / 3600
+        if feed.num_stops:
+            self.stop_nodes, distances = network.graph.snap(
+                feed.stop_lats, feed.stop_lons
+            )
+        else:
+            self.stop_nodes, distances = np.zeros(0, np.int32), np.zeros(0)
+        self.stop_walk_times = distances / walk_speed
+
+        # walking transfers between the stops within the transfer time
+        order = np.argsort(self.stop_nodes, kind="stable")
+        sorted_nodes = self.stop_nodes[order]
+        walk = network.search(self.WALK_MODE)
+        sources, targets, times = [], [], []
+        for stop, node in enumerate(self.stop_nodes.tolist()):
+            nodes, costs = walk.search(
+                node, max_transfer_time - self.stop_walk_times[stop]
+            )
+            start = np.searchsorted(sorted_nodes, nodes, side="left")
+            end = np.searchsorted(sorted_nodes, nodes, side="right")
+            counts = end - start
+            if not counts.any():
+                continue
+            near = order[
+                np.concatenate([np.arange(a, b) for a, b in zip(start, end) if b > a])
+            ]
+            near_times = (
+                np.repeat(costs, counts)
+                + self.stop_walk_times[stop]
+                + self.stop_walk_times[near]
+            )
+            kept = (near != stop) & (near_times <= max_transfer_time)
+            sources.append(np.full(int(kept.sum()), stop))
+            targets.append(near[kept])
+            times.append(near_times[kept])
+        if sources:
+            feed = feed.with_transfers(
+                np.concatenate(sources), np.concatenate(targets), np.concatenate(times)
+            )
+        self.feed = feed
+        self.search_rounds = raptor(feed, max_rounds)
+
+    def _departures(self) -> np.ndarray:
+        """
+        Returns the departure times of the window, in seconds after midnight.
+        """
+        return self.departure_time + np.arange(0, self.window + 1, self.step)
+
+    def search(
+        self, sources: np.ndarray, offsets: Optional[np.ndarray], limit: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds all walk network nodes reachable from the sources within the given time.
+
+        Parameters
+        ----------
+        sources : numpy.ndarray
+            The walk network nodes the journeys start from.
+        offsets : numpy.ndarray, optional
+            The walk time in seconds to every source node. Defaults to zero.
+        limit : float
+            The travel time budget in seconds.
+
+        Returns
+        -------
+        tuple
+            Two arrays in arrival order:
+            - nodes (numpy.ndarray): The int32 indices of the reachable nodes.
+            - costs (numpy.ndarray): The float64 travel time in seconds to every reachable node.
+        """
+        sources = np.asarray(sources, dtype=np.int32).ravel()
+        if offsets is None:
+            offsets = np.zeros(len(sources))
+        offsets = np.asarray(offsets, dtype=np.float64).ravel()
+        walk = self.network.search(self.WALK_MODE)
+        nodes, costs = walk.search(sources, limit, offsets)
+
+        node_costs = np.full(self.network.graph.num_nodes, np.inf)
+        node_costs[nodes] = costs
+        access = node_costs[self.stop_nodes] + self.stop_walk_times
+        stops = np.flatnonzero(access <= limit)
+        if len(stops) == 0:
+            return nodes, costs
+
+        durations = self.search_rounds.profile(
+            stops, access[stops], self._departures(), limit
+        )
+        rides = np.median(durations, axis=0) + self.stop_walk_times
+        egress = np.flatnonzero(rides <= limit)
+        return walk.search(
+            np.concatenate((sources, self.stop_nodes[egress])),
+            limit,
+            np.concatenate((offsets, rides[egress])),
+        )
+
+    def travel_time(
+        self,
+        lat1: float,
+        lon1: float,
+        lat2: float,
+        lon2: float,
+        limit: float = 3 * 3600,
+    ) -> float:
+        """
+        Returns the travel time in seconds between two points, walking or by transit.
+
+        Parameters
+        ----------
+        lat1 : float
+            The latitude of the starting point.
+        lon1 : float
+            The longitude of the starting point.
+        lat2 : float
+            The latitude of the destination point.
+        lon2 : float
+            The longitude of the destination point.
+        limit : float, optional
+            The maximum travel time in seconds. Defaults to 3 hours.
+
+        Returns
+        -------
+        float
+            The travel time in seconds, inf if the destination is not reached within the limit.
+        """
+        seed_nodes, seed_offsets = self.network.edge_seeds(
+            np.array([lat1]), np.array([lon1]), self.WALK_MODE
+        )
+        nodes, costs = self.search(seed_nodes[0], seed_offsets[0], limit)
+        target, distance = self.network.graph.snap(np.array([lat2]), np.array([lon2]))
+        reached = nodes == target[0]
+        if not reached.any():
+            return np.inf
+        walk_speed = self.network.SPEEDS_KMH[self.WALK_MODE] * 1000 / 3600
+        return float(costs[reached][0] + distance[0] / walk_speed)
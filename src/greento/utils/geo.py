@@ -1,12 +1,15 @@
 import logging
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple, Union
 
 import numpy as np
 import rasterio
 import requests
+from affine import Affine
 from rasterio.warp import Resampling, reproject
 from tqdm import tqdm
 
+from greento.network.speeds import speed_profiles
+
 
 class geo:
     """
@@ -24,65 +27,41 @@ class geo:
         Gets the coordinates of the cell with the maximum population.
     haversine_distance(lon1: float, lat1: float, lons2: float, lats2: float) -> float
         Calculates the Haversine distance between two points.
+    haversine_distances(lats1: numpy.ndarray, lons1: numpy.ndarray, lats2: numpy.ndarray, lons2: numpy.ndarray) -> numpy.ndarray
+        Calculates the element-wise Haversine distance between arrays of points.
+    pixel_centers(transform: Affine, rows: numpy.ndarray, cols: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]
+        Calculates the latitude and longitude of the center of raster cells.
     adjust_detail_level(osm: dict, copernicus: dict, ghs_pop: dict) -> dict
         Adjusts the detail level of the given raster datasets to match the highest resolution.
     """
 
     def _calculate_travel_time(
-        self, distance_meters: float, transport_mode: str
-    ) -> float:
+        self, distance_meters: Union[float, np.ndarray], transport_mode: str
+    ) -> Union[float, np.ndarray]:
         """
         Calculates the estimated travel time for a given distance and transport mode.
 
         Parameters
         ----------
-        distance_meters : float
-            The distance to travel in meters.
+        distance_meters : float or numpy.ndarray
+            The distance to travel in meters, or an array of distances.
         transport_mode : str
-            The mode of transport (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_service').
+            The mode of transport (e.g., 'walk', 'bike', 'drive', 'all_public', 'drive_public').
 
         Returns
         -------
-        float
-            The estimated travel time in minutes.
-        """
-        # Speed constants in km/h
-        SPEEDS = {
-            "walk": 1.4,  # 5 km/h
-            "bike": 4.17,  # 15 km/h
-            "drive": 8.33,  # 30 km/h (urban)
-            "all_public": 8.33,  # 30 km/h
-            "drive_service": 8.33,  # as drive
-        }
-
-        # Medium time of fixed delays in minutes
-        FIXED_DELAYS = {
-            "walk": 0,
-            "bike": 30,  # take/return bike
-            "drive": 180,  # parking + take the car
-            "all_public": 420,  # walk to the stop (3 min) + estimated wait (4 min)
-            "drive_service": 180,  # wait + call
-        }
-
-        # Delay factors depending on traffic and semaphores
-        DELAY_FACTORS = {
-            "walk": 1.15,  # semaphores for pedestrians
-            "bike": 1.2,  # semaphores and traffic
-            "drive": 1.25,  # traffic and semaphores
-            "all_public": 1.10,  # traffic and semaphores
-            "drive_service": 1.25,  # as drive
-        }
-
-        base_speed = SPEEDS[transport_mode]
-        base_time_seconds = distance_meters / base_speed
+        float or numpy.ndarray
+            The estimated travel time in minutes, with the shape of the distances.
 
-        total_time_seconds = (
-            base_time_seconds * DELAY_FACTORS[transport_mode]
-        ) + FIXED_DELAYS[transport_mode]
-
-        total_time_minutes = round(total_time_seconds / 60, 1)
-
-        return total_time_minutes
+        Raises
+        ------
+        ValueError
+            If the transport mode is not valid.
+        """
+        total_time_seconds = speed_profiles.estimated_time(
+            distance_meters, transport_mode
+        )
+        return np.round(total_time_seconds / 60, 1)
 
     def get_coordinates_from_address(
         self, address: str
@@ -223,6 +202,70 @@ class geo:
 
         return float(R * c)
 
+    def haversine_distances(
+        self,
+        lats1: Union[float, np.ndarray],
+        lons1: Union[float, np.ndarray],
+        lats2: Union[float, np.ndarray],
+        lons2: Union[float, np.ndarray],
+    ) -> np.ndarray:
+        """
+        Calculates the element-wise Haversine distance between arrays of points.
+
+        Parameters
+        ----------
+        lats1 : float or numpy.ndarray
+            Latitude(s) of the first point(s).
+        lons1 : float or numpy.ndarray
+            Longitude(s) of the first point(s).
+        lats2 : float or numpy.ndarray
+            Latitude(s) of the second point(s).
+        lons2 : float or numpy.ndarray
+            Longitude(s) of the second point(s).
+
+        Returns
+        -------
+        numpy.ndarray
+            The Haversine distances in kilometers, broadcast over the inputs.
+        """
+        R = 6371  # Earth radius in km
+
+        lats1 = np.radians(lats1)
+        lats2 = np.radians(lats2)
+        dlat = lats2 - lats1
+        dlon = np.radians(lons2) - np.radians(lons1)
+        a = (
+            np.sin(dlat / 2) ** 2
+            + np.cos(lats1) * np.cos(lats2) * np.sin(dlon / 2) ** 2
+        )
+        return 2 * R * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def pixel_centers(
+        self, transform: Affine, rows: np.ndarray, cols: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculates the latitude and longitude of the center of raster cells.
+
+        Parameters
+        ----------
+        transform : affine.Affine
+            The affine transform of the raster.
+        rows : numpy.ndarray
+            The (possibly fractional) rows of the cells.
+        cols : numpy.ndarray
+            The (possibly fractional) columns of the cells.
+
+        Returns
+        -------
+        tuple
+            The latitudes and longitudes of the cell centers.
+        """
+        x = np.asarray(cols, dtype=np.float64) + 0.5
+        y = np.asarray(rows, dtype=np.float64) + 0.5
+        lons = transform.a * x + transform.b * y + transform.c
+        lats = transform.d * x + transform.e * y + transform.f
+        return lats, lons
+
     def adjust_detail_level(
         self, osm: Dict[str, Any], copernicus: Dict[str, Any], ghs_pop: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
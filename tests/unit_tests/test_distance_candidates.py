@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+from greento.distance.candidates import green_candidates
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def traffic_network():
+    """Fixture per creare una rete stradale lineare a doppio senso con cinque nodi."""
+    xs = [9.450, 9.451, 9.452, 9.453, 9.454]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': [1, 2, 3, 4, 5], 'x': xs, 'y': [45.12] * 5},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    pairs = [(i, i + 1) for i in range(4)] + [(i + 1, i) for i in range(4)]
+    edges = gpd.GeoDataFrame(
+        {
+            'u': [u + 1 for u, _ in pairs],
+            'v': [v + 1 for _, v in pairs],
+            'length': [80.0] * len(pairs),
+        },
+        geometry=[LineString([(xs[u], 45.12), (xs[v], 45.12)]) for u, v in pairs],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+def test_snapping(traffic_network):
+    """Test dell'aggancio dei punti verdi alla rete."""
+    candidates = green_candidates(traffic_network, np.array([45.12, 45.1201]), np.array([9.451, 9.454]))
+
+    np.testing.assert_array_equal(candidates.nodes, [1, 4])
+    assert candidates.offsets[0] == pytest.approx(0.0)
+    assert candidates.offsets[1] == pytest.approx(11.1, abs=0.1)
+    assert len(candidates) == 2
+
+
+def test_nearest(traffic_network):
+    """Test della ricerca del punto verde più vicino."""
+    candidates = green_candidates(traffic_network, np.array([45.12, 45.12]), np.array([9.451, 9.454]))
+
+    position, cost = candidates.nearest(3)
+
+    assert position == 1
+    assert cost == pytest.approx(80.0)
+
+
+def test_nearest_preselection(traffic_network, monkeypatch):
+    """Test che la preselezione parziale non cambi il risultato."""
+    rng = np.random.default_rng(1)
+    lats = 45.12 + rng.uniform(-0.0005, 0.0005, 50)
+    lons = rng.uniform(9.450, 9.454, 50)
+    candidates = green_candidates(traffic_network, lats, lons)
+    expected = [candidates.nearest(node) for node in range(5)]
+
+    monkeypatch.setattr(green_candidates, "PRESELECTED", 3)
+
+    for node in range(5):
+        position, cost = candidates.nearest(node)
+        assert cost == pytest.approx(expected[node][1])
+
+
+def test_nearest_empty(traffic_network):
+    """Test della ricerca senza punti verdi."""
+    candidates = green_candidates(traffic_network, np.zeros(0), np.zeros(0))
+
+    assert candidates.nearest(0) == (-1, float("inf"))
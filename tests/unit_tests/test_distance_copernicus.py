@@ -64,10 +64,9 @@ def distance_copernicus(mock_raster_data, mock_vector_traffic_area):
 
 @patch('greento.distance.copernicus.ox')
 @patch('greento.distance.copernicus.geo')
-@patch('greento.distance.copernicus.cKDTree')
 @patch('greento.distance.copernicus.nx')
 @patch('greento.distance.copernicus.tqdm')
-def test_get_nearest_green_position(mock_tqdm, mock_nx, mock_cKDTree, mock_geo, mock_ox, distance_copernicus):
+def test_get_nearest_green_position(mock_tqdm, mock_nx, mock_geo, mock_ox, distance_copernicus):
     """Test del metodo get_nearest_green_position."""
     mock_progress = MagicMock()
     mock_tqdm.return_value.__enter__.return_value = mock_progress
@@ -126,4 +125,61 @@ def test_directions(mock_tqdm, mock_ox, distance_copernicus):
         assert "distance_km" in result_dict
         assert "estimated_time_minutes" in result_dict
         assert result_dict["estimated_time_minutes"] == 30
-        assert result_dict["distance_km"] == 1.2
\ No newline at end of file
+        assert result_dict["distance_km"] == 1.2
+
+def test_get_nearest_green_position_field(distance_copernicus):
+    """Test del metodo get_nearest_green_position con il campo precalcolato."""
+    expected = distance_copernicus.get_nearest_green_position(50.1, 10.1)
+
+    field = distance_copernicus.build_green_field()
+    result = distance_copernicus.get_nearest_green_position(50.1, 10.1)
+
+    assert distance_copernicus.green_field is field
+    assert result == pytest.approx(expected)
+    assert result == pytest.approx((49.65, 10.35))
+    # the last node of the one-way chain cannot reach any green
+    assert distance_copernicus.get_nearest_green_position(50.5, 10.5) is None
+
+
+def test_get_nearest_green_positions(distance_copernicus):
+    """Test del metodo get_nearest_green_positions."""
+    lats = np.array([50.1, 50.5, 50.1])
+    lons = np.array([10.1, 10.5, 10.1])
+
+    green_lats, green_lons, distances = distance_copernicus.get_nearest_green_positions(lats, lons)
+
+    assert green_lats[0] == pytest.approx(distance_copernicus.get_nearest_green_position(50.1, 10.1)[0])
+    assert green_lons[0] == pytest.approx(10.35)
+    assert distances[0] > 0
+    assert np.isnan(green_lats[1]) and np.isnan(distances[1])
+    assert distances[2] == distances[0]
+
+
+def test_get_nearest_green_positions_invalid(distance_copernicus):
+    """Test del metodo get_nearest_green_positions con coordinate non valide."""
+    with pytest.raises(ValueError, match="Coordinates not valid"):
+        distance_copernicus.get_nearest_green_positions(np.array([50.1, np.nan]), np.array([10.1, 10.2]))
+
+
+def test_od_matrix(distance_copernicus):
+    """Test della matrice origine-destinazione."""
+    origins = np.array([[50.1, 10.1], [50.1, 10.1], [50.5, 10.5]])
+    destinations = np.array([[50.3, 10.3], [50.5, 10.5]])
+
+    distances, times = distance_copernicus.od_matrix(origins, destinations, "bike", chunk_size=2)
+
+    np.testing.assert_allclose(distances[0], [300.0, 750.0])
+    np.testing.assert_allclose(distances[1], distances[0])
+    assert np.isinf(distances[2, 0]) and distances[2, 1] == 0.0
+    np.testing.assert_allclose(times[0], [1.9, 4.1])
+
+
+
+def test_directions_stored_landmarks(distance_copernicus):
+    """Test del metodo directions con le tabelle dei landmark già presenti nella rete."""
+    distance_copernicus._network().landmarks("walk", count=2)
+
+    result = json.loads(distance_copernicus.directions(50.1, 10.1, 50.5, 10.5, "walk"))
+
+    assert distance_copernicus.preprocessed_graph is None
+    assert result["distance_km"] == pytest.approx(0.75)
@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+from greento.distance.field import green_field
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def traffic_network():
+    """Fixture per creare una rete stradale lineare a senso unico 1 -> 2 -> 3 -> 4."""
+    xs = [9.450, 9.451, 9.452, 9.453]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': [1, 2, 3, 4], 'x': xs, 'y': [45.12] * 4},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    edges = gpd.GeoDataFrame(
+        {'u': [1, 2, 3], 'v': [2, 3, 4], 'length': [100.0, 100.0, 100.0]},
+        geometry=[LineString([(xs[i], 45.12), (xs[i + 1], 45.12)]) for i in range(3)],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+def test_build(traffic_network):
+    """Test della costruzione del campo di distanza dal verde."""
+    # green points exactly on nodes 2 and 4
+    field = green_field.build(traffic_network, np.array([45.12, 45.12]), np.array([9.451, 9.453]))
+
+    np.testing.assert_allclose(field.distances, [100.0, 0.0, 100.0, 0.0], atol=1e-6)
+    np.testing.assert_array_equal(field.nearest, [0, 0, 1, 1])
+
+
+def test_build_directed(traffic_network):
+    """Test che il campo segua il verso degli archi."""
+    field = green_field.build(traffic_network, np.array([45.12]), np.array([9.451]))
+
+    assert field.distances[0] == pytest.approx(100.0)
+    # nodes after the green cannot reach it on a one-way street
+    assert np.isinf(field.distances[2:]).all()
+    np.testing.assert_array_equal(field.nearest, [0, 0, -1, -1])
+    assert field.nearest_green(45.12, 9.4531) is None
+
+
+def test_query(traffic_network):
+    """Test delle interrogazioni puntuali e vettoriali."""
+    field = green_field.build(traffic_network, np.array([45.12, 45.12]), np.array([9.451, 9.453]))
+
+    assert field.nearest_green(45.12, 9.4501) == (45.12, 9.451)
+    lats, lons, distances = field.query(np.array([45.12, 45.12]), np.array([9.4501, 9.4521]))
+    np.testing.assert_allclose(lons, [9.451, 9.453])
+    # the origins lie a tenth along their edges, so only the rest of the edge is walked
+    np.testing.assert_allclose(distances, [90.0, 90.0], atol=1e-6)
+
+
+def test_save_load(traffic_network, tmp_path):
+    """Test della serializzazione del campo."""
+    field = green_field.build(traffic_network, np.array([45.12]), np.array([9.453]))
+    path = str(tmp_path / "field.npz")
+    field.save(path)
+
+    loaded = green_field.load(path, traffic_network)
+
+    np.testing.assert_array_equal(loaded.nearest, field.nearest)
+    np.testing.assert_allclose(loaded.distances, field.distances)
+
+
+def test_load_other_network(traffic_network, tmp_path):
+    """Test del caricamento su una rete diversa."""
+    field = green_field.build(traffic_network, np.array([45.12]), np.array([9.453]))
+    path = str(tmp_path / "field.npz")
+    field.save(path)
+    nodes, edges = traffic_network
+    other = prepared_network(nodes.iloc[:3], edges.iloc[:2])
+
+    with pytest.raises(ValueError, match="Green field does not match the traffic network"):
+        green_field.load(path, other)
@@ -4,8 +4,10 @@ import numpy as np
 import geopandas as gpd
 from shapely.geometry import Point, LineString
 import json
+import pandas as pd
 import rasterio
 from greento.distance.osm import osm
+from greento.transit.gtfs import gtfs_feed
 
 
 @pytest.fixture
@@ -64,10 +66,9 @@ def distance_osm(mock_osm_green, mock_vector_traffic_area):
 
 @patch('greento.distance.osm.ox')
 @patch('greento.distance.osm.geo')
-@patch('greento.distance.osm.cKDTree')
 @patch('greento.distance.osm.nx')
 @patch('greento.distance.osm.tqdm')
-def test_get_nearest_green_position(mock_tqdm, mock_nx, mock_cKDTree, mock_geo, mock_ox, distance_osm):
+def test_get_nearest_green_position(mock_tqdm, mock_nx, mock_geo, mock_ox, distance_osm):
     """Test del metodo get_nearest_green_position."""
     mock_progress = MagicMock()
     mock_tqdm.return_value.__enter__.return_value = mock_progress
@@ -126,4 +127,265 @@ def test_directions(mock_tqdm, mock_ox, distance_osm):
         assert "distance_km" in result_dict
         assert "estimated_time_minutes" in result_dict
         assert result_dict["estimated_time_minutes"] == 30
-        assert result_dict["distance_km"] == 1.2
\ No newline at end of file
+        assert result_dict["distance_km"] == 1.2
+
+def test_get_nearest_green_position_field(distance_osm):
+    """Test del metodo get_nearest_green_position con il campo precalcolato."""
+    expected = distance_osm.get_nearest_green_position(50.1, 10.1)
+
+    field = distance_osm.build_green_field()
+    result = distance_osm.get_nearest_green_position(50.1, 10.1)
+
+    assert distance_osm.green_field is field
+    assert result == pytest.approx(expected)
+    assert result == pytest.approx((49.55, 10.45))
+    # the last node of the one-way chain cannot reach any green
+    assert distance_osm.get_nearest_green_position(50.5, 10.5) is None
+
+
+def test_get_nearest_green_positions(distance_osm):
+    """Test del metodo get_nearest_green_positions."""
+    lats = np.array([50.1, 50.5])
+    lons = np.array([10.1, 10.5])
+
+    green_lats, green_lons, distances = distance_osm.get_nearest_green_positions(lats, lons)
+
+    assert green_lats[0] == pytest.approx(49.55)
+    assert green_lons[0] == pytest.approx(10.45)
+    assert distances[0] > 0
+    assert np.isnan(green_lats[1]) and np.isnan(distances[1])
+
+
+def test_get_nearest_green_positions_time_field(distance_osm):
+    """Test che il campo per distanza delle ricerche multiple sia costruito una sola volta."""
+    field = distance_osm.build_green_field("walk")
+    lats = np.array([50.1, 50.5])
+    lons = np.array([10.1, 10.5])
+
+    with patch('greento.distance.osm.green_field.from_candidates', wraps=field.from_candidates) as build:
+        first = distance_osm.get_nearest_green_positions(lats, lons)
+        second = distance_osm.get_nearest_green_positions(lats, lons)
+
+    assert build.call_count == 1
+    assert distance_osm.green_field is field
+    np.testing.assert_array_equal(first[2], second[2])
+    assert first[0][0] == pytest.approx(49.55)
+
+
+@pytest.fixture
+def road_with_greens():
+    """Fixture per una strada a doppio senso con un'area verde a ciascun capo."""
+    data = np.zeros((10, 40), dtype=np.int8)
+    data[5, 9] = 1
+    data[5, 34] = 1
+    green = {
+        'data': data,
+        'transform': rasterio.Affine(0.001, 0, 9.99, 0, -0.001, 50.005),
+        'crs': 'EPSG:4326',
+        'shape': data.shape
+    }
+    nodes = gpd.GeoDataFrame(
+        {
+            'osmid': [1, 2, 3],
+            'x': [10.0, 10.01, 10.02],
+            'y': [50.0, 50.0, 50.0],
+            'geometry': [Point(10.0, 50.0), Point(10.01, 50.0), Point(10.02, 50.0)]
+        }
+    )
+    edges = gpd.GeoDataFrame(
+        {
+            'u': [1, 2, 2, 3],
+            'v': [2, 1, 3, 2],
+            'length': [715.5, 715.5, 715.5, 715.5],
+            'highway': ['residential'] * 4,
+            'geometry': [
+                LineString([(10.0, 50.0), (10.01, 50.0)]),
+                LineString([(10.01, 50.0), (10.0, 50.0)]),
+                LineString([(10.01, 50.0), (10.02, 50.0)]),
+                LineString([(10.02, 50.0), (10.01, 50.0)])
+            ]
+        }
+    )
+    return green, (nodes, edges)
+
+
+def test_get_nearest_green_position_mid_edge(road_with_greens):
+    """Test delle ricerche singola e multipla da un punto a metà di un arco."""
+    green, network = road_with_greens
+    # closer to the middle node, whose nearest green is the western one,
+    # but along the edge the eastern green is closer
+    lat, lon = 50.0, 10.014
+
+    single = osm(green, network).get_nearest_green_position(lat, lon)
+    green_lats, green_lons, _ = osm(green, network).get_nearest_green_positions(
+        np.array([lat]), np.array([lon])
+    )
+    with_field = osm(green, network)
+    with_field.build_green_field()
+    with_trees = osm(green, network)
+    with_trees.cache_path_trees()
+
+    assert single == pytest.approx((green_lats[0], green_lons[0]))
+    assert single[1] == pytest.approx(10.0245)
+    assert with_field.get_nearest_green_position(lat, lon) == pytest.approx(single)
+    assert with_trees.get_nearest_green_position(lat, lon) == pytest.approx(single)
+
+
+def test_od_matrix_mid_edge(road_with_greens):
+    """Test della matrice origine-destinazione e di directions da un punto a metà di un arco."""
+    distance = osm(*road_with_greens)
+
+    distances, _ = distance.od_matrix(
+        np.array([[50.0, 10.014]]), np.array([[50.0, 10.02], [50.0, 10.0]])
+    )
+    by_time, _ = distance.od_matrix(
+        np.array([[50.0, 10.014]]), np.array([[50.0, 10.02]]), weight="travel_time"
+    )
+    result = json.loads(distance.directions(50.0, 10.014, 50.0, 10.02, "walk"))
+
+    # the rest of the edge, not the whole edge from the nearest node
+    np.testing.assert_allclose(distances, [[429.3, 286.2 + 715.5]], rtol=1e-3)
+    np.testing.assert_allclose(by_time, distances[:, :1], rtol=1e-3)
+    assert result["distance_km"] == pytest.approx(0.4293, rel=1e-3)
+
+
+def test_get_nearest_green_positions_invalid(distance_osm):
+    """Test del metodo get_nearest_green_positions con coordinate non valide."""
+    with pytest.raises(ValueError, match="Coordinates not valid"):
+        distance_osm.get_nearest_green_positions(np.array([50.1]), np.array([10.1, 10.2]))
+
+
+def test_od_matrix(distance_osm):
+    """Test della matrice origine-destinazione."""
+    origins = np.array([[50.1, 10.1], [50.5, 10.5]])
+    destinations = np.array([[50.3, 10.3], [50.5, 10.5]])
+
+    distances, times = distance_osm.od_matrix(origins, destinations, "walk")
+
+    np.testing.assert_allclose(distances, [[300.0, 750.0], [np.inf, 0.0]])
+    assert times[0, 0] == pytest.approx(4.1)
+    assert np.isinf(times[1, 0])
+
+
+def test_od_matrix_travel_time_sparse(distance_osm):
+    """Test della matrice origine-destinazione sparsa lungo i cammini più veloci."""
+    origins = np.array([[50.1, 10.1], [50.5, 10.5]])
+    destinations = np.array([[50.3, 10.3], [50.5, 10.5]])
+
+    distances, times = distance_osm.od_matrix(
+        origins, destinations, "walk", weight="travel_time", chunk_size=1, sparse=True
+    )
+
+    assert distances.nnz == 3
+    np.testing.assert_allclose(distances.toarray()[0], [300.0, 750.0])
+    assert times[0, 1] == pytest.approx(10.3)
+
+
+def test_od_matrix_invalid(distance_osm):
+    """Test della matrice origine-destinazione con parametri non validi."""
+    with pytest.raises(ValueError, match="Coordinates not valid"):
+        distance_osm.od_matrix(np.array([[np.nan, 10.1]]), np.array([[50.1, 10.1]]))
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        distance_osm.od_matrix(np.array([[50.1, 10.1]]), np.array([[50.1, 10.1]]), "boat")
+    with pytest.raises(ValueError, match="Weight not valid"):
+        distance_osm.od_matrix(np.array([[50.1, 10.1]]), np.array([[50.1, 10.1]]), weight="cost")
+
+
+def test_directions_landmarks(distance_osm):
+    """Test del metodo directions con le tabelle dei landmark."""
+    tables = distance_osm.build_landmarks("walk", count=2)
+
+    result = json.loads(distance_osm.directions(50.1, 10.1, 50.3, 10.3, "walk"))
+
+    assert len(tables) == 2
+    assert distance_osm.preprocessed_graph is None
+    assert result["distance_km"] == pytest.approx(0.3)
+    assert result["estimated_time_minutes"] == pytest.approx(4.1)
+    # the last node of the one-way chain cannot reach the first one
+    assert distance_osm.directions(50.5, 10.5, 50.1, 10.1, "walk") is None
+
+
+def test_cached_path_trees(distance_osm):
+    """Test delle interrogazioni ripetute con gli alberi dei cammini minimi in cache."""
+    expected = distance_osm.get_nearest_green_position(50.1, 10.1)
+    cache = distance_osm.cache_path_trees("walk")
+
+    assert distance_osm.get_nearest_green_position(50.1, 10.1) == pytest.approx(expected)
+    first = json.loads(distance_osm.directions(50.1, 10.1, 50.3, 10.3, "walk"))
+    second = json.loads(distance_osm.directions(50.1, 10.1, 50.5, 10.5, "walk"))
+
+    assert first["distance_km"] == pytest.approx(0.3)
+    assert second["distance_km"] == pytest.approx(0.75)
+    assert distance_osm.preprocessed_graph is None
+    # one tree limited for the nearest green, one unlimited for both directions
+    assert (cache.misses, cache.hits, len(cache)) == (2, 1, 2)
+
+
+def test_directions_fastest_route(mock_osm_green):
+    """Test di directions con landmark, alberi in cache e Dijkstra dove il percorso più breve non è il più veloce."""
+    nodes = gpd.GeoDataFrame(
+        {
+            'osmid': [1, 2, 3],
+            'x': [10.0, 10.01, 10.005],
+            'y': [50.0, 50.0, 50.002],
+            'geometry': [Point(10.0, 50.0), Point(10.01, 50.0), Point(10.005, 50.002)]
+        }
+    )
+    edges = gpd.GeoDataFrame(
+        {
+            'u': [1, 1, 3],
+            'v': [2, 3, 2],
+            'length': [1000, 600, 600],
+            'highway': ['residential', 'primary', 'primary'],
+            'geometry': [
+                LineString([(10.0, 50.0), (10.01, 50.0)]),
+                LineString([(10.0, 50.0), (10.005, 50.002)]),
+                LineString([(10.005, 50.002), (10.01, 50.0)])
+            ]
+        }
+    )
+    by_search = osm(mock_osm_green, (nodes, edges))
+    by_landmarks = osm(mock_osm_green, (nodes, edges))
+    by_landmarks.build_landmarks("drive", count=2)
+    by_trees = osm(mock_osm_green, (nodes, edges))
+    by_trees.cache_path_trees("drive")
+    # the tables by length would lead to the shortest route, they must be ignored
+    by_length = osm(mock_osm_green, (nodes, edges))
+    by_length.build_landmarks("length", count=2)
+    by_length.cache_path_trees("length")
+
+    results = [
+        json.loads(distance.directions(50.0, 10.0, 50.0, 10.01, "drive"))
+        for distance in (by_search, by_landmarks, by_trees, by_length)
+    ]
+
+    # 1.2 km on the primary roads at 50 km/h instead of 1 km on the residential one at 30 km/h
+    assert results[0]["distance_km"] == pytest.approx(1.2)
+    assert all(result == results[0] for result in results)
+    assert json.loads(by_search.directions(50.0, 10.0, 50.0, 10.01, "walk"))["distance_km"] == pytest.approx(1.0)
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        by_search.directions(50.0, 10.0, 50.0, 10.01, "boat")
+
+
+def test_directions_transit(distance_osm):
+    """Test del metodo directions con l'orario del trasporto pubblico."""
+    distance_osm.build_landmarks("all_public", count=2)
+    by_road = json.loads(distance_osm.directions(50.1, 10.1, 50.5, 10.5, "all_public"))
+    distance_osm.transit = gtfs_feed.from_frames(
+        pd.DataFrame({'stop_id': ['A', 'B'], 'stop_lat': [50.1, 50.5], 'stop_lon': [10.1, 10.5]}),
+        pd.DataFrame({'trip_id': ['T']}),
+        pd.DataFrame({
+            'trip_id': ['T', 'T'],
+            'stop_id': ['A', 'B'],
+            'stop_sequence': ['1', '2'],
+            'arrival_time': ['08:01:00', '08:03:00'],
+            'departure_time': ['08:01:00', '08:03:00'],
+        }),
+    )
+
+    by_transit = json.loads(distance_osm.directions(50.1, 10.1, 50.5, 10.5, "all_public"))
+
+    assert by_transit["distance_km"] == by_road["distance_km"]
+    # one minute of wait and two on board, instead of the fixed delays of the road estimate
+    assert by_road["estimated_time_minutes"] == pytest.approx(8.7)
+    assert by_transit["estimated_time_minutes"] == pytest.approx(3.0)
@@ -0,0 +1,110 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from affine import Affine
+from shapely.geometry import Point, LineString
+from greento.green.patches import green_patch_index
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def green_raster():
+    """Fixture per creare un raster con un parco 4x4 e un'aiuola di un pixel."""
+    data = np.zeros((8, 8), dtype=np.uint8)
+    data[1:5, 1:5] = 1
+    data[6, 7] = 1
+    return {
+        'data': data,
+        'transform': Affine(10, 0, 500000, 0, -10, 5000080),
+        'crs': 'EPSG:32632',
+        'shape': (8, 8),
+    }
+
+
+@pytest.fixture
+def geographic_raster():
+    """Fixture per creare un raster geografico con un parco 3x3."""
+    data = np.zeros((5, 5), dtype=np.uint8)
+    data[1:4, 1:4] = 1
+    return {
+        'data': data,
+        'transform': Affine(0.0001, 0, 9.45, 0, -0.0001, 45.1205),
+        'crs': 'EPSG:4326',
+        'shape': (5, 5),
+    }
+
+
+def test_patches(green_raster):
+    """Test dell'etichettatura e delle misure delle aree verdi."""
+    index = green_patch_index(green_raster)
+
+    assert index.num_patches == 2
+    np.testing.assert_allclose(index.area_sqm, [1600.0, 100.0])
+    np.testing.assert_array_equal(index.bbox, [[1, 5, 1, 5], [6, 7, 7, 8]])
+    # the inner 2x2 pixels of the park are not entry pixels
+    np.testing.assert_array_equal(np.diff(index.entry_ptr), [12, 1])
+
+
+def test_select(green_raster):
+    """Test del filtro per area minima."""
+    index = green_patch_index(green_raster)
+
+    np.testing.assert_array_equal(index.select(), [0, 1])
+    np.testing.assert_array_equal(index.select(min_area_sqm=500), [0])
+
+
+def test_entry_points(green_raster):
+    """Test delle coordinate dei pixel di ingresso."""
+    index = green_patch_index(green_raster)
+
+    lats, lons, patches = index.entry_points(np.array([1]))
+
+    np.testing.assert_array_equal(patches, [1])
+    assert lons[0] == pytest.approx(500075.0)
+    assert lats[0] == pytest.approx(5000015.0)
+
+
+def test_geographic_area(geographic_raster):
+    """Test dell'area dei pixel in coordinate geografiche."""
+    index = green_patch_index(geographic_raster)
+
+    # 9 pixels of ~11.06 m x ~7.86 m at 45 deg N
+    assert index.area_sqm[0] == pytest.approx(9 * 11.06 * 7.86, rel=0.01)
+    assert index.centroid_lats[0] == pytest.approx(45.12025)
+    assert index.centroid_lons[0] == pytest.approx(9.45025)
+
+
+def test_empty():
+    """Test di un raster senza verde."""
+    index = green_patch_index({
+        'data': np.zeros((3, 3), dtype=np.uint8),
+        'transform': Affine(10, 0, 0, 0, -10, 30),
+        'crs': 'EPSG:32632',
+        'shape': (3, 3),
+    })
+
+    assert index.num_patches == 0
+    assert len(index.select()) == 0
+    assert len(index.entry_points()[0]) == 0
+
+
+def test_snap(geographic_raster):
+    """Test dell'aggancio delle aree verdi alla rete."""
+    nodes = gpd.GeoDataFrame(
+        {'osmid': [1, 2], 'x': [9.4500, 9.4510], 'y': [45.1200, 45.1200]},
+        geometry=[Point(9.4500, 45.1200), Point(9.4510, 45.1200)],
+        crs="EPSG:4326",
+    )
+    edges = gpd.GeoDataFrame(
+        {'u': [1], 'v': [2], 'length': [78.0]},
+        geometry=[LineString([(9.4500, 45.1200), (9.4510, 45.1200)])],
+        crs="EPSG:4326",
+    )
+    network = prepared_network(nodes, edges)
+    index = green_patch_index(geographic_raster)
+
+    nodes, offsets = index.snap(network)
+
+    np.testing.assert_array_equal(nodes, [0])
+    assert offsets[0] == pytest.approx(20.4, abs=0.1)
+    assert index.snap(network)[0] is nodes
@@ -0,0 +1,108 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from rasterio.transform import Affine
+from shapely.geometry import Point, LineString
+from greento.metrics.accessibility import green_accessibility
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def network():
+    """Fixture per creare una strada a doppio senso di 21 nodi distanti 100 m."""
+    xs = [9.450 + 0.001 * i for i in range(21)]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': range(1, 22), 'x': xs, 'y': [45.12] * 21},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    pairs = [(i, i + 1) for i in range(20)] + [(i + 1, i) for i in range(20)]
+    edges = gpd.GeoDataFrame(
+        {'u': [a + 1 for a, _ in pairs], 'v': [b + 1 for _, b in pairs], 'length': [100.0] * len(pairs)},
+        geometry=[LineString([(xs[a], 45.12), (xs[b], 45.12)]) for a, b in pairs],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+@pytest.fixture
+def green():
+    """Fixture per creare un raster del verde con un parco all'inizio della strada."""
+    data = np.zeros((1, 21), dtype=np.uint8)
+    data[0, 0] = 1
+    return {'data': data, 'transform': Affine(0.001, 0, 9.4495, 0, -0.001, 45.1205), 'crs': 'EPSG:4326', 'shape': (1, 21)}
+
+
+@pytest.fixture
+def ghs_pop():
+    """Fixture per creare un raster di popolazione con tre celle abitate e una vuota."""
+    return {
+        'data': np.array([[10.0, 20.0, 70.0, 0.0]]),
+        'transform': Affine(0.01, 0, 9.445, 0, -0.001, 45.1205),
+        'crs': 'EPSG:4326',
+        'shape': (1, 4),
+    }
+
+
+def test_compute(network, green, ghs_pop):
+    """Test dei raster di distanza e tempo e del riepilogo pesato per popolazione."""
+    result = green_accessibility(green, network, ghs_pop).compute('walk', max_times=[5, 15, 30])
+
+    distance = result['distance']['data']
+    assert distance.shape == (1, 4)
+    np.testing.assert_allclose(distance[0, :3], [0.0, 1000.0, 2000.0], atol=0.5)
+    assert np.isnan(distance[0, 3])
+    # 1000 m at 5 km/h take 12 minutes
+    np.testing.assert_allclose(result['time']['data'][0, :3], [0.0, 12.0, 24.0], atol=0.01)
+
+    summary = result['summary']
+    assert summary['total_population'] == 100
+    assert summary['distance_meters'] == pytest.approx([1000.0, 2000.0, 2000.0, 2000.0], abs=0.5)
+    assert summary['population_share_within'] == [0.1, 0.3, 1.0]
+    assert summary['population_share_unreachable'] == 0.0
+
+
+def test_compute_no_green(network, green, ghs_pop):
+    """Test della popolazione senza aree verdi raggiungibili."""
+    green['data'][:] = 0
+
+    summary = green_accessibility(green, network, ghs_pop).compute('walk')['summary']
+
+    assert summary['time_minutes'] == [None] * 4
+    assert summary['population_share_unreachable'] == 1.0
+
+
+def test_projected_population(network, green):
+    """Test di un raster di popolazione in coordinate proiettate."""
+    ghs_pop = {
+        'data': np.array([[5.0]]),
+        'transform': Affine(10, 0, 1e6 - 5, 0, -10, 1e6 + 5),
+        'crs': 'EPSG:3857',
+        'shape': (1, 1),
+    }
+
+    _, _, lats, lons, population = green_accessibility(green, network, ghs_pop).populated_pixels()
+
+    assert lons[0] == pytest.approx(8.983, abs=0.001)
+    assert lats[0] == pytest.approx(8.946, abs=0.001)
+    assert population.tolist() == [5.0]
+
+
+def test_weighted_percentiles():
+    """Test dei percentili pesati."""
+    values = np.array([3.0, 1.0, np.inf, 2.0])
+    weights = np.array([1.0, 1.0, 2.0, 0.0])
+
+    result = green_accessibility.weighted_percentiles(values, weights, [10, 25, 50, 100])
+
+    np.testing.assert_array_equal(result, [1.0, 1.0, 3.0, np.inf])
+
+
+def test_invalid_params(network, green, ghs_pop):
+    """Test dei parametri non validi."""
+    accessibility = green_accessibility(green, network, ghs_pop)
+
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        accessibility.compute('plane')
+    with pytest.raises(ValueError, match="Max time not valid"):
+        accessibility.compute('walk', max_times=[0])
@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+from greento.metrics.cache import isochrone_cache
+
+
+def test_lru_eviction():
+    """Test dell'eliminazione dei risultati usati meno di recente."""
+    cache = isochrone_cache(max_entries=2)
+    cache.put(('a',), '1')
+    cache.put(('b',), '2')
+    assert cache.get(('a',)) == '1'
+    cache.put(('c',), '3')
+
+    assert ('b',) not in cache
+    assert ('a',) in cache and ('c',) in cache
+    assert cache.get(('b',)) is None
+    assert cache.stats() == {
+        'entries': 2, 'max_entries': 2, 'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5,
+    }
+
+
+def test_snapped_origins():
+    """Test della memoria delle origini già agganciate alla rete."""
+    cache = isochrone_cache(max_entries=1)
+    assert cache.snapped(('f', 45.0, 7.0, 'walk')) is None
+    cache.remember(('f', 45.0, 7.0, 'walk'), ((1, 2), (0.0, 3.0)))
+    assert cache.snapped(('f', 45.0, 7.0, 'walk')) == ((1, 2), (0.0, 3.0))
+    cache.remember(('f', 45.1, 7.0, 'walk'), ((3, 4), (1.0, 2.0)))
+
+    assert cache.snapped(('f', 45.0, 7.0, 'walk')) is None
+    cache.clear()
+    assert cache.snapped(('f', 45.1, 7.0, 'walk')) is None
+
+
+def test_save_and_load(tmp_path):
+    """Test della persistenza su disco della cache, con le chiavi annidate."""
+    path = str(tmp_path / 'isochrones.json')
+    cache = isochrone_cache(path=path)
+    key = ('fingerprint', ((1, 2), (0.0, 5.0)), (5.0, 10.0), True, 'walk', 'nodes', 50.0, 0.0)
+    cache.put(key, '{"green_area_sqm": 200}')
+    cache.save()
+
+    loaded = isochrone_cache(path=path)
+    assert loaded.get(key) == '{"green_area_sqm": 200}'
+    with pytest.raises(ValueError, match="Cache path not valid"):
+        isochrone_cache().save()
+
+
+def test_load_corrupted(tmp_path):
+    """Test che un file di cache non valido venga ignorato."""
+    path = tmp_path / 'isochrones.json'
+    path.write_text('not json')
+
+    assert len(isochrone_cache(path=str(path))) == 0
+
+
+def test_origin_and_fingerprint():
+    """Test delle chiavi dell'origine agganciata e dell'impronta dei dati."""
+    assert isochrone_cache.origin(np.array([3, 4]), np.array([12.3, np.inf])) == ((3, 4), (12.0, -1.0))
+    assert isochrone_cache.origin(np.array([3, 4]), np.array([11.8, 0.2])) == ((3, 4), (12.0, 0.0))
+
+    data = np.array([[0, 1], [1, 0]], dtype=np.uint8)
+    assert isochrone_cache.fingerprint(data, (1, 2)) == isochrone_cache.fingerprint(data.copy(), (1, 2))
+    assert isochrone_cache.fingerprint(data, (1, 2)) != isochrone_cache.fingerprint(1 - data, (1, 2))
+    assert isochrone_cache.fingerprint(data) != isochrone_cache.fingerprint(data.astype(np.int64))
@@ -0,0 +1,104 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from rasterio.transform import Affine
+from shapely.geometry import Point, LineString
+from greento.metrics.catchment import green_catchment
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def network():
+    """Fixture per creare una strada a doppio senso di 21 nodi distanti 100 m."""
+    xs = [9.450 + 0.001 * i for i in range(21)]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': range(1, 22), 'x': xs, 'y': [45.12] * 21},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    pairs = [(i, i + 1) for i in range(20)] + [(i + 1, i) for i in range(20)]
+    edges = gpd.GeoDataFrame(
+        {'u': [a + 1 for a, _ in pairs], 'v': [b + 1 for _, b in pairs], 'length': [100.0] * len(pairs)},
+        geometry=[LineString([(xs[a], 45.12), (xs[b], 45.12)]) for a, b in pairs],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+@pytest.fixture
+def catchment(network):
+    """Fixture per creare due parchi agli estremi della strada e tre celle abitate."""
+    data = np.zeros((1, 21), dtype=np.uint8)
+    data[0, [0, 20]] = 1
+    green = {'data': data, 'transform': Affine(0.001, 0, 9.4495, 0, -0.001, 45.1205), 'crs': 'EPSG:4326', 'shape': (1, 21)}
+    ghs_pop = {
+        'data': np.array([[10.0, 20.0, 70.0, 0.0]]),
+        'transform': Affine(0.01, 0, 9.445, 0, -0.001, 45.1205),
+        'crs': 'EPSG:4326',
+        'shape': (1, 4),
+    }
+    return green_catchment(green, network, ghs_pop)
+
+
+def test_travel_times(catchment):
+    """Test della matrice sparsa dei tempi tra celle e parchi."""
+    times, rows, cols, population, patches = catchment.travel_times('walk', 15, chunk_size=1)
+
+    assert times.shape == (3, 2)
+    # the parks are 24 minutes apart, only the pairs within 15 minutes are stored
+    assert times.nnz == 4
+    dense = times.toarray()
+    first, last = np.argsort(catchment.patches.centroid_lons[patches])
+    np.testing.assert_allclose(dense[:, first], [0.0, 12.0, 0.0], atol=0.01)
+    np.testing.assert_allclose(dense[:, last], [0.0, 12.0, 0.0][::-1], atol=0.01)
+    # the cells on a park are stored even with a zero travel time
+    assert np.diff(times.indptr).tolist() == [1, 2, 1]
+    np.testing.assert_array_equal(population, [10.0, 20.0, 70.0])
+
+
+def test_two_step(catchment):
+    """Test del punteggio 2SFCA con la competizione tra le celle."""
+    result = catchment.compute('walk', 15, method='2sfca')
+
+    area = catchment.patches.area_sqm[0]
+    score = result['score']['data'][0]
+    # the first park serves 30 people, the second one 90
+    np.testing.assert_allclose(score[:3], [area / 30, area / 30 + area / 90, area / 90], rtol=1e-5)
+    assert np.isnan(score[3])
+    summary = result['summary']
+    assert summary['decay'] == 'binary'
+    # every park is shared, so the weighted mean is the area per person
+    assert summary['mean_score'] == pytest.approx(2 * area / 100, rel=1e-4)
+    assert summary['population_share_unreachable'] == 0.0
+
+
+def test_gravity(catchment):
+    """Test del punteggio gravitazionale con decadimento a potenza."""
+    result = catchment.compute('walk', 15, method='gravity', beta=1.0)
+
+    area = catchment.patches.area_sqm[0]
+    np.testing.assert_allclose(
+        result['score']['data'][0, :3], [area, 2 * area / 12, area], rtol=1e-4
+    )
+
+
+def test_decay():
+    """Test delle funzioni di decadimento."""
+    minutes = np.array([0.0, 0.5, 15.0])
+
+    np.testing.assert_allclose(green_catchment.decay(minutes, 'binary'), [1, 1, 1])
+    np.testing.assert_allclose(green_catchment.decay(minutes, 'gaussian', 15), [1, 0.9986, 0], atol=1e-4)
+    np.testing.assert_allclose(green_catchment.decay(minutes, 'exponential', beta=0.1), np.exp(-0.1 * minutes))
+    np.testing.assert_allclose(green_catchment.decay(minutes, 'power', beta=2), [1, 1, 1 / 225])
+    with pytest.raises(ValueError, match="Decay function not valid"):
+        green_catchment.decay(minutes, 'linear')
+
+
+def test_invalid_params(catchment):
+    """Test dei parametri non validi."""
+    with pytest.raises(ValueError, match="Method not valid"):
+        catchment.compute(method='huff')
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        catchment.compute('plane')
+    with pytest.raises(ValueError, match="Max time not valid"):
+        catchment.compute('walk', max_time=-1)
@@ -154,6 +154,10 @@ import pytest
 from unittest.mock import patch, MagicMock, PropertyMock
 import numpy as np
 import json
+import geopandas as gpd
+import pandas as pd
+from rasterio.transform import Affine
+from shapely.geometry import LineString, Point
 from greento.metrics.copernicus import copernicus
 
 
@@ -228,46 +232,183 @@ def test_green_area_per_person_zero_population(mock_tqdm, metrics):
     assert result_dict['green_area_per_person'] == float('inf')
 
 
-@patch('greento.metrics.copernicus.tqdm')
-@patch('greento.metrics.copernicus.ox.graph_from_gdfs')
-@patch('greento.metrics.copernicus.ox.distance.nearest_nodes')
-def test_get_isochrone_green_basic(mock_nearest_nodes, mock_graph_from_gdfs, mock_tqdm, metrics):
+@pytest.fixture
+def traffic_network():
+    """Fixture per creare una rete stradale reale a catena."""
+    nodes = gpd.GeoDataFrame(
+        {
+            'x': [9.4505, 9.4515, 9.4525, 9.4535],
+            'y': [45.1205, 45.1205, 45.1205, 45.1205],
+        },
+        geometry=[Point(9.4505 + 0.001 * i, 45.1205) for i in range(4)],
+        index=pd.Index([10, 20, 30, 40], name='osmid'),
+    )
+    edges = gpd.GeoDataFrame(
+        {
+            'u': [10, 20, 20, 30, 30, 40],
+            'v': [20, 10, 30, 20, 40, 30],
+            'length': [100.0, 100.0, 100.0, 100.0, 1000.0, 1000.0],
+        },
+        geometry=[LineString([(0, 0), (1, 1)])] * 6,
+    )
+    return nodes, edges
+
+
+@patch('greento.metrics.interface.tqdm')
+def test_get_isochrone_green_basic(mock_tqdm, metrics, traffic_network):
     """Test del metodo get_isochrone_green con parametri validi."""
     mock_progress = MagicMock()
     type(mock_progress).n = PropertyMock(return_value=50)
     mock_tqdm.return_value.__enter__.return_value = mock_progress
 
-    mock_G = MagicMock()
-    mock_graph_from_gdfs.return_value = mock_G
+    metrics.vector_traffic_area = traffic_network
+    metrics.copernicus_green['transform'] = Affine(0.001, 0, 9.45, 0, -0.001, 45.121)
+    metrics.copernicus_green['data'] = np.array(
+        [[0, 1, 1, 1], [1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0]]
+    )
 
-    mock_nearest_nodes.return_value = (123, 100)
+    result = metrics.get_isochrone_green(45.1205, 9.4505, 5, 'walk')
+    result_dict = json.loads(result)
 
-    mock_G.nodes = {
-        123: {'y': 45.123, 'x': 9.456},
-        456: {'y': 45.124, 'x': 9.457}
-    }
+    assert result_dict['transport_mode'] == 'walk'
+    assert result_dict['max_time'] == 5
+    # 1000 m at 5 km/h is beyond 5 minutes, so only three nodes are reached
+    assert result_dict['green_area_sqm'] == 200
+    assert result_dict['green_area_percentage'] == pytest.approx(66.67)
 
-    mock_G.neighbors.return_value = [456]
-    mock_G.get_edge_data.return_value = {0: {'travel_time': 30}}
 
-    transform_mock = MagicMock()
-    metrics.copernicus_green['transform'] = transform_mock
-    inverse_transform = MagicMock()
-    transform_mock.__invert__.return_value = inverse_transform
-    inverse_transform.__mul__.return_value = (1, 1)
+@patch('greento.metrics.interface.tqdm')
+def test_get_isochrone_green_nested(mock_tqdm, metrics, traffic_network):
+    """Test del metodo get_isochrone_green con una lista di tempi massimi."""
+    mock_progress = MagicMock()
+    type(mock_progress).n = PropertyMock(return_value=50)
+    mock_tqdm.return_value.__enter__.return_value = mock_progress
+
+    metrics.vector_traffic_area = traffic_network
+    metrics.copernicus_green['transform'] = Affine(0.001, 0, 9.45, 0, -0.001, 45.121)
+    metrics.copernicus_green['data'] = np.array(
+        [[0, 1, 1, 1], [1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0]]
+    )
 
-    metrics.copernicus_green['data'] = np.array([[0, 1], [1, 0]])
+    nested = json.loads(metrics.get_isochrone_green(45.1205, 9.4505, [1, 3, 20], 'walk'))
 
-    with patch.object(metrics, '_estimate_distance_from_time', return_value=250):
-        result = metrics.get_isochrone_green(45.123, 9.456, 10, 'walk')
-        result_dict = json.loads(result)
+    assert [r['max_time'] for r in nested] == [1, 3, 20]
+    assert [r['green_area_sqm'] for r in nested] == [0, 200, 300]
+    for result in nested:
+        single = json.loads(
+            metrics.get_isochrone_green(45.1205, 9.4505, result['max_time'], 'walk')
+        )
+        assert single == result
 
-        assert 'transport_mode' in result_dict
-        assert result_dict['transport_mode'] == 'walk'
-        assert result_dict['max_time'] == 10
+    with pytest.raises(ValueError, match="Max time not valid"):
+        metrics.get_isochrone_green(45.1205, 9.4505, [10, 5], 'walk')
 
 
-@patch('greento.metrics.copernicus.tqdm')
+@patch('greento.metrics.interface.tqdm')
+def test_get_isochrone_green_accessibility(mock_tqdm, metrics):
+    """Test dei record di accessibilità per nodi con la stessa longitudine."""
+    mock_progress = MagicMock()
+    type(mock_progress).n = PropertyMock(return_value=50)
+    mock_tqdm.return_value.__enter__.return_value = mock_progress
+
+    nodes = gpd.GeoDataFrame(
+        {'x': [9.4505, 9.4505, 9.4515], 'y': [45.1205, 45.1195, 45.1205]},
+        geometry=[Point(9.4505, 45.1205), Point(9.4505, 45.1195), Point(9.4515, 45.1205)],
+        index=pd.Index([1, 2, 3], name='osmid'),
+    )
+    edges = gpd.GeoDataFrame(
+        {'u': [1, 1], 'v': [2, 3], 'length': [50.0, 100.0]},
+        geometry=[LineString([(0, 0), (1, 1)])] * 2,
+    )
+    metrics.vector_traffic_area = (nodes, edges)
+    metrics.copernicus_green['transform'] = Affine(0.001, 0, 9.45, 0, -0.001, 45.121)
+    # rows are latitudes and columns longitudes: only the two western nodes are green
+    metrics.copernicus_green['data'] = np.array([[1, 0], [1, 0]])
+
+    result = json.loads(metrics.get_isochrone_green(45.1205, 9.4505, 10, 'walk'))
+
+    records = result['green_accessibility']
+    assert result['green_area_sqm'] == 200
+    assert [(r['lat'], r['lon']) for r in records] == [(45.1205, 9.4505), (45.1195, 9.4505)]
+    assert records[1]['distance_meters'] == pytest.approx(50 / 1.15, abs=0.01)
+
+
+@patch('greento.metrics.interface.tqdm')
+def test_get_isochrone_green_area_coverage(mock_tqdm, metrics):
+    """Test della copertura per area con un parco tra le strade."""
+    mock_progress = MagicMock()
+    type(mock_progress).n = PropertyMock(return_value=50)
+    mock_tqdm.return_value.__enter__.return_value = mock_progress
+
+    xs = [9.4505, 9.4515, 9.4525]
+    nodes = gpd.GeoDataFrame(
+        {'x': xs, 'y': [45.1205] * 3},
+        geometry=[Point(x, 45.1205) for x in xs],
+        index=pd.Index([1, 2, 3], name='osmid'),
+        crs='EPSG:4326',
+    )
+    pairs = [(0, 1), (1, 0), (1, 2), (2, 1)]
+    edges = gpd.GeoDataFrame(
+        {'u': [a + 1 for a, _ in pairs], 'v': [b + 1 for _, b in pairs], 'length': [78.0] * 4},
+        geometry=[LineString([(xs[a], 45.1205), (xs[b], 45.1205)]) for a, b in pairs],
+        crs='EPSG:4326',
+    )
+    metrics.vector_traffic_area = (nodes, edges)
+    data = np.zeros((40, 40), dtype=np.uint8)
+    # a park about 35 m south of the street, not touching any intersection
+    data[18:21, 8:22] = 1
+    metrics.copernicus_green['transform'] = Affine(0.0001, 0, 9.450, 0, -0.0001, 45.122)
+    metrics.copernicus_green['data'] = data
+
+    by_nodes = json.loads(metrics.get_isochrone_green(45.1205, 9.4505, 5, 'walk'))
+    near = json.loads(
+        metrics.get_isochrone_green(45.1205, 9.4505, 5, 'walk', coverage='area', access_distance=10)
+    )
+    far = json.loads(
+        metrics.get_isochrone_green(45.1205, 9.4505, 5, 'walk', coverage='area', access_distance=60)
+    )
+
+    assert by_nodes['green_area_sqm'] == 0
+    assert near['green_area_sqm'] == 0
+    assert far['green_area_sqm'] > 0
+    assert 0 < far['green_area_percentage'] < 100
+
+    with pytest.raises(ValueError, match="Coverage not valid"):
+        metrics.get_isochrone_green(45.1205, 9.4505, 5, 'walk', coverage='pixels')
+
+
+def test_get_isochrone_green_batch(metrics, traffic_network):
+    """Test del metodo get_isochrone_green_batch con più origini."""
+    metrics.vector_traffic_area = traffic_network
+    metrics.copernicus_green['transform'] = Affine(0.001, 0, 9.45, 0, -0.001, 45.121)
+    metrics.copernicus_green['data'] = np.array([[0, 1, 1, 1]])
+    origins = pd.DataFrame(
+        {'lat': [45.1205, 45.1205], 'lon': [9.4505, 9.4535]}, index=['a', 'b']
+    )
+
+    result = metrics.get_isochrone_green_batch(origins, 5, 'walk', n_jobs=1)
+
+    assert list(result['origin_id']) == ['a', 'b']
+    assert list(result['reachable_nodes']) == [3, 1]
+    assert list(result['green_area_sqm']) == [200, 100]
+    assert result['green_area_percentage'].iloc[0] == pytest.approx(66.67)
+
+
+def test_get_isochrone_green_batch_invalid_params(metrics, traffic_network):
+    """Test del metodo get_isochrone_green_batch con parametri non validi."""
+    metrics.vector_traffic_area = traffic_network
+
+    with pytest.raises(ValueError, match="Max time not valid"):
+        metrics.get_isochrone_green_batch([(45.1205, 9.4505)], 0, 'walk')
+
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        metrics.get_isochrone_green_batch([(45.1205, 9.4505)], 5, 'teleport')
+
+    with pytest.raises(ValueError, match="Insufficient travel time"):
+        metrics.get_isochrone_green_batch([(45.1205, 9.4505)], 2, 'all_public')
+
+
+@patch('greento.metrics.interface.tqdm')
 def test_get_isochrone_green_invalid_params(mock_tqdm, metrics):
     """Test del metodo get_isochrone_green con parametri non validi."""
     mock_progress = MagicMock()
@@ -295,7 +436,28 @@ def test_estimate_distance_from_time(metrics):
     result_bike = metrics._estimate_distance_from_time(time_seconds, 'bike')
     assert pytest.approx(result_bike, 1) == expected_bike
 
-    mock_speed = 5 / 3.6
-    expected_unsupported = time_seconds * mock_speed
-    result_unsupported = metrics._estimate_distance_from_time(time_seconds, 'unknown_mode')
-    assert pytest.approx(result_unsupported, 1) == expected_unsupported
\ No newline at end of file
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        metrics._estimate_distance_from_time(time_seconds, 'unknown_mode')
+
+@patch('greento.metrics.interface.tqdm')
+def test_get_isochrone_green_patches(mock_tqdm, metrics, traffic_network):
+    """Test del conteggio delle aree verdi raggiungibili."""
+    mock_progress = MagicMock()
+    type(mock_progress).n = PropertyMock(return_value=50)
+    mock_tqdm.return_value.__enter__.return_value = mock_progress
+
+    metrics.vector_traffic_area = traffic_network
+    metrics.copernicus_green['transform'] = Affine(0.001, 0, 9.45, 0, -0.001, 45.121)
+    metrics.copernicus_green['data'] = np.array(
+        [[0, 1, 1, 1], [1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0]]
+    )
+
+    nested = json.loads(metrics.get_isochrone_green(45.1205, 9.4505, [1, 20], 'walk'))
+    large_only = json.loads(
+        metrics.get_isochrone_green(45.1205, 9.4505, 20, 'walk', min_patch_area_sqm=1e6)
+    )
+
+    assert [r['green_patches'] for r in nested] == [0, 1]
+    assert nested[1]['green_patches_area_sqm'] == pytest.approx(metrics.patch_index.area_sqm[0], abs=0.01)
+    assert large_only['green_patches'] == 0
+    assert large_only['green_patches_area_sqm'] == 0
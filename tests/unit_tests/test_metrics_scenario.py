@@ -0,0 +1,114 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from rasterio.transform import Affine
+from shapely.geometry import Point, LineString, box
+from greento.distance.field import green_field
+from greento.green.patches import green_patch_index
+from greento.metrics.scenario import green_scenarios
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def network():
+    """Fixture per creare una strada a doppio senso di 21 nodi distanti 100 m."""
+    xs = [9.450 + 0.001 * i for i in range(21)]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': range(1, 22), 'x': xs, 'y': [45.12] * 21},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    pairs = [(i, i + 1) for i in range(20)] + [(i + 1, i) for i in range(20)]
+    edges = gpd.GeoDataFrame(
+        {'u': [a + 1 for a, _ in pairs], 'v': [b + 1 for _, b in pairs], 'length': [100.0] * len(pairs)},
+        geometry=[LineString([(xs[a], 45.12), (xs[b], 45.12)]) for a, b in pairs],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+def raster(columns):
+    """Crea un raster del verde su una riga con i parchi nelle colonne indicate."""
+    data = np.zeros((1, 21), dtype=np.uint8)
+    data[0, columns] = 1
+    return {'data': data, 'transform': Affine(0.001, 0, 9.4495, 0, -0.001, 45.1205), 'crs': 'EPSG:4326', 'shape': (1, 21)}
+
+
+def field(network, green):
+    """Costruisce da zero il campo del verde più vicino di un raster."""
+    patches = green_patch_index(green)
+    lats, lons, _ = patches.entry_points(patches.select(0))
+    return patches, green_field.build(network, lats, lons)
+
+
+@pytest.fixture
+def ghs_pop():
+    """Fixture per creare un raster di popolazione con tre celle abitate e una vuota."""
+    return {
+        'data': np.array([[10.0, 20.0, 70.0, 0.0]]),
+        'transform': Affine(0.01, 0, 9.445, 0, -0.001, 45.1205),
+        'crs': 'EPSG:4326',
+        'shape': (1, 4),
+    }
+
+
+def test_apply_add(network, ghs_pop):
+    """Test dell'aggiunta di un parco in fondo alla strada, riparando solo i nodi più vicini."""
+    green = raster([0])
+    patches, base = field(network, green)
+    scenario = green_scenarios(green, patches, base, ghs_pop).apply(
+        box(9.4695, 45.1195, 9.4705, 45.1205), 'add'
+    )
+
+    assert sorted(scenario.nodes.tolist()) == list(range(11, 21))
+    _, expected = field(network, scenario.raster(green))
+    np.testing.assert_allclose(scenario.field().distances, expected.distances)
+    assert green['data'][0, 20] == 0
+
+    summary = scenario.summary
+    assert summary['added_entries'] == 1
+    assert summary['removed_entries'] == 0
+    assert summary['affected_population'] == 70
+    assert summary['mean_cost_before'] == pytest.approx(1600, abs=1)
+    assert summary['mean_cost_after'] == pytest.approx(200, abs=1)
+    assert summary['population_share_within_before'] == [0.1, 0.1, 0.1]
+    assert summary['population_share_within_after'] == [0.8, 0.8, 0.8]
+
+
+def test_apply_remove(network, ghs_pop):
+    """Test della rimozione di un parco, con i nodi invalidati riparati dall'altro parco."""
+    green = raster([0, 20])
+    patches, base = field(network, green)
+    scenario = green_scenarios(green, patches, base, ghs_pop).apply(
+        box(9.4495, 45.1195, 9.4505, 45.1205), 'remove'
+    )
+
+    _, expected = field(network, scenario.raster(green))
+    np.testing.assert_allclose(scenario.field().distances, expected.distances)
+    # node 10 is halfway and was closest to the removed park
+    assert sorted(scenario.nodes.tolist()) == list(range(0, 11))
+
+    summary = scenario.summary
+    assert summary['removed_entries'] == 1
+    assert summary['mean_cost_before'] == pytest.approx(200, abs=1)
+    assert summary['mean_cost_after'] == pytest.approx(400, abs=1)
+
+
+def test_apply_min_area(network, ghs_pop):
+    """Test che un parco aggiunto troppo piccolo non diventi un ingresso."""
+    green = raster([0])
+    patches, base = field(network, green)
+    scenario = green_scenarios(green, patches, base, ghs_pop, min_area_sqm=1e6).apply(
+        box(9.4695, 45.1195, 9.4705, 45.1205), 'add'
+    )
+
+    assert scenario.summary['added_entries'] == 0
+    assert len(scenario.nodes) == 0
+
+
+def test_apply_invalid_action(network, ghs_pop):
+    """Test che un'azione non valida sollevi un errore."""
+    green = raster([0])
+    patches, base = field(network, green)
+    with pytest.raises(ValueError, match="Action not valid"):
+        green_scenarios(green, patches, base, ghs_pop).apply(box(9.46, 45.11, 9.47, 45.12), 'move')
@@ -0,0 +1,130 @@
+import pytest
+import numpy as np
+from greento.network.core import network_core
+from greento.network.graph import csr_graph
+
+
+def build_graph(edges, num_nodes):
+    """Costruisce un grafo CSR da una lista di archi (u, v, lunghezza)."""
+    u = np.array([edge[0] for edge in edges])
+    v = np.array([edge[1] for edge in edges])
+    length = np.array([edge[2] for edge in edges], dtype=np.float64)
+    order = np.argsort(u, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=num_nodes), out=indptr[1:])
+    return csr_graph(
+        node_ids=np.arange(num_nodes) + 100,
+        x=np.arange(num_nodes, dtype=np.float64),
+        y=np.zeros(num_nodes),
+        indptr=indptr,
+        indices=v[order],
+        length=length[order],
+        travel_time=np.full(len(edges), np.nan),
+        edge_rows=order,
+    )
+
+
+@pytest.fixture
+def graph():
+    """Fixture di un incrocio (0) con una strada a doppio senso 0-1-2-3, un senso unico 0->4->5->0 e un ramo 0->6."""
+    edges = [
+        (0, 1, 10.0), (1, 0, 10.0), (1, 2, 20.0), (2, 1, 20.0), (2, 3, 30.0), (3, 2, 30.0),
+        (0, 4, 5.0), (4, 5, 5.0), (5, 0, 5.0),
+        (0, 6, 7.0),
+        (3, 0, 100.0),
+    ]
+    return build_graph(edges, 7)
+
+
+def test_largest_component(graph):
+    """Test della componente fortemente connessa più grande."""
+    component = network_core.largest_component(graph)
+
+    assert list(np.flatnonzero(component)) == [0, 1, 2, 3, 4, 5]
+
+    weights = graph.length.copy()
+    weights[graph.length == 100.0] = np.inf
+    assert list(np.flatnonzero(network_core.largest_component(graph, weights))) == [0, 1, 2, 3, 4, 5]
+
+
+def test_build(graph):
+    """Test della contrazione delle catene di nodi di grado 2."""
+    core = network_core.build(graph)
+
+    assert list(core.nodes) == [0, 3]
+    assert list(core.graph.node_ids) == [100, 103]
+    assert list(core.node_index) == [0, -1, -1, 1, -1, -1, -1]
+    sources, targets = core.graph.edge_endpoints()
+    edges = sorted(zip(sources.tolist(), targets.tolist(), core.graph.length.tolist()))
+    assert edges == [(0, 0, 15.0), (0, 1, 60.0), (1, 0, 60.0), (1, 0, 100.0)]
+    assert np.isnan(core.graph.travel_time).all()
+
+
+def test_build_without_contraction(graph):
+    """Test del nucleo senza contrazione, con la sola componente connessa."""
+    core = network_core.build(graph, contract=False)
+
+    assert list(core.nodes) == [0, 1, 2, 3, 4, 5]
+    assert core.graph.num_edges == 10
+
+
+def test_build_ring():
+    """Test di un anello di soli nodi di grado 2, di cui resta un nodo."""
+    graph = build_graph([(0, 1, 1.0), (1, 2, 1.0), (2, 0, 1.0)], 3)
+
+    core = network_core.build(graph)
+
+    assert list(core.nodes) == [0]
+    assert list(core.graph.length) == [3.0]
+
+
+def test_expand(graph):
+    """Test dell'espansione dei percorsi sul nucleo nella rete completa."""
+    core = network_core.build(graph)
+    sources, targets = core.graph.edge_endpoints()
+    edge = int(np.flatnonzero((sources == 0) & (targets == 1))[0])
+
+    original = core.expand(np.array([edge]))
+
+    assert graph.length[original].tolist() == [10.0, 20.0, 30.0]
+    assert list(core.expand_nodes(np.array([edge]))) == [0, 1, 2, 3]
+    assert len(core.expand_nodes(np.array([], dtype=np.int64))) == 0
+    np.testing.assert_allclose(core.chain_weights(graph.length), core.graph.length)
+
+
+def test_expand_geometry(graph):
+    """Test dell'unione delle geometrie degli archi delle catene."""
+    core = network_core.build(graph)
+    sources, targets = graph.edge_endpoints()
+    coords = np.column_stack(
+        (np.stack((graph.x[sources], graph.x[targets]), axis=1).ravel(), np.zeros(2 * graph.num_edges))
+    )
+    ptr = np.arange(0, 2 * graph.num_edges + 1, 2)
+
+    core_coords, core_ptr = core.expand_geometry(coords, ptr)
+
+    assert core_ptr[-1] == len(core_coords)
+    core_sources, core_targets = core.graph.edge_endpoints()
+    edge = int(np.flatnonzero((core_sources == 0) & (core_targets == 1))[0])
+    assert core_coords[core_ptr[edge]:core_ptr[edge + 1], 0].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_expand_reached(graph):
+    """Test dell'espansione dei nodi raggiunti sul nucleo ai nodi interni delle catene."""
+    core = network_core.build(graph)
+    sources, targets = core.graph.edge_endpoints()
+    edge = int(np.flatnonzero((sources == 0) & (targets == 1))[0])
+
+    nodes, costs = core.expand_reached(np.array([0]), np.array([0.0]), graph.length, 25.0)
+
+    assert list(nodes) == [0, 4, 1, 5]
+    assert costs.tolist() == [0.0, 5.0, 10.0, 10.0]
+
+    # a start 15 m along the chain 0-1-2-3 reaches node 2 directly, not node 1 behind it
+    nodes, costs = core.expand_reached(
+        np.array([], dtype=np.int64), np.array([]), graph.length, 100.0,
+        seed_edges=np.array([edge]), seed_offsets=np.array([45.0]),
+    )
+
+    assert list(nodes) == [2]
+    assert costs.tolist() == [15.0]
@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def network():
+    """Fixture per creare una rete con una strada a doppio senso e una a senso unico."""
+    xs = [9.450, 9.451, 9.452]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': [1, 2, 3], 'x': xs, 'y': [45.12] * 3},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    pairs = [(0, 1), (1, 0), (1, 2)]
+    edges = gpd.GeoDataFrame(
+        {'u': [a + 1 for a, _ in pairs], 'v': [b + 1 for _, b in pairs], 'length': [100.0, 80.0, 100.0]},
+        geometry=[LineString([(xs[a], 45.12), (xs[b], 45.12)]) for a, b in pairs],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+def test_snap(network):
+    """Test dell'aggancio dei punti all'arco più vicino."""
+    index = network.edge_snap_index
+    sources, targets = network.graph.edge_endpoints()
+
+    edges, fractions, distances = index.snap(np.array([45.1201, 45.12]), np.array([9.4515, 9.4502]))
+
+    assert (sources[edges[0]], targets[edges[0]]) == (1, 2)
+    assert fractions[0] == pytest.approx(0.5, abs=1e-3)
+    assert distances[0] == pytest.approx(11.1, rel=0.01)
+    assert {sources[edges[1]], targets[edges[1]]} == {0, 1}
+    assert distances[1] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_reverse(network):
+    """Test della ricerca degli archi in senso opposto."""
+    sources, targets = network.graph.edge_endpoints()
+    reverse = network.edge_snap_index.reverse
+
+    for edge in range(network.graph.num_edges):
+        if reverse[edge] >= 0:
+            assert (sources[reverse[edge]], targets[reverse[edge]]) == (targets[edge], sources[edge])
+    assert reverse[(sources == 1) & (targets == 2)][0] == -1
+
+
+def test_seeds(network):
+    """Test dei costi parziali verso i due estremi dell'arco."""
+    nodes, offsets = network.edge_seeds(np.array([45.12, 45.12]), np.array([9.4502, 9.4515]), 'length')
+
+    # a fifth along the two-way street: the way back uses the 80 m reverse edge
+    seeds = dict(zip(nodes[0].tolist(), offsets[0].tolist()))
+    assert seeds[0] == pytest.approx(16.0, abs=0.1)
+    assert seeds[1] == pytest.approx(80.0, abs=0.1)
+    # halfway along the one-way street the start node cannot be reached
+    np.testing.assert_array_equal(nodes[1], [1, 2])
+    assert np.isinf(offsets[1, 0])
+    assert offsets[1, 1] == pytest.approx(50.0, abs=0.1)
+
+
+def test_seeds_at_node(network):
+    """Test dei punti posti esattamente su un nodo."""
+    nodes, offsets = network.edge_seeds(np.array([45.12]), np.array([9.451]), 'length')
+
+    np.testing.assert_array_equal(nodes[0], [1, 1])
+    np.testing.assert_array_equal(offsets[0], [0.0, 0.0])
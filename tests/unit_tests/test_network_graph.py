@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import Point, LineString
+from greento.network.graph import csr_graph
+
+
+@pytest.fixture
+def traffic_network():
+    """Fixture per creare una rete stradale con indice (u, v, key) come osmnx."""
+    nodes = gpd.GeoDataFrame(
+        {'x': [7.60, 7.61, 7.62], 'y': [45.00, 45.00, 45.01]},
+        geometry=[Point(7.60, 45.00), Point(7.61, 45.00), Point(7.62, 45.01)],
+        index=pd.Index([101, 202, 303], name='osmid'),
+    )
+    edges = gpd.GeoDataFrame(
+        {
+            'length': [100.0, 100.0, 250.0, 80.0],
+            'travel_time': [np.nan, np.nan, 12.0, np.nan],
+        },
+        geometry=[LineString([(0, 0), (1, 1)])] * 4,
+        index=pd.MultiIndex.from_tuples(
+            [(101, 202, 0), (202, 101, 0), (202, 303, 0), (303, 999, 0)],
+            names=['u', 'v', 'key'],
+        ),
+    )
+    return nodes, edges
+
+
+def test_from_gdfs(traffic_network):
+    """Test della costruzione CSR da GeoDataFrame."""
+    graph = csr_graph.from_gdfs(*traffic_network)
+
+    assert graph.num_nodes == 3
+    # the edge towards the clipped node 999 is dropped
+    assert graph.num_edges == 3
+    assert graph.indices.dtype == np.int32
+    assert graph.length.dtype == np.float32
+    np.testing.assert_array_equal(graph.indptr, [0, 1, 3, 3])
+    np.testing.assert_array_equal(graph.indices, [1, 0, 2])
+    np.testing.assert_array_equal(graph.edge_rows, [0, 1, 2])
+
+
+def test_from_gdfs_empty():
+    """Test della costruzione CSR senza nodi."""
+    with pytest.raises(ValueError, match="Traffic network has no nodes"):
+        csr_graph.from_gdfs(gpd.GeoDataFrame(), gpd.GeoDataFrame())
+
+
+def test_travel_times(traffic_network):
+    """Test del calcolo dei tempi di percorrenza per arco."""
+    graph = csr_graph.from_gdfs(*traffic_network)
+
+    times = graph.travel_times(36)
+
+    assert times.dtype == np.float32
+    np.testing.assert_allclose(times, [10.0, 10.0, 12.0])
+
+
+def test_nearest_node(traffic_network):
+    """Test della ricerca del nodo più vicino."""
+    graph = csr_graph.from_gdfs(*traffic_network)
+
+    assert graph.nearest_node(45.009, 7.619) == 2
+    assert graph.nearest_node(45.0, 7.601) == 0
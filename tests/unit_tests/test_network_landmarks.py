@@ -0,0 +1,80 @@
+import pytest
+import numpy as np
+from greento.network.graph import csr_graph
+from greento.network.landmarks import landmarks
+from greento.network.matrix import shortest_paths
+from greento.network.search import reachability
+
+
+@pytest.fixture
+def grid():
+    """Fixture per creare una griglia 10x10 a doppio senso con lunghezze casuali."""
+    rng = np.random.default_rng(0)
+    side = 10
+    sources, targets = [], []
+    for row in range(side):
+        for col in range(side):
+            node = row * side + col
+            if col + 1 < side:
+                sources += [node, node + 1]
+                targets += [node + 1, node]
+            if row + 1 < side:
+                sources += [node, node + side]
+                targets += [node + side, node]
+    sources = np.array(sources)
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(side * side + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=side * side), out=indptr[1:])
+    return csr_graph(
+        node_ids=np.arange(side * side),
+        x=np.zeros(side * side),
+        y=np.zeros(side * side),
+        indptr=indptr,
+        indices=np.array(targets)[order],
+        length=rng.uniform(50, 150, len(sources)),
+        travel_time=np.full(len(sources), np.nan),
+        edge_rows=np.arange(len(sources)),
+    )
+
+
+def test_build(grid):
+    """Test della scelta dei landmark e delle loro tabelle."""
+    tables = landmarks.build(shortest_paths(grid, grid.length), count=4)
+
+    assert len(tables) == 4
+    assert len(set(tables.nodes.tolist())) == 4
+    assert tables.from_landmarks.shape == (100, 4)
+    np.testing.assert_allclose(tables.from_landmarks[tables.nodes, np.arange(4)], 0.0)
+
+
+def test_potential_is_lower_bound(grid):
+    """Test che i limiti inferiori non superino i costi reali."""
+    paths = shortest_paths(grid, grid.length)
+    tables = landmarks.build(paths, count=4)
+    costs, _ = paths.costs(np.arange(100), np.array([37]))
+
+    bound = tables.potential(37)
+
+    for node in range(100):
+        assert bound(node) <= costs[node, 0] + 1e-3
+    assert bound(37) == 0.0
+
+
+def test_path_with_landmarks(grid):
+    """Test che A* con i landmark trovi i cammini minimi esplorando meno nodi."""
+    search = reachability(grid, grid.length)
+    tables = landmarks.build(shortest_paths(grid, grid.length), count=8)
+
+    for source, target in [(0, 99), (9, 90), (45, 3)]:
+        edges, cost, settled = search.path(source, target)
+        alt_edges, alt_cost, alt_settled = search.path(source, target, tables.potential(target))
+
+        assert alt_cost == pytest.approx(cost, rel=1e-6)
+        assert grid.length[alt_edges].sum() == pytest.approx(cost, rel=1e-5)
+        assert alt_settled < settled
+
+
+def test_tables_mismatch():
+    """Test delle tabelle non corrispondenti ai landmark."""
+    with pytest.raises(ValueError, match="Landmark tables not valid"):
+        landmarks(np.array([0, 1]), np.zeros((5, 2)), np.zeros((5, 3)))
@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+from greento.network.graph import csr_graph
+from greento.network.matrix import shortest_paths
+
+
+@pytest.fixture
+def graph():
+    """Fixture per creare un grafo CSR con archi paralleli."""
+    # 0 -> 1 is shortest through 2, fastest through the long parallel edge
+    return csr_graph(
+        node_ids=np.array([1, 2, 3, 4]),
+        x=np.zeros(4),
+        y=np.zeros(4),
+        indptr=np.array([0, 3, 4, 5, 5]),
+        indices=np.array([1, 1, 2, 3, 1]),
+        length=np.array([100.0, 200.0, 10.0, 50.0, 10.0]),
+        travel_time=np.full(5, np.nan),
+        edge_rows=np.arange(5),
+    )
+
+
+def test_costs_length(graph):
+    """Test dei cammini minimi da molte sorgenti."""
+    costs, lengths = shortest_paths(graph, graph.length).costs(
+        np.array([0, 3, 0]), np.array([1, 3])
+    )
+
+    np.testing.assert_allclose(costs, [[20.0, 70.0], [np.inf, 0.0], [20.0, 70.0]])
+    assert lengths is None
+
+
+def test_costs_lengths_along_fastest(graph):
+    """Test delle lunghezze lungo i cammini più veloci."""
+    times = np.array([1.0, 0.5, 5.0, 1.0, 5.0])
+
+    costs, lengths = shortest_paths(graph, times).costs(
+        np.array([0, 2, 3]), np.array([0, 1, 3]), lengths=True
+    )
+
+    np.testing.assert_allclose(costs[0], [0.0, 0.5, 1.5])
+    np.testing.assert_allclose(lengths[0], [0.0, 200.0, 250.0])
+    np.testing.assert_allclose(lengths[1], [np.inf, 10.0, 60.0])
+    np.testing.assert_allclose(lengths[2], [np.inf, np.inf, 0.0])
+
+
+def test_costs_chunks_and_limit(graph):
+    """Test che la suddivisione in blocchi e il limite non cambino i risultati."""
+    paths = shortest_paths(graph, graph.length)
+    sources = np.array([0, 1, 2, 3, 0])
+
+    expected, _ = paths.costs(sources, np.arange(4))
+    chunked, _ = paths.costs(sources, np.arange(4), chunk_size=2)
+    limited, _ = paths.costs(sources, np.arange(4), limit=30)
+
+    np.testing.assert_allclose(chunked, expected)
+    np.testing.assert_allclose(limited, np.where(expected <= 30, expected, np.inf))
+
+
+def test_missing_weights(graph):
+    """Test che gli archi senza costo siano esclusi."""
+    costs, _ = shortest_paths(graph, graph.travel_time).costs(np.array([0]), np.array([0, 1]))
+
+    np.testing.assert_allclose(costs, [[0.0, np.inf]])
+
+
+def test_weights_mismatch(graph):
+    """Test dei pesi non corrispondenti agli archi."""
+    with pytest.raises(ValueError, match="Edge weights do not match the graph edges"):
+        shortest_paths(graph, np.ones(3))
@@ -0,0 +1,157 @@
+import gc
+import tracemalloc
+import pytest
+import numpy as np
+from greento.network import parallel
+from greento.network.graph import csr_graph
+from greento.network.parallel import reachability_pool, shared_arrays
+
+
+@pytest.fixture
+def graph():
+    """Fixture per creare un grafo CSR ad anello di 50 nodi."""
+    n = 50
+    targets = np.ravel(np.column_stack(((np.arange(n) + 1) % n, (np.arange(n) - 1) % n)))
+    return csr_graph(
+        node_ids=np.arange(n) * 10,
+        x=np.zeros(n),
+        y=np.zeros(n),
+        indptr=np.arange(0, 2 * n + 1, 2),
+        indices=targets,
+        length=np.full(2 * n, 10.0),
+        travel_time=np.full(2 * n, np.nan),
+        edge_rows=np.arange(2 * n),
+    )
+
+
+def test_shared_arrays_roundtrip():
+    """Test della pubblicazione e del collegamento di array in memoria condivisa."""
+    data = {'a': np.arange(5, dtype=np.int32), 'b': np.ones((2, 3), dtype=np.float32)}
+
+    with shared_arrays(data) as shared:
+        arrays, blocks = shared_arrays.attach(shared.spec)
+        np.testing.assert_array_equal(arrays['a'], data['a'])
+        np.testing.assert_array_equal(arrays['b'], data['b'])
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def test_count_reachable(graph):
+    """Test del conteggio dei nodi raggiungibili e dei flag."""
+    flags = (np.arange(graph.num_nodes) % 2 == 0)
+    pool = reachability_pool(graph, graph.length, flags, n_jobs=1)
+
+    counts = pool.count_reachable(np.array([0, 1]), 20)
+
+    np.testing.assert_array_equal(counts, [[5, 3], [5, 2]])
+
+
+def test_count_reachable_process_pool(graph):
+    """Test che il pool di processi dia gli stessi risultati dell'esecuzione seriale."""
+    flags = np.column_stack((np.ones(graph.num_nodes), np.arange(graph.num_nodes) < 10))
+    sources = np.arange(graph.num_nodes)
+
+    serial = reachability_pool(graph, graph.length, flags, n_jobs=1).count_reachable(
+        sources, 35, chunk_size=8
+    )
+    parallel = reachability_pool(graph, graph.length, flags, n_jobs=2).count_reachable(
+        sources, 35, chunk_size=8
+    )
+
+    np.testing.assert_array_equal(serial, parallel)
+    assert (serial[:, 0] == 7).all()
+
+
+def test_count_reachable_worker(graph):
+    """Test del conteggio in un worker, che cerca sugli array condivisi senza copiarli."""
+    flags = (np.arange(graph.num_nodes) % 2 == 0)
+    pool = reachability_pool(graph, graph.length, flags, n_jobs=2)
+
+    with shared_arrays(pool._published(flags=pool.flags)) as shared:
+        parallel._init_worker(shared.spec)
+        try:
+            search = parallel._WORKER['search']
+            assert search.shared
+            assert np.shares_memory(np.asarray(search._indices), search.graph.indices)
+            counts = parallel._count_reachable_worker(np.array([0, 5]), 25.0)
+            np.testing.assert_array_equal(counts, pool.count_reachable(np.array([0, 5]), 25.0))
+        finally:
+            blocks = parallel._WORKER.pop('blocks')
+            parallel._WORKER.clear()
+            gc.collect()
+            for block in blocks:
+                block.close()
+
+
+def test_count_reachable_offsets(graph):
+    """Test del conteggio da più nodi di partenza con costi iniziali."""
+    flags = np.ones(graph.num_nodes)
+    pool = reachability_pool(graph, graph.length, flags, n_jobs=1)
+
+    counts = pool.count_reachable(
+        np.array([[0, 1], [0, 1]]), 20, offsets=np.array([[0.0, 0.0], [5.0, np.inf]])
+    )
+
+    # two steps around the ring from either node, and one step from node 0 alone
+    np.testing.assert_array_equal(counts, [[6, 6], [3, 3]])
+
+
+def test_sweep(graph):
+    """Test della scansione di tutti i nodi come origine."""
+    flags = (np.arange(graph.num_nodes) % 2 == 0)
+    pool = reachability_pool(graph, graph.length, flags, n_jobs=1)
+
+    counts = pool.sweep(20, chunk_size=7)
+
+    np.testing.assert_array_equal(counts, pool.count_reachable(np.arange(graph.num_nodes), 20))
+    np.testing.assert_array_equal(counts[:2], [[5, 3], [5, 2]])
+
+
+def test_sweep_process_pool(graph):
+    """Test che i processi scrivano nell'array condiviso gli stessi risultati dell'esecuzione seriale."""
+    flags = np.column_stack((np.ones(graph.num_nodes), np.arange(graph.num_nodes) < 10))
+
+    serial = reachability_pool(graph, graph.length, flags, n_jobs=1).sweep(35)
+    parallel = reachability_pool(graph, graph.length, flags, n_jobs=2).sweep(35, chunk_size=8)
+
+    np.testing.assert_array_equal(serial, parallel)
+    assert (parallel[:, 0] == 7).all()
+
+
+def test_worker_memory_flat():
+    """Test che un worker legga il grafo in memoria condivisa senza copiarlo."""
+    n = 20000
+    graph = csr_graph(
+        node_ids=np.arange(n),
+        x=np.zeros(n),
+        y=np.zeros(n),
+        indptr=np.arange(0, 2 * n + 1, 2),
+        indices=np.ravel(np.column_stack(((np.arange(n) + 1) % n, (np.arange(n) - 1) % n))),
+        length=np.full(2 * n, 10.0),
+        travel_time=np.full(2 * n, np.nan),
+        edge_rows=np.arange(2 * n),
+    )
+    flags = np.column_stack((np.arange(n) % 2 == 0, np.arange(n) % 5 == 0))
+    pool = reachability_pool(graph, graph.length, flags, n_jobs=2)
+    output = np.zeros((n, 3), dtype=np.int64)
+
+    with shared_arrays(pool._published(columns=pool.flags.T, output=output)) as shared:
+        tracemalloc.start()
+        try:
+            parallel._init_worker(shared.spec)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        try:
+            # only the distance buffer grows with the graph, not a copy of its arrays
+            assert peak < 12 * n + 64 * 1024
+            parallel._sweep_worker(0, 100, 25.0)
+            expected = pool.sweep(25.0, chunk_size=n)
+            np.testing.assert_array_equal(shared.view('output')[:100], expected[:100])
+        finally:
+            blocks = parallel._WORKER.pop('blocks')
+            parallel._WORKER.clear()
+            gc.collect()
+            for block in blocks:
+                block.close()
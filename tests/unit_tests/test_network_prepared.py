@@ -0,0 +1,109 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+from greento.network.prepared import prepared_network
+
+
+@pytest.fixture
+def traffic_network():
+    """Fixture per creare una rete stradale lineare a tre nodi."""
+    nodes = gpd.GeoDataFrame(
+        {
+            'osmid': [1, 2, 3],
+            'x': [7.600, 7.601, 7.602],
+            'y': [45.0, 45.0, 45.0],
+        },
+        geometry=[Point(7.600, 45.0), Point(7.601, 45.0), Point(7.602, 45.0)],
+        crs="EPSG:4326",
+    )
+    edges = gpd.GeoDataFrame(
+        {
+            'u': [1, 2, 2, 3],
+            'v': [2, 1, 3, 2],
+            'length': [100.0, 100.0, 100.0, 100.0],
+        },
+        geometry=[
+            LineString([(7.600, 45.0), (7.601, 45.0)]),
+            LineString([(7.601, 45.0), (7.600, 45.0)]),
+            LineString([(7.601, 45.0), (7.602, 45.0)]),
+            LineString([(7.602, 45.0), (7.601, 45.0)]),
+        ],
+        crs="EPSG:4326",
+    )
+    return nodes, edges
+
+
+def test_prepared_network(traffic_network):
+    """Test della preparazione una tantum della rete."""
+    network = prepared_network(*traffic_network)
+
+    assert network.graph.num_nodes == 3
+    assert network.tree is network.graph.tree
+    assert set(network.travel_times) == {'walk', 'bike', 'drive', 'all_public', 'drive_public'}
+    np.testing.assert_allclose(network.travel_times['walk'], [72.0] * 4, rtol=1e-6)
+
+
+def test_prepared_network_unpacking(traffic_network):
+    """Test dello spacchettamento come la tupla (nodi, archi)."""
+    network = prepared_network(*traffic_network)
+
+    nodes, edges = network
+
+    assert nodes is traffic_network[0]
+    assert edges is traffic_network[1]
+    assert prepared_network.from_traffic_area(network) is network
+    assert isinstance(prepared_network.from_traffic_area(traffic_network), prepared_network)
+
+
+def test_prepared_network_missing_coordinates(traffic_network):
+    """Test della preparazione con nodi senza coordinate."""
+    nodes, edges = traffic_network
+    nodes = nodes.copy()
+    nodes.loc[0, 'x'] = np.nan
+
+    with pytest.raises(ValueError, match="Some nodes do not have 'x' and 'y' coordinates"):
+        prepared_network(nodes, edges)
+
+
+def test_search(traffic_network):
+    """Test del riuso della ricerca per peso."""
+    network = prepared_network(*traffic_network)
+
+    search = network.search('length')
+    nodes, costs = search.search(0, 150)
+
+    assert network.search('length') is search
+    np.testing.assert_array_equal(nodes, [0, 1])
+    np.testing.assert_allclose(costs, [0.0, 100.0])
+    with pytest.raises(ValueError, match="Weight not valid"):
+        network.search('plane')
+
+
+def test_path_tree_cache(traffic_network):
+    """Test della cache degli alberi dei cammini minimi."""
+    network = prepared_network(*traffic_network)
+
+    tree = network.path_tree(0)
+
+    assert network.path_tree(0) is tree
+    assert (network.path_trees.hits, network.path_trees.misses) == (1, 1)
+
+
+def test_core(traffic_network):
+    """Test del nucleo della rete con la catena di nodi di grado 2 contratta."""
+    network = prepared_network(*traffic_network)
+
+    core = network.core('walk')
+
+    assert network.core('walk') is core
+    assert core.parent is network
+    assert list(core.graph.node_ids) == [1, 3]
+    np.testing.assert_allclose(core.travel_times['walk'], [144.0, 144.0], rtol=1e-6)
+    coords, ptr = core.edge_geometry()
+    assert list(ptr) == [0, 3, 6]
+    np.testing.assert_allclose(coords[:3, 0], [7.600, 7.601, 7.602])
+    assert len(core.edges) == 2
+    reached, costs = core.search('walk').search(0, 200.0)
+    assert list(reached) == [0, 1]
+    np.testing.assert_allclose(costs, [0.0, 144.0], rtol=1e-6)
@@ -0,0 +1,197 @@
+import pytest
+import numpy as np
+from greento.network.graph import csr_graph
+from greento.network.search import reachability
+
+
+@pytest.fixture
+def graph():
+    """Fixture per creare un grafo CSR con una scorciatoia indiretta."""
+    # 0 -> 1 costs 100 directly, but only 20 through 2
+    return csr_graph(
+        node_ids=np.array([1, 2, 3, 4]),
+        x=np.zeros(4),
+        y=np.zeros(4),
+        indptr=np.array([0, 2, 3, 4, 4]),
+        indices=np.array([1, 2, 3, 1]),
+        length=np.array([100.0, 10.0, 50.0, 10.0]),
+        travel_time=np.full(4, np.nan),
+        edge_rows=np.arange(4),
+    )
+
+
+def test_search_shortest_times(graph):
+    """Test che i tempi di arrivo siano i cammini minimi."""
+    nodes, costs = reachability(graph, graph.length).search(0, 1000)
+
+    arrival = dict(zip(nodes.tolist(), costs.tolist()))
+    assert nodes.dtype == np.int32
+    assert arrival == {0: 0.0, 2: 10.0, 1: 20.0, 3: 70.0}
+
+
+def test_search_limit(graph):
+    """Test che la ricerca rispetti il limite di costo."""
+    nodes, costs = reachability(graph, graph.length).search(0, 30)
+
+    assert set(nodes.tolist()) == {0, 1, 2}
+    assert costs.max() <= 30
+
+
+def test_search_reuses_buffers(graph):
+    """Test che ricerche successive non siano influenzate dalle precedenti."""
+    search = reachability(graph, graph.length)
+    search.search(0, 1000)
+
+    nodes, costs = search.search(2, 1000)
+
+    assert dict(zip(nodes.tolist(), costs.tolist())) == {2: 0.0, 1: 10.0, 3: 60.0}
+
+
+def test_search_multiple_sources(graph):
+    """Test della ricerca da più nodi di partenza con costi iniziali."""
+    search = reachability(graph, graph.length)
+
+    nodes, costs = search.search(np.array([0, 2, 2]), 1000, np.array([50.0, 5.0, 30.0]))
+
+    # the cheapest offset of a repeated source is kept
+    assert dict(zip(nodes.tolist(), costs.tolist())) == {2: 5.0, 1: 15.0, 0: 50.0, 3: 65.0}
+
+
+def test_invalid_weights(graph):
+    """Test con un numero di pesi diverso dal numero di archi."""
+    with pytest.raises(ValueError, match="Edge weights do not match"):
+        reachability(graph, np.ones(2))
+
+
+def test_count(graph):
+    """Test del conteggio senza allocazioni con la somma dei valori per nodo."""
+    search = reachability(graph, graph.length)
+    totals = [0]
+
+    assert search.count(0, 30, [[1, 0, 1, 1]], totals) == 3
+    assert totals == [2]
+    # the scratch buffers are reset between counts
+    assert search.count(0, 1000) == 4
+    assert search.count(1, 1000, [[1, 0, 1, 1]], totals) == 2
+    assert totals == [1]
+
+
+def test_nearest_sources(graph):
+    """Test della ricerca multi-sorgente con offset iniziali."""
+    costs, labels = reachability(graph, graph.length).nearest_sources(
+        np.array([0, 1]), np.array([0.0, 15.0])
+    )
+
+    np.testing.assert_allclose(costs, [0.0, 15.0, 10.0, 65.0])
+    np.testing.assert_array_equal(labels, [0, 1, 0, 1])
+
+
+def test_repair(graph):
+    """Test della riparazione incrementale dopo l'aggiunta e la rimozione di sorgenti."""
+    search = reachability(graph, graph.length)
+    costs, labels = search.nearest_sources(np.array([0]))
+
+    # a new source on node 1 only improves nodes 1 and 3
+    nodes, new_costs, new_labels = search.repair(
+        costs, labels, np.array([1]), np.array([0.0]), np.array([1])
+    )
+    changed = dict(zip(nodes.tolist(), zip(new_costs.tolist(), new_labels.tolist())))
+    assert changed == {1: (0.0, 1), 3: (50.0, 1)}
+    np.testing.assert_allclose(costs, [0.0, 20.0, 10.0, 70.0])
+
+    # removing the source 1 invalidates its nodes, repaired from node 2 through 2 -> 1
+    costs, labels = search.nearest_sources(np.array([0, 1]), np.array([0.0, 15.0]))
+    nodes, new_costs, new_labels = search.repair(
+        costs, labels, np.array([1]), np.array([20.0]), np.array([0]), invalid=np.array([1, 3])
+    )
+    changed = dict(zip(nodes.tolist(), zip(new_costs.tolist(), new_labels.tolist())))
+    assert changed == {1: (20.0, 0), 3: (70.0, 0)}
+
+
+def test_reversed(graph):
+    """Test dell'inversione degli archi."""
+    reversed_graph, order = graph.reversed()
+
+    sources, targets = reversed_graph.edge_endpoints()
+    original_sources, original_targets = graph.edge_endpoints()
+    np.testing.assert_array_equal(sources, original_targets[order])
+    np.testing.assert_array_equal(targets, original_sources[order])
+    np.testing.assert_allclose(reversed_graph.length, graph.length[order])
+
+
+def test_nearest_target(graph):
+    """Test della ricerca del bersaglio più vicino con offset."""
+    search = reachability(graph, graph.length)
+
+    # node 1 costs 20 + 5, node 3 costs 70 + 0
+    assert search.nearest_target(0, np.array([3, 1]), np.array([0.0, 5.0])) == (1, 25.0)
+    # several targets on the same node: the cheapest offset wins
+    assert search.nearest_target(0, np.array([2, 2]), np.array([8.0, 3.0])) == (1, 13.0)
+    assert search.nearest_target(3, np.array([0, 1])) == (-1, float("inf"))
+    assert search.nearest_target(0, np.array([], dtype=np.int64)) == (-1, float("inf"))
+
+
+def test_nearest_target_matches_full_search():
+    """Test che la ricerca con terminazione anticipata sia esatta."""
+    rng = np.random.default_rng(0)
+    num_nodes, num_edges = 300, 1200
+    x, y = rng.random(num_nodes), rng.random(num_nodes)
+    u = np.sort(rng.integers(0, num_nodes, num_edges))
+    v = rng.integers(0, num_nodes, num_edges)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=num_nodes), out=indptr[1:])
+    straight = np.hypot(x[u] - x[v], y[u] - y[v])
+    graph = csr_graph(
+        node_ids=np.arange(num_nodes), x=x, y=y, indptr=indptr, indices=v,
+        length=straight * rng.uniform(1.0, 1.5, num_edges),
+        travel_time=np.full(num_edges, np.nan), edge_rows=np.arange(num_edges),
+    )
+    search = reachability(graph, graph.length)
+
+    for source in range(0, num_nodes, 15):
+        targets = rng.choice(num_nodes, 10, replace=False)
+        offsets = rng.random(10) * 0.1
+        bounds = np.hypot(x[targets] - x[source], y[targets] - y[source]) + offsets
+        nodes, costs = search.search(source, float("inf"))
+        arrival = dict(zip(nodes.tolist(), costs.tolist()))
+        totals = [arrival.get(t, np.inf) + o for t, o in zip(targets.tolist(), offsets)]
+
+        position, cost = search.nearest_target(source, targets, offsets, bounds)
+
+        assert cost == pytest.approx(min(totals))
+        if np.isfinite(cost):
+            assert totals[position] == pytest.approx(cost)
+
+
+def test_path(graph):
+    """Test del cammino minimo tra due nodi."""
+    edges, cost, settled = reachability(graph, graph.length).path(0, 1)
+
+    np.testing.assert_array_equal(edges, [1, 3])
+    assert cost == pytest.approx(20.0)
+    assert settled == 3
+
+
+def test_path_multiple_sources(graph):
+    """Test del cammino minimo e del bersaglio più vicino da più nodi di partenza con costi iniziali."""
+    search = reachability(graph, graph.length)
+
+    # node 1 costs 20 from node 0, but 5 + 10 from node 2
+    edges, cost, _ = search.path(np.array([0, 2]), 1, offsets=np.array([0.0, 5.0]))
+    np.testing.assert_array_equal(edges, [3])
+    assert cost == pytest.approx(15.0)
+    # a source unreachable from the point is ignored
+    edges, cost, _ = search.path(np.array([0, 2]), 1, offsets=np.array([0.0, np.inf]))
+    np.testing.assert_array_equal(edges, [1, 3])
+    assert cost == pytest.approx(20.0)
+    assert search.nearest_target(
+        np.array([0, 2]), np.array([3]), source_offsets=np.array([0.0, 5.0])
+    ) == (0, 65.0)
+
+
+def test_path_unreachable(graph):
+    """Test del cammino verso un nodo non raggiungibile."""
+    edges, cost, _ = reachability(graph, graph.length).path(3, 0)
+
+    assert len(edges) == 0
+    assert cost == float("inf")
@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+from greento.network.snap import snap_index
+
+
+@pytest.fixture
+def index():
+    """Fixture per creare un indice con due nodi a 60 gradi di latitudine."""
+    # 0.01 deg of longitude is ~556 m at 60 deg N, 0.006 deg of latitude ~667 m
+    return snap_index(np.array([60.0, 60.006]), np.array([10.01, 10.0]))
+
+
+def test_snap_in_meters(index):
+    """Test che l'aggancio usi le distanze metriche e non i gradi."""
+    nodes, distances = index.snap(np.array([60.0]), np.array([10.0]))
+
+    # in degrees the second node (0.006) looks closer than the first one (0.01)
+    assert nodes[0] == 0
+    assert distances[0] == pytest.approx(556.0, rel=0.01)
+
+
+def test_snap_max_distance(index):
+    """Test dei punti troppo lontani da ogni nodo."""
+    nodes, distances = index.snap(np.array([60.0, 61.0]), np.array([10.01, 10.0]), max_distance=100)
+
+    np.testing.assert_array_equal(nodes, [0, -1])
+    assert distances[0] == pytest.approx(0.0)
+    assert np.isinf(distances[1])
+
+
+def test_snap_many_points(index):
+    """Test dell'aggancio di molti punti in una sola interrogazione."""
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(59.99, 60.01, 1000)
+    lons = rng.uniform(9.99, 10.02, 1000)
+
+    nodes, distances = index.snap(lats, lons)
+
+    brute = np.stack([
+        np.hypot((lons - lon) * 55597.0, (lats - lat) * 111195.0)
+        for lat, lon in zip(index.lats, index.lons)
+    ])
+    np.testing.assert_array_equal(nodes, brute.argmin(axis=0))
+    np.testing.assert_allclose(distances, brute.min(axis=0), rtol=0.01)
+
+
+def test_invalid_coordinates():
+    """Test delle coordinate dei nodi non valide."""
+    with pytest.raises(ValueError, match="Coordinates not valid"):
+        snap_index(np.array([60.0, np.nan]), np.array([10.0, 10.0]))
@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+from greento.network.prepared import prepared_network
+from greento.network.speeds import speed_profiles
+
+
+@pytest.fixture
+def edges():
+    """Fixture per creare gli archi di una strada con limiti di velocità misti."""
+    return pd.DataFrame({
+        'length': [1000.0, 1000.0, 1000.0, 1000.0, 1000.0],
+        'highway': ['primary', 'residential', "['tertiary_link', 'service']", 'footway', None],
+        'maxspeed': ['70', None, '20 mph', 'IT:urban', 'none'],
+    })
+
+
+def test_parse_maxspeed():
+    """Test dell'interpretazione dei limiti di velocità, anche in mph, come zone e in liste."""
+    speeds = speed_profiles.parse_maxspeed(pd.Series(['50', "['30', '50']", '20 mph', 'IT:urban', 'none', None, '0']))
+
+    np.testing.assert_allclose(speeds[:4], [50.0, 30.0, 32.18688, 50.0])
+    assert np.isnan(speeds[4:]).all()
+
+
+def test_highway_speeds():
+    """Test delle velocità predefinite delle classi stradali."""
+    speeds = speed_profiles.highway_speeds(pd.Series(['primary', 'motorway_link', "['residential', 'primary']", 'footway']))
+
+    np.testing.assert_allclose(speeds[:3], [50.0, 110.0, 30.0])
+    assert np.isnan(speeds[3])
+
+
+def test_travel_times(edges):
+    """Test dei tempi di percorrenza di tutti i modi calcolati insieme dagli archi."""
+    profiles = speed_profiles.from_edges(edges)
+    stored = np.array([np.nan, 60.0, np.nan, np.nan, np.nan])
+    times = profiles.travel_times(edges['length'].to_numpy(), stored)
+
+    assert set(times) == set(speed_profiles.SPEEDS_KMH)
+    # cars follow the limit or the road class, the stored driving time wins on the road modes only
+    np.testing.assert_allclose(times['drive'], [1000 / (70 / 3.6), 60.0, 1000 / (32.18688 / 3.6), 1000 / (50 / 3.6), 1000 / (30 / 3.6)], rtol=1e-5)
+    np.testing.assert_allclose(times['drive_public'], times['drive'])
+    # the other modes keep their own speed, capped by the road
+    np.testing.assert_allclose(times['walk'], [720.0] * 5, rtol=1e-5)
+    np.testing.assert_allclose(times['bike'], [240.0] * 5, rtol=1e-5)
+    assert times['drive'].dtype == np.float32
+
+
+def test_prepared_network_speeds():
+    """Test che la rete preparata usi i profili di velocità senza modificare gli archi."""
+    nodes = gpd.GeoDataFrame(
+        {'osmid': [1, 2], 'x': [7.600, 7.601], 'y': [45.0, 45.0]},
+        geometry=[Point(7.600, 45.0), Point(7.601, 45.0)],
+        crs="EPSG:4326",
+    )
+    edges = gpd.GeoDataFrame(
+        {'u': [1, 2], 'v': [2, 1], 'length': [100.0, 100.0], 'highway': ['living_street', 'primary'], 'maxspeed': [None, '60']},
+        geometry=[LineString([(7.600, 45.0), (7.601, 45.0)]), LineString([(7.601, 45.0), (7.600, 45.0)])],
+        crs="EPSG:4326",
+    )
+    network = prepared_network(nodes, edges)
+
+    np.testing.assert_allclose(network.travel_times['drive'], [36.0, 6.0], rtol=1e-5)
+    np.testing.assert_allclose(network.travel_times['bike'], [36.0, 24.0], rtol=1e-5)
+    assert 'travel_time' not in edges.columns
+
+
+def test_estimated_time():
+    """Test della stima del tempo di viaggio con ritardi per tutti i modi, compreso drive_public."""
+    assert speed_profiles.estimated_time(1000.0, 'drive_public') == pytest.approx(1000 / 8.33 * 1.25 + 180)
+    assert speed_profiles.estimated_time(1000.0, 'drive_service') == pytest.approx(1000 / 8.33 * 1.25 + 180)
+    assert speed_profiles.estimated_time(1400.0, 'walk') == pytest.approx(1150.0)
+    assert speed_profiles.estimated_distance(720.0 * 1.15, 'walk') == pytest.approx(1000.0)
+
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        speed_profiles.estimated_time(1000.0, 'unknown')
+    with pytest.raises(ValueError, match="Transport mode not valid"):
+        speed_profiles.estimated_distance(600.0, 'unknown')
@@ -0,0 +1,94 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import Point, LineString
+from greento.network.prepared import prepared_network
+from greento.network.store import network_store
+
+
+@pytest.fixture
+def traffic_network():
+    """Fixture per creare una rete stradale con indice (u, v, key) come osmnx."""
+    nodes = gpd.GeoDataFrame(
+        {'x': [7.600, 7.601, 7.602], 'y': [45.0, 45.0, 45.001]},
+        geometry=[Point(7.600, 45.0), Point(7.601, 45.0), Point(7.602, 45.001)],
+        index=pd.Index([101, 202, 303], name='osmid'),
+        crs="EPSG:4326",
+    )
+    edges = gpd.GeoDataFrame(
+        {
+            'length': [100.0, 100.0, 150.0],
+            'travel_time': [np.nan, np.nan, 12.0],
+        },
+        geometry=[
+            LineString([(7.601, 45.0), (7.600, 45.0)]),
+            LineString([(7.600, 45.0), (7.601, 45.0)]),
+            LineString([(7.601, 45.0), (7.6015, 45.0005), (7.602, 45.001)]),
+        ],
+        index=pd.MultiIndex.from_tuples(
+            [(202, 101, 0), (101, 202, 0), (202, 303, 0)],
+            names=['u', 'v', 'key'],
+        ),
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+def test_save_load(traffic_network, tmp_path):
+    """Test del salvataggio e caricamento memory-mapped della rete."""
+    store = network_store(str(tmp_path / "network"))
+    store.save(traffic_network)
+
+    loaded = store.load()
+
+    assert isinstance(loaded.graph.indices, np.memmap) or isinstance(loaded.graph.indices.base, np.memmap)
+    assert loaded.graph.indices.dtype == np.int32
+    assert loaded.graph.length.dtype == np.float32
+    np.testing.assert_array_equal(loaded.graph.node_ids, [101, 202, 303])
+    np.testing.assert_array_equal(loaded.graph.indptr, traffic_network.graph.indptr)
+    np.testing.assert_array_equal(loaded.graph.indices, traffic_network.graph.indices)
+    np.testing.assert_array_equal(loaded.travel_times['walk'], traffic_network.travel_times['walk'])
+
+    search = loaded.search('length')
+    assert loaded.shared and search.shared
+    # the search reads the mapped pages in place instead of copying them
+    assert np.shares_memory(np.asarray(search._indices), loaded.graph.indices)
+    nodes, _ = search.search(0, 1000)
+    assert sorted(nodes.tolist()) == [0, 1, 2]
+    assert not store.load(mmap=False).search('length').shared
+
+
+def test_load_rebuilds_gdfs(traffic_network, tmp_path):
+    """Test della ricostruzione su richiesta dei GeoDataFrame."""
+    store = network_store(str(tmp_path / "network"))
+    store.save(traffic_network)
+
+    loaded = store.load(mmap=False)
+    nodes, edges = loaded
+
+    assert list(nodes.index) == [101, 202, 303]
+    assert len(edges) == 3
+    assert edges.crs == "EPSG:4326"
+    curved = edges.loc[(202, 303, 0)]
+    assert len(curved.geometry.coords) == 3
+    assert curved['travel_time'] == pytest.approx(12.0)
+
+
+def test_load_missing(tmp_path):
+    """Test del caricamento da una cartella senza rete."""
+    with pytest.raises(ValueError, match="Network store not found"):
+        network_store(str(tmp_path)).load()
+
+
+def test_save_load_landmarks(traffic_network, tmp_path):
+    """Test del salvataggio delle tabelle dei landmark insieme alla rete."""
+    tables = traffic_network.landmarks("length", count=2)
+    store = network_store(str(tmp_path / "network"))
+    store.save(traffic_network)
+
+    loaded = store.load()
+
+    assert list(loaded.landmark_tables) == ["length"]
+    np.testing.assert_array_equal(loaded.landmarks("length").nodes, tables.nodes)
+    np.testing.assert_array_equal(loaded.landmarks("length").from_landmarks, tables.from_landmarks)
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+from greento.network.graph import csr_graph
+from greento.network.search import reachability
+from greento.network.trees import path_tree, path_tree_cache
+
+
+@pytest.fixture
+def graph():
+    """Fixture per creare un grafo CSR con una scorciatoia indiretta."""
+    # 0 -> 1 costs 100 directly, but only 20 through 2
+    return csr_graph(
+        node_ids=np.array([1, 2, 3, 4]),
+        x=np.zeros(4),
+        y=np.zeros(4),
+        indptr=np.array([0, 2, 3, 4, 4]),
+        indices=np.array([1, 2, 3, 1]),
+        length=np.array([100.0, 10.0, 50.0, 10.0]),
+        travel_time=np.full(4, np.nan),
+        edge_rows=np.arange(4),
+    )
+
+
+def test_tree_cost_and_path(graph):
+    """Test dei costi e dei cammini letti dall'albero."""
+    tree = reachability(graph, graph.length).shortest_path_tree(0)
+
+    np.testing.assert_array_equal(tree.nodes, [0, 1, 2, 3])
+    np.testing.assert_allclose(tree.cost(np.array([3, 1, 0])), [70.0, 20.0, 0.0])
+    np.testing.assert_array_equal(tree.path(3, graph), [1, 3, 2])
+    assert len(tree.path(0, graph)) == 0
+
+
+def test_tree_limit(graph):
+    """Test dei nodi fuori dal limite di costo."""
+    tree = reachability(graph, graph.length).shortest_path_tree(0, limit=30)
+
+    assert np.isinf(tree.cost(np.array([3]))[0])
+    assert tree.path(3, graph) is None
+
+
+def test_cache_lru_eviction():
+    """Test dell'espulsione dell'albero usato meno di recente."""
+    def tree(source):
+        return path_tree(source, np.inf, np.arange(10), np.zeros(10), np.full(10, -1))
+
+    cache = path_tree_cache(max_bytes=2 * tree(0).nbytes)
+    cache.put((0, "length", np.inf), tree(0))
+    cache.put((1, "length", np.inf), tree(1))
+    assert cache.get((0, "length", np.inf)) is not None
+
+    cache.put((2, "length", np.inf), tree(2))
+
+    assert (0, "length", np.inf) in cache
+    assert (1, "length", np.inf) not in cache
+    assert cache.get((1, "length", np.inf)) is None
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+    assert cache.nbytes == 2 * tree(0).nbytes
@@ -4,6 +4,7 @@ import geopandas as gpd
 from shapely.geometry import Point, LineString
 from greento.traffic.traffic import traffic
 from greento.boundingbox import boundingbox
+from greento.network.prepared import prepared_network
 
 
 @pytest.fixture
@@ -87,4 +88,75 @@ def test_get_traffic_area_invalid_network_type(mock_graph_from_polygon, traffic_
     with pytest.raises(ValueError, match="Invalid network type"):
         traffic_instance.get_traffic_area(network_type="invalid_type")
 
-    mock_graph_from_polygon.assert_called_once()
\ No newline at end of file
+    mock_graph_from_polygon.assert_called_once()
+
+@patch("greento.traffic.traffic.ox.graph_from_polygon")
+@patch("greento.traffic.traffic.ox.graph_to_gdfs")
+@patch("greento.traffic.traffic.gpd.clip")
+def test_get_traffic_area_prepared(mock_clip, mock_graph_to_gdfs, mock_graph_from_polygon, traffic_instance):
+    """Test get_traffic_area con rete preparata."""
+    mock_graph_from_polygon.return_value = MagicMock()
+
+    mock_nodes = gpd.GeoDataFrame({
+        'osmid': [1, 2],
+        'x': [0.0, 1.0],
+        'y': [0.0, 1.0],
+        'geometry': [Point(0, 0), Point(1, 1)]
+    }, crs="EPSG:4326")
+
+    mock_edges = gpd.GeoDataFrame({
+        'u': [1],
+        'v': [2],
+        'length': [100.0],
+        'geometry': [LineString([(0, 0), (1, 1)])]
+    }, crs="EPSG:4326")
+
+    mock_graph_to_gdfs.return_value = (mock_nodes, mock_edges)
+    mock_clip.side_effect = lambda gdf, bbox: gdf
+
+    result = traffic_instance.get_traffic_area(network_type="drive", prepared=True)
+
+    assert isinstance(result, prepared_network)
+    assert result.graph.num_nodes == 2
+    assert result.graph.num_edges == 1
+    result_nodes, result_edges = result
+    assert result_nodes is mock_nodes
+
+
+@patch("greento.traffic.traffic.ox.graph_from_polygon")
+@patch("greento.traffic.traffic.ox.graph_to_gdfs")
+@patch("greento.traffic.traffic.gpd.clip")
+def test_get_traffic_area_core(mock_clip, mock_graph_to_gdfs, mock_graph_from_polygon, traffic_instance):
+    """Test get_traffic_area con il nucleo della rete, senza i frammenti lasciati dal ritaglio."""
+    mock_graph_from_polygon.return_value = MagicMock()
+
+    mock_nodes = gpd.GeoDataFrame({
+        'osmid': [1, 2, 3, 4],
+        'x': [0.0, 0.5, 1.0, 0.0],
+        'y': [0.0, 0.0, 0.0, 1.0],
+        'geometry': [Point(0, 0), Point(0.5, 0), Point(1, 0), Point(0, 1)]
+    }, crs="EPSG:4326")
+
+    mock_edges = gpd.GeoDataFrame({
+        'u': [1, 2, 2, 3, 1],
+        'v': [2, 1, 3, 2, 4],
+        'length': [100.0, 100.0, 100.0, 100.0, 50.0],
+        'geometry': [
+            LineString([(0, 0), (0.5, 0)]),
+            LineString([(0.5, 0), (0, 0)]),
+            LineString([(0.5, 0), (1, 0)]),
+            LineString([(1, 0), (0.5, 0)]),
+            LineString([(0, 0), (0, 1)]),
+        ]
+    }, crs="EPSG:4326")
+
+    mock_graph_to_gdfs.return_value = (mock_nodes, mock_edges)
+    mock_clip.side_effect = lambda gdf, bbox: gdf
+
+    result = traffic_instance.get_traffic_area(network_type="walk", core=True)
+
+    assert isinstance(result, prepared_network)
+    assert result.parent.graph.num_nodes == 4
+    assert list(result.graph.node_ids) == [1, 3]
+    assert result.graph.num_edges == 2
+    assert list(result.graph.length) == [200.0, 200.0]
@@ -0,0 +1,91 @@
+import zipfile
+import pytest
+import numpy as np
+import pandas as pd
+from greento.transit.gtfs import gtfs_feed
+
+
+@pytest.fixture
+def gtfs_zip(tmp_path):
+    """Fixture per creare un feed GTFS sintetico con due servizi."""
+    tables = {
+        'stops.txt': "stop_id,stop_name,stop_lat,stop_lon\nA,A,45.12,9.45\nB,B,45.12,9.46\nC,C,45.12,9.47\n",
+        'trips.txt': "route_id,service_id,trip_id\nR1,WEEK,T1\nR1,WEEK,T2\nR1,SUN,T3\n",
+        'stop_times.txt': (
+            "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+            "T2,08:20:00,08:20:00,A,1\nT2,08:24:00,08:25:00,B,2\nT2,,,C,3\nT2,08:30:00,08:30:00,C,4\n"
+            "T1,08:00:00,08:00:00,A,1\nT1,08:04:00,08:05:00,B,2\nT1,08:10:00,08:10:00,C,3\n"
+            "T3,25:00:00,25:00:00,A,1\nT3,25:10:00,25:10:00,C,2\n"
+        ),
+        'calendar.txt': (
+            "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+            "WEEK,1,1,1,1,1,0,0,20250101,20251231\nSUN,0,0,0,0,0,0,1,20250101,20251231\n"
+        ),
+        'calendar_dates.txt': "service_id,date,exception_type\nWEEK,20250602,2\n",
+        'transfers.txt': "from_stop_id,to_stop_id,transfer_type,min_transfer_time\nB,C,2,120\nC,A,3,\n",
+    }
+    path = tmp_path / "feed.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in tables.items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def test_from_zip(gtfs_zip):
+    """Test del caricamento di un file GTFS negli array compatti."""
+    feed = gtfs_feed.from_zip(gtfs_zip)
+
+    assert feed.num_stops == 3
+    assert feed.num_routes == 2
+    # the weekday trips share a pattern and are sorted by departure
+    route = int(np.flatnonzero(np.diff(feed.trip_ptr) == 2)[0])
+    stops = feed.route_stops[feed.route_ptr[route]:feed.route_ptr[route + 1]]
+    np.testing.assert_array_equal(stops, [0, 1, 2])
+    times = feed.departures[feed.time_ptr[route]:feed.time_ptr[route + 1]].reshape(2, 3)
+    np.testing.assert_array_equal(times[:, 0], [8 * 3600, 8 * 3600 + 1200])
+    # times past midnight are kept as they are
+    assert feed.arrivals.max() == 25 * 3600 + 600
+    # only the possible transfers are kept
+    np.testing.assert_array_equal(feed.transfer_ptr, [0, 0, 1, 1])
+    assert feed.transfer_times[0] == 120
+
+
+def test_from_zip_service_date(gtfs_zip):
+    """Test del filtro dei servizi attivi in un giorno."""
+    monday = gtfs_feed.from_zip(gtfs_zip, "20250609")
+    holiday = gtfs_feed.from_zip(gtfs_zip, "20250602")
+    sunday = gtfs_feed.from_zip(gtfs_zip, "20250608")
+
+    assert np.diff(monday.trip_ptr).tolist() == [2]
+    assert holiday.num_routes == 0
+    assert np.diff(sunday.trip_ptr).tolist() == [1]
+
+
+def test_overtaking_trips():
+    """Test della separazione delle corse che si sorpassano."""
+    stops = pd.DataFrame({'stop_id': ['A', 'B'], 'stop_lat': [45.12, 45.12], 'stop_lon': [9.45, 9.46]})
+    trips = pd.DataFrame({'trip_id': ['slow', 'fast']})
+    stop_times = pd.DataFrame({
+        'trip_id': ['slow', 'slow', 'fast', 'fast'],
+        'stop_id': ['A', 'B', 'A', 'B'],
+        'stop_sequence': ['1', '2', '1', '2'],
+        'arrival_time': ['08:00:00', '08:30:00', '08:05:00', '08:15:00'],
+        'departure_time': ['08:00:00', '08:30:00', '08:05:00', '08:15:00'],
+    })
+
+    feed = gtfs_feed.from_frames(stops, trips, stop_times)
+
+    assert feed.num_routes == 2
+    np.testing.assert_array_equal(np.diff(feed.trip_ptr), [1, 1])
+
+
+def test_invalid_feed(tmp_path):
+    """Test dei file GTFS non validi."""
+    path = tmp_path / "empty.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("stops.txt", "stop_id,stop_lat,stop_lon\n")
+
+    with pytest.raises(ValueError, match="GTFS file not valid"):
+        gtfs_feed.from_zip(str(path))
+    with pytest.raises(ValueError, match="GTFS file not valid"):
+        gtfs_feed.from_zip(str(tmp_path / "missing.zip"))
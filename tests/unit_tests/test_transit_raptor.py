@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+import pandas as pd
+from greento.transit.gtfs import gtfs_feed
+from greento.transit.raptor import raptor
+
+
+@pytest.fixture
+def feed():
+    """Fixture per creare un orario con due linee e un trasbordo a piedi."""
+    # line 1: A -> B every 10 minutes, line 2: C -> D at 08:20 only, B to C on foot in 60 s
+    stops = pd.DataFrame({
+        'stop_id': ['A', 'B', 'C', 'D'],
+        'stop_lat': [45.12] * 4,
+        'stop_lon': [9.45, 9.46, 9.4601, 9.47],
+    })
+    rows = []
+    for i, start in enumerate(['08:00', '08:10', '08:20']):
+        hour, minute = start.split(':')
+        end = f"{hour}:{int(minute) + 5:02d}"
+        rows += [(f"L1_{i}", 'A', 1, f"{start}:00"), (f"L1_{i}", 'B', 2, f"{end}:00")]
+    rows += [('L2', 'C', 1, '08:20:00'), ('L2', 'D', 2, '08:30:00')]
+    stop_times = pd.DataFrame(rows, columns=['trip_id', 'stop_id', 'stop_sequence', 'arrival_time'])
+    stop_times['departure_time'] = stop_times['arrival_time']
+    stop_times['stop_sequence'] = stop_times['stop_sequence'].astype(str)
+    trips = pd.DataFrame({'trip_id': stop_times['trip_id'].unique()})
+    transfers = pd.DataFrame({'from_stop_id': ['B'], 'to_stop_id': ['C'], 'min_transfer_time': ['60']})
+    return gtfs_feed.from_frames(stops, trips, stop_times, transfers)
+
+
+def test_search(feed):
+    """Test degli arrivi più rapidi con un trasbordo."""
+    arrivals = raptor(feed).search(np.array([0]), np.array([120.0]), 8 * 3600)
+
+    # the 08:00 trip is missed, the 08:10 one reaches B at 08:15 and C on foot at 08:16
+    np.testing.assert_allclose(
+        arrivals, [8 * 3600 + 120, 8 * 3600 + 900, 8 * 3600 + 960, 8 * 3600 + 1800]
+    )
+
+
+def test_search_rounds(feed):
+    """Test del numero massimo di corse per viaggio."""
+    arrivals = raptor(feed, max_rounds=1).search(np.array([0]), None, 8 * 3600)
+
+    assert arrivals[1] == 8 * 3600 + 300
+    # reaching D needs a second trip
+    assert np.isinf(arrivals[3])
+
+
+def test_search_limit(feed):
+    """Test del limite sul tempo di viaggio."""
+    arrivals = raptor(feed).search(np.array([0]), None, 8 * 3600, limit=1000)
+
+    assert arrivals[2] == 8 * 3600 + 360
+    assert np.isinf(arrivals[3])
+
+
+def test_profile(feed):
+    """Test del profilo su più orari di partenza."""
+    departures = np.array([8 * 3600, 8 * 3600 + 300, 8 * 3600 + 600])
+    search = raptor(feed)
+
+    durations = search.profile(np.array([0]), None, departures)
+
+    # every departure of the profile matches a separate search
+    for departure, row in zip(departures, durations):
+        np.testing.assert_allclose(row, search.search(np.array([0]), None, departure) - departure)
+    np.testing.assert_allclose(durations[:, 1], [300, 600, 300])
@@ -0,0 +1,98 @@
+import pytest
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import Point, LineString
+from greento.network.prepared import prepared_network
+from greento.transit.gtfs import gtfs_feed
+from greento.transit.router import transit_router
+
+
+@pytest.fixture
+def network():
+    """Fixture per creare una strada pedonale di 21 nodi distanti 100 m."""
+    xs = [9.450 + 0.001 * i for i in range(21)]
+    nodes = gpd.GeoDataFrame(
+        {'osmid': range(1, 22), 'x': xs, 'y': [45.12] * 21},
+        geometry=[Point(x, 45.12) for x in xs],
+        crs="EPSG:4326",
+    )
+    pairs = [(i, i + 1) for i in range(20)] + [(i + 1, i) for i in range(20)]
+    edges = gpd.GeoDataFrame(
+        {'u': [a + 1 for a, _ in pairs], 'v': [b + 1 for _, b in pairs], 'length': [100.0] * len(pairs)},
+        geometry=[LineString([(xs[a], 45.12), (xs[b], 45.12)]) for a, b in pairs],
+        crs="EPSG:4326",
+    )
+    return prepared_network(nodes, edges)
+
+
+@pytest.fixture
+def feed():
+    """Fixture per creare una linea tra le due estremità della strada."""
+    stops = pd.DataFrame({
+        'stop_id': ['A', 'B', 'C'],
+        'stop_lat': [45.12] * 3,
+        'stop_lon': [9.450, 9.470, 9.4692],
+    })
+    stop_times = pd.DataFrame({
+        'trip_id': ['T', 'T'],
+        'stop_id': ['A', 'B'],
+        'stop_sequence': ['1', '2'],
+        'arrival_time': ['08:02:00', '08:05:00'],
+        'departure_time': ['08:02:00', '08:05:00'],
+    })
+    return gtfs_feed.from_frames(stops, pd.DataFrame({'trip_id': ['T']}), stop_times)
+
+
+def test_walking_transfers(network, feed):
+    """Test dei trasbordi a piedi tra fermate vicine."""
+    router = transit_router(feed, network)
+
+    np.testing.assert_array_equal(router.stop_nodes, [0, 20, 19])
+    # B and C are a node apart, A is too far to walk to in 5 minutes
+    pairs = {
+        (int(s), int(t))
+        for s in range(router.feed.num_stops)
+        for t in router.feed.transfer_stops[router.feed.transfer_ptr[s]:router.feed.transfer_ptr[s + 1]]
+    }
+    assert pairs == {(1, 2), (2, 1)}
+
+
+def test_search(network, feed):
+    """Test dell'isocrona con accesso e uscita a piedi."""
+    router = transit_router(feed, network)
+    walk_only = network.search('walk').search(0, 600)[0]
+
+    nodes, costs = router.search(np.array([0]), None, 600)
+
+    arrival = dict(zip(nodes.tolist(), costs.tolist()))
+    assert 20 not in walk_only.tolist()
+    # the 08:02 trip leaves the first node and reaches the last one at 08:05
+    assert arrival[20] == pytest.approx(300.0)
+    assert arrival[17] == pytest.approx(300.0 + 300 / (5 / 3.6), abs=0.1)
+    assert list(costs) == sorted(costs)
+
+
+def test_search_window(network, feed):
+    """Test dell'attesa media su una finestra di partenze."""
+    router = transit_router(feed, network, departure_time=8 * 3600, window=120, step=60)
+
+    nodes, costs = router.search(np.array([0]), None, 600)
+
+    # leaving at 08:00, 08:01 and 08:02 the trip reaches the last node in 300, 240 and 180 s
+    assert dict(zip(nodes.tolist(), costs.tolist()))[20] == pytest.approx(240.0, abs=1e-6)
+
+
+def test_travel_time(network, feed):
+    """Test del tempo di viaggio tra due punti."""
+    router = transit_router(feed, network)
+
+    assert router.travel_time(45.12, 9.450, 45.12, 9.470) == pytest.approx(300.0)
+    assert router.travel_time(45.12, 9.450, 45.12, 9.452) == pytest.approx(200 / (5 / 3.6), abs=0.1)
+    assert np.isinf(router.travel_time(45.12, 9.450, 45.12, 9.470, limit=100))
+
+
+def test_invalid_window(network, feed):
+    """Test di una finestra di partenze non valida."""
+    with pytest.raises(ValueError, match="Departure window not valid"):
+        transit_router(feed, network, window=-60)
@@ -0,0 +1,37 @@
+import pytest
+import numpy as np
+from affine import Affine
+from greento.utils.geo import geo
+
+
+@pytest.fixture
+def geo_utils():
+    """Fixture per creare un'istanza di geo."""
+    return geo()
+
+
+def test_haversine_distances(geo_utils):
+    """Test della distanza di Haversine vettoriale."""
+    distances = geo_utils.haversine_distances(
+        np.array([45.0, 45.0]), np.array([7.0, 7.0]), np.array([45.0, 46.0]), np.array([7.0, 7.0])
+    )
+
+    assert distances[0] == pytest.approx(0.0)
+    assert distances[1] == pytest.approx(111.19, abs=0.01)
+
+
+def test_pixel_centers(geo_utils):
+    """Test del calcolo vettoriale dei centri dei pixel."""
+    transform = Affine(0.1, 0, 10, 0, -0.1, 50)
+
+    lats, lons = geo_utils.pixel_centers(transform, np.array([0, 3]), np.array([0, 4]))
+
+    np.testing.assert_allclose(lats, [49.95, 49.65])
+    np.testing.assert_allclose(lons, [10.05, 10.45])
+
+
+def test_calculate_travel_time(geo_utils):
+    """Test della stima del tempo di viaggio con le stesse tabelle della rete, anche per drive_public."""
+    times = geo_utils._calculate_travel_time(np.array([0.0, 1000.0]), 'drive_public')
+
+    np.testing.assert_allclose(times, [3.0, 5.5])